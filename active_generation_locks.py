@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from google.api_core import exceptions as gexc
+from google.cloud import firestore as gc_firestore
+
+# One document per user, active_generation_locks/{uid}, holds the jobs that
+# currently occupy that user's generation slots:
+#
+#   {"uid": ..., "jobs": {job_id: {"resource", "kind", "acquiredAt", "expiresAt"}}}
+#
+# Starting a job is a single transactional point read plus write; every
+# terminal path releases its entry, and expired entries are ignored and pruned
+# so a crashed job cannot wedge the user.
+ACTIVE_LOCK_COLLECTION = "active_generation_locks"
+ACTIVE_LOCK_TTL_SECONDS = {
+    "image": int(os.getenv("ACTIVE_IMAGE_LOCK_TTL_SECONDS", "900")),
+    "video": int(os.getenv("ACTIVE_VIDEO_LOCK_TTL_SECONDS", "3600")),
+}
+
+
+def _lock_ref(db, uid: str):
+    return db.collection(ACTIVE_LOCK_COLLECTION).document(uid)
+
+
+def _live_entries(data: Dict[str, Any], now: int) -> Dict[str, Dict[str, Any]]:
+    jobs = data.get("jobs") or {}
+    if not isinstance(jobs, dict):
+        return {}
+    return {
+        job_id: entry
+        for job_id, entry in jobs.items()
+        if isinstance(entry, dict) and int(entry.get("expiresAt") or 0) > now
+    }
+
+
+def acquire_active_generation_lock(
+    db,
+    uid: str,
+    resource: str,
+    job_id: str,
+    *,
+    kind: Optional[str] = None,
+    limit: int = 1,
+    detail: str = "You already have a generation in progress.",
+) -> None:
+    """Take one of the user's `resource` slots for job_id or raise 429."""
+    ref = _lock_ref(db, uid)
+    now = int(time.time())
+    ttl = ACTIVE_LOCK_TTL_SECONDS.get(resource, 900)
+
+    @gc_firestore.transactional
+    def _tx(transaction: gc_firestore.Transaction) -> None:
+        data = ref.get(transaction=transaction).to_dict() or {}
+        live = _live_entries(data, now)
+
+        held = sum(1 for entry in live.values() if entry.get("resource") == resource)
+        if held >= max(1, limit):
+            raise HTTPException(status_code=429, detail=detail)
+
+        live[job_id] = {
+            "resource": resource,
+            "kind": kind or resource,
+            "acquiredAt": now,
+            "expiresAt": now + ttl,
+        }
+        transaction.set(ref, {
+            "uid": uid,
+            "jobs": live,
+            "updatedAt": gc_firestore.SERVER_TIMESTAMP,
+        })
+
+    _tx(db.transaction())
+
+
+def release_active_generation_lock(db, uid: Optional[str], job_id: Optional[str]) -> bool:
+    """Drop job_id's entry. Safe to call more than once and for unlocked jobs."""
+    if not uid or not job_id:
+        return False
+    try:
+        _lock_ref(db, uid).update({
+            gc_firestore.FieldPath("jobs", job_id).to_api_repr(): gc_firestore.DELETE_FIELD,
+            "updatedAt": gc_firestore.SERVER_TIMESTAMP,
+        })
+        return True
+    except gexc.NotFound:
+        return False
+    except Exception as exc:
+        print(
+            "ACTIVE GENERATION LOCK RELEASE ERROR:",
+            {"uid": uid, "jobId": job_id, "error": repr(exc)},
+            flush=True,
+        )
+        return False
+
+
+def get_active_generation_lock(db, uid: str) -> Dict[str, Any]:
+    data = _lock_ref(db, uid).get().to_dict() or {}
+    now = int(time.time())
+    jobs = data.get("jobs") or {}
+    live = _live_entries(data, now)
+    return {
+        "uid": uid,
+        "jobs": [
+            {"jobId": job_id, **entry, "expired": job_id not in live}
+            for job_id, entry in sorted(jobs.items(), key=lambda item: item[1].get("acquiredAt") or 0)
+            if isinstance(entry, dict)
+        ],
+        "activeCount": len(live),
+    }
+
+
+def clear_active_generation_lock(db, uid: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+    if job_id:
+        release_active_generation_lock(db, uid, job_id)
+    else:
+        _lock_ref(db, uid).delete()
+    return get_active_generation_lock(db, uid)
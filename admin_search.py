@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.cloud import firestore as gc_firestore
+
+from request_documents import load_documents_many, load_user_doc
+from usage_caps import get_tier_and_status
+
+# Admin lookups run against one lightweight document per user and per creative
+# in admin_search/{kind}_{id}:
+#
+#   {"kind", "refId", "uid", "tokens": [...], "tier", "status", "createdAt"}
+#
+# `tokens` holds normalized word prefixes for identity fields (names, email,
+# ids, product) and whole words for free text (prompts, ad copy), so a search
+# is an indexed array_contains on its longest word plus equality filters on
+# the facets. Documents are written whenever the server creates or changes a
+# job or a user's Stripe state; backfill_admin_search.py rebuilds everything.
+ADMIN_SEARCH_COLLECTION = "admin_search"
+INDEXED_KINDS = ("user", "image", "video")
+
+_MIN_TOKEN_LENGTH = 2
+_MAX_TOKEN_LENGTH = 20
+_MAX_TOKENS = 400
+_MAX_SCAN_ROUNDS = 5
+_WRITE_BATCH_LIMIT = 400
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_COLLECTION_KINDS = {"image_jobs": "image", "video_jobs": "video"}
+
+_fingerprint_lock = threading.Lock()
+_user_fingerprints: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _words(value: Any) -> List[str]:
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return _WORD_RE.findall(text)
+
+
+def search_tokens(prefixed: Iterable[Any] = (), words: Iterable[Any] = ()) -> List[str]:
+    """Prefix tokens for identity values, whole-word tokens for free text."""
+    tokens: "OrderedDict[str, None]" = OrderedDict()
+
+    for value in prefixed:
+        for word in _words(value):
+            for length in range(_MIN_TOKEN_LENGTH, min(len(word), _MAX_TOKEN_LENGTH) + 1):
+                tokens[word[:length]] = None
+
+    for value in words:
+        for word in _words(value):
+            if len(word) >= _MIN_TOKEN_LENGTH:
+                tokens[word[:_MAX_TOKEN_LENGTH]] = None
+
+    return list(tokens)[:_MAX_TOKENS]
+
+
+def query_tokens(q: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(
+        word[:_MAX_TOKEN_LENGTH]
+        for word in _words(q)
+        if len(word) >= _MIN_TOKEN_LENGTH
+    ))
+
+
+def _search_ref(db, kind: str, ref_id: str):
+    return db.collection(ADMIN_SEARCH_COLLECTION).document(f"{kind}_{ref_id}")
+
+
+def admin_user_facets(profile: Dict[str, Any]) -> Tuple[str, str]:
+    """The tier and status the admin users page displays and filters on."""
+    stripe_obj = profile.get("stripe") or {}
+    _tier, helper_status = get_tier_and_status(profile)
+    tier = str(stripe_obj.get("tier") or profile.get("tier") or "-").strip() or "-"
+    status = str(stripe_obj.get("status") or helper_status or "inactive").strip()
+    return tier.lower(), status.lower()
+
+
+def _owner_names(profile: Dict[str, Any]) -> List[Any]:
+    return [
+        profile.get("fullName"),
+        profile.get("firstName"),
+        profile.get("lastName"),
+        profile.get("email"),
+    ]
+
+
+def user_search_doc(uid: str, profile: Dict[str, Any], auth_user: Any = None) -> Dict[str, Any]:
+    stripe_obj = profile.get("stripe") or {}
+    tier, status = admin_user_facets(profile)
+
+    created_at = 0
+    metadata = getattr(auth_user, "user_metadata", None)
+    creation_ms = getattr(metadata, "creation_timestamp", None)
+    if creation_ms:
+        created_at = int(creation_ms) // 1000
+    if not created_at:
+        try:
+            created_at = int(profile.get("createdAt") or 0)
+        except (TypeError, ValueError):
+            created_at = 0
+
+    return {
+        "kind": "user",
+        "refId": uid,
+        "uid": uid,
+        "tokens": search_tokens(
+            prefixed=[
+                uid,
+                *_owner_names(profile),
+                getattr(auth_user, "display_name", None),
+                getattr(auth_user, "email", None),
+                stripe_obj.get("customerId"),
+            ],
+        ),
+        "tier": tier,
+        "status": status,
+        "createdAt": created_at,
+        "updatedAt": int(time.time()),
+    }
+
+
+def creative_search_doc(
+    kind: str,
+    job_id: str,
+    data: Dict[str, Any],
+    owner: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    copy_obj = data.get("copy") if isinstance(data.get("copy"), dict) else {}
+    try:
+        created_at = int(data.get("createdAt") or 0)
+    except (TypeError, ValueError):
+        created_at = 0
+
+    return {
+        "kind": kind,
+        "refId": job_id,
+        "uid": data.get("uid") or "",
+        "tokens": search_tokens(
+            prefixed=[
+                job_id,
+                data.get("uid"),
+                data.get("productName") or data.get("product_name"),
+                data.get("title"),
+                data.get("source") or data.get("sourceType"),
+                data.get("model"),
+                *_owner_names(owner or {}),
+            ],
+            words=[
+                kind,
+                data.get("directorPrompt") or data.get("userPrompt"),
+                data.get("promptText"),
+                data.get("visualPrompt") or data.get("prompt"),
+                copy_obj.get("headline"),
+                copy_obj.get("primary_text"),
+                copy_obj.get("cta"),
+            ],
+        ),
+        "status": str(data.get("status") or "unknown").lower(),
+        "createdAt": created_at,
+        "updatedAt": int(time.time()),
+    }
+
+
+# ---------- maintenance ----------
+def set_creative_job(job_ref, data: Dict[str, Any], *, merge: bool = False) -> None:
+    """
+    job_ref.set(data) for an image or video job, writing its search document
+    in the same batch. `data` must carry the job's searchable fields.
+    """
+    kind = _COLLECTION_KINDS[job_ref.parent.id]
+    db = job_ref._client
+
+    owner: Dict[str, Any] = {}
+    uid = data.get("uid") or ""
+    if uid:
+        try:
+            owner = load_user_doc(db, uid)
+        except Exception as exc:
+            print("ADMIN SEARCH OWNER READ ERROR:", {"uid": uid, "error": repr(exc)}, flush=True)
+
+    batch = db.batch()
+    batch.set(job_ref, data, merge=merge)
+    batch.set(_search_ref(db, kind, job_ref.id), creative_search_doc(kind, job_ref.id, data, owner))
+    batch.commit()
+
+
+def update_creative_job(job_ref, payload: Dict[str, Any]) -> None:
+    """
+    job_ref.update(payload), mirroring a status change into the search index
+    in the same batch so the admin status facet never lags the job.
+    """
+    kind = _COLLECTION_KINDS.get(job_ref.parent.id)
+    if kind is None or "status" not in payload:
+        job_ref.update(payload)
+        return
+
+    db = job_ref._client
+    batch = db.batch()
+    batch.update(job_ref, payload)
+    batch.set(
+        _search_ref(db, kind, job_ref.id),
+        {"status": str(payload["status"]).lower(), "updatedAt": int(time.time())},
+        merge=True,
+    )
+    batch.commit()
+
+
+def remove_from_search_index(db, kind: str, ref_id: str) -> None:
+    try:
+        _search_ref(db, kind, ref_id).delete()
+    except Exception as exc:
+        print("ADMIN SEARCH DELETE ERROR:", {"kind": kind, "id": ref_id, "error": repr(exc)}, flush=True)
+
+
+def _remember_fingerprint(uid: str, doc: Dict[str, Any]) -> bool:
+    """Record the indexed shape of a user's profile; False when unchanged."""
+    fingerprint = hashlib.sha1(
+        repr((doc["tokens"], doc["tier"], doc["status"])).encode("utf-8")
+    ).hexdigest()
+    with _fingerprint_lock:
+        if _user_fingerprints.get(uid) == fingerprint:
+            _user_fingerprints.move_to_end(uid)
+            return False
+        _user_fingerprints[uid] = fingerprint
+        while len(_user_fingerprints) > 4096:
+            _user_fingerprints.popitem(last=False)
+        return True
+
+
+def index_user(
+    db,
+    uid: str,
+    profile: Optional[Dict[str, Any]] = None,
+    *,
+    only_if_changed: bool = False,
+) -> None:
+    """
+    (Re)index a user after a profile or Stripe change. Never raises.
+
+    With only_if_changed nothing is read or written when this process already
+    indexed the same profile, which keeps the hook cheap on hot read paths
+    such as /me/entitlements.
+    """
+    if not uid:
+        return
+    try:
+        if profile is None:
+            profile = db.collection("users").document(uid).get().to_dict() or {}
+
+        changed = _remember_fingerprint(uid, user_search_doc(uid, profile))
+        if only_if_changed and not changed:
+            return
+
+        from firebase_admin import auth as admin_auth
+
+        try:
+            auth_user = admin_auth.get_user(uid)
+        except Exception:
+            auth_user = None
+
+        doc = user_search_doc(uid, profile, auth_user)
+        if not doc["createdAt"]:
+            # Keep the creation time an earlier write recorded from Auth.
+            doc.pop("createdAt")
+        _search_ref(db, "user", uid).set(doc, merge=True)
+    except Exception as exc:
+        with _fingerprint_lock:
+            _user_fingerprints.pop(uid, None)
+        print("ADMIN SEARCH USER INDEX ERROR:", {"uid": uid, "error": repr(exc)}, flush=True)
+
+
+# ---------- queries ----------
+def _parse_cursor(db, cursor: Optional[str]):
+    if not cursor or ":" not in str(cursor):
+        return None
+    created_at, doc_id = str(cursor).split(":", 1)
+    try:
+        return int(created_at), db.collection(ADMIN_SEARCH_COLLECTION).document(doc_id)
+    except ValueError:
+        return None
+
+
+def search_admin_index(
+    db,
+    kinds: Iterable[str],
+    q: Optional[str] = "",
+    *,
+    tier: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Newest-first index documents matching every word of q and the facets.
+
+    Returns (documents, next_cursor). The cursor is "<createdAt>:<docId>" of
+    the last document consumed and is "" once the results are exhausted.
+    Multi-word searches filter the remaining words locally and scan at most
+    _MAX_SCAN_ROUNDS batches per call, so a page can come back short with a
+    cursor to continue from.
+    """
+    kinds = list(kinds)
+    words = query_tokens(q)
+    pivot = max(words, key=len) if words else None
+    rest = [word for word in words if word != pivot]
+
+    query = db.collection(ADMIN_SEARCH_COLLECTION)
+    query = query.where("kind", "==", kinds[0]) if len(kinds) == 1 else query.where("kind", "in", kinds)
+    if pivot:
+        query = query.where("tokens", "array_contains", pivot)
+    if tier:
+        query = query.where("tier", "==", tier.lower())
+    if status:
+        query = query.where("status", "==", status.lower())
+    if created_after:
+        query = query.where("createdAt", ">=", int(created_after))
+    query = query.order_by("createdAt", direction=gc_firestore.Query.DESCENDING).order_by(
+        gc_firestore.FieldPath.document_id(),
+        direction=gc_firestore.Query.DESCENDING,
+    )
+
+    batch_size = limit if not rest else min(300, limit * 3)
+    position = _parse_cursor(db, cursor)
+    results: List[Dict[str, Any]] = []
+
+    for _round in range(_MAX_SCAN_ROUNDS):
+        page = query
+        if position is not None:
+            page = page.start_after({"createdAt": position[0], "__name__": position[1]})
+
+        snaps = list(page.limit(batch_size).stream())
+        for snap in snaps:
+            data = snap.to_dict() or {}
+            position = (int(data.get("createdAt") or 0), snap.reference)
+            tokens = data.get("tokens") or []
+            if rest and not all(word in tokens for word in rest):
+                continue
+            results.append(data)
+            if len(results) >= limit:
+                return results, f"{position[0]}:{snap.id}"
+
+        if len(snaps) < batch_size:
+            return results, ""
+
+    return results, f"{position[0]}:{position[1].id}" if position is not None else ""
+
+
+# ---------- backfill ----------
+def _commit_all(db, writes: List[Tuple[Any, Dict[str, Any]]]) -> None:
+    for start in range(0, len(writes), _WRITE_BATCH_LIMIT):
+        batch = db.batch()
+        for ref, data in writes[start:start + _WRITE_BATCH_LIMIT]:
+            batch.set(ref, data)
+        batch.commit()
+
+
+def _backfill_users(db, *, apply: bool, page_size: int) -> int:
+    from firebase_admin import auth as admin_auth
+
+    count = 0
+    pending: List[Any] = []
+
+    def _flush() -> None:
+        profiles = load_documents_many(db, "user", [user.uid for user in pending])
+        writes = [
+            (_search_ref(db, "user", user.uid), user_search_doc(user.uid, profiles.get(user.uid) or {}, user))
+            for user in pending
+        ]
+        if apply:
+            _commit_all(db, writes)
+        pending.clear()
+
+    for auth_user in admin_auth.list_users().iterate_all():
+        pending.append(auth_user)
+        count += 1
+        if len(pending) >= page_size:
+            _flush()
+    if pending:
+        _flush()
+    return count
+
+
+def _backfill_creative(db, kind: str, *, apply: bool, page_size: int) -> int:
+    collection = db.collection(f"{kind}_jobs")
+    count = 0
+    last = None
+
+    while True:
+        query = collection.order_by(gc_firestore.FieldPath.document_id()).limit(page_size)
+        if last is not None:
+            query = query.start_after(last)
+        snaps = list(query.stream())
+        if not snaps:
+            return count
+
+        owners = load_documents_many(db, "user", [(snap.to_dict() or {}).get("uid") for snap in snaps])
+        writes = []
+        for snap in snaps:
+            data = snap.to_dict() or {}
+            owner = owners.get(data.get("uid") or "") or {}
+            writes.append((_search_ref(db, kind, snap.id), creative_search_doc(kind, snap.id, data, owner)))
+        if apply:
+            _commit_all(db, writes)
+
+        count += len(snaps)
+        last = snaps[-1]
+        if len(snaps) < page_size:
+            return count
+
+
+def backfill_admin_search(
+    db,
+    kinds: Iterable[str] = INDEXED_KINDS,
+    *,
+    apply: bool = False,
+    page_size: int = 300,
+) -> Dict[str, int]:
+    """Rebuild admin_search documents. Without apply nothing is written."""
+    counts: Dict[str, int] = {}
+    for kind in kinds:
+        if kind == "user":
+            counts[kind] = _backfill_users(db, apply=apply, page_size=page_size)
+        elif kind in ("image", "video"):
+            counts[kind] = _backfill_creative(db, kind, apply=apply, page_size=page_size)
+        else:
+            raise ValueError(f"Unsupported admin search kind: {kind}")
+        print(f"{'Indexed' if apply else 'Would index'} {counts[kind]} {kind} document(s).", flush=True)
+    return counts
@@ -1,5 +1,8 @@
 import os
 import json
+import time
+import hashlib
+from collections import OrderedDict
 from typing import Optional, Dict, Any, Tuple
 
 import firebase_admin
@@ -9,6 +12,18 @@ import threading
 
 _firebase_init_lock = threading.Lock()
 
+# Verified identities are cached in-process so polling routes skip the
+# Firebase Auth user lookup. Token entries never outlive the token's own
+# expiry; account status (disabled / email verified) is re-checked after
+# AUTH_IDENTITY_STALENESS_SECONDS.
+AUTH_IDENTITY_CACHE_SIZE = int(os.getenv("AUTH_IDENTITY_CACHE_SIZE", "4096"))
+AUTH_IDENTITY_STALENESS_SECONDS = int(os.getenv("AUTH_IDENTITY_STALENESS_SECONDS", "60"))
+
+_identity_lock = threading.Lock()
+_token_cache: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+_account_cache: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+_identity_stats = {"tokenHits": 0, "tokenMisses": 0, "accountHits": 0, "accountMisses": 0}
+
 
 def init_firebase_once() -> None:
     """
@@ -119,24 +134,108 @@ def verify_firebase_token(id_token: str) -> Dict[str, Any]:
         )
 
 
-def require_user(authorization: Optional[str]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _cache_get(cache: OrderedDict, key: str, now: float):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= now:
+        cache.pop(key, None)
+        return None
+    cache.move_to_end(key)
+    return entry
+
+
+def _cache_put(cache: OrderedDict, key: str, entry: tuple) -> None:
+    cache[key] = entry
+    cache.move_to_end(key)
+    while len(cache) > max(1, AUTH_IDENTITY_CACHE_SIZE):
+        cache.popitem(last=False)
+
+
+def invalidate_user_identity(uid: str) -> None:
     """
-    Require a valid Firebase ID token in the Authorization header.
-    Returns (uid, email, claims).
+    Drop cached identity and account status for a user.
+    Call after disabling an account or changing its tier/claims so the next
+    request re-verifies against Firebase Auth.
     """
-    token = get_bearer_token(authorization)
-    if not token:
-        raise HTTPException(status_code=401, detail="Missing Authorization bearer token.")
+    if not uid:
+        return
+
+    with _identity_lock:
+        _account_cache.pop(uid, None)
+        stale = [key for key, entry in _token_cache.items() if entry[1] == uid]
+        for key in stale:
+            _token_cache.pop(key, None)
+
+
+def clear_identity_cache() -> None:
+    with _identity_lock:
+        _token_cache.clear()
+        _account_cache.clear()
+
+
+def identity_cache_stats() -> Dict[str, Any]:
+    with _identity_lock:
+        return {
+            **_identity_stats,
+            "tokens": len(_token_cache),
+            "accounts": len(_account_cache),
+            "maxEntries": AUTH_IDENTITY_CACHE_SIZE,
+            "stalenessSeconds": AUTH_IDENTITY_STALENESS_SECONDS,
+        }
+
+
+def _verified_claims(token: str) -> Dict[str, Any]:
+    """Return decoded claims, reusing a prior verification of the same token."""
+    key = _token_key(token)
+    now = time.time()
+
+    with _identity_lock:
+        entry = _cache_get(_token_cache, key, now)
+        if entry is not None:
+            _identity_stats["tokenHits"] += 1
+            return entry[2]
+        _identity_stats["tokenMisses"] += 1
 
     claims = verify_firebase_token(token)
 
     uid = claims.get("uid") or claims.get("user_id") or claims.get("sub")
-    if not uid:
-        raise HTTPException(status_code=401, detail="Invalid auth token (missing uid).")
+    try:
+        token_exp = float(claims.get("exp") or 0)
+    except (TypeError, ValueError):
+        token_exp = 0
+
+    if uid and token_exp > now:
+        with _identity_lock:
+            _cache_put(_token_cache, key, (token_exp, str(uid), claims))
+
+    return claims
+
+
+def _confirm_account_status(uid: str) -> Optional[str]:
+    """
+    Confirm the Firebase Auth account is enabled and verified.
+    Returns the account email. Successful checks are cached for
+    AUTH_IDENTITY_STALENESS_SECONDS; failures are never cached.
+    """
+    now = time.time()
+
+    if AUTH_IDENTITY_STALENESS_SECONDS > 0:
+        with _identity_lock:
+            entry = _cache_get(_account_cache, uid, now)
+            if entry is not None:
+                _identity_stats["accountHits"] += 1
+                return entry[1]
+            _identity_stats["accountMisses"] += 1
 
     try:
         user_record = fb_auth.get_user(uid)
     except fb_auth.UserNotFoundError:
+        invalidate_user_identity(uid)
         raise HTTPException(
             status_code=401,
             detail="User account no longer exists. Please sign in again.",
@@ -154,6 +253,7 @@ def require_user(authorization: Optional[str]) -> Tuple[str, Optional[str], Dict
         )
 
     if user_record.disabled:
+        invalidate_user_identity(uid)
         raise HTTPException(
             status_code=403,
             detail="This account has been disabled.",
@@ -171,8 +271,33 @@ def require_user(authorization: Optional[str]) -> Tuple[str, Optional[str], Dict
             detail="Please verify your email before continuing.",
         )
 
-    email = claims.get("email") or user_record.email
-    return uid, email, claims
+    if AUTH_IDENTITY_STALENESS_SECONDS > 0:
+        with _identity_lock:
+            _cache_put(
+                _account_cache,
+                uid,
+                (now + AUTH_IDENTITY_STALENESS_SECONDS, user_record.email),
+            )
+
+    return user_record.email
+
+
+def require_user(authorization: Optional[str]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """
+    Require a valid Firebase ID token in the Authorization header.
+    Returns (uid, email, claims).
+    """
+    token = get_bearer_token(authorization)
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing Authorization bearer token.")
+
+    claims = _verified_claims(token)
 
+    uid = claims.get("uid") or claims.get("user_id") or claims.get("sub")
+    if not uid:
+        raise HTTPException(status_code=401, detail="Invalid auth token (missing uid).")
 
+    account_email = _confirm_account_status(uid)
 
+    email = claims.get("email") or account_email
+    return uid, email, claims
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+
+from dotenv import load_dotenv
+
+from admin_search import INDEXED_KINDS, backfill_admin_search
+from auth_helpers import get_db
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the admin_search index for users and creative."
+    )
+    parser.add_argument(
+        "--kinds",
+        default=",".join(INDEXED_KINDS),
+        help="Comma-separated kinds to index (user, image, video).",
+    )
+    parser.add_argument("--page-size", type=int, default=300)
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Write index documents. Without this flag, the script performs a dry run.",
+    )
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    counts = backfill_admin_search(
+        get_db(),
+        kinds,
+        apply=args.apply,
+        page_size=max(1, min(args.page_size, 1000)),
+    )
+
+    print(
+        f"\n{'Backfill complete' if args.apply else 'Dry run complete'}: "
+        + ", ".join(f"{kind}={count}" for kind, count in counts.items())
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
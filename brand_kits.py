@@ -13,6 +13,7 @@ from admin_guard import is_admin
 from plan_config import get_limit
 from storage_utils import upload_bytes_to_firebase_storage
 from usage_caps import get_tier_and_status
+from request_documents import load_user_doc
 
 router = APIRouter()
 
@@ -72,7 +73,7 @@ def ensure_brand_kit_migration(db, uid: str, user_doc: Optional[Dict[str, Any]]
 def resolve_brand_kit(db, uid: str, brand_kit_id: Optional[str] = None, user_doc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     user_ref = db.collection("users").document(uid)
     if user_doc is None:
-        user_doc = user_ref.get().to_dict() or {}
+        user_doc = load_user_doc(db, uid)
 
     user_doc = ensure_brand_kit_migration(db, uid, user_doc)
     selected_id = (brand_kit_id or user_doc.get("defaultBrandKitId") or "").strip()
@@ -13,6 +13,7 @@ from integrations.meta_ads.store import (
     get_connection as get_meta_connection,
     list_daily_campaign_performance as list_meta_daily,
 )
+from metrics_engine import columns
 
 MIN_IMPRESSIONS = 100
 MIN_CLICKS = 5
@@ -57,11 +58,19 @@ def _change_label(change: float | None) -> str:
 
 
 def _aggregate(rows: list[dict[str, Any]]) -> dict[str, Any]:
-    impressions = sum(_integer(row.get("impressions")) for row in rows)
-    clicks = sum(_integer(row.get("clicks")) for row in rows)
-    spend = sum(_num(row.get("spend")) for row in rows)
-    conversions = sum(_num(row.get("conversions")) for row in rows)
-    conversion_value = sum(_num(row.get("conversionValue")) for row in rows)
+    totals = {
+        field: float(values.sum())
+        for field, values in columns(
+            rows,
+            ("impressions", "clicks", "spend", "conversions", "conversionValue"),
+            integers=("impressions", "clicks"),
+        ).items()
+    }
+    impressions = int(totals["impressions"])
+    clicks = int(totals["clicks"])
+    spend = totals["spend"]
+    conversions = totals["conversions"]
+    conversion_value = totals["conversionValue"]
 
     return {
         "impressions": impressions,
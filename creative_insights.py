@@ -0,0 +1,660 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from google.cloud import firestore as gc_firestore
+
+from metrics_engine import (
+    columns,
+    factorize,
+    grouped_count,
+    grouped_mean,
+    grouped_sum,
+    grouped_weighted_ratio,
+    maybe,
+    present,
+    top_k,
+    weighted_ratio,
+)
+
+# Creative insights are served from one materialized document per user,
+# creative_insights/{uid}, instead of re-reading and re-ranking every job on
+# each page load. The document holds running sums and counts overall and per
+# platform, tone, image style and ratio, plus bounded top-K lists for ROAS,
+# CTR, CPA and CPM. update_creative_performance applies each change as
+# "remove the creative's old contribution, add its new one" in a transaction.
+#
+# A top-K list that shrinks below INSIGHTS_TOP_K while more creatives carry
+# that metric, or whose tail is a listed creative updated to a worse value,
+# can no longer be trusted (a better replacement may be outside the list),
+# so the document is marked dirty and rebuilt from the jobs. Reads serve a
+# dirty document as-is and rebuild it in the background; only a user with no
+# document waits, for a rebuild capped at INSIGHTS_READ_REBUILD_MAX_JOBS of
+# their latest jobs per collection (a capped build stays dirty, so the full
+# rebuild follows in the background).
+INSIGHTS_COLLECTION = "creative_insights"
+INSIGHTS_TOP_K = int(os.getenv("INSIGHTS_TOP_K", "20"))
+INSIGHTS_READ_REBUILD_MAX_JOBS = int(os.getenv("INSIGHTS_READ_REBUILD_MAX_JOBS", "1000"))
+#
+# Every performance change bumps the document's "generation", even while it
+# is dirty or missing. A rebuild only commits if the generation it started
+# from is unchanged, so a change made during its job scan is never
+# overwritten; the rebuild re-scans instead, up to INSIGHTS_REBUILD_ATTEMPTS.
+INSIGHTS_REBUILD_ATTEMPTS = int(os.getenv("INSIGHTS_REBUILD_ATTEMPTS", "3"))
+INSIGHTS_VERSION = 1
+
+_TOP_DISPLAY = 5
+_METRICS = ("roas", "ctr", "cpa", "cpm")
+_TOP_LISTS = {
+    # list name -> (metric, highest first)
+    "by_roas": ("roas", True),
+    "by_ctr": ("ctr", True),
+    "lowest_cpa": ("cpa", False),
+    "lowest_cpm": ("cpm", False),
+}
+_GROUPS = ("platform", "tone", "stylePreset", "ratio")
+
+
+def _safe_num(x):
+    try:
+        if x is None:
+            return None
+        n = float(x)
+        if n != n:  # NaN
+            return None
+        return n
+    except Exception:
+        return None
+
+
+def _pick(doc: dict, keys: List[str], default=None):
+    for k in keys:
+        v = doc.get(k)
+        if v is not None and v != "":
+            return v
+    return default
+
+
+def _get_perf(doc: dict) -> dict:
+    p = doc.get("performance") or {}
+    return p if isinstance(p, dict) else {}
+
+
+def has_performance(doc: dict) -> bool:
+    p = _get_perf(doc)
+    # consider it “has perf” if any of the key metrics exist
+    for k in ("ctr", "cpc", "cpa", "cpm", "spend", "revenue", "roas"):
+        if p.get(k) is not None:
+            return True
+    return False
+
+
+def creative_snapshot(kind: str, doc_id: str, doc: dict) -> dict:
+    p = _get_perf(doc)
+
+    # For display fields, try multiple likely locations safely
+    product_name = _pick(doc, ["productName", "product_name"], default=None)
+    title = (
+        f"{kind.capitalize()} Ad"
+        if not product_name
+        else f"{kind.capitalize()}: {product_name}"
+    )
+
+    # URLs
+    if kind == "video":
+        url = _pick(doc, ["finalVideoUrl", "videoUrl"], default=None)
+        thumb = _pick(doc, ["thumbnailUrl"], default=None)
+        ratio = _pick(doc, ["ratio", "aspectRatio"], default=None)
+    else:
+        url = _pick(doc, ["imageUrl"], default=None)
+        thumb = url
+        ratio = _pick(doc, ["aspectRatio", "ratio"], default=None)
+
+    created_at = doc.get("createdAt")
+    status = doc.get("status")
+
+    return {
+        "id": doc_id,
+        "kind": kind,
+        "title": title,
+        "createdAt": created_at,
+        "status": status,
+        "url": url,
+        "thumbnailUrl": thumb,
+        "ratio": ratio,
+        "performance": {
+            "ctr": _safe_num(p.get("ctr")),
+            "cpc": _safe_num(p.get("cpc")),
+            "cpa": _safe_num(p.get("cpa")),
+            "cpm": _safe_num(p.get("cpm")),
+            "spend": _safe_num(p.get("spend")),
+            "revenue": _safe_num(p.get("revenue")),
+            "roas": _safe_num(p.get("roas")),
+            "marked_successful": (
+                p.get("marked_successful")
+                if isinstance(p.get("marked_successful"), bool)
+                else None
+            ),
+        },
+        # helpful context for “best averages”
+        "meta": {
+            "platform": _pick(doc, ["platform", "platformStyle"], default=None),
+            "tone": _pick(doc, ["tone"], default=None),
+            "stylePreset": _pick(doc, ["stylePreset", "style"], default=None),
+            "model": _pick(doc, ["model"], default=None),
+        },
+    }
+
+
+# ---------- live computation (min_spend filters) ----------
+_LIVE_FIELDS = ("spend", "revenue", "roas", "ctr", "cpa", "cpm")
+
+
+def _performance_columns(items: List[dict]) -> Dict[str, np.ndarray]:
+    # NaN marks a missing metric, as None does in the snapshots.
+    return columns(items, _LIVE_FIELDS, missing=np.nan, source=_get_perf)
+
+
+def _avg(values: np.ndarray) -> Optional[float]:
+    values = values[present(values)]
+    return round(float(values.mean()), 4) if values.size else None
+
+
+def _weighted_roas(cols: Dict[str, np.ndarray]) -> Optional[float]:
+    # weighted by spend when available: sum(revenue)/sum(spend)
+    roas = weighted_ratio(cols["revenue"], cols["spend"])
+    return round(roas, 4) if roas is not None else None
+
+
+def _rank(items: List[dict], cols: Dict[str, np.ndarray], key: str, desc: bool = True) -> List[dict]:
+    # creatives without the metric go last
+    return [items[i] for i in top_k(cols[key], _TOP_DISPLAY, descending=desc).tolist()]
+
+
+def _group_summaries(cols: Dict[str, np.ndarray], labels: List[Any]) -> List[Dict[str, Any]]:
+    selected = [i for i, label in enumerate(labels) if label]
+    codes, values = factorize(labels[i] for i in selected)
+    n = len(values)
+    sub = {metric: column[selected] for metric, column in cols.items()}
+
+    counts = grouped_count(codes, n).tolist()
+    roas = grouped_weighted_ratio(codes, sub["revenue"], sub["spend"], n)
+    means = {metric: grouped_mean(codes, sub[metric], n) for metric in ("ctr", "cpa", "cpm")}
+    spend = grouped_sum(codes, np.nan_to_num(sub["spend"]), n)
+
+    return [
+        {
+            "value": value,
+            "count": counts[i],
+            "avg_ctr": maybe(means["ctr"][i], 4),
+            "avg_cpa": maybe(means["cpa"][i], 4),
+            "avg_cpm": maybe(means["cpm"][i], 4),
+            "total_spend": round(float(spend[i]), 4),
+            "weighted_roas": maybe(roas[i], 4),
+        }
+        for i, value in enumerate(values)
+    ]
+
+
+def _group_best(cols: Dict[str, np.ndarray], labels: List[Any]) -> Dict[str, Any]:
+    out = _group_summaries(cols, labels)
+    # sort by weighted_roas desc, fallback to avg_ctr
+    out.sort(
+        key=lambda r: (
+            r["weighted_roas"] if r["weighted_roas"] is not None else -1e18,
+            r["avg_ctr"] if r["avg_ctr"] is not None else -1e18,
+        ),
+        reverse=True,
+    )
+    return {
+        "best": out[0] if out else None,
+        "rows": out[:10],
+    }
+
+
+def _guidance(patterns: Dict[str, Any]) -> str:
+    guidance_parts = []
+    labels = (
+        ("platform", "Best platform"),
+        ("tone", "Best tone"),
+        ("image_stylePreset", "Best image style"),
+        ("ratio", "Best ratio"),
+    )
+    for key, label in labels:
+        best = (patterns.get(key) or {}).get("best")
+        if best and best.get("value"):
+            guidance_parts.append(f"{label}: {best['value']}")
+    return " • ".join(guidance_parts) if guidance_parts else ""
+
+
+def compute_insights(items: List[dict], *, min_spend: float, limit: int) -> Dict[str, Any]:
+    """Insights over creative snapshots, honoring a minimum spend filter."""
+    cols = _performance_columns(items)
+    keep = np.flatnonzero(np.nan_to_num(cols["spend"]) >= min_spend)
+    items = [items[i] for i in keep.tolist()]
+    cols = {metric: column[keep] for metric, column in cols.items()}
+
+    summary = {
+        "count_with_performance": len(items),
+        "avg_roas": _avg(cols["roas"]),
+        "avg_ctr": _avg(cols["ctr"]),
+        "avg_cpa": _avg(cols["cpa"]),
+        "avg_cpm": _avg(cols["cpm"]),
+        "weighted_roas": _weighted_roas(cols),
+        "min_spend_filter": min_spend,
+        "limit": limit,
+    }
+
+    metas = [it.get("meta") or {} for it in items]
+    best_platform = _group_best(cols, [meta.get("platform") for meta in metas])
+    best_tone = _group_best(cols, [meta.get("tone") for meta in metas])
+    best_style = _group_best(
+        cols,
+        [meta.get("stylePreset") if it["kind"] == "image" else None for it, meta in zip(items, metas)],
+    )
+
+    ratio_rows = [
+        {
+            "value": row["value"],
+            "count": row["count"],
+            "weighted_roas": row["weighted_roas"],
+            "avg_ctr": row["avg_ctr"],
+            "avg_cpa": row["avg_cpa"],
+            "avg_cpm": row["avg_cpm"],
+        }
+        for row in _group_summaries(cols, [it.get("ratio") for it in items])
+    ]
+    ratio_rows.sort(
+        key=lambda r: (r["weighted_roas"] if r["weighted_roas"] is not None else -1e18),
+        reverse=True,
+    )
+
+    patterns = {
+        "platform": best_platform,
+        "tone": best_tone,
+        "image_stylePreset": best_style,
+        "ratio": {
+            "best": ratio_rows[0] if ratio_rows else None,
+            "rows": ratio_rows[:10],
+        },
+    }
+
+    return {
+        "summary": summary,
+        "top": {
+            "by_roas": _rank(items, cols, "roas", desc=True),
+            "by_ctr": _rank(items, cols, "ctr", desc=True),
+            "lowest_cpa": _rank(items, cols, "cpa", desc=False),
+            "lowest_cpm": _rank(items, cols, "cpm", desc=False),
+        },
+        "patterns": patterns,
+        "guidance": _guidance(patterns),
+    }
+
+
+# ---------- materialized document ----------
+def _insights_ref(db, uid: str):
+    return db.collection(INSIGHTS_COLLECTION).document(uid)
+
+
+def _empty_bucket() -> Dict[str, float]:
+    return {
+        "count": 0,
+        "spend": 0.0,
+        "weightedSpend": 0.0,
+        "weightedRevenue": 0.0,
+        **{f"{metric}Sum": 0.0 for metric in _METRICS},
+        **{f"{metric}Count": 0 for metric in _METRICS},
+    }
+
+
+def _empty_document(uid: str) -> Dict[str, Any]:
+    return {
+        "uid": uid,
+        "version": INSIGHTS_VERSION,
+        "dirty": False,
+        "generation": 0,
+        "totals": _empty_bucket(),
+        "groups": {group: {} for group in _GROUPS},
+        "top": {name: [] for name in _TOP_LISTS},
+    }
+
+
+def _contribution(snapshot: dict) -> Tuple[Dict[str, float], Dict[str, Optional[str]]]:
+    p = snapshot.get("performance") or {}
+    spend = p.get("spend")
+    revenue = p.get("revenue")
+
+    delta = {
+        "count": 1,
+        "spend": spend or 0.0,
+        "weightedSpend": 0.0,
+        "weightedRevenue": 0.0,
+    }
+    if spend is not None and revenue is not None and spend > 0:
+        delta["weightedSpend"] = spend
+        delta["weightedRevenue"] = revenue
+    for metric in _METRICS:
+        value = p.get(metric)
+        delta[f"{metric}Sum"] = value or 0.0
+        delta[f"{metric}Count"] = 0 if value is None else 1
+
+    meta = snapshot.get("meta") or {}
+    keys = {
+        "platform": meta.get("platform"),
+        "tone": meta.get("tone"),
+        "stylePreset": meta.get("stylePreset") if snapshot.get("kind") == "image" else None,
+        "ratio": snapshot.get("ratio"),
+    }
+    return delta, {group: str(value) if value else None for group, value in keys.items()}
+
+
+def _add(bucket: Dict[str, float], delta: Dict[str, float], sign: int) -> None:
+    for key, value in delta.items():
+        bucket[key] = bucket.get(key, 0) + sign * value
+
+
+def _apply(document: Dict[str, Any], snapshot: dict, sign: int) -> None:
+    delta, keys = _contribution(snapshot)
+    _add(document["totals"], delta, sign)
+
+    for group, value in keys.items():
+        if not value:
+            continue
+        buckets = document["groups"].setdefault(group, {})
+        bucket = buckets.setdefault(value, _empty_bucket())
+        _add(bucket, delta, sign)
+        if bucket["count"] <= 0:
+            buckets.pop(value, None)
+
+
+def _top_entry(snapshot: dict, metric: str) -> Optional[Dict[str, Any]]:
+    value = (snapshot.get("performance") or {}).get(metric)
+    if value is None:
+        return None
+    return {"key": f"{snapshot['kind']}:{snapshot['id']}", "value": value, "item": snapshot}
+
+
+def _update_top(document: Dict[str, Any], key: str, snapshot: Optional[dict]) -> None:
+    for name, (metric, desc) in _TOP_LISTS.items():
+        previous = document["top"].get(name) or []
+        entries = [entry for entry in previous if entry.get("key") != key]
+        removed = len(entries) < len(previous)
+
+        entry = _top_entry(snapshot, metric) if snapshot is not None else None
+        if entry is not None:
+            entries.append(entry)
+        entries.sort(key=lambda e: e["value"], reverse=desc)
+        entries = entries[:INSIGHTS_TOP_K]
+        document["top"][name] = entries
+
+        # Creatives outside the list are only known to rank no better than
+        # the old tail. If a listed creative left, or was updated to a value
+        # that now sits at the tail below that bound, one of them may belong
+        # in its place, so the list can no longer be trusted.
+        available = int(document["totals"].get(f"{metric}Count") or 0)
+        if not removed or available <= len(entries):
+            continue
+        if len(entries) < min(available, INSIGHTS_TOP_K):
+            document["dirty"] = True
+        elif entries[-1] is entry:
+            bound = previous[-1]["value"]
+            if (entry["value"] < bound) if desc else (entry["value"] > bound):
+                document["dirty"] = True
+
+
+def build_insights_document(uid: str, snapshots: Iterable[dict]) -> Dict[str, Any]:
+    snapshots = list(snapshots)
+    document = _empty_document(uid)
+    for snapshot in snapshots:
+        _apply(document, snapshot, +1)
+    for name, (metric, desc) in _TOP_LISTS.items():
+        entries = [e for e in (_top_entry(s, metric) for s in snapshots) if e is not None]
+        entries.sort(key=lambda e: e["value"], reverse=desc)
+        document["top"][name] = entries[:INSIGHTS_TOP_K]
+    document["rebuiltAt"] = int(time.time())
+    return document
+
+
+def _user_snapshots(db, uid: str, max_jobs: Optional[int] = None) -> Tuple[List[dict], bool]:
+    """Snapshots of the user's jobs with performance, and whether max_jobs cut the scan short."""
+    snapshots: List[dict] = []
+    truncated = False
+    for kind, collection in (("image", "image_jobs"), ("video", "video_jobs")):
+        query = db.collection(collection).where("uid", "==", uid)
+        if max_jobs:
+            query = query.order_by(
+                "createdAt", direction=gc_firestore.Query.DESCENDING
+            ).limit(max_jobs)
+        scanned = 0
+        for snap in query.stream():
+            scanned += 1
+            data = snap.to_dict() or {}
+            if has_performance(data):
+                snapshots.append(creative_snapshot(kind, snap.id, data))
+        if max_jobs and scanned >= max_jobs:
+            truncated = True
+    return snapshots, truncated
+
+
+def _generation(snap) -> int:
+    return int((snap.to_dict() or {}).get("generation") or 0) if snap.exists else -1
+
+
+def rebuild_creative_insights(db, uid: str, *, max_jobs: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Recompute a user's insights document from every job they own, or from
+    their latest `max_jobs` per collection; a capped build is saved dirty.
+
+    The write is skipped and the scan repeated when a performance change
+    landed meanwhile. If changes keep landing, the last build is returned
+    (as dirty) but not saved; the stored document keeps what those changes
+    wrote and is rebuilt on a later read if it is dirty.
+    """
+    ref = _insights_ref(db, uid)
+
+    @gc_firestore.transactional
+    def _commit(transaction: gc_firestore.Transaction, started: int, document: Dict[str, Any]) -> bool:
+        if _generation(ref.get(transaction=transaction)) != started:
+            return False
+        transaction.set(ref, document)
+        return True
+
+    document: Dict[str, Any] = {}
+    for _attempt in range(max(1, INSIGHTS_REBUILD_ATTEMPTS)):
+        started = _generation(ref.get())
+        snapshots, truncated = _user_snapshots(db, uid, max_jobs)
+        document = build_insights_document(uid, snapshots)
+        document["dirty"] = truncated
+        document["generation"] = started + 1
+        document["updatedAt"] = int(time.time())
+        if _commit(db.transaction(), started, document):
+            return document
+
+    print("CREATIVE INSIGHTS REBUILD RACED:", {"uid": uid}, flush=True)
+    return {**document, "dirty": True}
+
+
+_rebuild_lock = threading.Lock()
+_rebuilding: set = set()
+
+
+def _rebuild_in_background(db, uid: str) -> None:
+    """Full rebuild off the request path, at most one per user at a time."""
+    def _run():
+        try:
+            rebuild_creative_insights(db, uid)
+        except Exception as exc:
+            print("CREATIVE INSIGHTS REBUILD ERROR:", {"uid": uid, "error": repr(exc)}, flush=True)
+        finally:
+            with _rebuild_lock:
+                _rebuilding.discard(uid)
+
+    with _rebuild_lock:
+        if uid in _rebuilding:
+            return
+        _rebuilding.add(uid)
+    threading.Thread(target=_run, name="creative-insights-rebuild", daemon=True).start()
+
+
+def apply_creative_performance_change(
+    db,
+    uid: str,
+    kind: str,
+    job_id: str,
+    before: Optional[dict],
+    after: Optional[dict],
+) -> None:
+    """
+    Move one creative's contribution from `before` to `after` (either may be
+    None for a creative that had no performance or was deleted). Never raises;
+    a missing or dirty document only has its generation bumped, so a
+    rebuild running concurrently starts over instead of overwriting it.
+    """
+    if not uid:
+        return
+
+    old = creative_snapshot(kind, job_id, before) if before and has_performance(before) else None
+    new = creative_snapshot(kind, job_id, after) if after and has_performance(after) else None
+    if old is None and new is None:
+        return
+
+    ref = _insights_ref(db, uid)
+
+    @gc_firestore.transactional
+    def _tx(transaction: gc_firestore.Transaction) -> None:
+        snap = ref.get(transaction=transaction)
+        document = snap.to_dict() or {}
+        generation = _generation(snap) + 1 if snap.exists else 1
+        if not snap.exists or document.get("dirty") or document.get("version") != INSIGHTS_VERSION:
+            transaction.set(
+                ref,
+                {"uid": uid, "dirty": True, "generation": generation, "updatedAt": int(time.time())},
+                merge=True,
+            )
+            return
+
+        if old is not None:
+            _apply(document, old, -1)
+        if new is not None:
+            _apply(document, new, +1)
+        _update_top(document, f"{kind}:{job_id}", new)
+        document["generation"] = generation
+        document["updatedAt"] = int(time.time())
+        transaction.set(ref, document)
+
+    try:
+        _tx(db.transaction())
+    except Exception as exc:
+        print(
+            "CREATIVE INSIGHTS UPDATE ERROR:",
+            {"uid": uid, "kind": kind, "jobId": job_id, "error": repr(exc)},
+            flush=True,
+        )
+        try:
+            ref.set({"dirty": True, "generation": gc_firestore.Increment(1)}, merge=True)
+        except Exception:
+            pass
+
+
+def load_creative_insights(db, uid: str) -> Dict[str, Any]:
+    """
+    The user's insights document. A dirty one is served while it is rebuilt
+    in the background; a missing or outdated one is rebuilt first, from a
+    bounded scan.
+    """
+    document = _insights_ref(db, uid).get().to_dict()
+    if not document or document.get("version") != INSIGHTS_VERSION:
+        document = rebuild_creative_insights(db, uid, max_jobs=INSIGHTS_READ_REBUILD_MAX_JOBS)
+    if document.get("dirty"):
+        _rebuild_in_background(db, uid)
+    return document
+
+
+# ---------- rendering ----------
+def _mean(bucket: Dict[str, float], metric: str) -> Optional[float]:
+    count = int(bucket.get(f"{metric}Count") or 0)
+    if count <= 0:
+        return None
+    return round(float(bucket.get(f"{metric}Sum") or 0.0) / count, 4)
+
+
+def _bucket_weighted_roas(bucket: Dict[str, float]) -> Optional[float]:
+    spend = float(bucket.get("weightedSpend") or 0.0)
+    if spend <= 0:
+        return None
+    return round(float(bucket.get("weightedRevenue") or 0.0) / spend, 4)
+
+
+def _group_rows(buckets: Dict[str, Dict[str, float]], *, with_spend: bool = True) -> Dict[str, Any]:
+    rows = []
+    for value, bucket in buckets.items():
+        row = {
+            "value": value,
+            "count": int(bucket.get("count") or 0),
+            "avg_ctr": _mean(bucket, "ctr"),
+            "avg_cpa": _mean(bucket, "cpa"),
+            "avg_cpm": _mean(bucket, "cpm"),
+            "weighted_roas": _bucket_weighted_roas(bucket),
+        }
+        if with_spend:
+            row["total_spend"] = round(float(bucket.get("spend") or 0.0), 4)
+        rows.append(row)
+
+    if with_spend:
+        rows.sort(
+            key=lambda r: (
+                r["weighted_roas"] if r["weighted_roas"] is not None else -1e18,
+                r["avg_ctr"] if r["avg_ctr"] is not None else -1e18,
+            ),
+            reverse=True,
+        )
+    else:
+        rows.sort(
+            key=lambda r: (r["weighted_roas"] if r["weighted_roas"] is not None else -1e18),
+            reverse=True,
+        )
+    return {"best": rows[0] if rows else None, "rows": rows[:10]}
+
+
+def render_insights(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The /creative-insights response shape from a materialized document.
+
+    The document covers every creative with performance, so unlike
+    compute_insights there is no recent-jobs `limit` in the summary.
+    """
+    totals = document.get("totals") or {}
+    groups = document.get("groups") or {}
+    top = document.get("top") or {}
+
+    summary = {
+        "count_with_performance": int(totals.get("count") or 0),
+        "avg_roas": _mean(totals, "roas"),
+        "avg_ctr": _mean(totals, "ctr"),
+        "avg_cpa": _mean(totals, "cpa"),
+        "avg_cpm": _mean(totals, "cpm"),
+        "weighted_roas": _bucket_weighted_roas(totals),
+        "min_spend_filter": 0.0,
+    }
+
+    patterns = {
+        "platform": _group_rows(groups.get("platform") or {}),
+        "tone": _group_rows(groups.get("tone") or {}),
+        "image_stylePreset": _group_rows(groups.get("stylePreset") or {}),
+        "ratio": _group_rows(groups.get("ratio") or {}, with_spend=False),
+    }
+
+    return {
+        "summary": summary,
+        "top": {
+            name: [entry["item"] for entry in (top.get(name) or [])[:_TOP_DISPLAY]]
+            for name in _TOP_LISTS
+        },
+        "patterns": patterns,
+        "guidance": _guidance(patterns),
+    }
@@ -5,6 +5,7 @@ from typing import Any, Dict, Optional
 
 from google.cloud import firestore as gc_firestore
 
+from request_documents import load_user_doc
 from usage_caps import get_tier_and_status
 
 from .decision_engine import build_recommendation_list, choose_next_best_action
@@ -44,13 +45,18 @@ def _base_profile(uid: str, user_doc: Optional[Dict[str, Any]] = None) -> Dict[s
     }
 
 
-def get_or_create_profile(db, uid: str) -> Dict[str, Any]:
+def get_or_create_profile(
+    db,
+    uid: str,
+    user_doc: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     ref = _profile_ref(db, uid)
     snap = ref.get()
     if snap.exists:
         return snap.to_dict() or {}
 
-    user_doc = db.collection("users").document(uid).get().to_dict() or {}
+    if user_doc is None:
+        user_doc = load_user_doc(db, uid)
     profile = _base_profile(uid, user_doc)
     ref.set(profile)
     return profile
@@ -70,8 +76,8 @@ def apply_event_to_profile(
     occurred_at: Optional[int] = None,
 ) -> Dict[str, Any]:
     metadata = metadata or {}
-    profile = get_or_create_profile(db, uid)
-    user_doc = db.collection("users").document(uid).get().to_dict() or {}
+    user_doc = load_user_doc(db, uid)
+    profile = get_or_create_profile(db, uid, user_doc)
     tier, status = get_tier_and_status(user_doc)
 
     profile["tier"] = tier or profile.get("tier") or "free"
@@ -155,8 +161,8 @@ def apply_event_to_profile(
 
 
 def rebuild_profile(db, uid: str) -> Dict[str, Any]:
-    profile = get_or_create_profile(db, uid)
-    user_doc = db.collection("users").document(uid).get().to_dict() or {}
+    user_doc = load_user_doc(db, uid)
+    profile = get_or_create_profile(db, uid, user_doc)
     tier, status = get_tier_and_status(user_doc)
     profile["tier"] = tier or "free"
     profile["subscriptionStatus"] = status or "inactive"
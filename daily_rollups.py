@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import date
+from typing import Any, Iterable
+
+# Reporting rollup cubes, persisted when provider daily history is synced.
+# Each daily-history parent (google_ads_daily_history/{uid},
+# meta_ads_daily_history/{uid}) gets a "rollups" subcollection with one
+# document per account x month, split into parts of at most
+# ROLLUP_CELLS_PER_DOC cells so a busy month stays under Firestore's document
+# size limit. A cell is one campaign x day holding only the additive metrics,
+# stored as parallel columns.
+#
+# Daily rows are upserted by (account, campaign, date), so a sync's rows
+# replace their cells outright. The first sync of an account (or the first
+# after a ROLLUP_VERSION bump) rebuilds every month from the account's full
+# daily history instead; until then reports fall back to the raw rows.
+ROLLUP_ITEMS = "rollups"
+ROLLUP_VERSION = 1
+ROLLUP_CELLS_PER_DOC = int(os.getenv("ROLLUP_CELLS_PER_DOC", "5000"))
+# Same fields, in the same order, as reporting_engine.metrics.ADDITIVE.
+ROLLUP_METRICS = ("impressions", "clicks", "spend", "conversions", "conversionValue")
+
+_BATCH_SIZE = 450
+_IN_QUERY_SIZE = 10
+
+Cells = dict[tuple[str, int], tuple[str, tuple[float, ...]]]
+
+
+def _num(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _first(row: dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _ordinal(value: Any) -> int | None:
+    try:
+        return date.fromisoformat(str(value or "")[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _month(ordinal: int) -> str:
+    return date.fromordinal(ordinal).strftime("%Y-%m")
+
+
+def cells_from_rows(rows: Iterable[dict[str, Any]]) -> Cells:
+    """
+    (campaign id, day ordinal) -> (campaign label, additive metrics) for
+    provider daily rows, labelled and valued as reporting_engine.service
+    normalizes them; the last row for a cell wins, like the upsert.
+    """
+    cells: Cells = {}
+    for row in rows:
+        campaign_id = str(_first(row, "campaignId", "id", "campaign_id") or "").strip()
+        ordinal = _ordinal(_first(row, "date", "reportDate", "date_start"))
+        if not campaign_id or ordinal is None:
+            continue
+        label = str(_first(row, "name", "campaignName", "campaign_name") or "Untitled campaign")
+        values = (
+            _num(row.get("impressions")),
+            _num(row.get("clicks")),
+            _num(row.get("spend")),
+            _num(row.get("conversions")),
+            _num(_first(row, "conversionValue", "conversion_value", "revenue")),
+        )
+        cells[(campaign_id, ordinal)] = (label, values)
+    return cells
+
+
+def _doc_id(account_id: str, month: str, part: int) -> str:
+    return f"{account_id}_{month}_{part}".replace("/", "_")
+
+
+def encode_month(uid: str, account_id: str, month: str, cells: Cells) -> dict[str, dict[str, Any]]:
+    """A month's cells as {document id: payload}, ROLLUP_CELLS_PER_DOC per part."""
+    keys = sorted(cells)
+    size = max(1, ROLLUP_CELLS_PER_DOC)
+    parts = max(1, -(-len(keys) // size))
+    documents: dict[str, dict[str, Any]] = {}
+    for part in range(parts):
+        # Keyed by id and label: a renamed campaign's older days keep the
+        # label they were synced with, as in the raw rows.
+        campaign_index: dict[tuple[str, str], int] = {}
+        campaign: list[int] = []
+        day: list[int] = []
+        metrics: list[list[float]] = [[] for _ in ROLLUP_METRICS]
+        for campaign_id, ordinal in keys[part * size:(part + 1) * size]:
+            label, values = cells[(campaign_id, ordinal)]
+            campaign.append(campaign_index.setdefault((campaign_id, label), len(campaign_index)))
+            day.append(date.fromordinal(ordinal).day)
+            for column, value in zip(metrics, values):
+                column.append(value)
+        documents[_doc_id(account_id, month, part)] = {
+            "uid": uid,
+            "accountId": account_id,
+            "month": month,
+            "part": part,
+            "parts": parts,
+            "version": ROLLUP_VERSION,
+            "campaignIds": [campaign_id for campaign_id, _label in campaign_index],
+            "campaignNames": [label for _campaign_id, label in campaign_index],
+            "campaign": campaign,
+            "day": day,
+            **{name: column for name, column in zip(ROLLUP_METRICS, metrics)},
+            "updatedAt": int(time.time()),
+        }
+    return documents
+
+
+def decode_months(documents: Iterable[dict[str, Any]]) -> Cells:
+    cells: Cells = {}
+    for data in documents:
+        first = date.fromisoformat(f"{data['month']}-01").toordinal() - 1
+        ids = data.get("campaignIds") or []
+        labels = data.get("campaignNames") or []
+        columns = [data.get(name) or [] for name in ROLLUP_METRICS]
+        for index, (code, day) in enumerate(zip(data.get("campaign") or [], data.get("day") or [])):
+            cells[(ids[code], first + int(day))] = (
+                labels[code],
+                tuple(float(column[index]) for column in columns),
+            )
+    return cells
+
+
+def decode_columns(documents: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Stored rollup documents as flat columns for reporting_engine.rollups:
+    campaign labels, one label code and day ordinal per cell, and one list
+    per ROLLUP_METRICS field.
+    """
+    label_index: dict[str, int] = {}
+    campaign: list[int] = []
+    ordinal: list[int] = []
+    metrics: dict[str, list[float]] = {name: [] for name in ROLLUP_METRICS}
+    for data in documents:
+        first = date.fromisoformat(f"{data['month']}-01").toordinal() - 1
+        codes = [
+            label_index.setdefault(label, len(label_index))
+            for label in data.get("campaignNames") or []
+        ]
+        campaign.extend(codes[code] for code in data.get("campaign") or [])
+        ordinal.extend(first + int(day) for day in data.get("day") or [])
+        for name in ROLLUP_METRICS:
+            metrics[name].extend(data.get(name) or [])
+    return {"campaigns": list(label_index), "campaign": campaign, "ordinal": ordinal, **metrics}
+
+
+def _by_month(cells: Cells) -> dict[str, Cells]:
+    months: dict[str, Cells] = {}
+    for key, value in cells.items():
+        months.setdefault(_month(key[1]), {})[key] = value
+    return months
+
+
+def _write_months(db, parent, uid: str, account_id: str, months: dict[str, Cells], existing: Iterable[Any]) -> None:
+    """Write the months' parts and delete `existing` rollup docs they no longer use."""
+    collection = parent.collection(ROLLUP_ITEMS)
+    written = set()
+    for month, cells in months.items():
+        # One write per part: a part can approach the document size limit,
+        # so parts are not batched together.
+        for doc_id, payload in encode_month(uid, account_id, month, cells).items():
+            collection.document(doc_id).set(payload)
+            written.add(doc_id)
+
+    stale = [snap.reference for snap in existing if snap.id not in written]
+    for start in range(0, len(stale), _BATCH_SIZE):
+        batch = db.batch()
+        for ref in stale[start:start + _BATCH_SIZE]:
+            batch.delete(ref)
+        batch.commit()
+
+
+def _rebuild(db, parent, items, uid: str, account_id: str) -> None:
+    """Every month from the account's full daily history."""
+    history = (snap.to_dict() or {} for snap in items.where("accountId", "==", account_id).stream())
+    existing = list(
+        parent.collection(ROLLUP_ITEMS).where("accountId", "==", account_id).select([]).stream()
+    )
+    _write_months(db, parent, uid, account_id, _by_month(cells_from_rows(history)), existing)
+
+
+def _merge(db, parent, uid: str, account_id: str, rows: list[dict[str, Any]]) -> None:
+    """Replace the cells of this sync's rows in the months they fall in."""
+    incoming = _by_month(cells_from_rows(rows))
+    months = sorted(incoming)
+    existing = []
+    for start in range(0, len(months), _IN_QUERY_SIZE):
+        existing.extend(
+            parent.collection(ROLLUP_ITEMS)
+            .where("accountId", "==", account_id)
+            .where("month", "in", months[start:start + _IN_QUERY_SIZE])
+            .stream()
+        )
+
+    stored = _by_month(decode_months(snap.to_dict() or {} for snap in existing))
+    merged = {month: {**stored.get(month, {}), **cells} for month, cells in incoming.items()}
+    _write_months(db, parent, uid, account_id, merged, existing)
+
+
+def update_daily_rollups(
+    db,
+    parent,
+    items,
+    *,
+    uid: str,
+    account_id: str,
+    rows: list[dict[str, Any]],
+) -> None:
+    """
+    Bring the account's rollup documents up to date after `rows` were
+    upserted into `items`. Call before the parent's lastSyncAt moves, so a
+    report rebuilt for the new watermark sees the new cubes. Never raises; on
+    failure the account is marked for a full rebuild on its next sync and
+    reports use the raw rows meanwhile.
+    """
+    if not account_id:
+        return
+    try:
+        versions = (parent.get().to_dict() or {}).get("rollupAccounts") or {}
+        if versions.get(account_id) == ROLLUP_VERSION:
+            _merge(db, parent, uid, account_id, rows)
+        else:
+            _rebuild(db, parent, items, uid, account_id)
+        version = ROLLUP_VERSION
+    except Exception as exc:
+        print(
+            "DAILY ROLLUP UPDATE ERROR:",
+            {"uid": uid, "accountId": account_id, "path": parent.path, "error": repr(exc)},
+            flush=True,
+        )
+        version = 0
+    try:
+        parent.set({"rollupAccounts": {account_id: version}}, merge=True)
+    except Exception as exc:
+        print(
+            "DAILY ROLLUP VERSION ERROR:",
+            {"uid": uid, "accountId": account_id, "error": repr(exc)},
+            flush=True,
+        )
+
+
+def load_daily_rollups(parent, account_id: str | None) -> dict[str, Any] | None:
+    """The account's rollup columns (see decode_columns), or None when they are not current."""
+    if not account_id:
+        return None
+    versions = (parent.get().to_dict() or {}).get("rollupAccounts") or {}
+    if versions.get(account_id) != ROLLUP_VERSION:
+        return None
+    documents = (
+        snap.to_dict() or {}
+        for snap in parent.collection(ROLLUP_ITEMS).where("accountId", "==", account_id).stream()
+    )
+    return decode_columns(data for data in documents if data.get("version") == ROLLUP_VERSION)
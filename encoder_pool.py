@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Video finalization encodes run on this executor instead of the default
+# asyncio thread pool. Concurrency is derived from the CPUs actually available
+# to the container, each encode is capped at a fair share of libx264 threads,
+# and encoder subprocesses run at a lower scheduling priority so a burst of
+# finished Runway tasks cannot starve API request handling.
+
+
+def available_cpus() -> int:
+    """CPUs usable by this process, honoring affinity and cgroup v2/v1 quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()[:2]
+            if limit != "max":
+                quota = float(limit) / float(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit_us = int(f.read().strip())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period_us = int(f.read().strip())
+            if limit_us > 0 and period_us > 0:
+                quota = limit_us / period_us
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+_CPUS = available_cpus()
+
+# Leave roughly half the cores for the API by default.
+FFMPEG_MAX_CONCURRENCY = max(1, int(os.getenv("FFMPEG_MAX_CONCURRENCY") or max(1, _CPUS // 2)))
+FFMPEG_THREADS_PER_ENCODE = int(
+    os.getenv("FFMPEG_THREADS_PER_ENCODE") or max(1, _CPUS // FFMPEG_MAX_CONCURRENCY)
+)
+FFMPEG_NICE = int(os.getenv("FFMPEG_NICE", "10"))
+
+_NICE_BINARY = shutil.which("nice")
+
+
+def encoder_command(cmd: List[str]) -> List[str]:
+    """
+    Cap libx264 threads and lower the scheduling priority of an ffmpeg command.
+
+    `nice` is used instead of a preexec_fn because the encodes are launched
+    from worker threads, where preexec_fn is not safe.
+    """
+    if cmd and os.path.basename(cmd[0]) == "ffmpeg":
+        # Placed just before the output path, -threads applies to the encoder.
+        cmd = [*cmd[:-1], "-threads", str(FFMPEG_THREADS_PER_ENCODE), cmd[-1]]
+    if FFMPEG_NICE > 0 and _NICE_BINARY:
+        cmd = [_NICE_BINARY, "-n", str(FFMPEG_NICE), *cmd]
+    return cmd
+
+
+class EncoderPool:
+    def __init__(self, workers: int = FFMPEG_MAX_CONCURRENCY):
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "waited": 0,
+            "waitSecondsTotal": 0.0,
+            "waitSecondsMax": 0.0,
+            "runSecondsTotal": 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="ffmpeg",
+                )
+            return self._executor
+
+    def _invoke(
+        self,
+        enqueued_at: float,
+        waited: bool,
+        on_start: Optional[Callable[[], None]],
+        fn: Callable[..., T],
+        args: tuple,
+    ) -> T:
+        started = time.monotonic()
+        wait = started - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self.stats["waitSecondsTotal"] += wait
+            self.stats["waitSecondsMax"] = max(self.stats["waitSecondsMax"], wait)
+
+        if waited and on_start is not None:
+            try:
+                on_start()
+            except Exception as exc:
+                print("ENCODER POOL START HOOK ERROR:", repr(exc), flush=True)
+
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.stats["completed" if ok else "failed"] += 1
+                self.stats["runSecondsTotal"] += time.monotonic() - started
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        on_wait: Optional[Callable[[int], None]] = None,
+        on_start: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """
+        Run an encode on the pool.
+
+        When every encoder is busy, `on_wait(position)` is called before
+        queueing and `on_start()` once the encode actually begins, so callers
+        can surface a waiting state instead of stalling silently.
+        """
+        with self._lock:
+            self.stats["submitted"] += 1
+            position = max(0, self._running + self._queued - self.workers + 1)
+            self._queued += 1
+            if position:
+                self.stats["waited"] += 1
+
+        if position and on_wait is not None:
+            try:
+                on_wait(position)
+            except Exception as exc:
+                print("ENCODER POOL WAIT HOOK ERROR:", repr(exc), flush=True)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            self._invoke,
+            time.monotonic(),
+            bool(position),
+            on_start,
+            fn,
+            args,
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.stats["completed"] + self.stats["failed"]
+            started = finished + self._running
+            return {
+                "cpus": _CPUS,
+                "workers": self.workers,
+                "threadsPerEncode": FFMPEG_THREADS_PER_ENCODE,
+                "nice": FFMPEG_NICE,
+                "queueDepth": self._queued,
+                "running": self._running,
+                "submitted": self.stats["submitted"],
+                "completed": self.stats["completed"],
+                "failed": self.stats["failed"],
+                "waited": self.stats["waited"],
+                "avgWaitMs": round(self.stats["waitSecondsTotal"] / started * 1000, 1) if started else 0.0,
+                "maxWaitMs": round(self.stats["waitSecondsMax"] * 1000, 1),
+                "avgRunMs": round(self.stats["runSecondsTotal"] / finished * 1000, 1) if finished else 0.0,
+            }
+
+
+_pool = EncoderPool()
+
+
+async def run_encode(
+    fn: Callable[..., T],
+    *args: Any,
+    on_wait: Optional[Callable[[int], None]] = None,
+    on_start: Optional[Callable[[], None]] = None,
+) -> T:
+    return await _pool.run(fn, *args, on_wait=on_wait, on_start=on_start)
+
+
+def encoder_pool_stats() -> Dict[str, Any]:
+    return _pool.snapshot()
+
+
+def shutdown_encoder_pool() -> None:
+    _pool.shutdown()
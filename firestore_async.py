@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# The Firestore, Firebase Auth and requests clients used across the backend
+# are synchronous. Async routes hand those calls to this bounded executor so
+# a slow read never stalls the event loop for every other in-flight request.
+FIRESTORE_EXECUTOR_WORKERS = int(os.getenv("FIRESTORE_EXECUTOR_WORKERS", "32"))
+
+# BLOCKING_CALL_GUARD=raise makes any Firestore / Auth / requests call made
+# directly on the event-loop thread raise BlockingCallOnLoopError.
+# BLOCKING_CALL_GUARD=warn logs the offending stack instead.
+BLOCKING_CALL_GUARD = (os.getenv("BLOCKING_CALL_GUARD") or "").strip().lower()
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class BlockingCallOnLoopError(RuntimeError):
+    """Raised in guard mode when a blocking client call runs on the event loop."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is not None:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, FIRESTORE_EXECUTOR_WORKERS),
+                thread_name_prefix="firestore-io",
+            )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a synchronous client call on the bounded I/O executor."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+async def get_document(ref):
+    return await run_blocking(ref.get)
+
+
+async def get_document_dict(ref) -> Optional[Dict[str, Any]]:
+    snap = await get_document(ref)
+    if not snap.exists:
+        return None
+    return snap.to_dict() or {}
+
+
+async def stream_query(query) -> List[Any]:
+    return await run_blocking(lambda: list(query.stream()))
+
+
+async def get_all(db, refs: Iterable[Any]) -> List[Any]:
+    refs = list(refs)
+    if not refs:
+        return []
+    return await run_blocking(lambda: list(db.get_all(refs)))
+
+
+async def set_document(ref, data: Dict[str, Any], *, merge: bool = False) -> None:
+    await run_blocking(ref.set, data, merge=merge)
+
+
+async def update_document(ref, data: Dict[str, Any]) -> None:
+    await run_blocking(ref.update, data)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+# -----------------------------
+# Blocking-call guard (test mode)
+# -----------------------------
+_guard_installed = False
+
+
+def _on_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _guarded(label: str, fn: Callable[..., Any], mode: str) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any):
+        if _on_loop_thread():
+            message = f"Blocking call {label} ran on the event loop thread."
+            if mode == "raise":
+                raise BlockingCallOnLoopError(message)
+            print("[BLOCKING CALL GUARD]", message, flush=True)
+            traceback.print_stack(limit=8)
+        return fn(*args, **kwargs)
+
+    wrapper.__blocking_guard__ = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def _patch(owner: Any, name: str, label: str, mode: str) -> None:
+    original = getattr(owner, name, None)
+    if original is None or getattr(original, "__blocking_guard__", False):
+        return
+    setattr(owner, name, _guarded(label, original, mode))
+
+
+def install_blocking_call_guard(mode: str = "raise") -> None:
+    """
+    Wrap the synchronous Firestore, Firebase Auth and requests entry points so
+    they detect being called on an event-loop thread. Intended for tests and
+    staging; production leaves BLOCKING_CALL_GUARD unset.
+    """
+    global _guard_installed
+    if _guard_installed:
+        return
+
+    from google.cloud.firestore_v1 import client as fs_client
+    from google.cloud.firestore_v1 import collection as fs_collection
+    from google.cloud.firestore_v1 import document as fs_document
+    from google.cloud.firestore_v1 import query as fs_query
+    from firebase_admin import auth as fb_auth
+    import requests
+
+    for name in ("get", "set", "update", "delete", "create"):
+        _patch(fs_document.DocumentReference, name, f"DocumentReference.{name}", mode)
+    for name in ("get", "stream"):
+        _patch(fs_query.Query, name, f"Query.{name}", mode)
+        _patch(fs_collection.CollectionReference, name, f"CollectionReference.{name}", mode)
+    _patch(fs_client.Client, "get_all", "Client.get_all", mode)
+    for name in ("get_user", "get_users", "verify_id_token", "list_users"):
+        _patch(fb_auth, name, f"firebase_admin.auth.{name}", mode)
+    _patch(requests.Session, "request", "requests.Session.request", mode)
+
+    _guard_installed = True
+    print(f"[BLOCKING CALL GUARD] installed (mode={mode})", flush=True)
+
+
+def install_blocking_call_guard_from_env() -> None:
+    if BLOCKING_CALL_GUARD in {"raise", "warn"}:
+        install_blocking_call_guard(BLOCKING_CALL_GUARD)
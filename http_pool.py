@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+# One pooled AsyncClient is shared by Runway calls and media downloads so
+# status polling reuses warm TCP+TLS connections instead of handshaking on
+# every request. main.py opens and closes it from the application lifespan.
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30"))
+HTTP_POOL_PER_HOST_LIMIT = int(os.getenv("HTTP_POOL_PER_HOST_LIMIT", "20"))
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "60"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "30"))
+
+# Clients and host semaphores are bound to the loop that created them, so
+# they are kept per loop; threads that run their own loop get their own pool.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_loop_host_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+_stats: Dict[str, Any] = {
+    "requests": 0,
+    "inFlight": 0,
+    "errors": 0,
+    "waits": 0,
+    "waitSecondsTotal": 0.0,
+    "waitSecondsMax": 0.0,
+}
+
+
+def default_timeout(total: Optional[float] = None) -> httpx.Timeout:
+    """Build a timeout; `total` overrides the read budget for slow endpoints."""
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=float(total) if total else HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT,
+    )
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=default_timeout(),
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+    )
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    return get_http_client()
+
+
+async def close_http_client() -> None:
+    """
+    Close every pooled client.
+
+    The running loop's client is awaited; clients of other live loops are
+    closed on their own loop, and those of loops that already stopped are
+    dropped with them.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_clients.items())
+        _clients.clear()
+        _loop_host_slots.clear()
+
+    for client_loop, client in clients:
+        if client_loop is loop:
+            await client.aclose()
+        elif not client_loop.is_closed():
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+            except RuntimeError:
+                pass
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the running loop's shared client, creating it on first use.
+
+    Scripts that call asyncio.run() more than once get a fresh client per
+    loop; clients left behind by loops that have since closed are released
+    here rather than kept for the life of the process.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            for stale in [other for other in _clients if other.is_closed()]:
+                _clients.pop(stale, None)
+                _loop_host_slots.pop(stale, None)
+            client = _build_client()
+            _clients[loop] = client
+            _loop_host_slots[loop] = {}
+    return client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = (urlparse(url).hostname or "").lower()
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        slots = _loop_host_slots.setdefault(loop, {})
+        slot = slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(max(1, HTTP_POOL_PER_HOST_LIMIT))
+            slots[host] = slot
+    return slot
+
+
+@asynccontextmanager
+async def _acquire(url: str) -> AsyncIterator[None]:
+    slot = _host_slot(url)
+    started = time.perf_counter()
+    await slot.acquire()
+    waited = time.perf_counter() - started
+
+    _stats["waits"] += 1
+    _stats["waitSecondsTotal"] += waited
+    _stats["waitSecondsMax"] = max(_stats["waitSecondsMax"], waited)
+    _stats["requests"] += 1
+    _stats["inFlight"] += 1
+    try:
+        yield
+    except Exception:
+        _stats["errors"] += 1
+        raise
+    finally:
+        _stats["inFlight"] -= 1
+        slot.release()
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Send one request through the shared pool, honoring per-host limits."""
+    client = get_http_client()
+    async with _acquire(url):
+        return await client.request(
+            method,
+            url,
+            timeout=default_timeout(timeout),
+            **kwargs,
+        )
+
+
+@asynccontextmanager
+async def stream(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> AsyncIterator[httpx.Response]:
+    """Stream a response body through the shared pool."""
+    client = get_http_client()
+    async with _acquire(url):
+        async with client.stream(
+            method,
+            url,
+            timeout=default_timeout(timeout),
+            **kwargs,
+        ) as response:
+            yield response
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection and wait-time statistics for sizing the pool."""
+    active = 0
+    idle = 0
+
+    with _clients_lock:
+        clients = [client for client in _clients.values() if not client.is_closed]
+        slot_maps = list(_loop_host_slots.values())
+
+    for client in clients:
+        try:
+            connections = client._transport._pool.connections  # type: ignore[attr-defined]
+            for connection in connections:
+                if connection.is_idle():
+                    idle += 1
+                else:
+                    active += 1
+        except Exception:
+            pass
+
+    hosts: Dict[str, int] = {}
+    for slots in slot_maps:
+        for host, slot in slots.items():
+            hosts[host] = hosts.get(host, 0) + HTTP_POOL_PER_HOST_LIMIT - slot._value  # type: ignore[attr-defined]
+
+    waits = _stats["waits"] or 0
+    return {
+        "open": bool(clients),
+        "clients": len(clients),
+        "activeConnections": active,
+        "idleConnections": idle,
+        "requests": _stats["requests"],
+        "inFlight": _stats["inFlight"],
+        "errors": _stats["errors"],
+        "avgWaitMs": round((_stats["waitSecondsTotal"] / waits) * 1000, 3) if waits else 0.0,
+        "maxWaitMs": round(_stats["waitSecondsMax"] * 1000, 3),
+        "hosts": hosts,
+        "limits": {
+            "maxConnections": HTTP_POOL_MAX_CONNECTIONS,
+            "maxKeepalive": HTTP_POOL_MAX_KEEPALIVE,
+            "keepaliveExpiry": HTTP_POOL_KEEPALIVE_EXPIRY,
+            "perHost": HTTP_POOL_PER_HOST_LIMIT,
+        },
+    }
@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+import http_pool
+from firestore_async import run_blocking
+
+# Streaming proxy for Firebase/Google Storage images used by Creative Studio
+# and Library downloads. Objects are immutable per (storage path, download
+# token), so they are cached on local disk with a size-bounded LRU and
+# served with strong ETags; repeat canvas loads never reach storage.
+IMAGE_PROXY_CACHE_DIR = (
+    os.getenv("IMAGE_PROXY_CACHE_DIR")
+    or os.path.join(tempfile.gettempdir(), "adgen-image-cache")
+)
+IMAGE_PROXY_CACHE_MAX_BYTES = int(os.getenv("IMAGE_PROXY_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_PROXY_MAX_OBJECT_BYTES = int(os.getenv("IMAGE_PROXY_MAX_OBJECT_BYTES", str(25 * 1024 * 1024)))
+IMAGE_PROXY_CACHE_CONTROL = os.getenv(
+    "IMAGE_PROXY_CACHE_CONTROL",
+    "private, max-age=86400, immutable",
+)
+IMAGE_PROXY_CHUNK_BYTES = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_index_lock = threading.Lock()
+_index: "OrderedDict[str, int]" = OrderedDict()
+_index_bytes = 0
+_index_loaded = False
+_stats = {"hits": 0, "misses": 0, "notModified": 0, "evictions": 0, "bypassed": 0}
+
+
+# -----------------------------
+# Cache keys
+# -----------------------------
+def storage_cache_key(url: str) -> str:
+    """
+    Key an image by storage object path plus download token.
+
+    Firebase download URLs look like /v0/b/{bucket}/o/{encoded path}?token=...;
+    storage.googleapis.com URLs carry the bucket and path directly.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    token = (parse_qs(parsed.query).get("token") or [""])[0]
+
+    if host == "firebasestorage.googleapis.com":
+        match = re.match(r"^/v0/b/([^/]+)/o/(.+)$", parsed.path)
+        if match:
+            object_key = f"{match.group(1)}/{unquote(match.group(2))}"
+        else:
+            object_key = parsed.path
+    else:
+        object_key = unquote(parsed.path.lstrip("/"))
+
+    return hashlib.sha256(f"{host}|{object_key}|{token}".encode("utf-8")).hexdigest()
+
+
+def _etag_for(key: str) -> str:
+    return f'"{key[:40]}"'
+
+
+def _paths(key: str) -> Tuple[str, str]:
+    base = os.path.join(IMAGE_PROXY_CACHE_DIR, key[:2], key)
+    return f"{base}.bin", f"{base}.json"
+
+
+# -----------------------------
+# LRU index
+# -----------------------------
+def _load_index() -> None:
+    """Rebuild the in-memory LRU order from files left by earlier processes."""
+    global _index_loaded, _index_bytes
+    if _index_loaded:
+        return
+
+    entries = []
+    if os.path.isdir(IMAGE_PROXY_CACHE_DIR):
+        for root, _dirs, files in os.walk(IMAGE_PROXY_CACHE_DIR):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+    entries.sort()
+    with _index_lock:
+        for _mtime, key, size in entries:
+            _index[key] = size
+            _index_bytes += size
+        _index_loaded = True
+
+
+def _remove_files(key: str) -> None:
+    for path in _paths(key):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _touch(key: str) -> bool:
+    with _index_lock:
+        if key not in _index:
+            return False
+        _index.move_to_end(key)
+
+    try:
+        os.utime(_paths(key)[0], None)
+    except OSError:
+        _forget(key)
+        return False
+    return True
+
+
+def _forget(key: str) -> None:
+    global _index_bytes
+    with _index_lock:
+        size = _index.pop(key, None)
+        if size is not None:
+            _index_bytes -= size
+    _remove_files(key)
+
+
+def _admit(key: str, size: int) -> None:
+    global _index_bytes
+    evicted = []
+    with _index_lock:
+        previous = _index.pop(key, None)
+        if previous is not None:
+            _index_bytes -= previous
+        _index[key] = size
+        _index_bytes += size
+
+        while _index_bytes > IMAGE_PROXY_CACHE_MAX_BYTES and len(_index) > 1:
+            old_key, old_size = _index.popitem(last=False)
+            _index_bytes -= old_size
+            evicted.append(old_key)
+            _stats["evictions"] += 1
+
+    for old_key in evicted:
+        _remove_files(old_key)
+
+
+def _read_meta(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_paths(key)[1], "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _lookup(key: str) -> Optional[Dict[str, Any]]:
+    _load_index()
+    if not _touch(key):
+        return None
+    meta = _read_meta(key)
+    if meta is None:
+        _forget(key)
+    return meta
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _index_lock:
+        return {
+            **_stats,
+            "entries": len(_index),
+            "bytes": _index_bytes,
+            "maxBytes": IMAGE_PROXY_CACHE_MAX_BYTES,
+        }
+
+
+# -----------------------------
+# HTTP helpers
+# -----------------------------
+def _if_none_match(request_headers, etag: str) -> bool:
+    value = (request_headers.get("if-none-match") or "").strip()
+    if not value:
+        return False
+    if value == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in value.split(",")]
+    return etag in tags
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range; multi-range requests fall back to 200."""
+    match = _RANGE_RE.match((value or "").strip())
+    if not match or size <= 0:
+        return None
+
+    start_s, end_s = match.groups()
+    if not start_s and not end_s:
+        return None
+
+    if not start_s:
+        # A zero-length suffix (bytes=-0) selects nothing: 416, not an empty 206.
+        length = min(int(end_s), size)
+        if length <= 0:
+            raise _range_not_satisfiable(size)
+        return size - length, size - 1
+
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size:
+        raise _range_not_satisfiable(size)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable.",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+async def _file_chunks(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    f = await run_blocking(open, path, "rb")
+    try:
+        await run_blocking(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await run_blocking(f.read, min(IMAGE_PROXY_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_blocking(f.close)
+
+
+def _serve_cached(
+    key: str,
+    meta: Dict[str, Any],
+    request_headers,
+    extra_headers: Dict[str, str],
+) -> Response:
+    size = int(meta.get("size") or 0)
+    content_type = meta.get("contentType") or "application/octet-stream"
+    headers = {
+        "ETag": _etag_for(key),
+        "Cache-Control": IMAGE_PROXY_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "X-Image-Cache": "hit",
+        **extra_headers,
+    }
+
+    byte_range = None
+    if request_headers.get("range"):
+        if_range = (request_headers.get("if-range") or "").strip()
+        if not if_range or if_range == headers["ETag"]:
+            byte_range = _parse_range(request_headers["range"], size)
+
+    path = _paths(key)[0]
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            _file_chunks(path, 0, size - 1),
+            media_type=content_type,
+            headers=headers,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(path, start, end),
+        status_code=206,
+        media_type=content_type,
+        headers=headers,
+    )
+
+
+def _write_meta(key: str, meta: Dict[str, Any]) -> None:
+    with open(_paths(key)[1], "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+async def _stream_and_fill(
+    key: str,
+    upstream: httpx.Response,
+    stack: AsyncExitStack,
+    content_type: str,
+) -> AsyncIterator[bytes]:
+    """Pipe upstream chunks to the client while filling the disk cache."""
+    bin_path, _meta_path = _paths(key)
+    tmp_path = f"{bin_path}.{uuid.uuid4().hex}.tmp"
+    tmp = None
+    written = 0
+    complete = False
+
+    try:
+        await run_blocking(os.makedirs, os.path.dirname(bin_path), exist_ok=True)
+        tmp = await run_blocking(open, tmp_path, "wb")
+    except OSError:
+        tmp = None
+
+    try:
+        async for chunk in upstream.aiter_bytes(IMAGE_PROXY_CHUNK_BYTES):
+            if tmp is not None:
+                written += len(chunk)
+                if written > IMAGE_PROXY_MAX_OBJECT_BYTES:
+                    await run_blocking(tmp.close)
+                    await run_blocking(_remove_quietly, tmp_path)
+                    tmp = None
+                else:
+                    await run_blocking(tmp.write, chunk)
+            yield chunk
+        complete = True
+    finally:
+        await stack.aclose()
+        if tmp is not None:
+            await run_blocking(tmp.close)
+            if complete:
+                await run_blocking(os.replace, tmp_path, bin_path)
+                await run_blocking(
+                    _write_meta,
+                    key,
+                    {
+                        "size": written,
+                        "contentType": content_type,
+                        "storedAt": int(time.time()),
+                    },
+                )
+                _admit(key, written)
+            else:
+                await run_blocking(_remove_quietly, tmp_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def proxy_storage_object(
+    url: str,
+    request_headers,
+    *,
+    fallback_content_type: str = "image/png",
+    require_image: bool = False,
+    media_type: Optional[str] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a storage object from the disk cache or stream it from upstream.
+
+    Honors If-None-Match (304) and single-range Range requests (206). Range
+    requests that miss the cache are forwarded upstream and not cached.
+    """
+    extra_headers = dict(extra_headers or {})
+    key = storage_cache_key(url)
+    etag = _etag_for(key)
+
+    if _if_none_match(request_headers, etag):
+        _stats["notModified"] += 1
+        return Response(
+            status_code=304,
+            headers={"ETag": etag, "Cache-Control": IMAGE_PROXY_CACHE_CONTROL},
+        )
+
+    meta = await run_blocking(_lookup, key)
+    if meta is not None:
+        # The entry may have been filled by a caller that accepts any type.
+        if require_image and not str(meta.get("contentType") or "").startswith("image/"):
+            raise HTTPException(
+                status_code=400, detail="The requested URL is not an image."
+            )
+        if media_type:
+            meta = {**meta, "contentType": media_type}
+        _stats["hits"] += 1
+        return _serve_cached(key, meta, request_headers, extra_headers)
+
+    _stats["misses"] += 1
+    range_header = request_headers.get("range")
+    upstream_headers = {"Range": range_header} if range_header else {}
+
+    stack = AsyncExitStack()
+    try:
+        upstream = await stack.enter_async_context(
+            http_pool.stream("GET", url, headers=upstream_headers, timeout=30)
+        )
+        upstream.raise_for_status()
+    except Exception as exc:
+        await stack.aclose()
+        raise HTTPException(status_code=502, detail=f"Could not retrieve image: {exc}")
+
+    content_type = upstream.headers.get("content-type") or fallback_content_type
+    if require_image and not content_type.startswith("image/"):
+        await stack.aclose()
+        raise HTTPException(
+            status_code=400, detail="The requested URL is not an image."
+        )
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMAGE_PROXY_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "X-Image-Cache": "miss",
+        **extra_headers,
+    }
+    if upstream.headers.get("content-range"):
+        headers["Content-Range"] = upstream.headers["content-range"]
+    if upstream.headers.get("content-length") and not upstream.headers.get("content-encoding"):
+        headers["Content-Length"] = upstream.headers["content-length"]
+
+    if upstream.status_code == 206:
+        _stats["bypassed"] += 1
+
+        async def _passthrough() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in upstream.aiter_bytes(IMAGE_PROXY_CHUNK_BYTES):
+                    yield chunk
+            finally:
+                await stack.aclose()
+
+        body = _passthrough()
+    else:
+        body = _stream_and_fill(key, upstream, stack, content_type)
+
+    return StreamingResponse(
+        body,
+        status_code=upstream.status_code,
+        media_type=media_type or content_type,
+        headers=headers,
+    )
@@ -5,6 +5,8 @@ import requests
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
 
+from reporting_engine.service import invalidate_reporting_snapshot
+
 from .auth import require_google_ads_user
 from .config import get_settings
 from .models import OAuthStartResponse, SelectCustomerBody
@@ -198,6 +200,7 @@ def choose_google_ads_customer(
         login_customer_id=login_customer_id,
         manager=payload.manager,
     )
+    invalidate_reporting_snapshot(user["uid"])
     return {
         "ok": True,
         "selectedCustomerId": customer_id,
@@ -319,6 +322,7 @@ def sync_google_ads(
             rows=daily_report.get("dailyCampaignPerformance") or [],
             synced_at=synced_at,
         )
+        invalidate_reporting_snapshot(user["uid"])
 
         return {
             "ok": True,
@@ -344,4 +348,5 @@ def sync_google_ads(
 @router.delete("/connection")
 def disconnect_google_ads(user=Depends(require_google_ads_user)):
     disconnect(user["uid"])
+    invalidate_reporting_snapshot(user["uid"])
     return {"ok": True}
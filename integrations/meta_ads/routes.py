@@ -4,6 +4,8 @@ import requests
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
 
+from reporting_engine.service import invalidate_reporting_snapshot
+
 from .auth import require_meta_ads_user
 from .config import get_settings
 from .models import OAuthStartResponse, SelectAdAccountBody
@@ -220,6 +222,7 @@ def choose_meta_ads_account(
         time_zone=account.get("timeZone"),
         account_status=account.get("accountStatus"),
     )
+    invalidate_reporting_snapshot(user["uid"])
 
     return {"ok": True, **account}
 
@@ -260,6 +263,7 @@ def sync_meta_ads_campaigns(
             account_id=connection.get("selectedAdAccountId") or "",
             rows=result.get("dailyCampaignPerformance") or [],
         )
+        invalidate_reporting_snapshot(user["uid"])
         return result
     except ValueError as exc:
         save_campaign_sync_error(user["uid"], str(exc))
@@ -329,4 +333,5 @@ def meta_ads_creatives(
 @router.delete("/connection")
 def disconnect_meta_ads(user=Depends(require_meta_ads_user)):
     disconnect(user["uid"])
+    invalidate_reporting_snapshot(user["uid"])
     return {"ok": True}
@@ -5,6 +5,7 @@ from typing import Any
 from google.cloud import firestore as gc_firestore
 
 from auth_helpers import get_db
+from daily_rollups import load_daily_rollups, update_daily_rollups
 from .security import encrypt_secret, decrypt_secret
 
 
@@ -270,6 +271,15 @@ def save_daily_campaign_performance(
         if chunk:
             batch.commit()
 
+    # Cubes first: lastSyncAt is the reporting watermark.
+    update_daily_rollups(
+        db,
+        parent,
+        parent.collection(DAILY_ITEMS),
+        uid=uid,
+        account_id=clean_account,
+        rows=[payload for _ref, payload in writes],
+    )
     parent.set({"uid": uid, "accountId": clean_account, "rowCountLastSync": len(writes), "lastSyncAt": now}, merge=True)
 
 
@@ -277,6 +287,13 @@ def list_daily_campaign_performance(uid: str, *, account_id: str | None = None,
     query = _daily_parent(uid).collection(DAILY_ITEMS)
     if account_id:
         query = query.where("accountId", "==", str(account_id))
+    # Most recent rows first, so the cap drops the oldest history.
+    query = query.order_by("date", direction=gc_firestore.Query.DESCENDING)
     rows = [{"historyId": snap.id, **(snap.to_dict() or {})} for snap in query.limit(max(1, min(limit, 20000))).stream()]
     rows.sort(key=lambda row: (str(row.get("date") or ""), str(row.get("campaignName") or "")))
     return rows
+
+
+def list_daily_rollups(uid: str, *, account_id: str | None = None) -> dict[str, Any] | None:
+    """The account's full-history rollup cells (see daily_rollups), or None before its first sync."""
+    return load_daily_rollups(_daily_parent(uid), str(account_id or "").strip())
@@ -0,0 +1,915 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from google.cloud import firestore as gc_firestore
+
+from auth_helpers import get_db
+from firestore_async import run_blocking
+
+# Durable queue for generation work. The web tier only enqueues; a bounded
+# worker pool (in the web process by default, or run_job_worker.py) claims
+# jobs under a lease, heartbeats while running, retries with backoff and
+# recovers jobs whose worker died.
+JOB_QUEUE_BACKEND = (os.getenv("JOB_QUEUE_BACKEND") or "firestore").strip().lower()
+JOB_QUEUE_COLLECTION = "generation_queue"
+JOB_QUEUE_SQLITE_PATH = (os.getenv("JOB_QUEUE_SQLITE_PATH") or "job_queue.sqlite3").strip()
+
+JOB_WORKERS_IN_WEB = (os.getenv("JOB_WORKERS_IN_WEB") or "1").strip().lower() in {"1", "true", "yes"}
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "15"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "20"))
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "2"))
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    """Parse `name=limit,name=limit` into a dict, ignoring malformed parts."""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            limits[name] = max(1, int(value.strip()))
+        except ValueError:
+            continue
+    return limits
+
+
+JOB_TYPE_CONCURRENCY = _parse_limits(
+    os.getenv("JOB_TYPE_CONCURRENCY", "image=4,optimizer=4,optimizer_generation=2")
+)
+JOB_PROVIDER_CONCURRENCY = _parse_limits(
+    os.getenv("JOB_PROVIDER_CONCURRENCY", "openai=6")
+)
+
+QUEUED = "queued"
+LEASED = "leased"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+
+class RetryableJobError(Exception):
+    """
+    Raise from a handler when the job should be retried with backoff.
+    Any other exception marks the job dead: handlers record their own
+    permanent failures, so only transient ones are worth another attempt.
+    """
+
+
+@dataclass
+class QueuedJob:
+    job_id: str
+    job_type: str
+    provider: str
+    uid: Optional[str]
+    payload: Dict[str, Any]
+    identity: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+    checkpoints: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def retryable(self) -> bool:
+        """True while a RetryableJobError would still earn another attempt."""
+        return self.attempts < self.max_attempts
+
+
+@dataclass
+class JobHandler:
+    job_type: str
+    provider: str
+    run: Callable[[QueuedJob], Awaitable[None]]
+    on_dead: Optional[Callable[[QueuedJob, str], Awaitable[None]]] = None
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+_job_identity: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "adgen_job_identity",
+    default=None,
+)
+_current_job: ContextVar[Optional[tuple]] = ContextVar(
+    "adgen_current_job",
+    default=None,
+)
+
+
+def register_job_handler(
+    job_type: str,
+    *,
+    provider: str,
+    run: Callable[[QueuedJob], Awaitable[None]],
+    on_dead: Optional[Callable[[QueuedJob, str], Awaitable[None]]] = None,
+) -> None:
+    _handlers[job_type] = JobHandler(job_type, provider, run, on_dead)
+
+
+def current_job_identity() -> Optional[Dict[str, Any]]:
+    """Identity captured at enqueue time, set only while a worker runs the job."""
+    return _job_identity.get()
+
+
+def job_checkpoint(key: str) -> Any:
+    """
+    A value recorded by save_job_checkpoint() on an earlier attempt of the
+    running job, or None (also outside a worker). Lets a job re-run after a
+    lease expiry or retry skip work it already paid for.
+    """
+    current = _current_job.get()
+    if current is None:
+        return None
+    _queue, _worker_id, job = current
+    return job.checkpoints.get(key)
+
+
+def save_job_checkpoint(key: str, value: Any) -> bool:
+    """
+    Persist `value` under `key` on the running job's queue record (None
+    removes it). Blocking; a no-op returning False outside a worker or once
+    the lease is lost.
+    """
+    current = _current_job.get()
+    if current is None:
+        return False
+    queue, worker_id, job = current
+    if value is None:
+        job.checkpoints.pop(key, None)
+    else:
+        job.checkpoints[key] = value
+    try:
+        return queue.checkpoint(job.job_id, worker_id, key, value)
+    except Exception as exc:
+        print("JOB QUEUE CHECKPOINT ERROR:", job.job_id, key, repr(exc), flush=True)
+        return False
+
+
+def job_identity(uid: str, email: Optional[str], claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Persistable identity for a queued job. Only the role claim is kept."""
+    role = (claims or {}).get("role")
+    return {
+        "uid": uid,
+        "email": email,
+        "claims": {"uid": uid, "role": role} if role else {"uid": uid},
+    }
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    delay = min(JOB_RETRY_MAX_SECONDS, delay)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# -----------------------------
+# Firestore backend
+# -----------------------------
+class FirestoreJobQueue:
+    def __init__(self, db=None):
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_db()
+        return self._db
+
+    def _ref(self, job_id: str):
+        return self.db.collection(JOB_QUEUE_COLLECTION).document(job_id)
+
+    def enqueue(
+        self,
+        job_type: str,
+        job_id: str,
+        *,
+        provider: str,
+        uid: Optional[str],
+        payload: Dict[str, Any],
+        identity: Dict[str, Any],
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> None:
+        now = time.time()
+        self._ref(job_id).set(
+            {
+                "jobId": job_id,
+                "jobType": job_type,
+                "provider": provider,
+                "uid": uid,
+                "payload": payload,
+                "identity": identity,
+                "status": QUEUED,
+                "attempts": 0,
+                "maxAttempts": max_attempts,
+                "availableAt": now,
+                "leaseOwner": None,
+                "leaseExpiresAt": None,
+                "lastError": None,
+                "checkpoints": {},
+                "createdAt": now,
+                "updatedAt": now,
+            }
+        )
+
+    def _to_job(self, job_id: str, data: Dict[str, Any]) -> QueuedJob:
+        return QueuedJob(
+            job_id=job_id,
+            job_type=data.get("jobType") or "",
+            provider=data.get("provider") or "",
+            uid=data.get("uid"),
+            payload=data.get("payload") or {},
+            identity=data.get("identity") or {},
+            attempts=int(data.get("attempts") or 0),
+            max_attempts=int(data.get("maxAttempts") or JOB_MAX_ATTEMPTS),
+            checkpoints=dict(data.get("checkpoints") or {}),
+        )
+
+    def claim(self, job_type: str, worker_id: str, limit: int) -> List[QueuedJob]:
+        if limit <= 0:
+            return []
+
+        now = time.time()
+        candidates = (
+            self.db.collection(JOB_QUEUE_COLLECTION)
+            .where("jobType", "==", job_type)
+            .where("status", "==", QUEUED)
+            .where("availableAt", "<=", now)
+            .order_by("availableAt")
+            .limit(limit)
+            .stream()
+        )
+
+        claimed: List[QueuedJob] = []
+        for snap in candidates:
+            ref = snap.reference
+
+            @gc_firestore.transactional
+            def _tx(transaction: gc_firestore.Transaction):
+                current = ref.get(transaction=transaction)
+                data = current.to_dict() or {}
+                if data.get("status") != QUEUED or float(data.get("availableAt") or 0) > now:
+                    return None
+
+                attempts = int(data.get("attempts") or 0) + 1
+                transaction.update(
+                    ref,
+                    {
+                        "status": LEASED,
+                        "attempts": attempts,
+                        "leaseOwner": worker_id,
+                        "leaseExpiresAt": now + JOB_LEASE_SECONDS,
+                        "heartbeatAt": now,
+                        "updatedAt": now,
+                    },
+                )
+                data["attempts"] = attempts
+                return data
+
+            try:
+                data = _tx(self.db.transaction())
+            except Exception as exc:
+                print("JOB QUEUE CLAIM ERROR:", snap.id, repr(exc), flush=True)
+                continue
+
+            if data is not None:
+                claimed.append(self._to_job(snap.id, data))
+
+        return claimed
+
+    def _owned_update(self, job_id: str, worker_id: str, update: Dict[str, Any]) -> bool:
+        ref = self._ref(job_id)
+
+        @gc_firestore.transactional
+        def _tx(transaction: gc_firestore.Transaction):
+            data = ref.get(transaction=transaction).to_dict() or {}
+            if data.get("status") != LEASED or data.get("leaseOwner") != worker_id:
+                return False
+            transaction.update(ref, {**update, "updatedAt": time.time()})
+            return True
+
+        return _tx(self.db.transaction())
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        now = time.time()
+        return self._owned_update(
+            job_id,
+            worker_id,
+            {"leaseExpiresAt": now + JOB_LEASE_SECONDS, "heartbeatAt": now},
+        )
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            {"status": SUCCEEDED, "leaseOwner": None, "leaseExpiresAt": None},
+        )
+
+    def checkpoint(self, job_id: str, worker_id: str, key: str, value: Any) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            {f"checkpoints.{key}": gc_firestore.DELETE_FIELD if value is None else value},
+        )
+
+    def retry(self, job_id: str, worker_id: str, error: str, delay: float) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            {
+                "status": QUEUED,
+                "availableAt": time.time() + max(0.0, delay),
+                "leaseOwner": None,
+                "leaseExpiresAt": None,
+                "lastError": (error or "")[:1000],
+            },
+        )
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Return a job to the queue without charging an attempt (shutdown)."""
+        ref = self._ref(job_id)
+
+        @gc_firestore.transactional
+        def _tx(transaction: gc_firestore.Transaction):
+            data = ref.get(transaction=transaction).to_dict() or {}
+            if data.get("status") != LEASED or data.get("leaseOwner") != worker_id:
+                return False
+            transaction.update(
+                ref,
+                {
+                    "status": QUEUED,
+                    "attempts": max(0, int(data.get("attempts") or 0) - 1),
+                    "availableAt": time.time(),
+                    "leaseOwner": None,
+                    "leaseExpiresAt": None,
+                    "updatedAt": time.time(),
+                },
+            )
+            return True
+
+        return _tx(self.db.transaction())
+
+    def dead(self, job_id: str, worker_id: Optional[str], error: str) -> bool:
+        update = {
+            "status": DEAD,
+            "leaseOwner": None,
+            "leaseExpiresAt": None,
+            "lastError": (error or "")[:1000],
+        }
+        if worker_id is None:
+            self._ref(job_id).update({**update, "updatedAt": time.time()})
+            return True
+        return self._owned_update(job_id, worker_id, update)
+
+    def recover_orphans(self) -> List[QueuedJob]:
+        """
+        Requeue leased jobs whose lease expired. Jobs that already used all
+        attempts are returned marked dead so their progress docs can be failed.
+        """
+        now = time.time()
+        expired = (
+            self.db.collection(JOB_QUEUE_COLLECTION)
+            .where("status", "==", LEASED)
+            .where("leaseExpiresAt", "<", now)
+            .limit(200)
+            .stream()
+        )
+
+        dead_jobs: List[QueuedJob] = []
+        for snap in expired:
+            ref = snap.reference
+
+            @gc_firestore.transactional
+            def _tx(transaction: gc_firestore.Transaction):
+                data = ref.get(transaction=transaction).to_dict() or {}
+                if data.get("status") != LEASED or float(data.get("leaseExpiresAt") or 0) >= now:
+                    return None
+
+                exhausted = int(data.get("attempts") or 0) >= int(
+                    data.get("maxAttempts") or JOB_MAX_ATTEMPTS
+                )
+                transaction.update(
+                    ref,
+                    {
+                        "status": DEAD if exhausted else QUEUED,
+                        "availableAt": now,
+                        "leaseOwner": None,
+                        "leaseExpiresAt": None,
+                        "lastError": "Worker lease expired.",
+                        "updatedAt": now,
+                    },
+                )
+                return data if exhausted else {}
+
+            try:
+                data = _tx(self.db.transaction())
+            except Exception as exc:
+                print("JOB QUEUE RECOVERY ERROR:", snap.id, repr(exc), flush=True)
+                continue
+
+            if data:
+                dead_jobs.append(self._to_job(snap.id, data))
+
+        return dead_jobs
+
+    def depth(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for job_type in _handlers:
+            try:
+                result = (
+                    self.db.collection(JOB_QUEUE_COLLECTION)
+                    .where("jobType", "==", job_type)
+                    .where("status", "==", QUEUED)
+                    .count()
+                    .get()
+                )
+                counts[job_type] = int(result[0][0].value)
+            except Exception:
+                counts[job_type] = -1
+        return counts
+
+
+# -----------------------------
+# SQLite backend (local runs)
+# -----------------------------
+class SQLiteJobQueue:
+    def __init__(self, path: str = JOB_QUEUE_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generation_queue (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                uid TEXT,
+                payload TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                last_error TEXT,
+                checkpoints TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS generation_queue_ready "
+            "ON generation_queue (job_type, status, available_at)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(generation_queue)")}
+        if "checkpoints" not in columns:
+            self._conn.execute(
+                "ALTER TABLE generation_queue ADD COLUMN checkpoints TEXT NOT NULL DEFAULT '{}'"
+            )
+
+    def _to_job(self, row: sqlite3.Row) -> QueuedJob:
+        return QueuedJob(
+            job_id=row["job_id"],
+            job_type=row["job_type"],
+            provider=row["provider"],
+            uid=row["uid"],
+            payload=json.loads(row["payload"] or "{}"),
+            identity=json.loads(row["identity"] or "{}"),
+            attempts=int(row["attempts"] or 0),
+            max_attempts=int(row["max_attempts"] or JOB_MAX_ATTEMPTS),
+            checkpoints=json.loads(row["checkpoints"] or "{}"),
+        )
+
+    def enqueue(
+        self,
+        job_type: str,
+        job_id: str,
+        *,
+        provider: str,
+        uid: Optional[str],
+        payload: Dict[str, Any],
+        identity: Dict[str, Any],
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO generation_queue (job_id, job_type, provider, uid, payload, identity, "
+                "status, attempts, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    job_type,
+                    provider,
+                    uid,
+                    json.dumps(payload, default=str),
+                    json.dumps(identity, default=str),
+                    QUEUED,
+                    max_attempts,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+
+    def claim(self, job_type: str, worker_id: str, limit: int) -> List[QueuedJob]:
+        if limit <= 0:
+            return []
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM generation_queue WHERE job_type = ? AND status = ? "
+                    "AND available_at <= ? ORDER BY available_at LIMIT ?",
+                    (job_type, QUEUED, now, limit),
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE generation_queue SET status = ?, attempts = attempts + 1, "
+                        "lease_owner = ?, lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                        (LEASED, worker_id, now + JOB_LEASE_SECONDS, now, row["job_id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        jobs = []
+        for row in rows:
+            job = self._to_job(row)
+            job.attempts += 1
+            jobs.append(job)
+        return jobs
+
+    def _owned_update(self, job_id: str, worker_id: str, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE generation_queue SET {assignments}, updated_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_owner = ?",
+                (*params, time.time(), job_id, LEASED, worker_id),
+            )
+            return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "lease_expires_at = ?",
+            (time.time() + JOB_LEASE_SECONDS,),
+        )
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "status = ?, lease_owner = NULL, lease_expires_at = NULL",
+            (SUCCEEDED,),
+        )
+
+    def checkpoint(self, job_id: str, worker_id: str, key: str, value: Any) -> bool:
+        if value is None:
+            return self._owned_update(
+                job_id,
+                worker_id,
+                "checkpoints = json_remove(checkpoints, ?)",
+                (f"$.{key}",),
+            )
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "checkpoints = json_set(checkpoints, ?, json(?))",
+            (f"$.{key}", json.dumps(value, default=str)),
+        )
+
+    def retry(self, job_id: str, worker_id: str, error: str, delay: float) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "status = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = ?",
+            (QUEUED, time.time() + max(0.0, delay), (error or "")[:1000]),
+        )
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "status = ?, attempts = MAX(0, attempts - 1), available_at = ?, "
+            "lease_owner = NULL, lease_expires_at = NULL",
+            (QUEUED, time.time()),
+        )
+
+    def dead(self, job_id: str, worker_id: Optional[str], error: str) -> bool:
+        if worker_id is None:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE generation_queue SET status = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE job_id = ?",
+                    (DEAD, (error or "")[:1000], time.time(), job_id),
+                )
+            return True
+        return self._owned_update(
+            job_id,
+            worker_id,
+            "status = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = ?",
+            (DEAD, (error or "")[:1000]),
+        )
+
+    def recover_orphans(self) -> List[QueuedJob]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM generation_queue WHERE status = ? AND lease_expires_at < ?",
+                    (LEASED, now),
+                ).fetchall()
+                dead_rows = []
+                for row in rows:
+                    exhausted = int(row["attempts"] or 0) >= int(row["max_attempts"] or JOB_MAX_ATTEMPTS)
+                    self._conn.execute(
+                        "UPDATE generation_queue SET status = ?, available_at = ?, lease_owner = NULL, "
+                        "lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE job_id = ?",
+                        (DEAD if exhausted else QUEUED, now, "Worker lease expired.", now, row["job_id"]),
+                    )
+                    if exhausted:
+                        dead_rows.append(row)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return [self._to_job(row) for row in dead_rows]
+
+    def depth(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_type, COUNT(*) AS n FROM generation_queue WHERE status = ? GROUP BY job_type",
+                (QUEUED,),
+            ).fetchall()
+        return {row["job_type"]: int(row["n"]) for row in rows}
+
+
+_queue_lock = threading.Lock()
+_queue = None
+
+
+def get_job_queue():
+    global _queue
+    if _queue is not None:
+        return _queue
+
+    with _queue_lock:
+        if _queue is None:
+            if JOB_QUEUE_BACKEND == "sqlite":
+                _queue = SQLiteJobQueue()
+            else:
+                _queue = FirestoreJobQueue()
+    return _queue
+
+
+def enqueue_job(
+    job_type: str,
+    job_id: str,
+    *,
+    uid: Optional[str],
+    payload: Dict[str, Any],
+    identity: Dict[str, Any],
+) -> None:
+    handler = _handlers.get(job_type)
+    if handler is None:
+        raise RuntimeError(f"No job handler registered for {job_type}.")
+
+    get_job_queue().enqueue(
+        job_type,
+        job_id,
+        provider=handler.provider,
+        uid=uid,
+        payload=payload,
+        identity=identity,
+    )
+
+
+# -----------------------------
+# Worker pool
+# -----------------------------
+class JobWorkerPool:
+    """Claims and runs queued jobs within per-type and per-provider limits."""
+
+    def __init__(self, queue=None, worker_id: Optional[str] = None):
+        self.queue = queue or get_job_queue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running_by_type: Dict[str, int] = {}
+        self._running_by_provider: Dict[str, int] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_recovery = 0.0
+        self.stats = {"claimed": 0, "succeeded": 0, "retried": 0, "dead": 0, "released": 0}
+
+    def _type_limit(self, job_type: str) -> int:
+        return JOB_TYPE_CONCURRENCY.get(job_type, JOB_DEFAULT_CONCURRENCY)
+
+    def _provider_limit(self, provider: str) -> Optional[int]:
+        return JOB_PROVIDER_CONCURRENCY.get(provider)
+
+    def _free_slots(self, handler: JobHandler) -> int:
+        free = self._type_limit(handler.job_type) - self._running_by_type.get(handler.job_type, 0)
+        provider_limit = self._provider_limit(handler.provider)
+        if provider_limit is not None:
+            free = min(free, provider_limit - self._running_by_provider.get(handler.provider, 0))
+        return max(0, free)
+
+    async def start(self) -> None:
+        await self._recover()
+        self._poll_task = asyncio.create_task(self._poll_loop())
+        print(f"[JOB QUEUE] worker {self.worker_id} started ({JOB_QUEUE_BACKEND})", flush=True)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        running = list(self._tasks.values())
+        if running:
+            _done, pending = await asyncio.wait(running, timeout=JOB_SHUTDOWN_GRACE_SECONDS)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _recover(self) -> None:
+        self._last_recovery = time.time()
+        try:
+            dead_jobs = await run_blocking(self.queue.recover_orphans)
+        except Exception as exc:
+            print("JOB QUEUE RECOVERY FAILED:", repr(exc), flush=True)
+            return
+
+        for job in dead_jobs:
+            await self._notify_dead(job, "The job could not be completed after several attempts.")
+
+    async def _poll_loop(self) -> None:
+        while not self._stopping:
+            claimed_any = False
+            try:
+                if time.time() - self._last_recovery >= JOB_LEASE_SECONDS:
+                    await self._recover()
+
+                for handler in list(_handlers.values()):
+                    free = self._free_slots(handler)
+                    if free <= 0:
+                        continue
+
+                    jobs = await run_blocking(
+                        self.queue.claim,
+                        handler.job_type,
+                        self.worker_id,
+                        free,
+                    )
+                    for job in jobs:
+                        claimed_any = True
+                        self._launch(handler, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print("JOB QUEUE POLL ERROR:", repr(exc), flush=True)
+
+            await asyncio.sleep(0.05 if claimed_any else JOB_POLL_SECONDS)
+
+    def _launch(self, handler: JobHandler, job: QueuedJob) -> None:
+        self.stats["claimed"] += 1
+        self._running_by_type[handler.job_type] = self._running_by_type.get(handler.job_type, 0) + 1
+        self._running_by_provider[handler.provider] = self._running_by_provider.get(handler.provider, 0) + 1
+
+        task = asyncio.create_task(self._execute(handler, job))
+        self._tasks[job.job_id] = task
+
+        def _done(_task: asyncio.Task) -> None:
+            self._tasks.pop(job.job_id, None)
+            self._running_by_type[handler.job_type] -= 1
+            self._running_by_provider[handler.provider] -= 1
+
+        task.add_done_callback(_done)
+
+    async def _heartbeat(self, job: QueuedJob) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                still_owned = await run_blocking(self.queue.heartbeat, job.job_id, self.worker_id)
+                if not still_owned:
+                    print("JOB QUEUE LEASE LOST:", job.job_id, flush=True)
+                    return
+            except Exception as exc:
+                print("JOB QUEUE HEARTBEAT ERROR:", job.job_id, repr(exc), flush=True)
+
+    async def _execute(self, handler: JobHandler, job: QueuedJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        token = _job_identity.set(job.identity or {"uid": job.uid, "email": None, "claims": {}})
+        job_token = _current_job.set((self.queue, self.worker_id, job))
+        try:
+            await handler.run(job)
+            await run_blocking(self.queue.complete, job.job_id, self.worker_id)
+            self.stats["succeeded"] += 1
+        except asyncio.CancelledError:
+            await asyncio.shield(run_blocking(self.queue.release, job.job_id, self.worker_id))
+            self.stats["released"] += 1
+            raise
+        except Exception as exc:
+            error = repr(exc)
+            print("JOB QUEUE HANDLER ERROR:", job.job_type, job.job_id, error, flush=True)
+            traceback.print_exc()
+
+            if isinstance(exc, RetryableJobError) and job.retryable:
+                await run_blocking(
+                    self.queue.retry,
+                    job.job_id,
+                    self.worker_id,
+                    error,
+                    backoff_seconds(job.attempts),
+                )
+                self.stats["retried"] += 1
+            else:
+                await run_blocking(self.queue.dead, job.job_id, self.worker_id, error)
+                self.stats["dead"] += 1
+                await self._notify_dead(job, error)
+        finally:
+            _current_job.reset(job_token)
+            _job_identity.reset(token)
+            heartbeat.cancel()
+
+    async def _notify_dead(self, job: QueuedJob, error: str) -> None:
+        handler = _handlers.get(job.job_type)
+        if handler is None or handler.on_dead is None:
+            return
+        try:
+            await handler.on_dead(job, error)
+        except Exception as exc:
+            print("JOB QUEUE DEAD-LETTER HOOK ERROR:", job.job_id, repr(exc), flush=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workerId": self.worker_id,
+            "backend": JOB_QUEUE_BACKEND,
+            "running": {
+                "byType": dict(self._running_by_type),
+                "byProvider": dict(self._running_by_provider),
+            },
+            "limits": {
+                "byType": {job_type: self._type_limit(job_type) for job_type in _handlers},
+                "byProvider": dict(JOB_PROVIDER_CONCURRENCY),
+            },
+            **self.stats,
+        }
+
+
+_pool: Optional[JobWorkerPool] = None
+
+
+async def start_job_workers() -> Optional[JobWorkerPool]:
+    global _pool
+    if _pool is None:
+        _pool = JobWorkerPool()
+        await _pool.start()
+    return _pool
+
+
+async def stop_job_workers() -> None:
+    global _pool
+    pool = _pool
+    _pool = None
+    if pool is not None:
+        await pool.stop()
+
+
+def job_queue_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"workersInWeb": JOB_WORKERS_IN_WEB}
+    if _pool is not None:
+        stats["pool"] = _pool.snapshot()
+    try:
+        stats["queued"] = get_job_queue().depth()
+    except Exception as exc:
+        stats["queued"] = {"error": str(exc)}
+    return stats
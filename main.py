@@ -5,9 +5,10 @@ import re
 import json
 import uuid
 import asyncio
+import threading
 import requests
 import time
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 
 from dotenv import load_dotenv
 from fastapi import (
@@ -19,6 +20,7 @@ from fastapi import (
     File,
     Form,
     BackgroundTasks,
+    Request,
 )
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -30,13 +32,19 @@ from stripe_server import stripe_router, price_id_to_tier, extract_subscription_
 import stripe
 
 # Firebase auth + Firestore
-from auth_helpers import get_db, get_bearer_token, verify_firebase_token
+from auth_helpers import (
+    get_db,
+    get_bearer_token,
+    verify_firebase_token,
+    invalidate_user_identity,
+)
 from usage_caps import (
     check_and_increment_usage,
     check_and_increment_resource,
     rollback_resource,
     peek_usage,
     peek_resource,
+    peek_resources_many,
     get_tier_and_status,
     get_usage_period,
 )
@@ -54,8 +62,8 @@ from firebase_admin import auth as admin_auth
 from usage_caps import utc_month_key
 
 import traceback
-from fastapi.responses import JSONResponse, StreamingResponse
-import io
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse
 
 from pydantic import BaseModel
 from google.cloud import firestore as gc_firestore
@@ -80,10 +88,71 @@ from storage_utils import (
 from storage_tracking import (
     ensure_storage_available,
     get_storage_summary,
+    get_storage_summaries_many,
     register_storage_asset,
     release_storage_asset,
 )
 from brand_kits import router as brand_kits_router, resolve_brand_kit
+from admin_search import (
+    index_user,
+    remove_from_search_index,
+    search_admin_index,
+    set_creative_job,
+)
+from active_generation_locks import (
+    acquire_active_generation_lock,
+    clear_active_generation_lock,
+    get_active_generation_lock,
+    release_active_generation_lock,
+)
+from firestore_async import (
+    get_document,
+    install_blocking_call_guard_from_env,
+    run_blocking,
+    shutdown_executor,
+    stream_query,
+)
+import http_pool
+from image_proxy import cache_stats as image_proxy_cache_stats, proxy_storage_object
+from progress_events import (
+    TERMINAL_STATUSES,
+    bearer_from_query,
+    open_progress_stream,
+    progress_stream_stats,
+    publish_progress,
+)
+from progress_writer import (
+    flush_progress_writes,
+    progress_writer_stats,
+    write_progress,
+)
+from encoder_pool import encoder_pool_stats, shutdown_encoder_pool
+from runway_poller import (
+    VIDEO_POLLER_IN_WEB,
+    runway_poller_stats,
+    start_runway_poller,
+    stop_runway_poller,
+)
+from job_queue import (
+    JOB_WORKERS_IN_WEB,
+    QueuedJob,
+    RetryableJobError,
+    current_job_identity,
+    enqueue_job,
+    job_checkpoint,
+    job_identity,
+    job_queue_stats,
+    register_job_handler,
+    save_job_checkpoint,
+    start_job_workers,
+    stop_job_workers,
+)
+from request_documents import (
+    begin_request_documents,
+    load_documents_many,
+    load_user_doc,
+    request_document_stats,
+)
 
 from notification_utils import (
     create_notification,
@@ -92,7 +161,14 @@ from notification_utils import (
 
 # Library Performace Schemas
 from typing import Optional
-from collections import defaultdict
+from creative_insights import (
+    apply_creative_performance_change,
+    compute_insights,
+    creative_snapshot,
+    has_performance,
+    load_creative_insights,
+    render_insights,
+)
 from typing import Any, Dict, List, Optional, Tuple
 from fastapi import Query
 from collections import Counter
@@ -119,6 +195,7 @@ from campaign_intelligence.routes import router as campaign_intelligence_router
 
 #Reporting 
 from reporting_engine import router as reporting_router
+from reporting_engine.service import bump_library_performance_version, reporting_snapshot_stats
 
 # Customer Intelligence
 from customer_intelligence.routes import router as customer_intelligence_router
@@ -128,8 +205,28 @@ from customer_intelligence.event_service import track_event
 from email_engine.routes import router as email_engine_router
 
 load_dotenv(override=True)
+install_blocking_call_guard_from_env()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await http_pool.open_http_client()
+    if JOB_WORKERS_IN_WEB:
+        await start_job_workers()
+    if VIDEO_POLLER_IN_WEB:
+        await start_runway_poller()
+    try:
+        yield
+    finally:
+        await stop_runway_poller()
+        await stop_job_workers()
+        flush_progress_writes()
+        await http_pool.close_http_client()
+        shutdown_encoder_pool()
+        shutdown_executor()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(campaign_router)
 app.include_router(line_items_router)
 app.include_router(campaign_assets_router)
@@ -268,7 +365,20 @@ def root():
 
 @app.get("/admin/health", dependencies=[Depends(admin_required)])
 def admin_health():
-    return {"ok": True, "admin": True}
+    return {
+        "ok": True,
+        "admin": True,
+        "requestDocuments": request_document_stats(),
+        "httpPool": http_pool.pool_stats(),
+        "imageProxyCache": image_proxy_cache_stats(),
+        "jobQueue": job_queue_stats(),
+        "progressStreams": progress_stream_stats(),
+        "progressWriter": progress_writer_stats(),
+        "runwayPoller": runway_poller_stats(),
+        "encoderPool": encoder_pool_stats(),
+        "reportingSnapshots": reporting_snapshot_stats(),
+        "imageFailureBreaker": image_failure_breaker.snapshot(),
+    }
 
 
 # ---------------- OpenAI ----------------
@@ -552,7 +662,14 @@ def set_generation_progress(
     }
     if extra:
         payload.update(extra)
-    db.collection(_progress_collection(kind)).document(job_id).set(payload, merge=True)
+    terminal = stage in TERMINAL_STATUSES or payload.get("status") in TERMINAL_STATUSES
+    write_progress(
+        db.collection(_progress_collection(kind)).document(job_id),
+        payload,
+        terminal=terminal,
+        create=True,
+    )
+    publish_progress(_progress_collection(kind), job_id, payload)
 
 
 def rollback_reserved_usage_with_logging(
@@ -616,7 +733,9 @@ def rollback_reserved_usage_with_logging(
             flush=True,
         )
 
-        if not refunded:
+        if refunded:
+            save_job_checkpoint("charged", None)
+        else:
             print(
                 "USAGE ROLLBACK WARNING:",
                 {
@@ -652,6 +771,24 @@ def rollback_reserved_usage_with_logging(
         return False
 
 
+def reserve_job_usage(reserve: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reserve usage at most once per queued job.
+
+    The reservation is recorded as the job's "charged" checkpoint, so a
+    re-run after a lease expiry or retry reuses it instead of charging
+    again; rollback_reserved_usage_with_logging clears it on refund.
+    Outside a queued job this is just reserve().
+    """
+    charged = job_checkpoint("charged")
+    if charged:
+        return dict(charged)
+    reservation = reserve()
+    if reservation.get("allowed"):
+        save_job_checkpoint("charged", reservation)
+    return reservation
+
+
 # ---------------- Image failure cost protection ----------------
 IMAGE_FAILURE_COOLDOWN_SECONDS = int(os.getenv("IMAGE_FAILURE_COOLDOWN_SECONDS", "90"))
 IMAGE_FAILURE_WINDOW_SECONDS = int(os.getenv("IMAGE_FAILURE_WINDOW_SECONDS", "1800"))
@@ -706,6 +843,142 @@ def _image_global_failure_ref(db, category: str):
     )
 
 
+def _image_user_cooldown_index_ref(db):
+    return db.collection(IMAGE_FAILURE_GUARD_COLLECTION).document("image_user_cooldowns")
+
+
+IMAGE_BREAKER_REFRESH_SECONDS = float(os.getenv("IMAGE_BREAKER_REFRESH_SECONDS", "5"))
+
+
+class ImageFailureBreaker:
+    """
+    Process-local view of the image failure guard.
+
+    The global category docs and the per-user cooldown index are refreshed
+    together with one get_all at most every IMAGE_BREAKER_REFRESH_SECONDS,
+    in the background once the first load is done, so admission checks are
+    served from memory. Failures recorded by this process update the view
+    immediately; other processes' failures arrive with the next refresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = 0.0
+        self._global: Dict[str, Dict[str, int]] = {}
+        self._users: Dict[str, int] = {}
+        self._open: set = set()
+
+    def _refresh(self, db) -> None:
+        refs = [_image_global_failure_ref(db, c) for c in IMAGE_FAILURE_CATEGORIES]
+        refs.append(_image_user_cooldown_index_ref(db))
+        by_path = {ref.path: ref for ref in refs}
+        index_path = refs[-1].path
+
+        global_state: Dict[str, Dict[str, int]] = {}
+        users: Dict[str, int] = {}
+        for snap in db.get_all(refs):
+            data = snap.to_dict() or {}
+            if snap.reference.path == index_path:
+                for uid, blocked_until in (data.get("blockedUntil") or {}).items():
+                    try:
+                        users[uid] = int(blocked_until)
+                    except (TypeError, ValueError):
+                        continue
+            elif snap.reference.path in by_path:
+                category = snap.reference.id.replace("image_global_", "", 1)
+                global_state[category] = {
+                    "blockedUntil": int(data.get("blockedUntil") or 0),
+                    "failureCount": int(data.get("failureCountInWindow") or 0),
+                }
+
+        with self._lock:
+            self._global = global_state
+            self._users = users
+            self._loaded_at = time.monotonic()
+        self._publish_transitions()
+
+    def _refresh_in_background(self, db) -> None:
+        def _run():
+            try:
+                self._refresh(db)
+            except Exception as exc:
+                print("IMAGE FAILURE BREAKER REFRESH ERROR:", repr(exc), flush=True)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=_run, name="image-breaker-refresh", daemon=True).start()
+
+    def ensure_fresh(self, db) -> None:
+        age = time.monotonic() - self._loaded_at
+        if not self._loaded_at:
+            self._refresh(db)
+        elif age >= IMAGE_BREAKER_REFRESH_SECONDS:
+            self._refresh_in_background(db)
+
+    def _publish_transitions(self) -> None:
+        now = int(time.time())
+        with self._lock:
+            open_now = {
+                category
+                for category, state in self._global.items()
+                if state["blockedUntil"] > now
+            }
+            opened = open_now - self._open
+            closed = self._open - open_now
+            self._open = open_now
+            snapshot = {c: dict(self._global.get(c) or {}) for c in opened}
+
+        for category in sorted(opened):
+            print(
+                "IMAGE GLOBAL CIRCUIT BREAKER OPENED:",
+                {"category": category, **snapshot[category]},
+                flush=True,
+            )
+        for category in sorted(closed):
+            print("IMAGE GLOBAL CIRCUIT BREAKER CLOSED:", {"category": category}, flush=True)
+
+    def user_blocked_until(self, uid: str) -> int:
+        with self._lock:
+            return int(self._users.get(uid) or 0)
+
+    def open_global_blocks(self) -> List[Dict[str, Any]]:
+        self._publish_transitions()
+        now = int(time.time())
+        with self._lock:
+            return [
+                {"category": category, **state}
+                for category, state in self._global.items()
+                if state["blockedUntil"] > now
+            ]
+
+    def note_failure(self, uid: str, category: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._users[uid] = int(result.get("userBlockedUntil") or 0)
+            self._global[category] = {
+                "blockedUntil": int(result.get("globalBlockedUntil") or 0),
+                "failureCount": int(result.get("globalFailureCount") or 0),
+            }
+        self._publish_transitions()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = int(time.time())
+        with self._lock:
+            return {
+                "ageSeconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "openCategories": sorted(self._open),
+                "usersCoolingDown": sum(1 for until in self._users.values() if until > now),
+            }
+
+
+image_failure_breaker = ImageFailureBreaker()
+
+
 def _record_image_generation_failure(
     *, db, uid: Optional[str], job_id: Optional[str], category: str, detail: Any,
 ) -> None:
@@ -722,14 +995,17 @@ def _record_image_generation_failure(
     safe_category = category if category in IMAGE_FAILURE_CATEGORIES else "unexpected"
     user_ref = _image_user_failure_ref(db, uid)
     global_ref = _image_global_failure_ref(db, safe_category)
+    index_ref = _image_user_cooldown_index_ref(db)
 
     try:
         @gc_firestore.transactional
         def _tx(transaction: gc_firestore.Transaction):
             user_snap = user_ref.get(transaction=transaction)
             global_snap = global_ref.get(transaction=transaction)
+            index_snap = index_ref.get(transaction=transaction)
             user_data = user_snap.to_dict() or {}
             global_data = global_snap.to_dict() or {}
+            index_data = index_snap.to_dict() or {}
 
             user_cutoff = now - IMAGE_FAILURE_WINDOW_SECONDS
             user_timestamps = [
@@ -794,6 +1070,24 @@ def _record_image_generation_failure(
                 },
                 merge=True,
             )
+            # Active cooldowns only, so admission can read every user's
+            # state from one small document. Every instance writes this one
+            # document, so it is only rewritten when a cooldown starts (or
+            # escalates to the window block); short extensions from
+            # in-flight failures stay on the user doc, and expired entries
+            # are pruned on the next start since readers compare against now.
+            cooldowns = {
+                key: int(value)
+                for key, value in (index_data.get("blockedUntil") or {}).items()
+                if isinstance(value, (int, float)) and int(value) > now
+            }
+            indexed_until = cooldowns.get(uid, 0)
+            if user_blocked_until > indexed_until + IMAGE_FAILURE_COOLDOWN_SECONDS:
+                cooldowns[uid] = user_blocked_until
+                transaction.set(
+                    index_ref,
+                    {"blockedUntil": cooldowns, "updatedAt": gc_firestore.SERVER_TIMESTAMP},
+                )
             return {
                 "userFailureCount": len(user_timestamps),
                 "userBlockedUntil": user_blocked_until,
@@ -807,16 +1101,7 @@ def _record_image_generation_failure(
             {"uid": uid, "jobId": job_id, "category": safe_category, **result},
             flush=True,
         )
-        if int(result.get("globalBlockedUntil") or 0) > now:
-            print(
-                "IMAGE GLOBAL CIRCUIT BREAKER OPENED:",
-                {
-                    "category": safe_category,
-                    "blockedUntil": result.get("globalBlockedUntil"),
-                    "failureCount": result.get("globalFailureCount"),
-                },
-                flush=True,
-            )
+        image_failure_breaker.note_failure(uid, safe_category, result)
     except Exception as guard_error:
         print(
             "IMAGE FAILURE GUARD RECORD ERROR:",
@@ -830,9 +1115,13 @@ def _check_image_generation_failure_guard(*, db, uid: str) -> None:
     """Block costly retries before usage is reserved or an API call is made."""
     now = int(time.time())
     try:
-        user_data = _image_user_failure_ref(db, uid).get().to_dict() or {}
-        user_blocked_until = int(user_data.get("blockedUntil") or 0)
+        image_failure_breaker.ensure_fresh(db)
+
+        user_blocked_until = image_failure_breaker.user_blocked_until(uid)
         if user_blocked_until > now:
+            # Rare path: read the user's guard doc for the response details.
+            user_data = _image_user_failure_ref(db, uid).get().to_dict() or {}
+            user_blocked_until = int(user_data.get("blockedUntil") or user_blocked_until)
             raise HTTPException(
                 status_code=429,
                 detail={
@@ -847,16 +1136,7 @@ def _check_image_generation_failure_guard(*, db, uid: str) -> None:
                 },
             )
 
-        active_global_blocks = []
-        for category in IMAGE_FAILURE_CATEGORIES:
-            data = _image_global_failure_ref(db, category).get().to_dict() or {}
-            blocked_until = int(data.get("blockedUntil") or 0)
-            if blocked_until > now:
-                active_global_blocks.append({
-                    "category": category,
-                    "blockedUntil": blocked_until,
-                    "failureCount": int(data.get("failureCountInWindow") or 0),
-                })
+        active_global_blocks = image_failure_breaker.open_global_blocks()
 
         if active_global_blocks:
             latest = max(active_global_blocks, key=lambda item: item["blockedUntil"])
@@ -885,12 +1165,33 @@ def _check_image_generation_failure_guard(*, db, uid: str) -> None:
         traceback.print_exc()
 
 
+# Provider/5xx failures a queued job may retry. generate_ad and friends
+# already refund the usage they reserved before raising, and checkpoint the
+# expensive steps, so a retry neither double-charges nor regenerates.
+RETRYABLE_JOB_STATUS_CODES = {500, 502, 503, 504}
+
+
+def _retry_generation_job(db, kind: str, job_id: str, error: Any) -> RetryableJobError:
+    set_generation_progress(
+        db,
+        kind,
+        job_id,
+        "queued",
+        message="A temporary service issue interrupted this request. Retrying shortly.",
+        extra={"status": "queued", "error": None},
+    )
+    return RetryableJobError(str(error)[:300])
+
+
 async def _run_image_generation_job(
-    job_id: str, payload: AdRequest, authorization: str
+    job_id: str, payload: AdRequest, authorization: str, *, retry: bool = False
 ):
     db = get_db()
     try:
-        result = await generate_ad(payload, authorization, progress_job_id=job_id)
+        result = job_checkpoint("result")
+        if result is None:
+            result = await generate_ad(payload, authorization, progress_job_id=job_id)
+            save_job_checkpoint("result", result)
         set_generation_progress(
             db,
             "image",
@@ -917,6 +1218,12 @@ async def _run_image_generation_job(
             or {}
         )
 
+        # Only the attempt that will not be retried counts against the
+        # failure guard; otherwise the cooldown it starts would reject the
+        # retry itself with a 429.
+        if retry and int(exc.status_code or 0) in RETRYABLE_JOB_STATUS_CODES:
+            raise _retry_generation_job(db, "image", job_id, exc.detail) from exc
+
         if int(exc.status_code or 0) >= 500:
             _record_image_generation_failure(
                 db=db,
@@ -973,6 +1280,9 @@ async def _run_image_generation_job(
             or {}
         )
 
+        if retry:
+            raise _retry_generation_job(db, "image", job_id, repr(exc)) from exc
+
         _record_image_generation_failure(
             db=db,
             uid=job_data.get("uid"),
@@ -1011,19 +1321,24 @@ async def _run_optimizer_job(
     job_id: str,
     payload: OptimizeAdRequest,
     authorization: str,
+    *,
+    retry: bool = False,
 ):
     db = get_db()
 
     try:
-        result = await optimize_ad(
-            payload,
-            authorization,
-            progress_job_id=job_id,
-        )
+        result_data = job_checkpoint("result")
+        if result_data is None:
+            result = await optimize_ad(
+                payload,
+                authorization,
+                progress_job_id=job_id,
+            )
 
-        result_data = (
-            result.model_dump() if hasattr(result, "model_dump") else dict(result)
-        )
+            result_data = (
+                result.model_dump() if hasattr(result, "model_dump") else dict(result)
+            )
+            save_job_checkpoint("result", result_data)
 
         set_generation_progress(
             db,
@@ -1048,6 +1363,9 @@ async def _run_optimizer_job(
             flush=True,
         )
 
+        if retry and int(exc.status_code or 0) in RETRYABLE_JOB_STATUS_CODES:
+            raise _retry_generation_job(db, "optimizer", job_id, exc.detail) from exc
+
         set_generation_progress(
             db,
             "optimizer",
@@ -1093,6 +1411,9 @@ async def _run_optimizer_job(
         )
         traceback.print_exc()
 
+        if retry:
+            raise _retry_generation_job(db, "optimizer", job_id, repr(exc)) from exc
+
         set_generation_progress(
             db,
             "optimizer",
@@ -1131,15 +1452,20 @@ async def _run_optimizer_generation_job(
     job_id: str,
     payload: GenerateFromOptimizerRequest,
     authorization: str,
+    *,
+    retry: bool = False,
 ):
     db = get_db()
 
     try:
-        result = await generate_from_optimizer(
-            payload,
-            authorization,
-            progress_job_id=job_id,
-        )
+        result = job_checkpoint("result")
+        if result is None:
+            result = await generate_from_optimizer(
+                payload,
+                authorization,
+                progress_job_id=job_id,
+            )
+            save_job_checkpoint("result", result)
 
         set_generation_progress(
             db,
@@ -1172,6 +1498,12 @@ async def _run_optimizer_generation_job(
             or {}
         )
 
+        # Only the attempt that will not be retried counts against the
+        # failure guard; otherwise the cooldown it starts would reject the
+        # retry itself with a 429.
+        if retry and int(exc.status_code or 0) in RETRYABLE_JOB_STATUS_CODES:
+            raise _retry_generation_job(db, "optimizer_generation", job_id, exc.detail) from exc
+
         if int(exc.status_code or 0) >= 500:
             _record_image_generation_failure(
                 db=db,
@@ -1234,6 +1566,9 @@ async def _run_optimizer_generation_job(
             or {}
         )
 
+        if retry:
+            raise _retry_generation_job(db, "optimizer_generation", job_id, repr(exc)) from exc
+
         _record_image_generation_failure(
             db=db,
             uid=job_data.get("uid"),
@@ -1276,67 +1611,85 @@ async def _run_optimizer_generation_job(
         )
 
 
-def _read_progress_job(db, collection: str, job_id: str, uid: str, admin: bool):
-    snap = db.collection(collection).document(job_id).get()
-    if not snap.exists:
-        raise HTTPException(status_code=404, detail="Progress job not found.")
-    data = snap.to_dict() or {}
-    if not admin and data.get("uid") != uid:
-        raise HTTPException(status_code=403, detail="Forbidden.")
-    return {"jobId": job_id, **data}
+# ---------------- Queued job handlers ----------------
+# The runners above record permanent failures on the progress doc themselves.
+# While attempts remain they raise RetryableJobError for provider/5xx
+# failures instead, and the queue retries with backoff; a worker that dies
+# mid-job is recovered by lease expiry. Either way the re-run picks up the
+# job's checkpoints (charged usage, stored image, finished result).
+async def _queued_image_generation(job: QueuedJob) -> None:
+    await _run_image_generation_job(
+        job.job_id,
+        AdRequest(**job.payload),
+        "",
+        retry=job.retryable,
+    )
+    await run_blocking(release_active_generation_lock, get_db(), job.uid, job.job_id)
 
-ACTIVE_IMAGE_GENERATION_STATUSES = {
-    "queued",
-    "running",
-    "pending",
-    "processing",
-}
 
+async def _queued_optimizer(job: QueuedJob) -> None:
+    await _run_optimizer_job(
+        job.job_id,
+        OptimizeAdRequest(**job.payload),
+        "",
+        retry=job.retryable,
+    )
 
-def require_no_active_image_generation(db, uid: str) -> None:
-    """
-    Prevent one user from starting multiple image generations at the same time.
 
-    Checks progress-job collections, not the completed Library collection.
-    """
+async def _queued_optimizer_generation(job: QueuedJob) -> None:
+    await _run_optimizer_generation_job(
+        job.job_id,
+        GenerateFromOptimizerRequest(**job.payload),
+        "",
+        retry=job.retryable,
+    )
+    await run_blocking(release_active_generation_lock, get_db(), job.uid, job.job_id)
 
-    # Regular Ad Generator image jobs
-    for snap in (
-        db.collection("image_generation_jobs")
-        .where("uid", "==", uid)
-        .limit(25)
-        .stream()
-    ):
-        data = snap.to_dict() or {}
-        status = str(data.get("status") or "").strip().lower()
 
-        if status in ACTIVE_IMAGE_GENERATION_STATUSES:
-            raise HTTPException(
-                status_code=429,
-                detail="You already have an image generation in progress.",
-            )
+def _dead_letter_handler(kind: str, message: str):
+    async def _on_dead(job: QueuedJob, error: str) -> None:
+        await run_blocking(release_active_generation_lock, get_db(), job.uid, job.job_id)
+        await run_blocking(
+            set_generation_progress,
+            get_db(),
+            kind,
+            job.job_id,
+            "failed",
+            message=message,
+            extra={"status": "failed", "error": error[:300]},
+        )
 
-    # Optimizer-generated image jobs
-    for snap in (
-        db.collection("optimizer_jobs")
-        .where("uid", "==", uid)
-        .limit(25)
-        .stream()
-    ):
-        data = snap.to_dict() or {}
+    return _on_dead
 
-        job_type = str(data.get("jobType") or "").strip().lower()
-        status = str(data.get("status") or "").strip().lower()
 
-        if (
-            job_type == "optimizer_generation"
-            and status in ACTIVE_IMAGE_GENERATION_STATUSES
-        ):
-            raise HTTPException(
-                status_code=429,
-                detail="You already have an image generation in progress.",
-            )
+register_job_handler(
+    "image",
+    provider="openai",
+    run=_queued_image_generation,
+    on_dead=_dead_letter_handler("image", "Creative generation failed."),
+)
+register_job_handler(
+    "optimizer",
+    provider="openai",
+    run=_queued_optimizer,
+    on_dead=_dead_letter_handler("optimizer", "Optimization failed."),
+)
+register_job_handler(
+    "optimizer_generation",
+    provider="openai",
+    run=_queued_optimizer_generation,
+    on_dead=_dead_letter_handler("optimizer_generation", "Creative generation failed."),
+)
+
 
+def _read_progress_job(db, collection: str, job_id: str, uid: str, admin: bool):
+    snap = db.collection(collection).document(job_id).get()
+    if not snap.exists:
+        raise HTTPException(status_code=404, detail="Progress job not found.")
+    data = snap.to_dict() or {}
+    if not admin and data.get("uid") != uid:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return {"jobId": job_id, **data}
 
 # ---------------- Helpers ----------------
 def upload_png_to_firebase_storage(img_bytes: bytes, uid: str) -> dict:
@@ -1441,6 +1794,13 @@ def is_admin(claims: dict) -> bool:
 
 
 def require_user(authorization: str | None):
+    # Queued generation jobs run without the caller's bearer token, which may
+    # have expired by the time a worker claims them; the identity captured at
+    # enqueue time stands in for it.
+    identity = current_job_identity()
+    if identity is not None:
+        return identity.get("uid"), identity.get("email"), identity.get("claims") or {}
+
     token = get_bearer_token(authorization)
     if not token:
         raise HTTPException(
@@ -1729,8 +2089,9 @@ def ensure_stripe_period_for_user(db, uid: str, user_doc: dict) -> dict:
         user_ref = db.collection("users").document(uid)
         user_ref.set({"stripe": stripe_update}, merge=True)
 
-        refreshed = user_ref.get()
-        return refreshed.to_dict() or user_doc
+        refreshed = user_ref.get().to_dict() or user_doc
+        index_user(db, uid, refreshed)
+        return refreshed
 
     except Exception as e:
         print("STRIPE PERIOD SELF-HEAL ERROR:", repr(e))
@@ -1758,165 +2119,6 @@ def _pick(doc: dict, keys: List[str], default=None):
     return default
 
 
-def _get_perf(doc: dict) -> dict:
-    p = doc.get("performance") or {}
-    return p if isinstance(p, dict) else {}
-
-
-def _has_perf(doc: dict) -> bool:
-    p = _get_perf(doc)
-    # consider it “has perf” if any of the key metrics exist
-    for k in ("ctr", "cpc", "cpa", "cpm", "spend", "revenue", "roas"):
-        if p.get(k) is not None:
-            return True
-    return False
-
-
-def _creative_snapshot(kind: str, doc_id: str, doc: dict) -> dict:
-    p = _get_perf(doc)
-
-    # For display fields, try multiple likely locations safely
-    product_name = _pick(doc, ["productName", "product_name"], default=None)
-    title = (
-        f"{kind.capitalize()} Ad"
-        if not product_name
-        else f"{kind.capitalize()}: {product_name}"
-    )
-
-    # URLs
-    if kind == "video":
-        url = _pick(doc, ["finalVideoUrl", "videoUrl"], default=None)
-        thumb = _pick(doc, ["thumbnailUrl"], default=None)
-        ratio = _pick(doc, ["ratio", "aspectRatio"], default=None)
-    else:
-        url = _pick(doc, ["imageUrl"], default=None)
-        thumb = url
-        ratio = _pick(doc, ["aspectRatio", "ratio"], default=None)
-
-    created_at = doc.get("createdAt")
-    status = doc.get("status")
-
-    return {
-        "id": doc_id,
-        "kind": kind,
-        "title": title,
-        "createdAt": created_at,
-        "status": status,
-        "url": url,
-        "thumbnailUrl": thumb,
-        "ratio": ratio,
-        "performance": {
-            "ctr": _safe_num(p.get("ctr")),
-            "cpc": _safe_num(p.get("cpc")),
-            "cpa": _safe_num(p.get("cpa")),
-            "cpm": _safe_num(p.get("cpm")),
-            "spend": _safe_num(p.get("spend")),
-            "revenue": _safe_num(p.get("revenue")),
-            "roas": _safe_num(p.get("roas")),
-            "marked_successful": (
-                p.get("marked_successful")
-                if isinstance(p.get("marked_successful"), bool)
-                else None
-            ),
-        },
-        # helpful context for “best averages”
-        "meta": {
-            "platform": _pick(doc, ["platform", "platformStyle"], default=None),
-            "tone": _pick(doc, ["tone"], default=None),
-            "stylePreset": _pick(doc, ["stylePreset", "style"], default=None),
-            "model": _pick(doc, ["model"], default=None),
-        },
-    }
-
-
-def _avg(nums: List[float]) -> Optional[float]:
-    vals = [x for x in nums if isinstance(x, (int, float))]
-    return round(sum(vals) / len(vals), 4) if vals else None
-
-
-def _weighted_roas(items: List[dict]) -> Optional[float]:
-    # weighted by spend when available: sum(revenue)/sum(spend)
-    total_spend = 0.0
-    total_revenue = 0.0
-    for it in items:
-        p = it.get("performance") or {}
-        s = _safe_num(p.get("spend"))
-        r = _safe_num(p.get("revenue"))
-        if s is None or r is None or s <= 0:
-            continue
-        total_spend += s
-        total_revenue += r
-    if total_spend <= 0:
-        return None
-    return round(total_revenue / total_spend, 4)
-
-
-def _rank(items: List[dict], key: str, desc: bool = True) -> List[dict]:
-    def k(it):
-        v = _safe_num((it.get("performance") or {}).get(key))
-        return v if v is not None else (-1e18 if desc else 1e18)
-
-    return sorted(items, key=k, reverse=desc)
-
-
-def _rank_low(items: List[dict], key: str) -> List[dict]:
-    # lowest first
-    def k(it):
-        v = _safe_num((it.get("performance") or {}).get(key))
-        return v if v is not None else 1e18
-
-    return sorted(items, key=k)
-
-
-def _group_best(items: List[dict], group_key: str, min_spend: float) -> Dict[str, Any]:
-    groups = defaultdict(list)
-    for it in items:
-        meta = it.get("meta") or {}
-        g = meta.get(group_key)
-        if not g:
-            continue
-        p = it.get("performance") or {}
-        spend = _safe_num(p.get("spend")) or 0.0
-        if spend < min_spend:
-            continue
-        groups[g].append(it)
-
-    # compute summary per group
-    out = []
-    for g, arr in groups.items():
-        roas = _weighted_roas(arr)
-        ctrs = [_safe_num((x.get("performance") or {}).get("ctr")) for x in arr]
-        cpas = [_safe_num((x.get("performance") or {}).get("cpa")) for x in arr]
-        spends = [_safe_num((x.get("performance") or {}).get("spend")) for x in arr]
-        cpms = [_safe_num((x.get("performance") or {}).get("cpm")) for x in arr]
-
-        out.append(
-            {
-                "value": g,
-                "count": len(arr),
-                "avg_ctr": _avg([x for x in ctrs if x is not None]),
-                "avg_cpa": _avg([x for x in cpas if x is not None]),
-                "avg_cpm": _avg([x for x in cpms if x is not None]),
-                "total_spend": round(sum([x for x in spends if x is not None]), 4),
-                "weighted_roas": roas,
-            }
-        )
-
-    # sort by weighted_roas desc, fallback to avg_ctr
-    out.sort(
-        key=lambda r: (
-            r["weighted_roas"] if r["weighted_roas"] is not None else -1e18,
-            r["avg_ctr"] if r["avg_ctr"] is not None else -1e18,
-        ),
-        reverse=True,
-    )
-    return {
-        "best": out[0] if out else None,
-        "rows": out[:10],
-    }
-
-
-
 def _profile_values(
     profile: Optional[Dict[str, Any]],
     key: str,
@@ -2223,6 +2425,7 @@ def sync_my_subscription(authorization: str | None = Header(default=None)):
     user_ref.set(update_payload, merge=True)
 
     saved = user_ref.get().to_dict() or {}
+    index_user(db, uid, saved)
 
     return {
         "ok": True,
@@ -2265,6 +2468,8 @@ def me_entitlements(authorization: str | None = Header(default=None)):
     user_doc = user_ref.get().to_dict() or {}
     user_doc = ensure_stripe_period_for_user(db, uid, user_doc)
     tier, status = get_tier_and_status(user_doc)
+    # Profiles are written by the client, so this is where the server sees them.
+    index_user(db, uid, user_doc, only_if_changed=True)
 
     payload = build_entitlements_payload(tier)
     payload.update(
@@ -2360,12 +2565,12 @@ async def upload_creatives(
 ):
     uid, _email, claims = require_user(authorization)
     admin = is_admin(claims)
+    db = get_db()
+    begin_request_documents(db, prefetch=("user", "storage"))
 
     # Starter/Pro/Business Optimizer upload access (admin bypass)
     if not admin:
-        db = get_db()
-        user_snap = db.collection("users").document(uid).get()
-        user_doc = user_snap.to_dict() or {}
+        user_doc = load_user_doc(db, uid)
         tier, status = get_tier_and_status(user_doc)
 
         allowed_statuses = {"active", "trialing"}
@@ -2399,8 +2604,7 @@ async def upload_creatives(
                 status_code=413, detail="File too large. Max 8MB per image."
             )
 
-        db = get_db()
-        user_doc = db.collection("users").document(uid).get().to_dict() or {}
+        user_doc = load_user_doc(db, uid)
         tier, _status = get_tier_and_status(user_doc)
         if not admin:
             ensure_storage_available(db, uid, tier, len(data))
@@ -2497,7 +2701,7 @@ async def upload_creative_studio_image(
             "copy": {"headline": "", "primary_text": "", "cta": ""},
             "error": None,
         }
-        db.collection("image_jobs").document(job_id).set(item)
+        set_creative_job(db.collection("image_jobs").document(job_id), item)
 
         return {
             "ok": True,
@@ -2532,14 +2736,15 @@ async def upload_creative_studio_image(
 @app.get("/creative-studio/image/{job_id}")
 async def get_creative_studio_image(
     job_id: str,
+    request: Request,
     authorization: str | None = Header(default=None),
 ):
     """Stream a user's Library image through the API so canvas rendering is not blocked by CORS."""
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
-    snap = db.collection("image_jobs").document(job_id).get()
+    snap = await get_document(db.collection("image_jobs").document(job_id))
     if not snap.exists:
         raise HTTPException(status_code=404, detail="Image not found.")
 
@@ -2553,25 +2758,21 @@ async def get_creative_studio_image(
             status_code=404, detail="This Library item has no image URL."
         )
 
-    try:
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Could not retrieve image: {exc}")
-
-    content_type = (
-        response.headers.get("content-type") or item.get("contentType") or "image/png"
+    return await proxy_storage_object(
+        image_url,
+        request.headers,
+        fallback_content_type=item.get("contentType") or "image/png",
     )
-    return StreamingResponse(io.BytesIO(response.content), media_type=content_type)
 
 
 @app.get("/creative-studio/proxy-image")
 async def proxy_creative_studio_image(
+    request: Request,
     url: str = Query(...),
     authorization: str | None = Header(default=None),
 ):
     """Proxy trusted Firebase/Google Storage images used as Studio logo and image layers."""
-    require_user(authorization)
+    await run_blocking(require_user, authorization)
     parsed = urlparse(url)
     host = (parsed.hostname or "").lower()
     allowed_hosts = {
@@ -2583,18 +2784,11 @@ async def proxy_creative_studio_image(
             status_code=400, detail="Only trusted storage image URLs can be loaded."
         )
 
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Could not retrieve image: {exc}")
-
-    content_type = response.headers.get("content-type") or "image/png"
-    if not content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400, detail="The requested URL is not an image."
-        )
-    return StreamingResponse(io.BytesIO(response.content), media_type=content_type)
+    return await proxy_storage_object(
+        url,
+        request.headers,
+        require_image=True,
+    )
 
 
 @app.post("/creative-studio/rewrite")
@@ -2885,7 +3079,7 @@ async def save_creative_studio_image(
             "error": None,
         }
 
-        document_ref.set(item, merge=is_update)
+        set_creative_job(document_ref, item, merge=is_update)
         firestore_saved = True
 
         track_event(
@@ -3239,7 +3433,6 @@ async def upload_reference_images(
 @app.post("/image/start", response_model=ProgressStartResponse)
 async def start_image_generation(
     payload: AdRequest,
-    background_tasks: BackgroundTasks,
     authorization: str | None = Header(default=None),
 ):
     uid, _email, claims = require_user(authorization)
@@ -3249,31 +3442,47 @@ async def start_image_generation(
     # costly retries after server-side failures.
     if not is_admin(claims):
         _check_image_generation_failure_guard(db=db, uid=uid)
-        require_no_active_image_generation(db, uid)
 
     job_id = uuid.uuid4().hex
 
-    db.collection("image_generation_jobs").document(job_id).set(
-        {
-            "uid": uid,
-            "createdAt": int(time.time()),
-            "updatedAt": int(time.time()),
-            "status": "queued",
-            "jobType": "image",
-            "progressStage": "queued",
-            "progressMessage": IMAGE_PROGRESS["queued"][1],
-            "progressPercent": IMAGE_PROGRESS["queued"][0],
-            "result": None,
-            "error": None,
-        }
-    )
+    if not is_admin(claims):
+        await run_blocking(
+            acquire_active_generation_lock,
+            db,
+            uid,
+            "image",
+            job_id,
+            kind="image",
+            detail="You already have an image generation in progress.",
+        )
 
-    background_tasks.add_task(
-        _run_image_generation_job,
-        job_id,
-        payload,
-        authorization or "",
-    )
+    try:
+        db.collection("image_generation_jobs").document(job_id).set(
+            {
+                "uid": uid,
+                "createdAt": int(time.time()),
+                "updatedAt": int(time.time()),
+                "status": "queued",
+                "jobType": "image",
+                "progressStage": "queued",
+                "progressMessage": IMAGE_PROGRESS["queued"][1],
+                "progressPercent": IMAGE_PROGRESS["queued"][0],
+                "result": None,
+                "error": None,
+            }
+        )
+
+        await run_blocking(
+            enqueue_job,
+            "image",
+            job_id,
+            uid=uid,
+            payload=payload.model_dump(mode="json"),
+            identity=job_identity(uid, _email, claims),
+        )
+    except Exception:
+        await run_blocking(release_active_generation_lock, db, uid, job_id)
+        raise
 
     return ProgressStartResponse(
         jobId=job_id,
@@ -3286,16 +3495,20 @@ async def image_generation_status(
     job_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
-    return _read_progress_job(
-        get_db(), "image_generation_jobs", job_id, uid, is_admin(claims)
+    uid, _email, claims = await run_blocking(require_user, authorization)
+    return await run_blocking(
+        _read_progress_job,
+        get_db(),
+        "image_generation_jobs",
+        job_id,
+        uid,
+        is_admin(claims),
     )
 
 
 @app.post("/optimizer/start", response_model=ProgressStartResponse)
 async def start_optimizer_analysis(
     payload: OptimizeAdRequest,
-    background_tasks: BackgroundTasks,
     authorization: str | None = Header(default=None),
 ):
     uid, _email, claims = require_user(authorization)
@@ -3315,7 +3528,14 @@ async def start_optimizer_analysis(
             "error": None,
         }
     )
-    background_tasks.add_task(_run_optimizer_job, job_id, payload, authorization or "")
+    await run_blocking(
+        enqueue_job,
+        "optimizer",
+        job_id,
+        uid=uid,
+        payload=payload.model_dump(mode="json"),
+        identity=job_identity(uid, _email, claims),
+    )
     return ProgressStartResponse(jobId=job_id, status="queued")
 
 
@@ -3324,15 +3544,21 @@ async def optimizer_status(
     job_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
-    return _read_progress_job(get_db(), "optimizer_jobs", job_id, uid, is_admin(claims))
+    uid, _email, claims = await run_blocking(require_user, authorization)
+    return await run_blocking(
+        _read_progress_job,
+        get_db(),
+        "optimizer_jobs",
+        job_id,
+        uid,
+        is_admin(claims),
+    )
 
 
 
 @app.post("/optimizer/generate/start", response_model=ProgressStartResponse)
 async def start_optimizer_generation(
     payload: GenerateFromOptimizerRequest,
-    background_tasks: BackgroundTasks,
     authorization: str | None = Header(default=None),
 ):
     uid, _email, claims = require_user(authorization)
@@ -3342,31 +3568,47 @@ async def start_optimizer_generation(
     # after server-side failures.
     if not is_admin(claims):
         _check_image_generation_failure_guard(db=db, uid=uid)
-        require_no_active_image_generation(db, uid)
 
     job_id = uuid.uuid4().hex
 
-    db.collection("optimizer_jobs").document(job_id).set(
-        {
-            "uid": uid,
-            "createdAt": int(time.time()),
-            "updatedAt": int(time.time()),
-            "status": "queued",
-            "jobType": "optimizer_generation",
-            "progressStage": "queued",
-            "progressMessage": OPTIMIZER_GENERATION_PROGRESS["queued"][1],
-            "progressPercent": OPTIMIZER_GENERATION_PROGRESS["queued"][0],
-            "result": None,
-            "error": None,
-        }
-    )
-
-    background_tasks.add_task(
-        _run_optimizer_generation_job,
-        job_id,
-        payload,
-        authorization or "",
-    )
+    if not is_admin(claims):
+        await run_blocking(
+            acquire_active_generation_lock,
+            db,
+            uid,
+            "image",
+            job_id,
+            kind="optimizer_generation",
+            detail="You already have an image generation in progress.",
+        )
+
+    try:
+        db.collection("optimizer_jobs").document(job_id).set(
+            {
+                "uid": uid,
+                "createdAt": int(time.time()),
+                "updatedAt": int(time.time()),
+                "status": "queued",
+                "jobType": "optimizer_generation",
+                "progressStage": "queued",
+                "progressMessage": OPTIMIZER_GENERATION_PROGRESS["queued"][1],
+                "progressPercent": OPTIMIZER_GENERATION_PROGRESS["queued"][0],
+                "result": None,
+                "error": None,
+            }
+        )
+
+        await run_blocking(
+            enqueue_job,
+            "optimizer_generation",
+            job_id,
+            uid=uid,
+            payload=payload.model_dump(mode="json"),
+            identity=job_identity(uid, _email, claims),
+        )
+    except Exception:
+        await run_blocking(release_active_generation_lock, db, uid, job_id)
+        raise
 
     return ProgressStartResponse(
         jobId=job_id,
@@ -3380,8 +3622,79 @@ async def optimizer_generation_status(
     job_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
-    return _read_progress_job(get_db(), "optimizer_jobs", job_id, uid, is_admin(claims))
+    uid, _email, claims = await run_blocking(require_user, authorization)
+    return await run_blocking(
+        _read_progress_job,
+        get_db(),
+        "optimizer_jobs",
+        job_id,
+        uid,
+        is_admin(claims),
+    )
+
+
+# ---------------- Progress streams (SSE) ----------------
+async def _progress_stream(
+    collection: str,
+    job_id: str,
+    request: Request,
+    authorization: Optional[str],
+    access_token: Optional[str],
+):
+    uid, _email, claims = await run_blocking(
+        require_user,
+        bearer_from_query(authorization, access_token),
+    )
+    admin = is_admin(claims)
+
+    def _authorize(data: Dict[str, Any]) -> None:
+        if not admin and data.get("uid") != uid:
+            raise HTTPException(status_code=403, detail="Forbidden.")
+
+    return await open_progress_stream(
+        get_db(),
+        collection,
+        job_id,
+        request,
+        authorize=_authorize,
+        view=lambda jid, data: {"jobId": jid, **data},
+    )
+
+
+@app.get("/image/stream/{job_id}")
+async def image_generation_stream(
+    job_id: str,
+    request: Request,
+    authorization: str | None = Header(default=None),
+    access_token: Optional[str] = Query(default=None),
+):
+    return await _progress_stream(
+        "image_generation_jobs", job_id, request, authorization, access_token
+    )
+
+
+@app.get("/optimizer/stream/{job_id}")
+async def optimizer_stream(
+    job_id: str,
+    request: Request,
+    authorization: str | None = Header(default=None),
+    access_token: Optional[str] = Query(default=None),
+):
+    return await _progress_stream(
+        "optimizer_jobs", job_id, request, authorization, access_token
+    )
+
+
+@app.get("/optimizer/generate/stream/{job_id}")
+async def optimizer_generation_stream(
+    job_id: str,
+    request: Request,
+    authorization: str | None = Header(default=None),
+    access_token: Optional[str] = Query(default=None),
+):
+    return await _progress_stream(
+        "optimizer_jobs", job_id, request, authorization, access_token
+    )
 
 
 
@@ -3401,8 +3714,8 @@ async def generate_ad(
         _check_image_generation_failure_guard(db=db, uid=uid)
 
     set_generation_progress(db, "image", progress_job_id, "validated")
-    user_snap = db.collection("users").document(uid).get()
-    user_doc = user_snap.to_dict() or {}
+    begin_request_documents(db, prefetch=("user", "storage"))
+    user_doc = load_user_doc(db, uid)
 
     tier, status = get_tier_and_status(user_doc)
 
@@ -3915,6 +4228,11 @@ It should be visually impressive enough to appear in a professional design portf
             ) from exc
 
     async def _gen_image_and_upload():
+        # A re-run of this queued job reuses the image an earlier attempt
+        # already generated and stored.
+        stored = job_checkpoint("image")
+        if stored:
+            return stored
         try:
             img_bytes = await asyncio.to_thread(
                 lambda: generate_gpt_image_bytes(
@@ -3931,6 +4249,7 @@ It should be visually impressive enough to appear in a professional design portf
             register_storage_asset(
                 db, uid, size_bytes=stored["fileSizeBytes"], asset_type="image"
             )
+            save_job_checkpoint("image", stored)
             return stored
         except Exception as exc:
             print(
@@ -3955,7 +4274,7 @@ It should be visually impressive enough to appear in a professional design portf
                 detail="Subscription inactive. Please subscribe to continue.",
             )
 
-        cap_result = check_and_increment_usage(db, uid, tier)
+        cap_result = reserve_job_usage(lambda: check_and_increment_usage(db, uid, tier))
 
         if not cap_result["allowed"]:
             track_event(
@@ -4018,7 +4337,8 @@ It should be visually impressive enough to appear in a professional design portf
         set_generation_progress(db, "image", progress_job_id, "saving_library")
         image_job_id = uuid.uuid4().hex
         try:
-            db.collection("image_jobs").document(image_job_id).set(
+            set_creative_job(
+                db.collection("image_jobs").document(image_job_id),
                 {
                     "uid": uid,
                     "createdAt": int(time.time()),
@@ -4191,8 +4511,8 @@ async def optimize_ad(
     db = get_db()
     set_generation_progress(db, "optimizer", progress_job_id, "validated")
 
-    user_snap = db.collection("users").document(uid).get()
-    user_doc = user_snap.to_dict() or {}
+    begin_request_documents(db, prefetch=("user",))
+    user_doc = load_user_doc(db, uid)
     tier, status = get_tier_and_status(user_doc)
 
     if not admin:
@@ -4227,12 +4547,14 @@ async def optimize_ad(
 
     optimizer_usage_reservation = None
     if not admin:
-        optimizer_usage_reservation = check_and_increment_resource(
-            db,
-            uid,
-            tier,
-            "optimizer_runs",
-            1,
+        optimizer_usage_reservation = reserve_job_usage(
+            lambda: check_and_increment_resource(
+                db,
+                uid,
+                tier,
+                "optimizer_runs",
+                1,
+            )
         )
 
         if not optimizer_usage_reservation.get("allowed"):
@@ -4650,8 +4972,8 @@ async def generate_from_optimizer(
     set_generation_progress(
         db, "optimizer_generation", progress_job_id, "validated"
     )
-    user_snap = db.collection("users").document(uid).get()
-    user_doc = user_snap.to_dict() or {}
+    begin_request_documents(db, prefetch=("user", "storage"))
+    user_doc = load_user_doc(db, uid)
     set_generation_progress(
         db, "optimizer_generation", progress_job_id, "loading_brand_kit"
     )
@@ -4905,7 +5227,7 @@ Improve it.
 
         require_pro_or_business(tier)
 
-        cap_result = check_and_increment_usage(db, uid, tier)
+        cap_result = reserve_job_usage(lambda: check_and_increment_usage(db, uid, tier))
 
         if not cap_result["allowed"]:
             create_usage_notifications(
@@ -4955,24 +5277,27 @@ Improve it.
         set_generation_progress(
             db, "optimizer_generation", progress_job_id, "generating_creative"
         )
-        img_bytes = await asyncio.to_thread(
-            lambda: generate_gpt_image_bytes(
-                prompt=visual_prompt,
-                size=payload.imageSize or "1024x1024",
-                input_image_url=brand_kit.get("logoUrl"),
-                input_image_urls=reference_image_urls,
+        image_asset = job_checkpoint("image")
+        if not image_asset:
+            img_bytes = await asyncio.to_thread(
+                lambda: generate_gpt_image_bytes(
+                    prompt=visual_prompt,
+                    size=payload.imageSize or "1024x1024",
+                    input_image_url=brand_kit.get("logoUrl"),
+                    input_image_urls=reference_image_urls,
+                )
             )
-        )
 
-        if not admin:
-            ensure_storage_available(db, uid, tier, len(img_bytes))
-        set_generation_progress(
-            db, "optimizer_generation", progress_job_id, "uploading_creative"
-        )
-        image_asset = upload_png_to_firebase_storage(img_bytes, uid)
-        register_storage_asset(
-            db, uid, size_bytes=image_asset["fileSizeBytes"], asset_type="image"
-        )
+            if not admin:
+                ensure_storage_available(db, uid, tier, len(img_bytes))
+            set_generation_progress(
+                db, "optimizer_generation", progress_job_id, "uploading_creative"
+            )
+            image_asset = upload_png_to_firebase_storage(img_bytes, uid)
+            register_storage_asset(
+                db, uid, size_bytes=image_asset["fileSizeBytes"], asset_type="image"
+            )
+            save_job_checkpoint("image", image_asset)
         image_url = image_asset["url"]
 
         set_generation_progress(
@@ -4980,7 +5305,8 @@ Improve it.
         )
         image_job_id = uuid.uuid4().hex
         try:
-            db.collection("image_jobs").document(image_job_id).set(
+            set_creative_job(
+                db.collection("image_jobs").document(image_job_id),
                 {
                     "uid": uid,
                     "createdAt": int(time.time()),
@@ -5384,32 +5710,21 @@ def _reset_resource_usage(
 
 
 # ---------------- Admin Creative Manager ----------------
-def _admin_creative_user(db, uid: str, cache: dict[str, dict[str, Any]]) -> dict[str, Any]:
-    if not uid:
-        return {
-            "uid": "",
-            "email": "",
-            "displayName": "Unknown user",
-            "tier": "unknown",
-            "status": "inactive",
-        }
-
-    if uid in cache:
-        return cache[uid]
-
-    profile = {}
-    try:
-        snap = db.collection("users").document(uid).get()
-        profile = snap.to_dict() or {} if snap.exists else {}
-    except Exception:
-        profile = {}
+# Owner identities shown on the creative feed, shared across admin requests so
+# paging through the feed reuses enrichment instead of re-reading every owner.
+ADMIN_CREATIVE_IDENTITY_TTL_SECONDS = float(
+    os.getenv("ADMIN_CREATIVE_IDENTITY_TTL_SECONDS", "120")
+)
+_ADMIN_AUTH_BATCH = 100
+_admin_creative_identity_lock = threading.Lock()
+_admin_creative_identities: dict[str, tuple[float, dict[str, Any]]] = {}
 
-    auth_user = None
-    try:
-        auth_user = admin_auth.get_user(uid)
-    except Exception:
-        auth_user = None
 
+def _admin_creative_identity(
+    uid: str,
+    profile: dict[str, Any],
+    auth_user: Any,
+) -> dict[str, Any]:
     stripe_obj = profile.get("stripe") or {}
     display_name = (
         (profile.get("fullName") or "").strip()
@@ -5436,15 +5751,84 @@ def _admin_creative_user(db, uid: str, cache: dict[str, dict[str, Any]]) -> dict
         or "inactive"
     )
 
-    result = {
+    return {
         "uid": uid,
         "email": email,
         "displayName": display_name,
         "tier": str(tier),
         "status": str(subscription_status).lower(),
     }
-    cache[uid] = result
-    return result
+
+
+def _admin_creative_users(db, uids: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    Resolve creative owners for a feed page.
+
+    Cached identities are reused; the rest are loaded with one batched
+    Firestore get_all and one admin_auth.get_users call per 100 uids.
+    """
+    now = time.monotonic()
+    wanted = list(dict.fromkeys(uid for uid in uids if uid))
+    resolved: dict[str, dict[str, Any]] = {}
+
+    with _admin_creative_identity_lock:
+        for uid in wanted:
+            entry = _admin_creative_identities.get(uid)
+            if entry is not None and entry[0] > now:
+                resolved[uid] = entry[1]
+
+    missing = [uid for uid in wanted if uid not in resolved]
+    if not missing:
+        return resolved
+
+    profiles: dict[str, dict[str, Any]] = {}
+    try:
+        profiles = load_documents_many(db, "user", missing)
+    except Exception as exc:
+        print("ADMIN CREATIVE PROFILE READ ERROR:", repr(exc), flush=True)
+
+    auth_users: dict[str, Any] = {}
+    for start in range(0, len(missing), _ADMIN_AUTH_BATCH):
+        chunk = missing[start:start + _ADMIN_AUTH_BATCH]
+        try:
+            result = admin_auth.get_users([admin_auth.UidIdentifier(uid) for uid in chunk])
+            for auth_user in result.users:
+                auth_users[auth_user.uid] = auth_user
+        except Exception as exc:
+            print("ADMIN CREATIVE AUTH LOOKUP ERROR:", repr(exc), flush=True)
+
+    expires_at = now + ADMIN_CREATIVE_IDENTITY_TTL_SECONDS
+    with _admin_creative_identity_lock:
+        for uid in missing:
+            identity = _admin_creative_identity(
+                uid,
+                profiles.get(uid) or {},
+                auth_users.get(uid),
+            )
+            resolved[uid] = identity
+            _admin_creative_identities[uid] = (expires_at, identity)
+
+        if len(_admin_creative_identities) > 4096:
+            for uid in [
+                key
+                for key, (entry_expires, _identity) in _admin_creative_identities.items()
+                if entry_expires <= now
+            ]:
+                _admin_creative_identities.pop(uid, None)
+
+    return resolved
+
+
+def _admin_creative_user(uid: str, identities: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    if not uid or uid not in identities:
+        return {
+            "uid": uid,
+            "email": "",
+            "displayName": "Unknown user",
+            "tier": "unknown",
+            "status": "inactive",
+        }
+    return identities[uid]
 
 
 def _admin_creative_item(kind: str, doc_id: str, data: dict, user: dict) -> dict:
@@ -5489,39 +5873,67 @@ def _admin_creative_item(kind: str, doc_id: str, data: dict, user: dict) -> dict
     }
 
 
-@app.get("/admin/creative")
-def admin_list_creative(
-    authorization: str | None = Header(default=None),
-    kind: str = Query(default="all"),
-    status: str = Query(default="all"),
-    q: str = Query(default=""),
-    days: int = Query(default=0, ge=0, le=3650),
-    limit: int = Query(default=48, ge=1, le=100),
-    cursor: int | None = Query(default=None),
-) -> dict[str, Any]:
-    """Return a read-only, admin-only view of generated image and video assets."""
-    _require_admin_request(authorization)
-    db = get_db()
+def _admin_creative_search_page(
+    db,
+    kinds: list[str],
+    search_norm: str,
+    *,
+    status: str | None,
+    created_after: int,
+    limit: int,
+    cursor: str | None,
+) -> tuple[list[dict], str]:
+    """Search through the admin_search index, then load the matching jobs."""
+    entries, next_cursor = search_admin_index(
+        db,
+        kinds,
+        search_norm,
+        status=status,
+        created_after=created_after,
+        limit=limit,
+        cursor=cursor,
+    )
 
-    kind_norm = (kind or "all").strip().lower()
-    status_norm = (status or "all").strip().lower()
-    search_norm = (q or "").strip().lower()
+    refs = [
+        db.collection(f"{entry.get('kind')}_jobs").document(str(entry.get("refId") or ""))
+        for entry in entries
+    ]
+    snaps = {snap.reference.path: snap for snap in db.get_all(refs)} if refs else {}
 
-    if kind_norm not in {"all", "image", "video"}:
-        raise HTTPException(status_code=400, detail="Invalid creative type.")
+    rows: list[tuple[str, str, dict]] = []
+    for entry, ref in zip(entries, refs):
+        snap = snaps.get(ref.path)
+        if snap is None or not snap.exists:
+            continue
+        rows.append((str(entry.get("kind")), snap.id, snap.to_dict() or {}))
 
-    collections = []
-    if kind_norm in {"all", "image"}:
-        collections.append(("image", "image_jobs"))
-    if kind_norm in {"all", "video"}:
-        collections.append(("video", "video_jobs"))
+    identities = _admin_creative_users(
+        db,
+        [str(data.get("uid") or "") for _kind, _doc_id, data in rows],
+    )
+    items = [
+        _admin_creative_item(
+            creative_kind,
+            doc_id,
+            data,
+            _admin_creative_user(str(data.get("uid") or ""), identities),
+        )
+        for creative_kind, doc_id, data in rows
+    ]
+    return items, next_cursor
 
-    start_timestamp = 0
-    if days > 0:
-        start_timestamp = int(time.time()) - (days * 86400)
 
-    # Fetch enough records to support cross-collection merge and light admin search.
-    per_collection_limit = min(300, max(limit * 3, 100 if search_norm else limit * 2))
+def _admin_creative_recent_page(
+    db,
+    collections: list[tuple[str, str]],
+    status_norm: str,
+    *,
+    created_after: int,
+    limit: int,
+    cursor: int | None,
+) -> tuple[list[dict], int | None]:
+    # Fetch enough records to support the cross-collection merge.
+    per_collection_limit = min(300, limit * 3)
     raw_items: list[tuple[str, str, dict]] = []
 
     for creative_kind, collection_name in collections:
@@ -5531,8 +5943,8 @@ def admin_list_creative(
 
         if cursor is not None:
             query_ref = query_ref.where("createdAt", "<", int(cursor))
-        if start_timestamp:
-            query_ref = query_ref.where("createdAt", ">=", start_timestamp)
+        if created_after:
+            query_ref = query_ref.where("createdAt", ">=", created_after)
 
         query_ref = query_ref.limit(per_collection_limit)
 
@@ -5559,40 +5971,20 @@ def admin_list_creative(
         reverse=True,
     )
 
-    user_cache: dict[str, dict[str, Any]] = {}
-    items = []
-
-    for creative_kind, doc_id, data in raw_items:
-        uid = str(data.get("uid") or "")
-        user = _admin_creative_user(db, uid, user_cache)
-        item = _admin_creative_item(creative_kind, doc_id, data, user)
-
-        if search_norm:
-            copy_obj = item.get("copy") or {}
-            haystack = " ".join(
-                str(value or "")
-                for value in [
-                    item.get("id"),
-                    item.get("uid"),
-                    item.get("kind"),
-                    item.get("status"),
-                    item.get("productName"),
-                    item.get("prompt"),
-                    item.get("model"),
-                    item.get("source"),
-                    user.get("email"),
-                    user.get("displayName"),
-                    copy_obj.get("headline"),
-                    copy_obj.get("primary_text"),
-                    copy_obj.get("cta"),
-                ]
-            ).lower()
-            if search_norm not in haystack:
-                continue
-
-        items.append(item)
-        if len(items) >= limit:
-            break
+    raw_items = raw_items[:limit]
+    identities = _admin_creative_users(
+        db,
+        [str(row[2].get("uid") or "") for row in raw_items],
+    )
+    items = [
+        _admin_creative_item(
+            creative_kind,
+            doc_id,
+            data,
+            _admin_creative_user(str(data.get("uid") or ""), identities),
+        )
+        for creative_kind, doc_id, data in raw_items
+    ]
 
     next_cursor = None
     if len(items) == limit:
@@ -5600,6 +5992,60 @@ def admin_list_creative(
         if last_created_at > 0:
             next_cursor = last_created_at
 
+    return items, next_cursor
+
+
+@app.get("/admin/creative")
+def admin_list_creative(
+    authorization: str | None = Header(default=None),
+    kind: str = Query(default="all"),
+    status: str = Query(default="all"),
+    q: str = Query(default=""),
+    days: int = Query(default=0, ge=0, le=3650),
+    limit: int = Query(default=48, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+) -> dict[str, Any]:
+    """Return a read-only, admin-only view of generated image and video assets."""
+    _require_admin_request(authorization)
+    db = get_db()
+
+    kind_norm = (kind or "all").strip().lower()
+    status_norm = (status or "all").strip().lower()
+    search_norm = (q or "").strip().lower()
+
+    if kind_norm not in {"all", "image", "video"}:
+        raise HTTPException(status_code=400, detail="Invalid creative type.")
+
+    collections = []
+    if kind_norm in {"all", "image"}:
+        collections.append(("image", "image_jobs"))
+    if kind_norm in {"all", "video"}:
+        collections.append(("video", "video_jobs"))
+
+    start_timestamp = 0
+    if days > 0:
+        start_timestamp = int(time.time()) - (days * 86400)
+
+    if search_norm:
+        items, next_cursor = _admin_creative_search_page(
+            db,
+            [creative_kind for creative_kind, _collection in collections],
+            search_norm,
+            status=None if status_norm == "all" else status_norm,
+            created_after=start_timestamp,
+            limit=limit,
+            cursor=cursor,
+        )
+    else:
+        items, next_cursor = _admin_creative_recent_page(
+            db,
+            collections,
+            status_norm,
+            created_after=start_timestamp,
+            limit=limit,
+            cursor=_safe_int(str(cursor or "").split(":")[0], 0) or None,
+        )
+
     return {
         "items": items,
         "nextCursor": next_cursor,
@@ -5613,6 +6059,18 @@ def admin_list_creative(
     }
 
 
+def _admin_auth_users_by_uid(uids: list[str]) -> list[Any]:
+    """Firebase Auth records for uids, in order, one get_users call per 100."""
+    found: dict[str, Any] = {}
+    wanted = [uid for uid in dict.fromkeys(uids) if uid]
+    for start in range(0, len(wanted), _ADMIN_AUTH_BATCH):
+        chunk = wanted[start:start + _ADMIN_AUTH_BATCH]
+        result = admin_auth.get_users([admin_auth.UidIdentifier(uid) for uid in chunk])
+        for auth_user in result.users:
+            found[auth_user.uid] = auth_user
+    return [found[uid] for uid in wanted if uid in found]
+
+
 @app.get("/admin/users")
 def admin_list_users(
     authorization: str | None = Header(default=None),
@@ -5631,14 +6089,65 @@ def admin_list_users(
         tier_norm = (tier or "all").strip().lower()
         status_norm = (status or "all").strip().lower()
 
-        page = admin_auth.list_users(
-            page_token=page_token or None,
-            max_results=limit,
-        )
+        # Filtered searches page through the admin_search index so every page
+        # is full; the unfiltered listing pages through Firebase Auth directly.
+        indexed_search = bool(q_norm) or tier_norm != "all" or status_norm != "all"
+
+        if indexed_search:
+            entries, next_cursor = search_admin_index(
+                db,
+                ["user"],
+                q_norm,
+                tier=None if tier_norm == "all" else tier_norm,
+                status=None if status_norm == "all" else status_norm,
+                limit=limit,
+                cursor=page_token or None,
+            )
+            page_users = _admin_auth_users_by_uid(
+                [str(entry.get("uid") or "") for entry in entries]
+            )
+        else:
+            page = admin_auth.list_users(
+                page_token=page_token or None,
+                max_results=limit,
+            )
+            page_users = list(page.users)
+            next_cursor = page.next_page_token or ""
 
         results = []
 
-        for auth_user in page.users:
+        # Read every profile, usage and storage document for the page in a
+        # handful of batched get_all calls instead of several reads per user.
+        page_uids = [auth_user.uid for auth_user in page_users]
+        profiles: dict[str, dict[str, Any]] = {}
+        usage_by_uid: dict[str, dict[str, dict[str, Any]]] = {}
+        storage_by_uid: dict[str, dict[str, Any]] = {}
+
+        try:
+            profiles = load_documents_many(db, "user", page_uids)
+        except Exception as exc:
+            print("ADMIN USERS PROFILE READ ERROR:", repr(exc))
+
+        usage_by_uid = peek_resources_many(
+            db,
+            page_uids,
+            ("images", "video_credits", "optimizer_runs"),
+            user_docs=profiles,
+        )
+
+        try:
+            storage_by_uid = get_storage_summaries_many(
+                db,
+                page_uids,
+                {
+                    uid: get_tier_and_status(profiles.get(uid) or {})[0]
+                    for uid in page_uids
+                },
+            )
+        except Exception as exc:
+            print("ADMIN USERS STORAGE READ ERROR:", repr(exc))
+
+        for auth_user in page_users:
             auth_uid = auth_user.uid
             auth_email = auth_user.email or ""
             display_name = (auth_user.display_name or "").strip()
@@ -5659,14 +6168,7 @@ def admin_list_users(
                 )
             )
 
-            profile = {}
-
-            try:
-                snapshot = db.collection("users").document(auth_uid).get()
-                if snapshot.exists:
-                    profile = snapshot.to_dict() or {}
-            except Exception:
-                profile = {}
+            profile = profiles.get(auth_uid) or {}
 
             first_name = (profile.get("firstName") or "").strip()
             last_name = (profile.get("lastName") or "").strip()
@@ -5682,7 +6184,7 @@ def admin_list_users(
 
             full_name = f"{first_name} {last_name}".strip()
 
-            tier_for_caps, helper_status = get_tier_and_status(profile)
+            _caps_tier, helper_status = get_tier_and_status(profile)
             stripe_object = profile.get("stripe") or {}
 
             requested_tier = (stripe_object.get("requestedTier") or "").strip()
@@ -5719,12 +6221,9 @@ def admin_list_users(
                 stripe_object.get("requestedTierAt")
             )
 
-            image_usage = peek_usage(
-                db,
-                auth_uid,
-                tier_for_caps,
-                profile,
-            )
+            user_usage = usage_by_uid.get(auth_uid) or {}
+
+            image_usage = user_usage.get("images") or {}
             image_used = _safe_int(image_usage.get("used"))
             image_cap = _safe_int(image_usage.get("cap"))
             image_remaining = _safe_int(
@@ -5736,13 +6235,7 @@ def admin_list_users(
                 image_cap,
             )
 
-            video_usage = peek_resource(
-                db,
-                auth_uid,
-                tier_for_caps,
-                "video_credits",
-                profile,
-            )
+            video_usage = user_usage.get("video_credits") or {}
             video_used = _safe_int(video_usage.get("used"))
             video_cap = _safe_int(video_usage.get("cap"))
             video_remaining = _safe_int(
@@ -5754,13 +6247,7 @@ def admin_list_users(
                 video_cap,
             )
 
-            optimizer_usage = peek_resource(
-                db,
-                auth_uid,
-                tier_for_caps,
-                "optimizer_runs",
-                profile,
-            )
+            optimizer_usage = user_usage.get("optimizer_runs") or {}
             optimizer_used = _safe_int(optimizer_usage.get("used"))
             optimizer_cap = _safe_int(optimizer_usage.get("cap"))
             optimizer_remaining = _safe_int(
@@ -5772,19 +6259,7 @@ def admin_list_users(
                 optimizer_cap,
             )
 
-            storage_summary = {}
-
-            try:
-                storage_summary = (
-                    get_storage_summary(
-                        db,
-                        auth_uid,
-                        tier_for_caps,
-                    )
-                    or {}
-                )
-            except Exception:
-                storage_summary = {}
+            storage_summary = storage_by_uid.get(auth_uid) or {}
 
             storage_used_bytes = _safe_int(
                 storage_summary.get("usedBytes") or storage_summary.get("used_bytes")
@@ -5806,28 +6281,13 @@ def admin_list_users(
                     storage_limit_bytes,
                 )
 
+            # The index can briefly trail a Stripe change; trust the profile.
             if tier_norm != "all" and user_tier.lower() != tier_norm:
                 continue
 
             if status_norm != "all" and stripe_status.lower() != status_norm:
                 continue
 
-            if q_norm:
-                search_text = " ".join(
-                    [
-                        first_name,
-                        last_name,
-                        full_name,
-                        display_name,
-                        auth_email,
-                        auth_uid,
-                        customer_id,
-                    ]
-                ).lower()
-
-                if q_norm not in search_text:
-                    continue
-
             results.append(
                 {
                     "uid": auth_uid,
@@ -5876,7 +6336,7 @@ def admin_list_users(
 
         return {
             "users": results,
-            "nextCursor": page.next_page_token or "",
+            "nextCursor": next_cursor,
             "returned": len(results),
         }
 
@@ -6039,6 +6499,26 @@ def admin_reset_optimizer_usage(
     }
 
 
+# ---------- Active generation locks ----------
+@app.get("/admin/users/{target_uid}/generation-locks")
+def admin_get_generation_locks(
+    target_uid: str,
+    authorization: str | None = Header(default=None),
+):
+    _require_admin_request(authorization)
+    return get_active_generation_lock(get_db(), target_uid)
+
+
+@app.delete("/admin/users/{target_uid}/generation-locks")
+def admin_clear_generation_locks(
+    target_uid: str,
+    authorization: str | None = Header(default=None),
+    job_id: Optional[str] = Query(default=None, alias="jobId"),
+):
+    _require_admin_request(authorization)
+    return clear_active_generation_lock(get_db(), target_uid, job_id)
+
+
 @app.post("/admin/users/{target_uid}/usage/reset-all")
 def admin_reset_all_usage(
     target_uid: str,
@@ -6178,6 +6658,7 @@ def admin_request_tier_change(
         },
         merge=True,
     )
+    invalidate_user_identity(target_uid)
 
     return {
         "ok": True,
@@ -6208,6 +6689,7 @@ def admin_clear_requested_tier(
         },
         merge=True,
     )
+    invalidate_user_identity(target_uid)
 
     return {
         "ok": True,
@@ -6280,6 +6762,8 @@ def admin_sync_user_subscription(
                 },
                 merge=True,
             )
+            invalidate_user_identity(target_uid)
+            index_user(db, target_uid)
 
             return {
                 "ok": True,
@@ -6362,6 +6846,8 @@ def admin_sync_user_subscription(
             {"stripe": stripe_update},
             merge=True,
         )
+        invalidate_user_identity(target_uid)
+        index_user(db, target_uid)
 
         return {
             "ok": True,
@@ -6416,13 +6902,14 @@ def get_video_usage(authorization: str | None = Header(default=None)):
 @app.get("/download-image/{job_id}")
 async def download_image(
     job_id: str,
+    request: Request,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
-    snap = db.collection("image_jobs").document(job_id).get()
+    snap = await get_document(db.collection("image_jobs").document(job_id))
     if not snap.exists:
         raise HTTPException(status_code=404, detail="Image job not found.")
 
@@ -6435,20 +6922,15 @@ async def download_image(
     if not image_url:
         raise HTTPException(status_code=404, detail="No image URL found for this job.")
 
-    try:
-        r = requests.get(image_url, timeout=30)
-        r.raise_for_status()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Could not fetch image: {e}")
-
     product_name = (data.get("productName") or "adgen-image").strip()
     safe_name = re.sub(r"[^a-zA-Z0-9_-]+", "-", product_name).strip("-").lower()
     filename = f"{safe_name or 'adgen-image'}-{job_id[:8]}.png"
 
-    return StreamingResponse(
-        io.BytesIO(r.content),
+    return await proxy_storage_object(
+        image_url,
+        request.headers,
         media_type="image/png",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        extra_headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
@@ -6458,7 +6940,7 @@ async def list_image_jobs(
     limit: int = Query(24, ge=1, le=100),
     cursor: int | None = Query(None, description="createdAt cursor (unix seconds)"),
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
@@ -6474,7 +6956,7 @@ async def list_image_jobs(
 
     items = []
     last_created_at = None
-    for snap in q.stream():
+    for snap in await stream_query(q):
         data = snap.to_dict() or {}
         if not admin and data.get("uid") != uid:
             continue
@@ -6490,12 +6972,12 @@ async def get_image_job(
     job_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
     ref = db.collection("image_jobs").document(job_id)
-    snap = ref.get()
+    snap = await get_document(ref)
     if not snap.exists:
         raise HTTPException(status_code=404, detail="Job not found.")
 
@@ -6530,6 +7012,9 @@ def delete_image_job(job_id: str, authorization: str | None = Header(default=Non
             asset_type="image",
         )
     ref.delete()
+    remove_from_search_index(db, "image", job_id)
+    apply_creative_performance_change(db, data.get("uid") or uid, "image", job_id, data, None)
+    bump_library_performance_version(data.get("uid") or uid)
     return {"ok": True, "jobId": job_id}
 
 
@@ -6652,6 +7137,17 @@ async def update_creative_performance(
 
     ref.set({"performance": perf}, merge=True)
 
+    previous_perf = doc.get("performance") if isinstance(doc.get("performance"), dict) else {}
+    apply_creative_performance_change(
+        db,
+        doc.get("uid") or uid,
+        kind,
+        job_id,
+        doc,
+        {**doc, "performance": {**previous_perf, **perf}},
+    )
+    bump_library_performance_version(doc.get("uid") or uid)
+
     # Refresh Performance Intelligence after the user's manual metrics save.
     # The existing save response stays fast because analysis runs as a
     # FastAPI background task.
@@ -6695,13 +7191,13 @@ async def _creative_insights_impl(
     limit: int,
     min_spend: float,
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
     # Gate: Pro/Business only (admins bypass)
     if not admin:
-        user_snap = db.collection("users").document(uid).get()
+        user_snap = await get_document(db.collection("users").document(uid))
         user_doc = user_snap.to_dict() or {}
         tier, status = get_tier_and_status(user_doc)
 
@@ -6713,7 +7209,14 @@ async def _creative_insights_impl(
             )
         require_pro_or_business(tier)
 
-    def fetch_jobs(col_name: str) -> List[dict]:
+    # The unfiltered view is one read of the materialized insights document
+    # and covers every creative with performance; `limit` (the most recent
+    # jobs to scan) only applies to the min_spend filter below.
+    if min_spend <= 0:
+        document = await run_blocking(load_creative_insights, db, uid)
+        return render_insights(document)
+
+    async def fetch_jobs(col_name: str) -> List[dict]:
         q = (
             db.collection(col_name)
             .where("uid", "==", uid)
@@ -6721,137 +7224,22 @@ async def _creative_insights_impl(
             .limit(limit)
         )
         docs = []
-        for snap in q.stream():
+        for snap in await stream_query(q):
             docs.append({"id": snap.id, **(snap.to_dict() or {})})
         return docs
 
-    image_docs = fetch_jobs("image_jobs")
-    video_docs = fetch_jobs("video_jobs")
-
-    items = []
-    for d in image_docs:
-        if not _has_perf(d):
-            continue
-        snap = _creative_snapshot("image", d["id"], d)
-        spend = _safe_num((snap["performance"] or {}).get("spend")) or 0.0
-        if spend < min_spend:
-            continue
-        items.append(snap)
-
-    for d in video_docs:
-        if not _has_perf(d):
-            continue
-        snap = _creative_snapshot("video", d["id"], d)
-        spend = _safe_num((snap["performance"] or {}).get("spend")) or 0.0
-        if spend < min_spend:
-            continue
-        items.append(snap)
-
-    top_by_roas = _rank(items, "roas", desc=True)[:5]
-    top_by_ctr = _rank(items, "ctr", desc=True)[:5]
-    lowest_cpa = _rank_low(items, "cpa")[:5]
-    lowest_cpm = _rank_low(items, "cpm")[:5]
-
-    all_roas = [_safe_num((x.get("performance") or {}).get("roas")) for x in items]
-    all_ctr = [_safe_num((x.get("performance") or {}).get("ctr")) for x in items]
-    all_cpa = [_safe_num((x.get("performance") or {}).get("cpa")) for x in items]
-    all_cpm = [_safe_num((x.get("performance") or {}).get("cpm")) for x in items]
-
-    summary = {
-        "count_with_performance": len(items),
-        "avg_roas": _avg([x for x in all_roas if x is not None]),
-        "avg_ctr": _avg([x for x in all_ctr if x is not None]),
-        "avg_cpa": _avg([x for x in all_cpa if x is not None]),
-        "avg_cpm": _avg([x for x in all_cpm if x is not None]),
-        "weighted_roas": _weighted_roas(items),
-        "min_spend_filter": min_spend,
-        "limit": limit,
-    }
-
-    best_platform = _group_best(items, "platform", min_spend=min_spend)
-    best_tone = _group_best(items, "tone", min_spend=min_spend)
-    best_style = _group_best(
-        [x for x in items if x["kind"] == "image"], "stylePreset", min_spend=min_spend
+    image_docs, video_docs = await asyncio.gather(
+        fetch_jobs("image_jobs"),
+        fetch_jobs("video_jobs"),
     )
 
-    ratio_groups = defaultdict(list)
-    for it in items:
-        ratio = it.get("ratio")
-        if not ratio:
-            continue
-        spend = _safe_num((it.get("performance") or {}).get("spend")) or 0.0
-        if spend < min_spend:
-            continue
-        ratio_groups[ratio].append(it)
-
-    ratio_rows = []
-    for ratio, arr in ratio_groups.items():
-        ratio_rows.append(
-            {
-                "value": ratio,
-                "count": len(arr),
-                "weighted_roas": _weighted_roas(arr),
-                "avg_ctr": _avg(
-                    [
-                        _safe_num((x.get("performance") or {}).get("ctr"))
-                        for x in arr
-                        if _safe_num((x.get("performance") or {}).get("ctr"))
-                        is not None
-                    ]
-                ),
-                "avg_cpa": _avg(
-                    [
-                        _safe_num((x.get("performance") or {}).get("cpa"))
-                        for x in arr
-                        if _safe_num((x.get("performance") or {}).get("cpa"))
-                        is not None
-                    ]
-                ),
-                "avg_cpm": _avg(
-                    [
-                        _safe_num((x.get("performance") or {}).get("cpm"))
-                        for x in arr
-                        if _safe_num((x.get("performance") or {}).get("cpm"))
-                        is not None
-                    ]
-                ),
-            }
-        )
-    ratio_rows.sort(
-        key=lambda r: (r["weighted_roas"] if r["weighted_roas"] is not None else -1e18),
-        reverse=True,
-    )
-    best_ratio = {
-        "best": ratio_rows[0] if ratio_rows else None,
-        "rows": ratio_rows[:10],
-    }
-
-    guidance_parts = []
-    if best_platform.get("best") and best_platform["best"].get("value"):
-        guidance_parts.append(f"Best platform: {best_platform['best']['value']}")
-    if best_tone.get("best") and best_tone["best"].get("value"):
-        guidance_parts.append(f"Best tone: {best_tone['best']['value']}")
-    if best_style.get("best") and best_style["best"].get("value"):
-        guidance_parts.append(f"Best image style: {best_style['best']['value']}")
-    if best_ratio.get("best") and best_ratio["best"].get("value"):
-        guidance_parts.append(f"Best ratio: {best_ratio['best']['value']}")
-
-    return {
-        "summary": summary,
-        "top": {
-            "by_roas": top_by_roas,
-            "by_ctr": top_by_ctr,
-            "lowest_cpa": lowest_cpa,
-            "lowest_cpm": lowest_cpm,
-        },
-        "patterns": {
-            "platform": best_platform,
-            "tone": best_tone,
-            "image_stylePreset": best_style,
-            "ratio": best_ratio,
-        },
-        "guidance": " • ".join(guidance_parts) if guidance_parts else "",
-    }
+    items = [
+        creative_snapshot(kind, d["id"], d)
+        for kind, docs in (("image", image_docs), ("video", video_docs))
+        for d in docs
+        if has_performance(d)
+    ]
+    return compute_insights(items, min_spend=min_spend, limit=limit)
 
 
 @app.get("/creative-insights")
@@ -6914,10 +7302,13 @@ async def winners_profile(
     ratios = Counter()
 
     for w in winners:
-        if w.get("platform"):
-            platforms[w["platform"]] += 1
-        if w.get("tone"):
-            tones[w["tone"]] += 1
+        meta = w.get("meta") or {}
+        platform = w.get("platform") or meta.get("platform")
+        tone = w.get("tone") or meta.get("tone")
+        if platform:
+            platforms[platform] += 1
+        if tone:
+            tones[tone] += 1
         if w.get("ratio"):
             ratios[w["ratio"]] += 1
 
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Columnar metrics shared by creative insights, the reporting engine and the
+# intelligence reports. Rows are parsed once into float64 columns; sums,
+# ratios, means and rankings then run as array operations instead of
+# re-parsing every value in per-row Python loops.
+#
+# Missing, blank, unparseable and NaN values become `missing` (0.0 by
+# default). Pass missing=np.nan where "absent" must stay distinguishable
+# from zero, and mask with present() before reducing.
+
+
+def _to_float(value: Any) -> float:
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return math.nan
+
+
+def parse_column(values: Sequence[Any], *, missing: float = 0.0) -> np.ndarray:
+    try:
+        # Fast path: numbers, None (-> NaN) and numeric strings.
+        out = np.array(values, dtype=np.float64)
+        if out.ndim != 1:
+            raise ValueError("non-scalar values")
+    except (TypeError, ValueError, OverflowError):
+        out = np.fromiter((_to_float(v) for v in values), dtype=np.float64, count=len(values))
+    if not math.isnan(missing):
+        out[np.isnan(out)] = missing
+    return out
+
+
+def columns(
+    rows: Iterable[Dict[str, Any]],
+    fields: Iterable[str],
+    *,
+    missing: float = 0.0,
+    integers: Iterable[str] = (),
+    source: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Parse `fields` out of rows into one float64 array each.
+
+    `source` picks the dict to read from each row (e.g. a nested
+    "performance" map). Fields in `integers` are truncated per row, matching
+    callers that summed int(float(value)).
+    """
+    records = [source(row) or {} for row in rows] if source else list(rows)
+    whole = set(integers)
+    out: Dict[str, np.ndarray] = {}
+    for field in fields:
+        column = parse_column([record.get(field) for record in records], missing=missing)
+        out[field] = np.trunc(column) if field in whole else column
+    return out
+
+
+def present(values: np.ndarray) -> np.ndarray:
+    return ~np.isnan(values)
+
+
+def factorize(keys: Iterable[Hashable]) -> Tuple[np.ndarray, List[Hashable]]:
+    """Group codes per key plus the distinct keys in first-seen order."""
+    index: Dict[Hashable, int] = {}
+    codes = [index.setdefault(key, len(index)) for key in keys]
+    return np.asarray(codes, dtype=np.intp), list(index)
+
+
+def grouped_sum(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    if not groups:
+        return np.zeros(0, dtype=np.float64)
+    return np.bincount(codes, weights=values, minlength=groups)
+
+
+def grouped_count(codes: np.ndarray, groups: int) -> np.ndarray:
+    if not groups:
+        return np.zeros(0, dtype=np.intp)
+    return np.bincount(codes, minlength=groups)
+
+
+def grouped_mean(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Per-group mean of the present values; NaN for groups with none."""
+    mask = present(values)
+    totals = grouped_sum(codes[mask], values[mask], groups)
+    counts = grouped_count(codes[mask], groups)
+    return ratio(totals, counts, fill=math.nan)
+
+
+def ratio(
+    numerator: Any,
+    denominator: Any,
+    *,
+    scale: float = 1.0,
+    fill: float = 0.0,
+    positive_only: bool = False,
+) -> np.ndarray:
+    """numerator / denominator * scale, or `fill` where the denominator is 0."""
+    num = np.asarray(numerator, dtype=np.float64)
+    den = np.asarray(denominator, dtype=np.float64)
+    valid = den > 0 if positive_only else den != 0
+    out = np.full(np.broadcast(num, den).shape, fill, dtype=np.float64)
+    np.divide(num, den, out=out, where=valid)
+    if scale != 1.0:
+        np.multiply(out, scale, out=out, where=valid)
+    return out
+
+
+def derive_ratios(
+    impressions: Any,
+    clicks: Any,
+    spend: Any,
+    conversions: Any,
+    value: Any,
+    *,
+    fill: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """CTR/CPM/conversion rate as percentages and per-mille, CPC, CPA and ROAS."""
+    return {
+        "ctr": ratio(clicks, impressions, scale=100.0, fill=fill),
+        "cpc": ratio(spend, clicks, fill=fill),
+        "cpm": ratio(spend, impressions, scale=1000.0, fill=fill),
+        "conversionRate": ratio(conversions, clicks, scale=100.0, fill=fill),
+        "cpa": ratio(spend, conversions, fill=fill),
+        "roas": ratio(value, spend, fill=fill),
+    }
+
+
+def weighted_ratio(numerator: np.ndarray, denominator: np.ndarray) -> Optional[float]:
+    """sum(numerator) / sum(denominator) over rows where both are present and the denominator is positive."""
+    mask = present(numerator) & present(denominator) & (denominator > 0)
+    total = float(denominator[mask].sum())
+    if total <= 0:
+        return None
+    return float(numerator[mask].sum()) / total
+
+
+def grouped_weighted_ratio(
+    codes: np.ndarray,
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    groups: int,
+) -> np.ndarray:
+    mask = present(numerator) & present(denominator) & (denominator > 0)
+    return ratio(
+        grouped_sum(codes[mask], numerator[mask], groups),
+        grouped_sum(codes[mask], denominator[mask], groups),
+        fill=math.nan,
+        positive_only=True,
+    )
+
+
+def top_k(values: np.ndarray, k: int, *, descending: bool = True) -> np.ndarray:
+    """
+    Indices of the k best values, best first.
+
+    Ties keep their input order and missing (NaN) values rank last, the same
+    order a stable sorted() with a sentinel for missing values produces.
+    """
+    n = len(values)
+    k = max(0, min(k, n))
+    if not k:
+        return np.zeros(0, dtype=np.intp)
+    keyed = -values if descending else values.copy()
+    keyed[np.isnan(keyed)] = np.inf
+    if k < n:
+        # Keep everything tied with the k-th key so stability survives the cut.
+        threshold = np.partition(keyed, k - 1)[k - 1]
+        candidates = np.flatnonzero(keyed <= threshold)
+    else:
+        candidates = np.arange(n)
+    order = np.argsort(keyed[candidates], kind="stable")
+    return candidates[order][:k]
+
+
+def maybe(value: Any, digits: Optional[int] = None) -> Optional[float]:
+    """Python float (optionally rounded) or None for NaN."""
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return round(value, digits) if digits is not None else value
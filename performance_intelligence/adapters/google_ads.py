@@ -1,12 +1,13 @@
+import time
 from typing import Any
 
 from integrations.google_ads.service import fetch_creative_assets
 from integrations.google_ads.store import get_connection
 
-from ..extractors import analyze_copy, analyze_image, analyze_video_metadata
-from ..models import CreativeFeatures, PerformanceEvidence
+from ..extractors import analyze_copy, analyze_images, analyze_video_metadata, image_features
+from ..models import CreativeFeatures, PerformanceEvidence, QualificationThresholds
 from ..qualification import qualify_evidence
-from ..store import get_thresholds, stable_creative_id, upsert_evidence
+from ..store import get_thresholds, stable_creative_id, upsert_evidence_bulk
 
 
 def _num(value: Any, default: float = 0.0) -> float:
@@ -38,6 +39,8 @@ def google_asset_to_evidence(
     customer_id: str,
     asset: dict[str, Any],
     analyze_media: bool,
+    thresholds: QualificationThresholds | None = None,
+    image_analyses: dict[str, dict[str, Any]] | None = None,
 ) -> PerformanceEvidence:
     kind = _kind(asset)
     text_value = (
@@ -79,13 +82,7 @@ def google_asset_to_evidence(
     )
 
     if kind == "image" and asset.get("previewUrl") and analyze_media:
-        try:
-            features.image = analyze_image(asset["previewUrl"])
-        except Exception as exc:
-            features.image = {
-                "analysis_status": "failed",
-                "analysis_error": str(exc)[:250],
-            }
+        features.image = image_features(asset["previewUrl"], image_analyses)
 
     if kind == "video":
         features.video = analyze_video_metadata(
@@ -170,10 +167,18 @@ def google_asset_to_evidence(
 
     return qualify_evidence(
         evidence,
-        get_thresholds(uid),
+        thresholds or get_thresholds(uid),
     )
 
 
+def _failure(asset: dict[str, Any], error: Any) -> dict[str, Any]:
+    return {
+        "assetId": asset.get("assetId"),
+        "campaignId": asset.get("campaignId"),
+        "error": str(error)[:250],
+    }
+
+
 def ingest_google_ads(
     *,
     uid: str,
@@ -192,6 +197,7 @@ def ingest_google_ads(
             "reason": "google_ads_customer_not_selected",
         }
 
+    started = time.perf_counter()
     assets = fetch_creative_assets(
         uid,
         customer_id=customer_id,
@@ -200,38 +206,54 @@ def ingest_google_ads(
         start_date=start_date,
         end_date=end_date,
     )
+    fetched = time.perf_counter()
 
-    imported = 0
-    added = 0
-    updated = 0
-    unchanged = 0
+    image_analyses = (
+        analyze_images(
+            "google_ads",
+            (
+                asset.get("previewUrl")
+                for asset in assets
+                if _kind(asset) == "image"
+            ),
+        )
+        if analyze_media
+        else {}
+    )
+    analyzed = time.perf_counter()
+
+    thresholds = get_thresholds(uid)
     skipped = 0
     failures = []
+    pending: list[tuple[dict[str, Any], PerformanceEvidence]] = []
 
     for asset in assets:
         try:
-            evidence = google_asset_to_evidence(
-                uid=uid,
-                customer_id=customer_id,
-                asset=asset,
-                analyze_media=analyze_media,
+            pending.append(
+                (
+                    asset,
+                    google_asset_to_evidence(
+                        uid=uid,
+                        customer_id=customer_id,
+                        asset=asset,
+                        analyze_media=analyze_media,
+                        thresholds=thresholds,
+                        image_analyses=image_analyses,
+                    ),
+                )
             )
-            _evidence_id, change = upsert_evidence(uid, evidence)
-            if change == "added":
-                added += 1
-            elif change == "updated":
-                updated += 1
-            else:
-                unchanged += 1
-            imported += 1
         except Exception as exc:
-            failures.append(
-                {
-                    "assetId": asset.get("assetId"),
-                    "campaignId": asset.get("campaignId"),
-                    "error": str(exc)[:250],
-                }
-            )
+            failures.append(_failure(asset, exc))
+
+    converted = time.perf_counter()
+    result = upsert_evidence_bulk(uid, [evidence for _asset, evidence in pending])
+    for (asset, _evidence), (evidence_id, change) in zip(pending, result["changes"]):
+        if change == "failed":
+            failures.append(_failure(asset, result["failed"][evidence_id]))
+    added = result["added"]
+    updated = result["updated"]
+    unchanged = result["unchanged"]
+    imported = added + updated + unchanged
 
     return {
         "imported": imported,
@@ -242,4 +264,10 @@ def ingest_google_ads(
         "failures": failures[:25],
         "customerId": customer_id,
         "dateRange": date_range,
+        "timings": {
+            "fetchSeconds": round(fetched - started, 3),
+            "mediaAnalysisSeconds": round(analyzed - fetched, 3),
+            "evidenceSeconds": round(converted - analyzed, 3),
+            "upsertSeconds": round(time.perf_counter() - converted, 3),
+        },
     }
@@ -1,14 +1,16 @@
+import time
 from typing import Any
 
 from auth_helpers import get_db
 
-from ..extractors import analyze_copy, analyze_image, analyze_video_metadata
-from ..models import CreativeFeatures, PerformanceEvidence
+from ..extractors import analyze_copy, analyze_images, analyze_video_metadata, image_features
+from ..models import CreativeFeatures, PerformanceEvidence, QualificationThresholds
 from ..qualification import qualify_evidence
 from ..store import (
     get_thresholds,
     save_evidence,
     stable_creative_id,
+    upsert_evidence_bulk,
 )
 
 
@@ -26,6 +28,15 @@ def _first(*values):
     return None
 
 
+def _image_url(doc: dict[str, Any]) -> str | None:
+    return _first(
+        doc.get("imageUrl"),
+        doc.get("image_url"),
+        doc.get("outputUrl"),
+        doc.get("url"),
+    )
+
+
 def manual_job_to_evidence(
     *,
     uid: str,
@@ -33,6 +44,8 @@ def manual_job_to_evidence(
     job_id: str,
     doc: dict[str, Any],
     analyze_media: bool,
+    thresholds: QualificationThresholds | None = None,
+    image_analyses: dict[str, dict[str, Any]] | None = None,
 ) -> PerformanceEvidence | None:
     perf = doc.get("performance") or {}
     if not perf:
@@ -58,12 +71,7 @@ def manual_job_to_evidence(
         (doc.get("result") or {}).get("cta"),
     )
 
-    image_url = _first(
-        doc.get("imageUrl"),
-        doc.get("image_url"),
-        doc.get("outputUrl"),
-        doc.get("url"),
-    )
+    image_url = _image_url(doc)
     video_url = _first(
         doc.get("videoUrl"),
         doc.get("video_url"),
@@ -87,13 +95,7 @@ def manual_job_to_evidence(
     )
 
     if kind == "image" and image_url and analyze_media:
-        try:
-            features.image = analyze_image(image_url)
-        except Exception as exc:
-            features.image = {
-                "analysis_status": "failed",
-                "analysis_error": str(exc)[:250],
-            }
+        features.image = image_features(image_url, image_analyses)
 
     if kind == "video":
         features.video = analyze_video_metadata(
@@ -168,7 +170,7 @@ def manual_job_to_evidence(
 
     return qualify_evidence(
         evidence,
-        get_thresholds(uid),
+        thresholds or get_thresholds(uid),
     )
 
 
@@ -213,10 +215,13 @@ def ingest_manual_library(
     limit: int = 500,
 ) -> dict[str, Any]:
     db = get_db()
-    imported = 0
+    thresholds = get_thresholds(uid)
     skipped = 0
     failures = []
+    pending: list[tuple[str, str, PerformanceEvidence]] = []
 
+    started = time.perf_counter()
+    jobs: list[tuple[str, str, dict[str, Any]]] = []
     for kind, collection in [
         ("image", "image_jobs"),
         ("video", "video_jobs"),
@@ -226,31 +231,73 @@ def ingest_manual_library(
             .where("uid", "==", uid)
             .limit(limit)
         )
-        for snap in query.stream():
-            try:
-                evidence = manual_job_to_evidence(
-                    uid=uid,
-                    kind=kind,
-                    job_id=snap.id,
-                    doc=snap.to_dict() or {},
-                    analyze_media=analyze_media,
-                )
-                if not evidence:
-                    skipped += 1
-                    continue
-                save_evidence(uid, evidence)
-                imported += 1
-            except Exception as exc:
-                failures.append(
-                    {
-                        "kind": kind,
-                        "jobId": snap.id,
-                        "error": str(exc)[:250],
-                    }
-                )
+        jobs.extend(
+            (kind, snap.id, snap.to_dict() or {})
+            for snap in query.stream()
+        )
+    fetched = time.perf_counter()
+
+    image_analyses = (
+        analyze_images(
+            "manual",
+            (
+                _image_url(doc)
+                for kind, _job_id, doc in jobs
+                if kind == "image" and doc.get("performance")
+            ),
+        )
+        if analyze_media
+        else {}
+    )
+    analyzed = time.perf_counter()
+
+    for kind, job_id, doc in jobs:
+        try:
+            evidence = manual_job_to_evidence(
+                uid=uid,
+                kind=kind,
+                job_id=job_id,
+                doc=doc,
+                analyze_media=analyze_media,
+                thresholds=thresholds,
+                image_analyses=image_analyses,
+            )
+            if not evidence:
+                skipped += 1
+                continue
+            pending.append((kind, job_id, evidence))
+        except Exception as exc:
+            failures.append(
+                {
+                    "kind": kind,
+                    "jobId": job_id,
+                    "error": str(exc)[:250],
+                }
+            )
+
+    converted = time.perf_counter()
+    result = upsert_evidence_bulk(uid, [evidence for _kind, _job_id, evidence in pending])
+    for (kind, job_id, _evidence), (evidence_id, change) in zip(pending, result["changes"]):
+        if change == "failed":
+            failures.append(
+                {
+                    "kind": kind,
+                    "jobId": job_id,
+                    "error": result["failed"][evidence_id],
+                }
+            )
 
     return {
-        "imported": imported,
+        "imported": result["added"] + result["updated"] + result["unchanged"],
+        "added": result["added"],
+        "updated": result["updated"],
+        "unchanged": result["unchanged"],
         "skipped": skipped,
         "failures": failures[:25],
+        "timings": {
+            "fetchSeconds": round(fetched - started, 3),
+            "mediaAnalysisSeconds": round(analyzed - fetched, 3),
+            "evidenceSeconds": round(converted - analyzed, 3),
+            "upsertSeconds": round(time.perf_counter() - converted, 3),
+        },
     }
@@ -1,3 +1,4 @@
+import time
 from typing import Any
 
 from integrations.meta_ads.store import (
@@ -7,15 +8,16 @@ from integrations.meta_ads.store import (
 
 from ..extractors import (
     analyze_copy,
-    analyze_image,
+    analyze_images,
     analyze_video_metadata,
+    image_features,
 )
-from ..models import CreativeFeatures, PerformanceEvidence
+from ..models import CreativeFeatures, PerformanceEvidence, QualificationThresholds
 from ..qualification import qualify_evidence
 from ..store import (
     get_thresholds,
-    upsert_evidence,
     stable_creative_id,
+    upsert_evidence_bulk,
 )
 
 
@@ -64,12 +66,20 @@ def _kind(item: dict[str, Any]) -> str:
     return "mixed"
 
 
+def _analysis_url(item: dict[str, Any]) -> str | None:
+    if _kind(item) not in {"image", "mixed"}:
+        return None
+    return item.get("imageUrl") or item.get("thumbnailUrl")
+
+
 def meta_creative_to_evidence(
     *,
     uid: str,
     ad_account_id: str,
     item: dict[str, Any],
     analyze_media: bool,
+    thresholds: QualificationThresholds | None = None,
+    image_analyses: dict[str, dict[str, Any]] | None = None,
 ) -> PerformanceEvidence:
     kind = _kind(item)
     headline = item.get("headline")
@@ -95,15 +105,9 @@ def meta_creative_to_evidence(
         },
     )
 
-    image_url = item.get("imageUrl") or item.get("thumbnailUrl")
-    if kind in {"image", "mixed"} and image_url and analyze_media:
-        try:
-            features.image = analyze_image(image_url)
-        except Exception as exc:
-            features.image = {
-                "analysis_status": "failed",
-                "analysis_error": str(exc)[:250],
-            }
+    image_url = _analysis_url(item)
+    if image_url and analyze_media:
+        features.image = image_features(image_url, image_analyses)
 
     if kind in {"video", "mixed"} and item.get("videoId"):
         features.video = analyze_video_metadata(
@@ -193,10 +197,19 @@ def meta_creative_to_evidence(
 
     return qualify_evidence(
         evidence,
-        get_thresholds(uid),
+        thresholds or get_thresholds(uid),
     )
 
 
+def _failure(item: dict[str, Any], error: Any) -> dict[str, Any]:
+    return {
+        "adId": item.get("adId"),
+        "creativeId": item.get("creativeId"),
+        "campaignId": item.get("campaignId"),
+        "error": str(error)[:250],
+    }
+
+
 def ingest_meta_ads(
     *,
     uid: str,
@@ -226,14 +239,28 @@ def ingest_meta_ads(
     # Performance Intelligence ingests the latest Meta creative snapshot.
     # The Meta panel owns provider synchronization so rebuilding learning
     # never unexpectedly makes a second external API request.
+    started = time.perf_counter()
     creatives = list_creative_sync(uid, limit=1000)
+    fetched = time.perf_counter()
 
-    imported = 0
-    added = 0
-    updated = 0
-    unchanged = 0
+    image_analyses = (
+        analyze_images(
+            "meta_ads",
+            (
+                _analysis_url(item)
+                for item in creatives
+                if item.get("adId") or item.get("creativeId")
+            ),
+        )
+        if analyze_media
+        else {}
+    )
+    analyzed = time.perf_counter()
+
+    thresholds = get_thresholds(uid)
     skipped = 0
     failures: list[dict[str, Any]] = []
+    pending: list[tuple[dict[str, Any], PerformanceEvidence]] = []
 
     for item in creatives:
         if not item.get("adId") and not item.get("creativeId"):
@@ -241,29 +268,31 @@ def ingest_meta_ads(
             continue
 
         try:
-            evidence = meta_creative_to_evidence(
-                uid=uid,
-                ad_account_id=ad_account_id,
-                item=item,
-                analyze_media=analyze_media,
+            pending.append(
+                (
+                    item,
+                    meta_creative_to_evidence(
+                        uid=uid,
+                        ad_account_id=ad_account_id,
+                        item=item,
+                        analyze_media=analyze_media,
+                        thresholds=thresholds,
+                        image_analyses=image_analyses,
+                    ),
+                )
             )
-            _evidence_id, change = upsert_evidence(uid, evidence)
-            if change == "added":
-                added += 1
-            elif change == "updated":
-                updated += 1
-            else:
-                unchanged += 1
-            imported += 1
         except Exception as exc:
-            failures.append(
-                {
-                    "adId": item.get("adId"),
-                    "creativeId": item.get("creativeId"),
-                    "campaignId": item.get("campaignId"),
-                    "error": str(exc)[:250],
-                }
-            )
+            failures.append(_failure(item, exc))
+
+    converted = time.perf_counter()
+    result = upsert_evidence_bulk(uid, [evidence for _item, evidence in pending])
+    for (item, _evidence), (evidence_id, change) in zip(pending, result["changes"]):
+        if change == "failed":
+            failures.append(_failure(item, result["failed"][evidence_id]))
+    added = result["added"]
+    updated = result["updated"]
+    unchanged = result["unchanged"]
+    imported = added + updated + unchanged
 
     return {
         "imported": imported,
@@ -281,4 +310,10 @@ def ingest_meta_ads(
         "lastCreativeSyncAt": connection.get(
             "lastCreativeSyncAt"
         ),
+        "timings": {
+            "fetchSeconds": round(fetched - started, 3),
+            "mediaAnalysisSeconds": round(analyzed - fetched, 3),
+            "evidenceSeconds": round(converted - analyzed, 3),
+            "upsertSeconds": round(time.perf_counter() - converted, 3),
+        },
     }
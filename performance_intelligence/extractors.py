@@ -1,12 +1,23 @@
 import base64
+import copy
+import hashlib
 import json
 import os
 import re
-from collections import Counter
-from typing import Any
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from io import BytesIO
+from typing import Any, Callable, Iterable, Iterator
 
 import requests
 from openai import OpenAI
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .store import get_vision_analysis, save_vision_analysis
 
 URGENCY_WORDS = {
     "now", "today", "limited", "hurry", "ends", "last chance",
@@ -90,15 +101,125 @@ def analyze_copy(
     }
 
 
-def _download_as_data_url(url: str) -> str:
+VISION_PROMPT = (
+    "Analyze this advertising creative. Return only "
+    "valid JSON with these keys: dominant_colors "
+    "(array of simple color names), visual_style, "
+    "composition, background_type, lighting, "
+    "product_present, product_prominence_percent, "
+    "human_present, human_count, lifestyle_vs_studio, "
+    "logo_visible, logo_prominence, text_overlay_level "
+    "(none/low/medium/high), text_position, "
+    "cta_visible, cta_position, contrast_level "
+    "(low/medium/high), emotional_tone, "
+    "aspect_orientation, notable_elements (array), "
+    "creative_summary. Do not identify real people."
+)
+
+# Vision analyses are cached by content: the key hashes the normalized image
+# (EXIF-rotated, downscaled to VISION_MAX_EDGE, metadata stripped) together
+# with the model and VISION_PROMPT_VERSION, so the same creative behind
+# different URLs or ads is analyzed once. Results live in Firestore
+# (store.VISION_CACHE_COLLECTION) with an in-process LRU in front, and
+# concurrent requests for the same URL or image share one download and one
+# vision call. The prompt version is derived from the prompt text and the
+# normalization settings; any change to either moves every key, so stale
+# analyses are never read. Set VISION_CACHE_GENERATION to force the same.
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1536"))
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "512"))
+VISION_URL_CACHE_SECONDS = float(os.getenv("VISION_URL_CACHE_SECONDS", "3600"))
+VISION_CACHE_GENERATION = os.getenv("VISION_CACHE_GENERATION", "1")
+# Refreshes analyze media through analyze_images(): a shared pool of
+# MEDIA_ANALYSIS_WORKERS threads, at most MEDIA_ANALYSIS_PER_PROVIDER
+# in-flight analyses per source across all refreshes, and a per-item budget
+# of MEDIA_ANALYSIS_TIMEOUT_SECONDS that starts when the analysis does; the
+# wait for a slot and for a pool worker are each bounded by the same amount
+# but not charged to it. Timed-out items keep their slot until they finish,
+# which the OpenAI client (same budget) makes soon after.
+MEDIA_ANALYSIS_WORKERS = int(os.getenv("MEDIA_ANALYSIS_WORKERS", "16"))
+MEDIA_ANALYSIS_PER_PROVIDER = int(os.getenv("MEDIA_ANALYSIS_PER_PROVIDER", "4"))
+MEDIA_ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("MEDIA_ANALYSIS_TIMEOUT_SECONDS", "90"))
+VISION_PROMPT_VERSION = hashlib.sha256(
+    f"{VISION_CACHE_GENERATION}\n{VISION_MAX_EDGE}\n{VISION_PROMPT}".encode("utf-8")
+).hexdigest()[:16]
+
+VISION_OUTCOMES = ("memoryHits", "firestoreHits", "deduplicated", "analyses", "errors")
+
+_openai_client: OpenAI | None = None
+_vision_lock = threading.Lock()
+_vision_analyses: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_vision_urls: "OrderedDict[tuple[str, str], tuple[float, str]]" = OrderedDict()
+_vision_inflight: dict[str, Future] = {}
+_vision_stats = {"requests": 0, **{outcome: 0 for outcome in VISION_OUTCOMES}}
+_media_lock = threading.Lock()
+_media_executor: ThreadPoolExecutor | None = None
+_media_slots: dict[str, threading.BoundedSemaphore] = {}
+_vision_scope: ContextVar[Counter | None] = ContextVar(
+    "performance_intelligence_vision_scope",
+    default=None,
+)
+
+
+def _client() -> OpenAI:
+    global _openai_client
+    with _vision_lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(timeout=MEDIA_ANALYSIS_TIMEOUT_SECONDS)
+        return _openai_client
+
+
+def _vision_model(model: str | None) -> str:
+    return (
+        model
+        or os.getenv("OPENAI_VISION_MODEL")
+        or os.getenv("OPENAI_TEXT_MODEL")
+        or "gpt-5.5"
+    )
+
+
+def _cache_key(content_hash: str, model: str) -> str:
+    raw = f"{content_hash}:{model}:{VISION_PROMPT_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _normalize_image(content: bytes, content_type: str) -> tuple[bytes, str, str]:
+    """(bytes to send, content type, content hash) for a downloaded image.
+
+    The hash is over the decoded, rotated and downscaled pixels, so
+    re-encodes, metadata changes and CDN resizes above VISION_MAX_EDGE of the
+    same creative share a key. Anything Pillow cannot decode is sent as
+    downloaded and hashed as raw bytes.
+    """
+    try:
+        with Image.open(BytesIO(content)) as source:
+            image = ImageOps.exif_transpose(source)
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return content, content_type, "raw:" + hashlib.sha256(content).hexdigest()
+
+    image.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE))
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode("ascii"))
+    digest.update(image.tobytes())
+
+    output = BytesIO()
+    if has_alpha:
+        image.save(output, format="PNG", optimize=True)
+        normalized_type = "image/png"
+    else:
+        image.save(output, format="JPEG", quality=90)
+        normalized_type = "image/jpeg"
+    return output.getvalue(), normalized_type, digest.hexdigest()
+
+
+def _download_image(url: str) -> tuple[bytes, str, str]:
     response = requests.get(url, timeout=25)
     response.raise_for_status()
     content_type = response.headers.get(
         "content-type",
         "image/jpeg",
     ).split(";")[0]
-    encoded = base64.b64encode(response.content).decode("ascii")
-    return f"data:{content_type};base64,{encoded}"
+    return _normalize_image(response.content, content_type)
 
 
 def _parse_json_response(text: str) -> dict[str, Any]:
@@ -113,50 +234,109 @@ def _parse_json_response(text: str) -> dict[str, Any]:
     return json.loads(cleaned)
 
 
-def analyze_image(
-    image_url: str,
-    *,
-    model: str | None = None,
-) -> dict[str, Any]:
-    if not image_url:
-        return {}
+def _remembered(key: str) -> dict[str, Any] | None:
+    """LRU lookup; call with _vision_lock held."""
+    analysis = _vision_analyses.get(key)
+    if analysis is not None:
+        _vision_analyses.move_to_end(key)
+    return analysis
 
-    client = OpenAI()
-    vision_model = (
-        model
-        or os.getenv("OPENAI_VISION_MODEL")
-        or os.getenv("OPENAI_TEXT_MODEL")
-        or "gpt-5.5"
-    )
 
-    data_url = _download_as_data_url(image_url)
+def _remember(key: str, analysis: dict[str, Any]) -> None:
+    with _vision_lock:
+        _vision_analyses[key] = analysis
+        _vision_analyses.move_to_end(key)
+        while len(_vision_analyses) > max(0, VISION_CACHE_SIZE):
+            _vision_analyses.popitem(last=False)
+
+
+def _url_cache_key(url: str, model: str) -> str | None:
+    """Cache key last seen for `url`; call with _vision_lock held."""
+    entry = _vision_urls.get((model, url))
+    if entry is None:
+        return None
+    expires_at, key = entry
+    if expires_at < time.monotonic():
+        _vision_urls.pop((model, url), None)
+        return None
+    return key
+
+
+def _remember_url(url: str, model: str, key: str) -> None:
+    with _vision_lock:
+        _vision_urls[(model, url)] = (time.monotonic() + VISION_URL_CACHE_SECONDS, key)
+        _vision_urls.move_to_end((model, url))
+        while len(_vision_urls) > max(0, VISION_CACHE_SIZE) * 4:
+            _vision_urls.popitem(last=False)
+
 
-    response = client.responses.create(
-        model=vision_model,
+def _single_flight(
+    flight_key: str,
+    lookup: Callable[[], dict[str, Any] | None],
+    load: Callable[[], tuple[dict[str, Any], str]],
+) -> tuple[dict[str, Any], str]:
+    """
+    Run `load` once per flight_key at a time. Callers that arrive while it
+    runs wait for its result (outcome "deduplicated"); `lookup` is checked
+    under the lock first so a just-finished flight is not repeated.
+    """
+    with _vision_lock:
+        cached = lookup()
+        if cached is not None:
+            return cached, "memoryHits"
+        future = _vision_inflight.get(flight_key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _vision_inflight[flight_key] = future
+
+    if not leader:
+        analysis, _outcome = future.result()
+        return analysis, "deduplicated"
+
+    try:
+        result = load()
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _vision_lock:
+            _vision_inflight.pop(flight_key, None)
+
+
+def _cached_analysis(key: str, content_hash: str, model: str) -> dict[str, Any] | None:
+    try:
+        doc = get_vision_analysis(key)
+    except Exception:
+        return None
+    if (
+        not doc
+        or doc.get("promptVersion") != VISION_PROMPT_VERSION
+        or doc.get("model") != model
+        or not isinstance(doc.get("analysis"), dict)
+    ):
+        return None
+    return doc["analysis"]
+
+
+def _run_vision(content: bytes, content_type: str, model: str) -> dict[str, Any]:
+    encoded = base64.b64encode(content).decode("ascii")
+    response = _client().responses.create(
+        model=model,
         input=[
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "input_text",
-                        "text": (
-                            "Analyze this advertising creative. Return only "
-                            "valid JSON with these keys: dominant_colors "
-                            "(array of simple color names), visual_style, "
-                            "composition, background_type, lighting, "
-                            "product_present, product_prominence_percent, "
-                            "human_present, human_count, lifestyle_vs_studio, "
-                            "logo_visible, logo_prominence, text_overlay_level "
-                            "(none/low/medium/high), text_position, "
-                            "cta_visible, cta_position, contrast_level "
-                            "(low/medium/high), emotional_tone, "
-                            "aspect_orientation, notable_elements (array), "
-                            "creative_summary. Do not identify real people."
-                        ),
+                        "text": VISION_PROMPT,
                     },
                     {
                         "type": "input_image",
-                        "image_url": data_url,
+                        "image_url": f"data:{content_type};base64,{encoded}",
                     },
                 ],
             }
@@ -165,6 +345,233 @@ def analyze_image(
     return _parse_json_response(response.output_text)
 
 
+def _analyze_content(
+    key: str,
+    content: bytes,
+    content_type: str,
+    content_hash: str,
+    model: str,
+) -> tuple[dict[str, Any], str]:
+    analysis = _cached_analysis(key, content_hash, model)
+    outcome = "firestoreHits"
+    if analysis is None:
+        analysis = _run_vision(content, content_type, model)
+        outcome = "analyses"
+        try:
+            save_vision_analysis(
+                key,
+                analysis=analysis,
+                content_hash=content_hash,
+                model=model,
+                prompt_version=VISION_PROMPT_VERSION,
+            )
+        except Exception:
+            # A failed cache write only costs a repeat analysis later.
+            pass
+    _remember(key, analysis)
+    return analysis, outcome
+
+
+def _analyze_url(image_url: str, model: str) -> tuple[dict[str, Any], str]:
+    content, content_type, content_hash = _download_image(image_url)
+    key = _cache_key(content_hash, model)
+    _remember_url(image_url, model, key)
+    return _single_flight(
+        key,
+        lambda: _remembered(key),
+        lambda: _analyze_content(key, content, content_type, content_hash, model),
+    )
+
+
+def _record_outcome(outcome: str) -> None:
+    with _vision_lock:
+        _vision_stats["requests"] += 1
+        _vision_stats[outcome] += 1
+    scope = _vision_scope.get()
+    if scope is not None:
+        with _vision_lock:
+            scope["requests"] += 1
+            scope[outcome] += 1
+
+
+def analyze_image(
+    image_url: str,
+    *,
+    model: str | None = None,
+) -> dict[str, Any]:
+    if not image_url:
+        return {}
+
+    vision_model = _vision_model(model)
+
+    def _by_url() -> dict[str, Any] | None:
+        key = _url_cache_key(image_url, vision_model)
+        return _remembered(key) if key else None
+
+    try:
+        analysis, outcome = _single_flight(
+            f"url:{vision_model}:{image_url}",
+            _by_url,
+            lambda: _analyze_url(image_url, vision_model),
+        )
+    except Exception:
+        _record_outcome("errors")
+        raise
+    _record_outcome(outcome)
+    return copy.deepcopy(analysis)
+
+
+def _analysis_failure(error: Any, status: str = "failed") -> dict[str, Any]:
+    return {
+        "analysis_status": status,
+        "analysis_error": str(error)[:250],
+    }
+
+
+def image_features(
+    image_url: str,
+    analyses: dict[str, dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Image features for an evidence record: a prefetched analyze_images()
+    entry when there is one, otherwise analyze_image() with failures kept
+    as an analysis_status entry."""
+    if analyses is not None and image_url in analyses:
+        return copy.deepcopy(analyses[image_url])
+    try:
+        return analyze_image(image_url)
+    except Exception as exc:
+        return _analysis_failure(exc)
+
+
+def _get_media_executor() -> ThreadPoolExecutor:
+    global _media_executor
+    with _media_lock:
+        if _media_executor is None:
+            _media_executor = ThreadPoolExecutor(
+                max_workers=max(1, MEDIA_ANALYSIS_WORKERS),
+                thread_name_prefix="media-analysis",
+            )
+        return _media_executor
+
+
+def _provider_slots(provider: str) -> threading.BoundedSemaphore:
+    with _media_lock:
+        slots = _media_slots.get(provider)
+        if slots is None:
+            slots = threading.BoundedSemaphore(max(1, MEDIA_ANALYSIS_PER_PROVIDER))
+            _media_slots[provider] = slots
+        return slots
+
+
+class _MediaStart:
+    """When a submitted analysis actually started on a pool worker."""
+
+    __slots__ = ("event", "at")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.at = 0.0
+
+    def run(self, url: str) -> dict[str, Any]:
+        self.at = time.monotonic()
+        self.event.set()
+        return analyze_image(url)
+
+
+def analyze_images(
+    provider: str,
+    image_urls: Iterable[str | None],
+) -> dict[str, dict[str, Any]]:
+    """
+    analyze_image() for each distinct URL on the shared media pool, at most
+    MEDIA_ANALYSIS_PER_PROVIDER at a time for `provider`. Every URL maps to
+    its analysis or an analysis_status failure entry; an item still running
+    MEDIA_ANALYSIS_TIMEOUT_SECONDS after it started is reported as timed_out
+    and left to finish (and fill the cache) in the background.
+    """
+    executor = _get_media_executor()
+    slots = _provider_slots(provider)
+    results: dict[str, dict[str, Any]] = {}
+    submitted: list[tuple[str, float, _MediaStart, Future]] = []
+
+    for url in dict.fromkeys(url for url in image_urls if url):
+        if not slots.acquire(timeout=MEDIA_ANALYSIS_TIMEOUT_SECONDS):
+            results[url] = _analysis_failure(
+                f"No {provider} analysis slot within {MEDIA_ANALYSIS_TIMEOUT_SECONDS:g}s",
+                "timed_out",
+            )
+            continue
+        start = _MediaStart()
+        try:
+            future = executor.submit(copy_context().run, start.run, url)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _future: slots.release())
+        submitted.append((url, time.monotonic() + MEDIA_ANALYSIS_TIMEOUT_SECONDS, start, future))
+
+    for url, queued_until, start, future in submitted:
+        if not start.event.wait(timeout=max(0.0, queued_until - time.monotonic())) and future.cancel():
+            results[url] = _analysis_failure(
+                f"No media analysis worker within {MEDIA_ANALYSIS_TIMEOUT_SECONDS:g}s",
+                "timed_out",
+            )
+            continue
+        start.event.wait()
+        try:
+            results[url] = future.result(
+                timeout=max(0.0, start.at + MEDIA_ANALYSIS_TIMEOUT_SECONDS - time.monotonic())
+            )
+        except FutureTimeoutError:
+            results[url] = _analysis_failure(
+                f"Image analysis exceeded {MEDIA_ANALYSIS_TIMEOUT_SECONDS:g}s",
+                "timed_out",
+            )
+        except Exception as exc:
+            results[url] = _analysis_failure(exc)
+    return results
+
+
+def _hit_rate(counts: Counter | dict[str, int]) -> dict[str, Any]:
+    requests_seen = int(counts.get("requests") or 0)
+    hits = sum(
+        int(counts.get(key) or 0)
+        for key in ("memoryHits", "firestoreHits", "deduplicated")
+    )
+    return {
+        "requests": requests_seen,
+        **{outcome: int(counts.get(outcome) or 0) for outcome in VISION_OUTCOMES},
+        "hitRate": round(hits / requests_seen, 4) if requests_seen else None,
+        "promptVersion": VISION_PROMPT_VERSION,
+    }
+
+
+@contextmanager
+def vision_cache_scope() -> Iterator[Counter]:
+    """Count analyze_image outcomes in this context (e.g. one refresh)."""
+    counts: Counter = Counter()
+    token = _vision_scope.set(counts)
+    try:
+        yield counts
+    finally:
+        _vision_scope.reset(token)
+
+
+def vision_cache_report(counts: Counter) -> dict[str, Any]:
+    with _vision_lock:
+        return _hit_rate(counts)
+
+
+def vision_cache_stats() -> dict[str, Any]:
+    with _vision_lock:
+        return {
+            "cachedAnalyses": len(_vision_analyses),
+            "cachedUrls": len(_vision_urls),
+            "inFlight": len(_vision_inflight),
+            **_hit_rate(_vision_stats),
+        }
+
+
 def analyze_video_metadata(
     *,
     duration_seconds: float | None = None,
@@ -1,17 +1,16 @@
 from __future__ import annotations
 
-import csv
-import io
 import json
 import time
-import zipfile
-from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
+import numpy as np
 from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils import get_column_letter
+
+from metrics_engine import columns, derive_ratios, factorize, grouped_count, grouped_mean, grouped_sum
+from report_exports import csv_zip_chunks, styled_cell, workbook_chunks, write_table
 
 from .store import get_evidence, get_refresh_sessions, get_summary
 
@@ -190,56 +189,62 @@ def _performance_unit_key(item: dict[str, Any]) -> str:
     return ":".join([source, account, campaign, scope])
 
 
+_DERIVED_METRICS = {"ctr_percent", "cpc", "cpm", "cpa", "roas"}
+_AVERAGED_METRICS = {"qualification_score", "attribution_confidence"}
+
+
 def _aggregate(rows: list[dict[str, Any]], key_fields: list[str], metrics: list[str]) -> list[dict[str, Any]]:
-    grouped: dict[tuple[Any, ...], dict[str, Any]] = {}
-    seen_units: dict[tuple[Any, ...], set[str]] = defaultdict(set)
-    for item in rows:
-        key = tuple(item.get(field) for field in key_fields)
-        if key not in grouped:
-            grouped[key] = {field: item.get(field) for field in key_fields}
-            grouped[key]["creative_count"] = 0
-            grouped[key]["independent_result_count"] = 0
-            for metric in metrics:
-                grouped[key][metric] = 0.0
-        target = grouped[key]
-        target["creative_count"] += 1
-        unit = _performance_unit_key(item)
-        if unit in seen_units[key]:
-            continue
-        seen_units[key].add(unit)
-        target["independent_result_count"] += 1
+    codes, keys = factorize(tuple(item.get(field) for field in key_fields) for item in rows)
+    groups = len(keys)
+
+    # Each performance unit counts once per group; repeats only add to creative_count.
+    seen_units: set[tuple[int, str]] = set()
+    independent = []
+    for index, (code, item) in enumerate(zip(codes.tolist(), rows)):
+        unit = (code, _performance_unit_key(item))
+        if unit not in seen_units:
+            seen_units.add(unit)
+            independent.append(index)
+    unit_rows = [rows[index] for index in independent]
+    unit_codes = codes[independent]
+
+    summed = [metric for metric in metrics if metric not in _DERIVED_METRICS | _AVERAGED_METRICS]
+    averaged = [metric for metric in metrics if metric in _AVERAGED_METRICS]
+    values = columns(unit_rows, summed + averaged)
+    sums = {metric: grouped_sum(unit_codes, values[metric], groups) for metric in summed}
+    zeros = np.zeros(groups)
+    ratios = derive_ratios(
+        sums.get("impressions", zeros),
+        sums.get("clicks", zeros),
+        sums.get("spend", zeros),
+        sums.get("conversions", zeros),
+        sums.get("revenue", zeros),
+    )
+    derived = {
+        **sums,
+        "ctr_percent": ratios["ctr"],
+        "cpc": ratios["cpc"],
+        "cpm": ratios["cpm"],
+        "cpa": ratios["cpa"],
+        "roas": ratios["roas"],
+        **{metric: grouped_mean(unit_codes, values[metric], groups) for metric in averaged},
+    }
+    columns_out = {metric: derived[metric].tolist() for metric in metrics}
+    creative_counts = grouped_count(codes, groups).tolist()
+    unit_counts = grouped_count(unit_codes, groups).tolist()
+
+    output = []
+    for index, key in enumerate(keys):
+        target: dict[str, Any] = dict(zip(key_fields, key))
+        target["creative_count"] = creative_counts[index]
+        target["independent_result_count"] = unit_counts[index]
         for metric in metrics:
-            if metric in {"ctr_percent", "cpc", "cpm", "cpa", "roas", "qualification_score", "attribution_confidence"}:
-                continue
-            target[metric] += _to_float(item.get(metric))
-
-    for key, target in grouped.items():
-        impressions = _to_float(target.get("impressions"))
-        clicks = _to_float(target.get("clicks"))
-        spend = _to_float(target.get("spend"))
-        conversions = _to_float(target.get("conversions"))
-        revenue = _to_float(target.get("revenue"))
-        matching_units = {}
-        for item in rows:
-            if all(item.get(field) == target.get(field) for field in key_fields):
-                matching_units.setdefault(_performance_unit_key(item), item)
-        if "ctr_percent" in metrics:
-            target["ctr_percent"] = (clicks / impressions * 100) if impressions else 0
-        if "cpc" in metrics:
-            target["cpc"] = spend / clicks if clicks else 0
-        if "cpm" in metrics:
-            target["cpm"] = spend / impressions * 1000 if impressions else 0
-        if "cpa" in metrics:
-            target["cpa"] = spend / conversions if conversions else 0
-        if "roas" in metrics:
-            target["roas"] = revenue / spend if spend else 0
-        for metric in {"qualification_score", "attribution_confidence"} & set(metrics):
-            vals = [_to_float(item.get(metric)) for item in matching_units.values()]
-            target[metric] = sum(vals) / len(vals) if vals else 0
-
-    return sorted(grouped.values(), key=lambda row: (_to_float(row.get("spend")), _to_int(row.get("impressions"))), reverse=True)
-
-def _creative_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[list[str], list[list[Any]]]:
+            target[metric] = columns_out[metric][index]
+        output.append(target)
+
+    return sorted(output, key=lambda row: (_to_float(row.get("spend")), _to_int(row.get("impressions"))), reverse=True)
+
+def _creative_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[list[str], Iterator[list[Any]]]:
     base = [
         "Source", "Account ID", "Campaign ID", "Campaign Name",
         "Line Item ID", "Line Item Name", "Ad ID", "Creative ID",
@@ -247,11 +252,14 @@ def _creative_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[
         "Headline", "Primary Text", "CTA", "Image URL", "Video ID",
     ]
     headers = base + [METRIC_LABELS[metric] for metric in metrics] + ["First Seen", "Last Changed"]
-    rows = []
+    return headers, _creative_values(evidence, metrics)
+
+
+def _creative_values(evidence: list[dict[str, Any]], metrics: list[str]) -> Iterator[list[Any]]:
     for item in evidence:
         copy, _image, video = _features(item)
         raw = _raw(item)
-        rows.append([
+        yield [
             SOURCE_LABELS.get(item.get("source"), _title(item.get("source"))),
             item.get("source_account_id"), item.get("campaign_id"), item.get("campaign_name"),
             item.get("ad_group_id"), raw.get("adSetName") or raw.get("ad_group_name") or raw.get("assetGroupName"),
@@ -262,21 +270,23 @@ def _creative_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[
             raw.get("videoId") or video.get("video_id"),
             *[_metric_value(item, metric) for metric in metrics],
             _timestamp_label(item.get("firstSeenAt")), _timestamp_label(item.get("lastChangedAt")),
-        ])
-    return headers, rows
+        ]
 
 
-def _intelligence_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[list[str], list[list[Any]]]:
+def _intelligence_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tuple[list[str], Iterator[list[Any]]]:
     headers = [
         "Evidence ID", "Source", "Campaign ID", "Line Item ID", "Creative ID", "Asset ID",
         "Evidence Status", "Visual Style", "Composition", "Background", "Imagery Type",
         "Emotional Tone", "Dominant Colors", "Headline Opener", "CTA Opener",
         "Headline Length", "Product Prominence (%)",
     ] + [METRIC_LABELS[metric] for metric in metrics]
-    rows = []
+    return headers, _intelligence_values(evidence, metrics)
+
+
+def _intelligence_values(evidence: list[dict[str, Any]], metrics: list[str]) -> Iterator[list[Any]]:
     for item in evidence:
         copy, image, _video = _features(item)
-        rows.append([
+        yield [
             item.get("id"), SOURCE_LABELS.get(item.get("source"), _title(item.get("source"))),
             item.get("campaign_id"), item.get("ad_group_id"), item.get("creative_id"), item.get("external_asset_id"),
             item.get("evidence_status"), image.get("visual_style"), image.get("composition"),
@@ -285,8 +295,7 @@ def _intelligence_rows(evidence: list[dict[str, Any]], metrics: list[str]) -> tu
             copy.get("first_headline_word"), copy.get("first_cta_word"), copy.get("headline_length"),
             image.get("product_prominence_percent"),
             *[_metric_value(item, metric) for metric in metrics],
-        ])
-    return headers, rows
+        ]
 
 
 def _dna_rows(summary: dict[str, Any]) -> tuple[list[str], list[list[Any]]]:
@@ -334,47 +343,42 @@ def _timeline_rows(sessions: list[dict[str, Any]]) -> tuple[list[str], list[list
     return headers, rows
 
 
-def _write_sheet(ws, headers: list[str], rows: list[list[Any]]) -> None:
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.fill = HEADER_FILL
-        cell.font = HEADER_FONT
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.freeze_panes = "A2"
-    ws.auto_filter.ref = f"A1:{get_column_letter(max(1, len(headers)))}{max(1, len(rows) + 1)}"
-    for row in rows:
-        ws.append(row)
-    for index, header in enumerate(headers, start=1):
-        max_length = len(str(header))
-        for cell in ws[get_column_letter(index)]:
-            max_length = max(max_length, min(len(str(cell.value or "")), 80))
-        ws.column_dimensions[get_column_letter(index)].width = min(max_length + 2, 48)
-    ws.sheet_view.showGridLines = False
+def _write_sheet(ws, headers: list[str], rows: Iterable[list[Any]]) -> None:
+    write_table(
+        ws,
+        headers,
+        rows,
+        fill=HEADER_FILL,
+        font=HEADER_FONT,
+        alignment=Alignment(horizontal="center", vertical="center"),
+        show_grid_lines=False,
+    )
 
 
 def _summary_sheet(ws, summary: dict[str, Any], evidence: list[dict[str, Any]], metrics: list[str], filters: dict[str, Any]) -> None:
-    ws["A1"] = "ADGen Performance Report"
-    ws["A1"].font = Font(size=18, bold=True)
-    ws["A3"] = "Generated"
-    ws["B3"] = _timestamp_label(int(time.time()))
-    ws["A4"] = "Scope"
-    ws["B4"] = "Accumulated Performance Intelligence evidence"
-    ws["A5"] = "Important"
-    ws["B5"] = "Campaign and line-item totals are creative-attributed aggregates and may not equal provider billing totals."
-    ws["A7"] = "Filters"
-    ws["A7"].fill = SUBHEADER_FILL
-    ws["A7"].font = BOLD_FONT
-    ws["A8"] = "Sources"
-    ws["B8"] = ", ".join(filters.get("sources") or ["All"])
-    ws["A9"] = "Evidence statuses"
-    ws["B9"] = ", ".join(filters.get("statuses") or ["All"])
-    ws["A10"] = "Evidence updated start"
-    ws["B10"] = filters.get("updated_start") or "Any"
-    ws["A11"] = "Evidence updated end"
-    ws["B11"] = filters.get("updated_end") or "Any"
-    ws["A13"] = "Learning Summary"
-    ws["A13"].fill = SUBHEADER_FILL
-    ws["A13"].font = BOLD_FONT
+    # Write-only sheets are written top to bottom, so layout, widths and grid
+    # lines are fixed before the first row.
+    ws.column_dimensions["A"].width = 30
+    ws.column_dimensions["B"].width = 70
+    ws.column_dimensions["D"].width = 30
+    ws.sheet_view.showGridLines = False
+
+    def subheader(value: str) -> Any:
+        return styled_cell(ws, value, fill=SUBHEADER_FILL, font=BOLD_FONT)
+
+    ws.append([styled_cell(ws, "ADGen Performance Report", font=Font(size=18, bold=True))])
+    ws.append([])
+    ws.append(["Generated", _timestamp_label(int(time.time()))])
+    ws.append(["Scope", "Accumulated Performance Intelligence evidence"])
+    ws.append(["Important", "Campaign and line-item totals are creative-attributed aggregates and may not equal provider billing totals."])
+    ws.append([])
+    ws.append([subheader("Filters")])
+    ws.append(["Sources", ", ".join(filters.get("sources") or ["All"])])
+    ws.append(["Evidence statuses", ", ".join(filters.get("statuses") or ["All"])])
+    ws.append(["Evidence updated start", filters.get("updated_start") or "Any"])
+    ws.append(["Evidence updated end", filters.get("updated_end") or "Any"])
+    ws.append([])
+    ws.append([subheader("Learning Summary"), None, None, subheader("Included Metrics")])
     summary_rows = [
         ("Evidence in export", len(evidence)), ("Overall retained evidence", summary.get("evidenceCount", 0)),
         ("Qualified evidence", summary.get("qualifiedCount", 0)), ("Positive signals", summary.get("positiveCount", 0)),
@@ -382,18 +386,41 @@ def _summary_sheet(ws, summary: dict[str, Any], evidence: list[dict[str, Any]],
         ("Average positive CTR (%)", summary.get("averagePositiveCtrPercent")),
         ("Average positive ROAS", summary.get("averagePositiveRoas")),
     ]
-    for row_index, (label, value) in enumerate(summary_rows, start=14):
-        ws.cell(row=row_index, column=1, value=label)
-        ws.cell(row=row_index, column=2, value=value)
-    ws["D13"] = "Included Metrics"
-    ws["D13"].fill = SUBHEADER_FILL
-    ws["D13"].font = BOLD_FONT
-    for row_index, metric in enumerate(metrics, start=14):
-        ws.cell(row=row_index, column=4, value=METRIC_LABELS[metric])
-    ws.column_dimensions["A"].width = 30
-    ws.column_dimensions["B"].width = 70
-    ws.column_dimensions["D"].width = 30
-    ws.sheet_view.showGridLines = False
+    metric_labels = [METRIC_LABELS[metric] for metric in metrics]
+    for index in range(max(len(summary_rows), len(metric_labels))):
+        label, value = summary_rows[index] if index < len(summary_rows) else (None, None)
+        ws.append([label, value, None, metric_labels[index] if index < len(metric_labels) else None])
+
+
+def _campaign_rows(rows: list[dict[str, Any]], metrics: list[str], *, line_items: bool = False) -> tuple[list[str], Iterator[list[Any]]]:
+    ids = ["Line Item ID"] if line_items else []
+    headers = ["Source", "Account ID", "Campaign ID", "Campaign Name", *ids, "Creative Count"] + [METRIC_LABELS[m] for m in metrics]
+    values = (
+        [
+            SOURCE_LABELS.get(r.get("source"), _title(r.get("source"))), r.get("source_account_id"), r.get("campaign_id"), r.get("campaign_name"),
+            *([r.get("ad_group_id")] if line_items else []), r.get("creative_count"), *[_metric_value(r, m) for m in metrics],
+        ]
+        for r in rows
+    )
+    return headers, values
+
+
+def _sections(data: dict[str, Any]) -> Iterator[tuple[str, str, tuple[list[str], Iterable[list[Any]]]]]:
+    """(sheet title, CSV file name, (headers, rows)) for each selected table section."""
+    sections = set(data["sections"])
+    metrics = data["metrics"]
+    if "campaigns" in sections:
+        yield "Campaigns", "campaigns.csv", _campaign_rows(data["campaigns"], metrics)
+    if "line_items" in sections:
+        yield "Line Items", "line_items.csv", _campaign_rows(data["line_items"], metrics, line_items=True)
+    if "creatives" in sections:
+        yield "Creatives", "creatives.csv", _creative_rows(data["evidence"], metrics)
+    if "intelligence" in sections:
+        yield "Intelligence", "intelligence.csv", _intelligence_rows(data["evidence"], metrics)
+    if "creative_dna" in sections:
+        yield "Creative DNA", "creative_dna.csv", _dna_rows(data["summary"])
+    if "learning_timeline" in sections:
+        yield "Learning Timeline", "learning_timeline.csv", _timeline_rows(data["sessions"])
 
 
 def build_report_data(
@@ -441,84 +468,33 @@ def build_report_data(
     }
 
 
-def build_excel_report(uid: str, **kwargs: Any) -> tuple[bytes, str]:
+def build_excel_report(uid: str, **kwargs: Any) -> tuple[Iterator[bytes], str]:
     data = build_report_data(uid, **kwargs)
-    workbook = Workbook()
-    workbook.remove(workbook.active)
+    workbook = Workbook(write_only=True)
     workbook.properties.creator = "ADGen MCM"
     workbook.properties.title = "ADGen Performance Report"
     workbook.properties.description = "Performance Intelligence reporting export"
 
-    sections = set(data["sections"])
     metrics = data["metrics"]
-    if "summary" in sections:
+    if "summary" in data["sections"]:
         _summary_sheet(workbook.create_sheet("Summary"), data["summary"], data["evidence"], metrics, data["filters"])
 
-    if "campaigns" in sections:
-        headers = ["Source", "Account ID", "Campaign ID", "Campaign Name", "Creative Count"] + [METRIC_LABELS[m] for m in metrics]
-        rows = [[SOURCE_LABELS.get(r.get("source"), _title(r.get("source"))), r.get("source_account_id"), r.get("campaign_id"), r.get("campaign_name"), r.get("creative_count"), *[_metric_value(r, m) for m in metrics]] for r in data["campaigns"]]
-        _write_sheet(workbook.create_sheet("Campaigns"), headers, rows)
-
-    if "line_items" in sections:
-        headers = ["Source", "Account ID", "Campaign ID", "Campaign Name", "Line Item ID", "Creative Count"] + [METRIC_LABELS[m] for m in metrics]
-        rows = [[SOURCE_LABELS.get(r.get("source"), _title(r.get("source"))), r.get("source_account_id"), r.get("campaign_id"), r.get("campaign_name"), r.get("ad_group_id"), r.get("creative_count"), *[_metric_value(r, m) for m in metrics]] for r in data["line_items"]]
-        _write_sheet(workbook.create_sheet("Line Items"), headers, rows)
-
-    if "creatives" in sections:
-        headers, rows = _creative_rows(data["evidence"], metrics)
-        _write_sheet(workbook.create_sheet("Creatives"), headers, rows)
-
-    if "intelligence" in sections:
-        headers, rows = _intelligence_rows(data["evidence"], metrics)
-        _write_sheet(workbook.create_sheet("Intelligence"), headers, rows)
-
-    if "creative_dna" in sections:
-        headers, rows = _dna_rows(data["summary"])
-        _write_sheet(workbook.create_sheet("Creative DNA"), headers, rows)
-
-    if "learning_timeline" in sections:
-        headers, rows = _timeline_rows(data["sessions"])
-        _write_sheet(workbook.create_sheet("Learning Timeline"), headers, rows)
+    for title, _filename, (headers, rows) in _sections(data):
+        _write_sheet(workbook.create_sheet(title), headers, rows)
 
     if not workbook.sheetnames:
         _summary_sheet(workbook.create_sheet("Summary"), data["summary"], data["evidence"], metrics, data["filters"])
 
-    stream = io.BytesIO()
-    workbook.save(stream)
     timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d_%H%M%S")
-    return stream.getvalue(), f"ADGen_Performance_Report_{timestamp}.xlsx"
+    return workbook_chunks(workbook), f"ADGen_Performance_Report_{timestamp}.xlsx"
 
 
-def build_csv_zip(uid: str, **kwargs: Any) -> tuple[bytes, str]:
+def build_csv_zip(uid: str, **kwargs: Any) -> tuple[Iterator[bytes], str]:
     data = build_report_data(uid, **kwargs)
-    files: dict[str, tuple[list[str], list[list[Any]]]] = {}
-    metrics = data["metrics"]
-    sections = set(data["sections"])
-    if "campaigns" in sections:
-        headers = ["Source", "Account ID", "Campaign ID", "Campaign Name", "Creative Count"] + [METRIC_LABELS[m] for m in metrics]
-        rows = [[SOURCE_LABELS.get(r.get("source"), _title(r.get("source"))), r.get("source_account_id"), r.get("campaign_id"), r.get("campaign_name"), r.get("creative_count"), *[_metric_value(r, m) for m in metrics]] for r in data["campaigns"]]
-        files["campaigns.csv"] = (headers, rows)
-    if "line_items" in sections:
-        headers = ["Source", "Account ID", "Campaign ID", "Campaign Name", "Line Item ID", "Creative Count"] + [METRIC_LABELS[m] for m in metrics]
-        rows = [[SOURCE_LABELS.get(r.get("source"), _title(r.get("source"))), r.get("source_account_id"), r.get("campaign_id"), r.get("campaign_name"), r.get("ad_group_id"), r.get("creative_count"), *[_metric_value(r, m) for m in metrics]] for r in data["line_items"]]
-        files["line_items.csv"] = (headers, rows)
-    if "creatives" in sections:
-        files["creatives.csv"] = _creative_rows(data["evidence"], metrics)
-    if "intelligence" in sections:
-        files["intelligence.csv"] = _intelligence_rows(data["evidence"], metrics)
-    if "creative_dna" in sections:
-        files["creative_dna.csv"] = _dna_rows(data["summary"])
-    if "learning_timeline" in sections:
-        files["learning_timeline.csv"] = _timeline_rows(data["sessions"])
-
-    stream = io.BytesIO()
-    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
-        archive.writestr("report_metadata.json", json.dumps({"generatedAt": int(time.time()), **data["filters"], "metrics": metrics, "sections": data["sections"]}, indent=2))
-        for filename, (headers, rows) in files.items():
-            text = io.StringIO()
-            writer = csv.writer(text)
-            writer.writerow(headers)
-            writer.writerows(rows)
-            archive.writestr(filename, text.getvalue())
+    metadata = json.dumps({"generatedAt": int(time.time()), **data["filters"], "metrics": data["metrics"], "sections": data["sections"]}, indent=2)
+    content = csv_zip_chunks(
+        ((filename, headers, rows) for _sheet, filename, (headers, rows) in _sections(data)),
+        extra=[("report_metadata.json", metadata)],
+    )
     timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d_%H%M%S")
-    return stream.getvalue(), f"ADGen_Performance_Report_{timestamp}.zip"
+    return content, f"ADGen_Performance_Report_{timestamp}.zip"
@@ -1,4 +1,3 @@
-import io
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 
@@ -123,7 +122,7 @@ def intelligence_export_excel(
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Report generation failed: {str(exc)[:300]}") from exc
     return StreamingResponse(
-        io.BytesIO(content),
+        content,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -141,7 +140,7 @@ def intelligence_export_csv(
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Report generation failed: {str(exc)[:300]}") from exc
     return StreamingResponse(
-        io.BytesIO(content),
+        content,
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
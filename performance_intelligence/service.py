@@ -1,5 +1,9 @@
+import os
+import threading
 import time
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from typing import Any, Callable
 
 from integrations.google_ads.service import fetch_campaign_summary
 from integrations.google_ads.store import (
@@ -19,7 +23,13 @@ from integrations.meta_ads.store import (
 from .adapters.google_ads import ingest_google_ads
 from .adapters.meta_ads import ingest_meta_ads
 from .adapters.manual import ingest_manual_creative, ingest_manual_library
-from .extractors import analyze_copy, analyze_image, analyze_video_metadata
+from .extractors import (
+    analyze_copy,
+    analyze_image,
+    analyze_video_metadata,
+    vision_cache_report,
+    vision_cache_scope,
+)
 from .models import (
     AnalyzeCreativeRequest,
     CreativeFeatures,
@@ -39,6 +49,28 @@ from .store import (
     start_refresh_session,
 )
 
+# Refresh sources (manual library, Google Ads, Meta Ads) run concurrently on
+# threads owned by each refresh, at most REBUILD_SOURCE_WORKERS running across
+# the process. A source's wall-clock budget starts once it holds one of those
+# slots, so waiting behind other refreshes does not use it up; the wait itself
+# is bounded by REBUILD_SOURCE_QUEUE_SECONDS. A source that runs out of time
+# keeps running in the background: up to REBUILD_SOURCE_MAX_ABANDONED of them
+# give their slot back, beyond that they hold it until they finish. Media
+# analysis inside each source fans out separately (see
+# extractors.analyze_images).
+REBUILD_SOURCE_WORKERS = int(os.getenv("REBUILD_SOURCE_WORKERS", "6"))
+REBUILD_SOURCE_QUEUE_SECONDS = float(os.getenv("REBUILD_SOURCE_QUEUE_SECONDS", "120"))
+REBUILD_SOURCE_MAX_ABANDONED = int(os.getenv("REBUILD_SOURCE_MAX_ABANDONED", "3"))
+REBUILD_SOURCE_TIMEOUT_SECONDS = {
+    "manual": float(os.getenv("REBUILD_MANUAL_TIMEOUT_SECONDS", "300")),
+    "googleAds": float(os.getenv("REBUILD_GOOGLE_ADS_TIMEOUT_SECONDS", "600")),
+    "metaAds": float(os.getenv("REBUILD_META_ADS_TIMEOUT_SECONDS", "600")),
+}
+
+_source_slots = threading.BoundedSemaphore(max(1, REBUILD_SOURCE_WORKERS))
+_abandoned_lock = threading.Lock()
+_abandoned_sources = 0
+
 
 def _source_failure(exc: Exception) -> dict[str, Any]:
     return {
@@ -158,116 +190,249 @@ def _build_learning_changes(
         "recommendation": recommendation,
     }
 
+def _manual_source(uid: str, payload: RebuildRequest) -> dict[str, Any]:
+    return ingest_manual_library(
+        uid=uid,
+        analyze_media=payload.analyze_media,
+    )
+
+
+def _google_ads_source(uid: str, payload: RebuildRequest) -> dict[str, Any]:
+    started = time.perf_counter()
+    google_connection = get_google_connection(uid) or {}
+    customer_id = google_connection.get("selectedCustomerId")
+
+    if payload.sync_sources and customer_id:
+        report = fetch_campaign_summary(
+            uid,
+            customer_id=customer_id,
+            login_customer_id=google_connection.get(
+                "loginCustomerId"
+            ),
+            start_date=payload.google_date_range,
+            custom_start_date=payload.google_start_date,
+            custom_end_date=payload.google_end_date,
+        )
+        save_google_sync_summary(
+            uid,
+            summary=report.get("summary") or {},
+            campaigns=report.get("campaigns") or [],
+            synced_at=int(time.time()),
+        )
+    synced = time.perf_counter()
+
+    result = ingest_google_ads(
+        uid=uid,
+        date_range=payload.google_date_range,
+        start_date=payload.google_start_date,
+        end_date=payload.google_end_date,
+        analyze_media=payload.analyze_media,
+    )
+    result.setdefault("timings", {})["syncSeconds"] = round(synced - started, 3)
+    return result
+
+
+def _meta_ads_source(uid: str, payload: RebuildRequest) -> dict[str, Any]:
+    started = time.perf_counter()
+    meta_connection = get_meta_connection(uid) or {}
+    has_meta_account = bool(
+        meta_connection.get("selectedAdAccountId")
+    )
+
+    if payload.sync_sources and has_meta_account:
+        campaign_result = sync_campaign_performance(
+            uid,
+            date_range=payload.meta_date_range,
+            start_date=payload.meta_start_date,
+            end_date=payload.meta_end_date,
+        )
+        save_campaign_sync(
+            uid,
+            date_range=campaign_result["dateRange"],
+            summary=campaign_result["summary"],
+            campaigns=campaign_result["campaigns"],
+        )
+
+        creative_result = sync_creative_performance(
+            uid,
+            date_range=payload.meta_date_range,
+            start_date=payload.meta_start_date,
+            end_date=payload.meta_end_date,
+        )
+        save_creative_sync(
+            uid,
+            date_range=creative_result["dateRange"],
+            creatives=creative_result["creatives"],
+        )
+    synced = time.perf_counter()
+
+    result = ingest_meta_ads(
+        uid=uid,
+        date_range=payload.meta_date_range,
+        start_date=payload.meta_start_date,
+        end_date=payload.meta_end_date,
+        analyze_media=payload.analyze_media,
+    )
+    result.setdefault("timings", {})["syncSeconds"] = round(synced - started, 3)
+    return result
+
+
+class _SourceRun:
+    """One source of one refresh: its slot, start time and abandonment."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.timeout = REBUILD_SOURCE_TIMEOUT_SECONDS[name]
+        self.started = threading.Event()
+        self.started_at = 0.0
+        self._lock = threading.Lock()
+        self._holding = False
+        self._abandoned = False
+
+    def run(
+        self,
+        source: Callable[[str, RebuildRequest], dict[str, Any]],
+        uid: str,
+        payload: RebuildRequest,
+    ) -> tuple[dict[str, Any] | None, Exception | None, float]:
+        try:
+            if not _source_slots.acquire(timeout=REBUILD_SOURCE_QUEUE_SECONDS):
+                return None, TimeoutError(
+                    f"{self.name} waited {REBUILD_SOURCE_QUEUE_SECONDS:g}s for a free source slot"
+                ), 0.0
+            with self._lock:
+                self._holding = True
+        finally:
+            self.started_at = time.monotonic()
+            self.started.set()
+
+        started = time.perf_counter()
+        try:
+            return source(uid, payload), None, time.perf_counter() - started
+        except Exception as exc:
+            return None, exc, time.perf_counter() - started
+        finally:
+            self._finish()
+
+    def abandon(self) -> None:
+        """Stop waiting; give the slot back if the abandoned cap allows."""
+        global _abandoned_sources
+        with self._lock, _abandoned_lock:
+            if not self._holding or _abandoned_sources >= REBUILD_SOURCE_MAX_ABANDONED:
+                return
+            _abandoned_sources += 1
+            self._abandoned = True
+            self._holding = False
+        _source_slots.release()
+
+    def _finish(self) -> None:
+        global _abandoned_sources
+        with self._lock:
+            holding, self._holding = self._holding, False
+            abandoned = self._abandoned
+        if holding:
+            _source_slots.release()
+        if abandoned:
+            with _abandoned_lock:
+                _abandoned_sources -= 1
+
+
+def _run_sources(
+    uid: str,
+    payload: RebuildRequest,
+) -> tuple[dict[str, Any], dict[str, Any], int]:
+    """
+    Run the requested sources concurrently, one thread each.
+
+    Each source gets its own REBUILD_SOURCE_TIMEOUT_SECONDS budget from the
+    moment it starts running; a source that fails, cannot get a slot or
+    runs out of time is reported as failed without affecting the others. A
+    timed-out source keeps running in the background, so its evidence may
+    still land after this refresh. Returns (results, timings, failure count).
+    """
+    sources = [
+        (name, source)
+        for name, source, included in (
+            ("manual", _manual_source, payload.include_manual),
+            ("googleAds", _google_ads_source, payload.include_google_ads),
+            ("metaAds", _meta_ads_source, payload.include_meta_ads),
+        )
+        if included
+    ]
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, len(sources)),
+        thread_name_prefix="intelligence-source",
+    )
+    try:
+        submitted = [
+            (run, executor.submit(copy_context().run, run.run, source, uid, payload))
+            for run, source in ((_SourceRun(name), source) for name, source in sources)
+        ]
+    finally:
+        # Timed-out sources keep their thread; nothing here waits for them.
+        executor.shutdown(wait=False)
+
+    results: dict[str, Any] = {}
+    timings: dict[str, Any] = {}
+    failure_count = 0
+    for run, future in submitted:
+        name = run.name
+        run.started.wait()
+        try:
+            result, error, elapsed = future.result(
+                timeout=max(0.0, run.started_at + run.timeout - time.monotonic())
+            )
+        except FutureTimeoutError:
+            run.abandon()
+            failure_count += 1
+            results[name] = {
+                **_source_failure(TimeoutError(f"{name} did not finish within {run.timeout:g}s")),
+                "timedOut": True,
+            }
+            timings[name] = {"totalSeconds": round(run.timeout, 3)}
+            continue
+        if error is not None:
+            failure_count += 1
+            results[name] = _source_failure(error)
+            timings[name] = {"totalSeconds": round(elapsed, 3)}
+            continue
+        result = dict(result or {})
+        timings[name] = {
+            **(result.pop("timings", None) or {}),
+            "totalSeconds": round(elapsed, 3),
+        }
+        results[name] = _normalize_result(result)
+    return results, timings, failure_count
+
+
 def rebuild_intelligence(
     *,
     uid: str,
     payload: RebuildRequest,
 ) -> dict[str, Any]:
+    started = time.perf_counter()
     before_summary = get_summary(uid)
     before = _learning_snapshot(before_summary)
     session_id = start_refresh_session(uid, payload.model_dump())
     source_results: dict[str, Any] = {}
-    failure_count = 0
+    phases: dict[str, float] = {"startSeconds": round(time.perf_counter() - started, 3)}
+    timings: dict[str, Any] = {"phases": phases, "sources": {}}
 
     try:
-        if payload.include_manual:
-            try:
-                source_results["manual"] = _normalize_result(
-                    ingest_manual_library(
-                        uid=uid,
-                        analyze_media=payload.analyze_media,
-                    )
-                )
-            except Exception as exc:
-                failure_count += 1
-                source_results["manual"] = _source_failure(exc)
-
-        if payload.include_google_ads:
-            try:
-                google_connection = get_google_connection(uid) or {}
-                customer_id = google_connection.get("selectedCustomerId")
-
-                if payload.sync_sources and customer_id:
-                    report = fetch_campaign_summary(
-                        uid,
-                        customer_id=customer_id,
-                        login_customer_id=google_connection.get(
-                            "loginCustomerId"
-                        ),
-                        start_date=payload.google_date_range,
-                        custom_start_date=payload.google_start_date,
-                        custom_end_date=payload.google_end_date,
-                    )
-                    save_google_sync_summary(
-                        uid,
-                        summary=report.get("summary") or {},
-                        campaigns=report.get("campaigns") or [],
-                        synced_at=int(time.time()),
-                    )
-
-                source_results["googleAds"] = _normalize_result(
-                    ingest_google_ads(
-                        uid=uid,
-                        date_range=payload.google_date_range,
-                        start_date=payload.google_start_date,
-                        end_date=payload.google_end_date,
-                        analyze_media=payload.analyze_media,
-                    )
-                )
-            except Exception as exc:
-                failure_count += 1
-                source_results["googleAds"] = _source_failure(exc)
-
-        if payload.include_meta_ads:
-            try:
-                meta_connection = get_meta_connection(uid) or {}
-                has_meta_account = bool(
-                    meta_connection.get("selectedAdAccountId")
-                )
-
-                if payload.sync_sources and has_meta_account:
-                    campaign_result = sync_campaign_performance(
-                        uid,
-                        date_range=payload.meta_date_range,
-                        start_date=payload.meta_start_date,
-                        end_date=payload.meta_end_date,
-                    )
-                    save_campaign_sync(
-                        uid,
-                        date_range=campaign_result["dateRange"],
-                        summary=campaign_result["summary"],
-                        campaigns=campaign_result["campaigns"],
-                    )
-
-                    creative_result = sync_creative_performance(
-                        uid,
-                        date_range=payload.meta_date_range,
-                        start_date=payload.meta_start_date,
-                        end_date=payload.meta_end_date,
-                    )
-                    save_creative_sync(
-                        uid,
-                        date_range=creative_result["dateRange"],
-                        creatives=creative_result["creatives"],
-                    )
-
-                source_results["metaAds"] = _normalize_result(
-                    ingest_meta_ads(
-                        uid=uid,
-                        date_range=payload.meta_date_range,
-                        start_date=payload.meta_start_date,
-                        end_date=payload.meta_end_date,
-                        analyze_media=payload.analyze_media,
-                    )
-                )
-            except Exception as exc:
-                failure_count += 1
-                source_results["metaAds"] = _source_failure(exc)
+        with vision_cache_scope() as vision_counts:
+            phase_started = time.perf_counter()
+            source_results, timings["sources"], failure_count = _run_sources(uid, payload)
+            phases["sourcesSeconds"] = round(time.perf_counter() - phase_started, 3)
 
+        phase_started = time.perf_counter()
         after_summary = rebuild_summary(uid)
         after = _learning_snapshot(after_summary)
+        phases["summarySeconds"] = round(time.perf_counter() - phase_started, 3)
+
         status = "partial" if failure_count else "completed"
         learning_changes = _build_learning_changes(before, after, source_results)
+        vision_cache = vision_cache_report(vision_counts)
+        timings["totalSeconds"] = round(time.perf_counter() - started, 3)
         latest_refresh = finish_refresh_session(
             uid,
             session_id,
@@ -276,6 +441,8 @@ def rebuild_intelligence(
             before=before,
             after=after,
             learning_changes=learning_changes,
+            vision_cache=vision_cache,
+            timings=timings,
         )
         # Store the completed refresh metadata back into the returned summary.
         after_summary["latestRefresh"] = latest_refresh
@@ -288,16 +455,20 @@ def rebuild_intelligence(
             "before": before,
             "after": after,
             "learningChanges": learning_changes,
+            "visionCache": vision_cache,
+            "timings": timings,
             "summary": after_summary,
             "latestRefresh": latest_refresh,
         }
     except Exception as exc:
+        timings["totalSeconds"] = round(time.perf_counter() - started, 3)
         finish_refresh_session(
             uid,
             session_id,
             status="failed",
             sources=source_results,
             before=before,
+            timings=timings,
             error=str(exc)[:300],
         )
         raise
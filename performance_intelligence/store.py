@@ -13,6 +13,9 @@ from .models import PerformanceEvidence, QualificationThresholds
 ROOT_COLLECTION = "performance_intelligence"
 EVIDENCE_SUBCOLLECTION = "evidence"
 REFRESH_SUBCOLLECTION = "refresh_sessions"
+VISION_CACHE_COLLECTION = "performance_intelligence_vision_cache"
+EVIDENCE_READ_CHUNK = 100
+EVIDENCE_WRITE_ATTEMPTS = 3
 
 
 def stable_creative_id(*parts: Any) -> str:
@@ -75,6 +78,38 @@ def _content_hash(payload: dict[str, Any]) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
+def _prepare_evidence(
+    evidence: PerformanceEvidence,
+    existing: dict[str, Any],
+) -> tuple[dict[str, Any], str]:
+    incoming = evidence.model_dump()
+
+    # A fast refresh can skip media analysis. Preserve previously extracted
+    # traits rather than replacing them with empty feature sections.
+    previous_features = existing.get("features") or {}
+    incoming_features = incoming.get("features") or {}
+    for section in ("copy", "image", "video"):
+        if not incoming_features.get(section) and previous_features.get(section):
+            incoming_features[section] = previous_features[section]
+    incoming["features"] = incoming_features
+    return incoming, _content_hash(incoming)
+
+
+def _evidence_write(
+    incoming: dict[str, Any],
+    incoming_hash: str,
+    existing: dict[str, Any],
+    now: int,
+) -> dict[str, Any]:
+    return {
+        **incoming,
+        "contentHash": incoming_hash,
+        "firstSeenAt": existing.get("firstSeenAt") or now,
+        "lastChangedAt": now,
+        "updatedAt": now,
+    }
+
+
 def upsert_evidence(
     uid: str,
     evidence: PerformanceEvidence,
@@ -94,34 +129,84 @@ def upsert_evidence(
     now = int(time.time())
     existing_snap = ref.get()
     existing = existing_snap.to_dict() or {}
-    incoming = evidence.model_dump()
-
-    # A fast refresh can skip media analysis. Preserve previously extracted
-    # traits rather than replacing them with empty feature sections.
-    previous_features = existing.get("features") or {}
-    incoming_features = incoming.get("features") or {}
-    for section in ("copy", "image", "video"):
-        if not incoming_features.get(section) and previous_features.get(section):
-            incoming_features[section] = previous_features[section]
-    incoming["features"] = incoming_features
-
-    incoming_hash = _content_hash(incoming)
+    incoming, incoming_hash = _prepare_evidence(evidence, existing)
     if existing and existing.get("contentHash") == incoming_hash:
         return doc_id, "unchanged"
 
-    ref.set(
-        {
-            **incoming,
-            "contentHash": incoming_hash,
-            "firstSeenAt": existing.get("firstSeenAt") or now,
-            "lastChangedAt": now,
-            "updatedAt": now,
-        },
-        merge=True,
-    )
+    ref.set(_evidence_write(incoming, incoming_hash, existing, now), merge=True)
     return doc_id, "updated" if existing else "added"
 
 
+def upsert_evidence_bulk(
+    uid: str,
+    evidence: list[PerformanceEvidence],
+) -> dict[str, Any]:
+    """upsert_evidence() for a whole refresh.
+
+    Existing documents are read in EVIDENCE_READ_CHUNK-sized get_all batches
+    and only records whose content hash changed are written, through one
+    BulkWriter. Records are applied in order, so a repeated document id
+    behaves as it would with sequential upserts. Returns the per-record
+    (evidence id, change) pairs in input order plus added/updated/unchanged
+    counts; a record whose write still fails after EVIDENCE_WRITE_ATTEMPTS
+    is reported under "failed" (evidence id -> error) with change "failed"
+    instead of being counted.
+    """
+    db = get_db()
+    collection = root_ref(uid).collection(EVIDENCE_SUBCOLLECTION)
+    doc_ids = [evidence_document_id(item) for item in evidence]
+    refs = {doc_id: collection.document(doc_id) for doc_id in doc_ids}
+
+    existing: dict[str, dict[str, Any]] = {}
+    unique_refs = list(refs.values())
+    for start in range(0, len(unique_refs), EVIDENCE_READ_CHUNK):
+        for snap in db.get_all(unique_refs[start:start + EVIDENCE_READ_CHUNK]):
+            if snap.exists:
+                existing[snap.id] = snap.to_dict() or {}
+
+    now = int(time.time())
+    changes: list[tuple[str, str]] = []
+    writes: dict[str, dict[str, Any]] = {}
+    for doc_id, item in zip(doc_ids, evidence):
+        current = existing.get(doc_id) or {}
+        incoming, incoming_hash = _prepare_evidence(item, current)
+        if current and current.get("contentHash") == incoming_hash:
+            changes.append((doc_id, "unchanged"))
+            continue
+        payload = _evidence_write(incoming, incoming_hash, current, now)
+        changes.append((doc_id, "updated" if current else "added"))
+        writes[doc_id] = payload
+        existing[doc_id] = payload
+
+    failed: dict[str, str] = {}
+    if writes:
+        writer = db.bulk_writer()
+
+        def _on_error(error, _writer) -> bool:
+            if error.attempts < EVIDENCE_WRITE_ATTEMPTS:
+                return True
+            failed[error.operation.reference.id] = str(error.message)[:250]
+            return False
+
+        writer.on_write_error(_on_error)
+        for doc_id, payload in writes.items():
+            writer.set(refs[doc_id], payload, merge=True)
+        writer.close()
+
+    changes = [
+        (doc_id, "failed" if doc_id in failed and change != "unchanged" else change)
+        for doc_id, change in changes
+    ]
+    counts = Counter(change for _doc_id, change in changes)
+    return {
+        "added": counts["added"],
+        "updated": counts["updated"],
+        "unchanged": counts["unchanged"],
+        "changes": changes,
+        "failed": failed,
+    }
+
+
 def save_evidence(uid: str, evidence: PerformanceEvidence) -> str:
     doc_id, _change = upsert_evidence(uid, evidence)
     return doc_id
@@ -143,6 +228,37 @@ def get_evidence(uid: str, limit: int = 1000) -> list[dict[str, Any]]:
     ]
 
 
+def get_vision_analysis(cache_key: str) -> dict[str, Any] | None:
+    snap = (
+        get_db()
+        .collection(VISION_CACHE_COLLECTION)
+        .document(cache_key)
+        .get()
+    )
+    if not snap.exists:
+        return None
+    return snap.to_dict() or None
+
+
+def save_vision_analysis(
+    cache_key: str,
+    *,
+    analysis: dict[str, Any],
+    content_hash: str,
+    model: str,
+    prompt_version: str,
+) -> None:
+    get_db().collection(VISION_CACHE_COLLECTION).document(cache_key).set(
+        {
+            "analysis": analysis,
+            "contentHash": content_hash,
+            "model": model,
+            "promptVersion": prompt_version,
+            "createdAt": int(time.time()),
+        }
+    )
+
+
 def start_refresh_session(uid: str, request: dict[str, Any]) -> str:
     now = int(time.time())
     ref = (
@@ -181,6 +297,8 @@ def finish_refresh_session(
     before: dict[str, Any] | None = None,
     after: dict[str, Any] | None = None,
     learning_changes: dict[str, Any] | None = None,
+    vision_cache: dict[str, Any] | None = None,
+    timings: dict[str, Any] | None = None,
     error: str | None = None,
 ) -> dict[str, Any]:
     now = int(time.time())
@@ -197,6 +315,8 @@ def finish_refresh_session(
         "before": before or {},
         "after": after or {},
         "learningChanges": learning_changes or {},
+        "visionCache": vision_cache or {},
+        "timings": timings or {},
         "error": error,
         "finishedAt": now,
         "updatedAt": now,
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from firestore_async import run_blocking
+
+# Server-sent progress for generation and video jobs. set_generation_progress
+# and set_video_progress publish every stage to in-process subscribers; a
+# Firestore snapshot listener on the job doc covers updates written by other
+# processes (a separate job worker, another web instance).
+PROGRESS_STREAM_KEEPALIVE_SECONDS = float(os.getenv("PROGRESS_STREAM_KEEPALIVE_SECONDS", "15"))
+PROGRESS_STREAM_MAX_SECONDS = float(os.getenv("PROGRESS_STREAM_MAX_SECONDS", "1800"))
+
+TERMINAL_STATUSES = {"succeeded", "failed", "canceled"}
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def deliver(self, update: Dict[str, Any]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, dict(update))
+        except RuntimeError:
+            # Loop already closed; the stream is gone.
+            pass
+
+
+_lock = threading.Lock()
+_subscribers: Dict[Tuple[str, str], Set[_Subscriber]] = {}
+_stats = {"published": 0, "delivered": 0, "streamsOpened": 0, "streamsClosed": 0}
+
+
+def publish_progress(collection: str, job_id: Optional[str], update: Dict[str, Any]) -> None:
+    """Fan a progress update out to open streams for this job. Thread-safe."""
+    if not job_id:
+        return
+
+    with _lock:
+        _stats["published"] += 1
+        targets = list(_subscribers.get((collection, job_id), ()))
+        _stats["delivered"] += len(targets)
+
+    for subscriber in targets:
+        subscriber.deliver(update)
+
+
+def _subscribe(collection: str, job_id: str) -> _Subscriber:
+    subscriber = _Subscriber(asyncio.get_running_loop())
+    with _lock:
+        _subscribers.setdefault((collection, job_id), set()).add(subscriber)
+        _stats["streamsOpened"] += 1
+    return subscriber
+
+
+def _unsubscribe(collection: str, job_id: str, subscriber: _Subscriber) -> None:
+    with _lock:
+        key = (collection, job_id)
+        subs = _subscribers.get(key)
+        if subs is not None:
+            subs.discard(subscriber)
+            if not subs:
+                _subscribers.pop(key, None)
+        _stats["streamsClosed"] += 1
+
+
+def progress_stream_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "openStreams": sum(len(subs) for subs in _subscribers.values()),
+            "jobsWatched": len(_subscribers),
+        }
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _watch_document(ref, subscriber: _Subscriber):
+    def _on_snapshot(snapshots, _changes, _read_time):
+        for snap in snapshots:
+            if snap.exists:
+                subscriber.deliver(snap.to_dict() or {})
+
+    return ref.on_snapshot(_on_snapshot)
+
+
+async def open_progress_stream(
+    db,
+    collection: str,
+    job_id: str,
+    request: Request,
+    *,
+    authorize: Callable[[Dict[str, Any]], None],
+    view: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+    tick: Optional[Callable[[], Awaitable[None]]] = None,
+    tick_seconds: float = 5.0,
+) -> StreamingResponse:
+    """
+    Open an SSE stream for one job document.
+
+    `authorize` raises HTTPException when the caller may not see the job,
+    `view` shapes the public payload, and the optional `tick` runs
+    periodically for jobs whose progress still has to be driven from here.
+    The stream ends once the job reaches a terminal status.
+    """
+    subscriber = _subscribe(collection, job_id)
+    ref = db.collection(collection).document(job_id)
+
+    try:
+        snap = await run_blocking(ref.get)
+        if not snap.exists:
+            raise HTTPException(status_code=404, detail="Progress job not found.")
+        state = snap.to_dict() or {}
+        authorize(state)
+    except Exception:
+        _unsubscribe(collection, job_id, subscriber)
+        raise
+
+    watch = None
+    if str(state.get("status") or "").lower() not in TERMINAL_STATUSES:
+        try:
+            watch = await run_blocking(_watch_document, ref, subscriber)
+        except Exception as exc:
+            print("PROGRESS STREAM WATCH ERROR:", job_id, repr(exc), flush=True)
+
+    async def _events():
+        nonlocal state
+        started = time.monotonic()
+        last_tick = started
+        last_sent: Optional[Dict[str, Any]] = None
+        try:
+            while True:
+                payload = view(job_id, state)
+                if payload != last_sent:
+                    last_sent = payload
+                    yield _sse("progress", payload)
+
+                if str(state.get("status") or "").lower() in TERMINAL_STATUSES:
+                    yield _sse("done", payload)
+                    return
+
+                now = time.monotonic()
+                if now - started >= PROGRESS_STREAM_MAX_SECONDS:
+                    yield _sse("timeout", {"jobId": job_id})
+                    return
+
+                timeout = PROGRESS_STREAM_KEEPALIVE_SECONDS
+                if tick is not None:
+                    timeout = min(timeout, max(0.1, tick_seconds - (now - last_tick)))
+
+                try:
+                    update = await asyncio.wait_for(subscriber.queue.get(), timeout=timeout)
+                    state = {**state, **update}
+                    while not subscriber.queue.empty():
+                        state = {**state, **subscriber.queue.get_nowait()}
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    if tick is not None and time.monotonic() - last_tick >= tick_seconds:
+                        last_tick = time.monotonic()
+                        try:
+                            await tick()
+                        except Exception as exc:
+                            print("PROGRESS STREAM TICK ERROR:", job_id, repr(exc), flush=True)
+                    else:
+                        yield ": keep-alive\n\n"
+        finally:
+            _unsubscribe(collection, job_id, subscriber)
+            if watch is not None:
+                try:
+                    watch.unsubscribe()
+                except Exception:
+                    pass
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def bearer_from_query(authorization: Optional[str], access_token: Optional[str]) -> Optional[str]:
+    """EventSource cannot set headers, so streams also accept ?access_token=."""
+    if authorization:
+        return authorization
+    if access_token:
+        return f"Bearer {access_token}"
+    return None
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from google.api_core import exceptions as gexc
+
+# Progress stages for one job often land milliseconds apart. The writer sends
+# the first stage straight away, then folds any further stages that arrive
+# within PROGRESS_COALESCE_SECONDS into a single deferred update. Terminal
+# stages flush immediately together with whatever is still pending, so the
+# final result and the last stage go out as one write.
+#
+# Deferred updates carry a last-update-time precondition from the writer's
+# previous write. If anything else wrote the job doc in between (for example
+# a direct terminal update in video_jobs), the stale stage is dropped rather
+# than written over newer data.
+PROGRESS_COALESCE_SECONDS = float(os.getenv("PROGRESS_COALESCE_SECONDS", "0.75"))
+_LAST_WRITE_TTL_SECONDS = 600.0
+
+
+class _Pending:
+    __slots__ = ("ref", "payload", "deadline", "update_time")
+
+    def __init__(self, ref, payload: Dict[str, Any], deadline: float, update_time):
+        self.ref = ref
+        self.payload = payload
+        self.deadline = deadline
+        self.update_time = update_time
+
+
+class ProgressWriter:
+    def __init__(self, window: float = PROGRESS_COALESCE_SECONDS):
+        self.window = max(0.0, window)
+        self._cond = threading.Condition()
+        self._pending: Dict[str, _Pending] = {}
+        self._last: Dict[str, Tuple[float, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "requested": 0,
+            "written": 0,
+            "coalesced": 0,
+            "droppedStale": 0,
+            "errors": 0,
+        }
+
+    def write(self, ref, payload: Dict[str, Any], *, terminal: bool = False, create: bool = False) -> None:
+        key = ref.path
+        now = time.monotonic()
+
+        with self._cond:
+            self.stats["requested"] += 1
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                payload = {**pending.payload, **payload}
+                self.stats["coalesced"] += 1
+
+            last = self._last.get(key)
+            if not terminal and self.window > 0 and last is not None and now - last[0] < self.window:
+                self._pending[key] = _Pending(ref, payload, last[0] + self.window, last[1])
+                self._ensure_thread()
+                self._cond.notify()
+                return
+
+        self._write_now(ref, key, payload, terminal=terminal, create=create)
+
+    def _write_now(self, ref, key: str, payload: Dict[str, Any], *, terminal: bool, create: bool) -> None:
+        try:
+            if create:
+                result = ref.set(payload, merge=True)
+            else:
+                result = ref.update(payload)
+        except Exception:
+            with self._cond:
+                self.stats["errors"] += 1
+                self._last.pop(key, None)
+            raise
+
+        with self._cond:
+            self.stats["written"] += 1
+            if terminal:
+                self._last.pop(key, None)
+            else:
+                self._last[key] = (time.monotonic(), getattr(result, "update_time", None))
+                if len(self._last) > 2048:
+                    self._prune_last()
+
+    def _write_deferred(self, key: str, pending: _Pending) -> None:
+        option = None
+        if pending.update_time is not None:
+            option = pending.ref._client.write_option(last_update_time=pending.update_time)
+
+        try:
+            result = pending.ref.update(pending.payload, option=option)
+        except gexc.FailedPrecondition:
+            with self._cond:
+                self.stats["droppedStale"] += 1
+                self._last.pop(key, None)
+            return
+        except Exception as exc:
+            print("PROGRESS WRITE ERROR:", key, repr(exc), flush=True)
+            with self._cond:
+                self.stats["errors"] += 1
+                self._last.pop(key, None)
+            return
+
+        with self._cond:
+            self.stats["written"] += 1
+            if key in self._last:
+                self._last[key] = (time.monotonic(), getattr(result, "update_time", None))
+
+    def _prune_last(self) -> None:
+        cutoff = time.monotonic() - _LAST_WRITE_TTL_SECONDS
+        for key in [k for k, (at, _ut) in self._last.items() if at < cutoff]:
+            self._last.pop(key, None)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name="progress-writer",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _take_due(self, force: bool = False):
+        now = time.monotonic()
+        due = [
+            (key, pending)
+            for key, pending in self._pending.items()
+            if force or pending.deadline <= now
+        ]
+        for key, _pending in due:
+            self._pending.pop(key, None)
+        return due
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                next_deadline = min(p.deadline for p in self._pending.values())
+                delay = next_deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                due = self._take_due()
+
+            for key, pending in due:
+                self._write_deferred(key, pending)
+
+    def flush(self) -> None:
+        """Write every pending update now (shutdown, tests)."""
+        with self._cond:
+            due = self._take_due(force=True)
+        for key, pending in due:
+            self._write_deferred(key, pending)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "pending": len(self._pending),
+                "windowSeconds": self.window,
+            }
+
+
+_writer = ProgressWriter()
+
+
+def write_progress(ref, payload: Dict[str, Any], *, terminal: bool = False, create: bool = False) -> None:
+    _writer.write(ref, payload, terminal=terminal, create=create)
+
+
+def flush_progress_writes() -> None:
+    _writer.flush()
+
+
+def progress_writer_stats() -> Dict[str, Any]:
+    return _writer.snapshot()
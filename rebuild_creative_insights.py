@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+
+from dotenv import load_dotenv
+
+from auth_helpers import get_db
+from creative_insights import rebuild_creative_insights
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild materialized creative insights documents."
+    )
+    parser.add_argument(
+        "--uid",
+        action="append",
+        default=[],
+        help="User to rebuild. Repeat for several users; omit to rebuild every user.",
+    )
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    db = get_db()
+
+    uids = args.uid or [ref.id for ref in db.collection("users").list_documents()]
+
+    rebuilt = 0
+    for uid in uids:
+        document = rebuild_creative_insights(db, uid)
+        rebuilt += 1
+        print(f"Rebuilt {uid}: {int(document['totals']['count'])} creative(s) with performance.")
+
+    print(f"\nRebuild complete: {rebuilt} user(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
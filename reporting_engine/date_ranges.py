@@ -1,4 +1,5 @@
 from __future__ import annotations
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from typing import Any
@@ -53,6 +54,20 @@ def comparison_window(window: DateWindow, comparison: str) -> DateWindow | None:
     return DateWindow(start, end, f"{start:%b %-d, %Y} – {end:%b %-d, %Y}")
 
 
+def period_label(d: date, split: str) -> str:
+    if split == "day":
+        return d.isoformat()
+    if split == "week":
+        monday = d.fromordinal(d.toordinal() - d.weekday())
+        sunday = d.fromordinal(monday.toordinal() + 6)
+        return f"{monday:%b %d} – {sunday:%b %d, %Y}"
+    if split == "month":
+        return d.strftime("%B %Y")
+    if split == "quarter":
+        return f"Q{((d.month - 1) // 3) + 1} {d.year}"
+    return str(d.year)
+
+
 def parse_row_date(row: dict[str, Any]) -> date | None:
     for key in ("date", "reportDate", "performanceDate", "day", "createdAt", "created_at", "updatedAt", "updated_at"):
         value = row.get(key)
@@ -63,3 +78,31 @@ def parse_row_date(row: dict[str, Any]) -> date | None:
             return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
         except Exception: pass
     return None
+
+
+# Rows carry a precomputed date ordinal (date.toordinal(); 0 when undated) so
+# windows are bisect slices over rows kept sorted by ordinal, instead of a
+# parse_row_date() per row per filter. Undated rows sort first.
+UNDATED = 0
+
+
+def row_ordinal(row: dict[str, Any]) -> int:
+    parsed = parse_row_date(row)
+    return parsed.toordinal() if parsed else UNDATED
+
+
+def sort_by_ordinal(rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[int]]:
+    keyed = sorted(((row_ordinal(row), index) for index, row in enumerate(rows)))
+    return [rows[index] for _, index in keyed], [ordinal for ordinal, _ in keyed]
+
+
+def window_bounds(ordinals: list[int], window: DateWindow) -> tuple[int, int]:
+    """Index range of the sorted ordinals inside the window; every row when unbounded."""
+    if not window.start or not window.end:
+        return 0, len(ordinals)
+    return bisect_left(ordinals, window.start.toordinal()), bisect_right(ordinals, window.end.toordinal())
+
+
+def undated_count(ordinals: list[int]) -> int:
+    return bisect_right(ordinals, UNDATED)
+
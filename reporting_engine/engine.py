@@ -1,11 +1,25 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date
 from typing import Any
 
-from .date_ranges import comparison_window, parse_row_date, resolve_window
-from .metrics import METRICS, aggregate
+import numpy as np
+
+from metrics_engine import columns, factorize, grouped_count
+
+from .date_ranges import (
+    UNDATED,
+    comparison_window,
+    parse_row_date,
+    period_label,
+    resolve_window,
+    sort_by_ordinal,
+    undated_count,
+    window_bounds,
+)
+from .metrics import ADDITIVE, METRICS, derive, derive_groups, sum_groups
+from .rollups import Rollups, group_cells
+from .rollups import build_rollups as build_rollup_cubes
 
 SOURCE_KEYS = {
     "googleAds": "googleAds",
@@ -23,56 +37,39 @@ NON_TIME_SPLITS = {
     "placement",
 }
 SUPPORTED_SPLITS = TIME_SPLITS | NON_TIME_SPLITS
-
-
-def _period(d: date, split: str) -> str:
-    if split == "day":
-        return d.isoformat()
-    if split == "week":
-        monday = d.fromordinal(d.toordinal() - d.weekday())
-        sunday = d.fromordinal(monday.toordinal() + 6)
-        return f"{monday:%b %d} – {sunday:%b %d, %Y}"
-    if split == "month":
-        return d.strftime("%B %Y")
-    if split == "quarter":
-        return f"Q{((d.month - 1) // 3) + 1} {d.year}"
-    return str(d.year)
+# Provider payload key holding {row list key: date ordinals}; the snapshot
+# keeps each row list sorted by ordinal (see date_ranges.sort_by_ordinal).
+ORDINALS_KEY = "_ordinals"
+# split -> (row fields tried in order, label when none is set)
+_SPLIT_FIELDS = {
+    "platform": (("providerLabel", "platform", "provider"), "Unknown"),
+    "campaign": (("campaignName", "name"), "Untitled campaign"),
+    "ad_group": (("adGroupName", "adSetName", "adsetName"), "Not available"),
+    "creative": (("creativeName", "adName", "title"), "Not available"),
+    "device": (("device",), "Not available"),
+    "country": (("country",), "Not available"),
+    "placement": (("placement",), "Not available"),
+}
+_EMPTY_VALUES = {
+    "",
+    "All",
+    "Unknown",
+    "Not available",
+    "Date not available",
+}
 
 
 def _split_value(row: dict[str, Any], split: str) -> str:
     if split in TIME_SPLITS:
         parsed = parse_row_date(row)
-        return _period(parsed, split) if parsed else "Date not available"
-
-    values = {
-        "platform": (
-            row.get("providerLabel")
-            or row.get("platform")
-            or row.get("provider")
-            or "Unknown"
-        ),
-        "campaign": (
-            row.get("campaignName")
-            or row.get("name")
-            or "Untitled campaign"
-        ),
-        "ad_group": (
-            row.get("adGroupName")
-            or row.get("adSetName")
-            or row.get("adsetName")
-            or "Not available"
-        ),
-        "creative": (
-            row.get("creativeName")
-            or row.get("adName")
-            or row.get("title")
-            or "Not available"
-        ),
-        "device": row.get("device") or "Not available",
-        "country": row.get("country") or "Not available",
-        "placement": row.get("placement") or "Not available",
-    }
-    return str(values.get(split, "All"))
+        return period_label(parsed, split) if parsed else "Date not available"
+
+    keys, default = _SPLIT_FIELDS.get(split, ((), "All"))
+    for key in keys:
+        value = row.get(key)
+        if value:
+            return str(value)
+    return default
 
 
 def _requires_daily_rows(
@@ -91,14 +88,26 @@ def _can_fallback_to_campaign_snapshot(splits: list[str]) -> bool:
     return not any(split in TIME_SPLITS for split in splits)
 
 
+def _indexed_rows(
+    payload: dict[str, Any],
+    key: str,
+) -> tuple[list[dict[str, Any]], list[int]]:
+    rows = payload.get(key) or []
+    ordinals = (payload.get(ORDINALS_KEY) or {}).get(key)
+    if ordinals is None or len(ordinals) != len(rows):
+        return sort_by_ordinal(rows)
+    return rows, ordinals
+
+
 def _source_rows(
     snapshot: dict[str, Any],
     providers: list[str],
     *,
     needs_daily: bool,
     allow_snapshot_fallback: bool,
-) -> tuple[list[dict[str, Any]], list[str], list[str]]:
-    rows: list[dict[str, Any]] = []
+) -> tuple[list[tuple[list[dict[str, Any]], list[int]]], list[str], list[str]]:
+    """Per-provider (rows, ordinals) segments, each sorted by date ordinal."""
+    segments: list[tuple[list[dict[str, Any]], list[int]]] = []
     missing_daily: list[str] = []
     fallback_sources: list[str] = []
 
@@ -106,64 +115,95 @@ def _source_rows(
         payload = snapshot.get(SOURCE_KEYS.get(key, key)) or {}
 
         if key == "libraryPerformance":
-            rows.extend(payload.get("creatives") or [])
+            segments.append(_indexed_rows(payload, "creatives"))
             continue
 
         if needs_daily:
-            daily = payload.get("dailyCampaignPerformance") or []
-            if daily:
-                rows.extend(daily)
+            if payload.get("dailyCampaignPerformance"):
+                segments.append(_indexed_rows(payload, "dailyCampaignPerformance"))
                 continue
 
             source_label = payload.get("accountName") or key
             missing_daily.append(source_label)
 
             if allow_snapshot_fallback:
-                campaign_rows = payload.get("campaigns") or []
-                if campaign_rows:
-                    rows.extend(campaign_rows)
+                if payload.get("campaigns"):
+                    segments.append(_indexed_rows(payload, "campaigns"))
                     fallback_sources.append(source_label)
             continue
 
-        rows.extend(payload.get("campaigns") or [])
+        segments.append(_indexed_rows(payload, "campaigns"))
 
-    return rows, missing_daily, fallback_sources
+    return segments, missing_daily, fallback_sources
 
 
-def _filter(
-    rows: list[dict[str, Any]],
+def _window_rows(
+    segments: list[tuple[list[dict[str, Any]], list[int]]],
     window,
     *,
     allow_undated_rows: bool = False,
-) -> list[dict[str, Any]]:
-    if not window.start or not window.end:
-        return rows
+) -> tuple[list[dict[str, Any]], list[int]]:
+    """Rows (and their ordinals) inside the window: one bisect slice per segment."""
+    rows: list[dict[str, Any]] = []
+    ordinals: list[int] = []
+    bounded = bool(window.start and window.end)
 
-    result: list[dict[str, Any]] = []
-    for row in rows:
-        parsed = parse_row_date(row)
-        if parsed and window.start <= parsed <= window.end:
-            result.append(row)
-        elif allow_undated_rows and parsed is None:
-            result.append(row)
-    return result
+    for segment_rows, segment_ordinals in segments:
+        if allow_undated_rows and bounded:
+            undated = undated_count(segment_ordinals)
+            rows.extend(segment_rows[:undated])
+            ordinals.extend(segment_ordinals[:undated])
+        lo, hi = window_bounds(segment_ordinals, window)
+        rows.extend(segment_rows[lo:hi])
+        ordinals.extend(segment_ordinals[lo:hi])
+    return rows, ordinals
+
+
+def _split_column(
+    rows: list[dict[str, Any]],
+    ordinals: list[int],
+    split: str,
+) -> list[str]:
+    if split not in TIME_SPLITS:
+        return [_split_value(row, split) for row in rows]
+
+    labels: dict[int, str] = {UNDATED: "Date not available"}
+    column = []
+    for ordinal in ordinals:
+        label = labels.get(ordinal)
+        if label is None:
+            label = labels[ordinal] = period_label(date.fromordinal(ordinal), split)
+        column.append(label)
+    return column
 
 
 def _group(
     rows: list[dict[str, Any]],
+    ordinals: list[int],
     splits: list[str],
     metrics: list[str],
-) -> list[dict[str, Any]]:
-    grouped: dict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
-
-    for row in rows:
-        key = tuple(_split_value(row, split) for split in splits)
-        grouped[key].append(row)
+    comparison_rows: list[dict[str, Any]],
+) -> tuple[list[dict[str, Any]], dict[str, Any], dict[str, Any]]:
+    """
+    Split rows, totals and comparison totals from one pass over the metrics:
+    comparison rows are summed as one extra group after the split groups.
+    """
+    split_columns = [_split_column(rows, ordinals, split) for split in splits]
+    codes, keys = factorize(
+        zip(*split_columns) if split_columns else (() for _ in rows)
+    )
+    groups = len(keys)
+    counts = grouped_count(codes, groups)
+    sums = sum_groups(
+        rows + comparison_rows,
+        np.concatenate([codes, np.full(len(comparison_rows), groups, dtype=codes.dtype)]),
+        groups + 1,
+    )
+    split_sums = {name: values[:groups] for name, values in sums.items()}
 
     result: list[dict[str, Any]] = []
-    for key, group in grouped.items():
-        totals = aggregate(group)
-        item: dict[str, Any] = {"rowCount": len(group)}
+    for key, count, totals in zip(keys, counts.tolist(), derive_groups(split_sums)):
+        item: dict[str, Any] = {"rowCount": count}
 
         for index, split in enumerate(splits):
             item[split] = key[index]
@@ -183,7 +223,13 @@ def _group(
             for split in splits
         )
     )
-    return result
+    totals = derive({name: float(values.sum()) for name, values in split_sums.items()})
+    comparison_totals = (
+        derive({name: float(values[groups]) for name, values in sums.items()})
+        if comparison_rows
+        else {}
+    )
+    return result, totals, comparison_totals
 
 
 def _comparison_values(
@@ -213,64 +259,47 @@ def _comparison_values(
 
 def _dimension_has_values(
     rows: list[dict[str, Any]],
+    ordinals: list[int],
     split: str,
 ) -> bool:
     if split in TIME_SPLITS:
-        return any(parse_row_date(row) is not None for row in rows)
+        return any(ordinal != UNDATED for ordinal in ordinals)
 
     for row in rows:
         value = _split_value(row, split)
-        if value not in {
-            "",
-            "All",
-            "Unknown",
-            "Not available",
-            "Date not available",
-        }:
+        if value not in _EMPTY_VALUES:
             return True
 
     return False
 
 
-def build_report(
+def _unavailable_notice(unavailable_splits: list[str]) -> list[str]:
+    if not unavailable_splits:
+        return []
+    readable = ", ".join(
+        split.replace("_", " ").title()
+        for split in unavailable_splits
+    )
+    return [
+        f"{readable} data is not available for the selected sources. "
+        "Rows may be grouped under ‘Not available’ until that dimension "
+        "is collected during provider sync."
+    ]
+
+
+def _raw_slices(
     snapshot: dict[str, Any],
-    *,
-    report_type: str,
     providers: list[str],
+    window,
+    compare_window,
+    clean_splits: list[str],
     metrics: list[str],
-    date_preset: str,
-    start_date: str | None,
-    end_date: str | None,
-    comparison: str,
-    splits: list[str],
-) -> dict[str, Any]:
-    window = resolve_window(date_preset, start_date, end_date)
-    compare_window = comparison_window(window, comparison)
-
-    clean_splits = [
-        split
-        for split in splits
-        if split and split != "none" and split in SUPPORTED_SPLITS
-    ][:2]
-
-    if not clean_splits:
-        if report_type == "campaign":
-            clean_splits = ["campaign"]
-        elif report_type in {"creative", "library"}:
-            clean_splits = ["creative"]
-        else:
-            clean_splits = ["platform"]
-
-    needs_daily = _requires_daily_rows(
-        date_preset,
-        comparison,
-        clean_splits,
-    )
-    allow_snapshot_fallback = _can_fallback_to_campaign_snapshot(
-        clean_splits
-    )
-
-    source_rows, missing_daily, fallback_sources = _source_rows(
+    *,
+    needs_daily: bool,
+    allow_snapshot_fallback: bool,
+) -> tuple[Any, ...]:
+    """Current and comparison aggregates from the snapshot's raw rows."""
+    segments, missing_daily, fallback_sources = _source_rows(
         snapshot,
         providers,
         needs_daily=needs_daily,
@@ -278,14 +307,14 @@ def build_report(
     )
 
     using_fallback = bool(fallback_sources)
-    filtered = _filter(
-        source_rows,
+    filtered, filtered_ordinals = _window_rows(
+        segments,
         window,
         allow_undated_rows=using_fallback,
     )
 
     comparison_rows = (
-        _filter(source_rows, compare_window)
+        _window_rows(segments, compare_window)[0]
         if compare_window and not using_fallback
         else []
     )
@@ -310,7 +339,7 @@ def build_report(
 
     if (
         needs_daily
-        and not source_rows
+        and not any(rows for rows, _ in segments)
         and any(
             provider != "libraryPerformance"
             for provider in providers
@@ -321,33 +350,191 @@ def build_report(
             "sources and period."
         )
 
-    unavailable_splits = [
-        split
-        for split in clean_splits
-        if not _dimension_has_values(filtered, split)
-    ]
-    if unavailable_splits:
-        readable = ", ".join(
-            split.replace("_", " ").title()
-            for split in unavailable_splits
+    notices.extend(
+        _unavailable_notice(
+            [
+                split
+                for split in clean_splits
+                if not _dimension_has_values(filtered, filtered_ordinals, split)
+            ]
         )
-        notices.append(
-            f"{readable} data is not available for the selected sources. "
-            "Rows may be grouped under ‘Not available’ until that dimension "
-            "is collected during provider sync."
+    )
+
+    result, totals, comparison_totals = _group(
+        filtered,
+        filtered_ordinals,
+        clean_splits,
+        metrics,
+        comparison_rows,
+    )
+    return (
+        result,
+        totals,
+        comparison_totals,
+        len(filtered),
+        len(comparison_rows),
+        using_fallback,
+        notices,
+    )
+
+
+def _rollup_slice(
+    rollups: Rollups,
+    providers: list[str],
+    window,
+    splits: list[str],
+    metrics: list[str],
+) -> dict[str, Any]:
+    """The _group/aggregate results for one window, answered from the rollup cubes."""
+    time_split = next((split for split in splits if split in TIME_SPLITS), None)
+    cells = rollups.select(providers, window, time_split)
+    keys, counts, sums = group_cells(rollups, cells, splits)
+
+    result: list[dict[str, Any]] = []
+    for key, count, totals in zip(keys, counts.tolist(), derive_groups(sums)):
+        item: dict[str, Any] = {"rowCount": count}
+        for index, split in enumerate(splits):
+            item[split] = key[index]
+        item.update(
+            {
+                metric: totals.get(metric, 0)
+                for metric in metrics
+                if metric in METRICS
+            }
         )
+        result.append(item)
 
-    result = _group(filtered, clean_splits, metrics)
-    totals = aggregate(filtered)
+    result.sort(
+        key=lambda row: tuple(
+            str(row.get(split, "")).lower()
+            for split in splits
+        )
+    )
 
-    comparison_totals = (
-        aggregate(comparison_rows)
-        if compare_window and comparison_rows
-        else {}
+    row_count = int(cells.rows.sum())
+    unavailable = [
+        split
+        for split in splits
+        if not row_count
+        or (
+            split not in TIME_SPLITS
+            and all(key[splits.index(split)] in _EMPTY_VALUES for key in keys)
+        )
+    ]
+    return {
+        "rows": result,
+        "totals": derive({name: float(values.sum()) for name, values in cells.metrics.items()}),
+        "rowCount": row_count,
+        "unavailable": unavailable,
+    }
+
+
+def _rollup_columns(payload: dict[str, Any], default_platform: str) -> dict[str, Any]:
+    """A provider's raw daily rows in the column form build_rollup_cubes takes."""
+    rows, ordinals = _indexed_rows(payload, "dailyCampaignPerformance")
+    codes, labels = factorize([_split_value(row, "campaign") for row in rows])
+    return {
+        "platform": _split_value(rows[0], "platform") if rows else default_platform,
+        "campaigns": labels,
+        "campaign": codes,
+        "ordinal": ordinals,
+        **columns(rows, ADDITIVE),
+    }
+
+
+def build_rollups(
+    snapshot: dict[str, Any],
+    cells: dict[str, dict[str, Any] | None] | None = None,
+) -> Rollups:
+    """
+    Rollup cubes per provider: from its persisted full-history cells when
+    `cells` has them, otherwise from the snapshot's daily rows.
+    """
+    cells = cells or {}
+    return build_rollup_cubes(
+        {
+            key: cells.get(key) or _rollup_columns(snapshot.get(key) or {}, key)
+            for key in ("googleAds", "metaAds")
+        }
+    )
+
+
+def build_report(
+    snapshot: dict[str, Any],
+    *,
+    report_type: str,
+    providers: list[str],
+    metrics: list[str],
+    date_preset: str,
+    start_date: str | None,
+    end_date: str | None,
+    comparison: str,
+    splits: list[str],
+) -> dict[str, Any]:
+    window = resolve_window(date_preset, start_date, end_date)
+    compare_window = comparison_window(window, comparison)
+
+    clean_splits = [
+        split
+        for split in splits
+        if split and split != "none" and split in SUPPORTED_SPLITS
+    ][:2]
+
+    if not clean_splits:
+        if report_type == "campaign":
+            clean_splits = ["campaign"]
+        elif report_type in {"creative", "library"}:
+            clean_splits = ["creative"]
+        else:
+            clean_splits = ["platform"]
+
+    needs_daily = _requires_daily_rows(
+        date_preset,
+        comparison,
+        clean_splits,
+    )
+    allow_snapshot_fallback = _can_fallback_to_campaign_snapshot(
+        clean_splits
     )
+
+    rollups = snapshot.get("rollups")
+    if needs_daily and rollups is not None and rollups.covers(providers, clean_splits):
+        current = _rollup_slice(rollups, providers, window, clean_splits, metrics)
+        previous = (
+            _rollup_slice(rollups, providers, compare_window, [], metrics)
+            if compare_window
+            else None
+        )
+        result = current["rows"]
+        totals = current["totals"]
+        source_row_count = current["rowCount"]
+        comparison_row_count = previous["rowCount"] if previous else 0
+        comparison_totals = previous["totals"] if comparison_row_count else {}
+        using_fallback = False
+        notices = _unavailable_notice(current["unavailable"])
+    else:
+        (
+            result,
+            totals,
+            comparison_totals,
+            source_row_count,
+            comparison_row_count,
+            using_fallback,
+            notices,
+        ) = _raw_slices(
+            snapshot,
+            providers,
+            window,
+            compare_window,
+            clean_splits,
+            metrics,
+            needs_daily=needs_daily,
+            allow_snapshot_fallback=allow_snapshot_fallback,
+        )
+
     comparison_summary = (
         _comparison_values(totals, comparison_totals, metrics)
-        if compare_window and comparison_rows
+        if compare_window and comparison_row_count
         else {}
     )
 
@@ -435,7 +622,7 @@ def build_report(
         "rows": result,
         "sheets": sheets,
         "notices": notices,
-        "sourceRowCount": len(filtered),
-        "comparisonSourceRowCount": len(comparison_rows),
+        "sourceRowCount": source_row_count,
+        "comparisonSourceRowCount": comparison_row_count,
         "usedSnapshotFallback": using_fallback,
     }
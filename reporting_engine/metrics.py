@@ -1,6 +1,10 @@
 from __future__ import annotations
 from typing import Any
 
+import numpy as np
+
+from metrics_engine import columns, derive_ratios, grouped_sum
+
 METRICS = {
  "impressions":"Impressions","clicks":"Clicks","ctr":"CTR","spend":"Spend","cpc":"CPC","cpm":"CPM",
  "conversions":"Conversions","conversionValue":"Conversion Value","conversionRate":"Conversion Rate","cpa":"CPA","roas":"ROAS"
@@ -21,3 +25,19 @@ def derive(row: dict[str, Any]) -> dict[str, Any]:
 
 def aggregate(rows: list[dict[str, Any]]) -> dict[str, Any]:
     return derive({k:sum(num(r.get(k)) for r in rows) for k in ADDITIVE})
+
+def derive_groups(sums: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+    """derive() for per-group additive sums (one array per ADDITIVE metric)."""
+    ratios = derive_ratios(*(sums[k] for k in ADDITIVE))
+    out = {k:v.tolist() for k, v in {**{k:sums[k] for k in ADDITIVE}, **ratios}.items()}
+    for k in ("impressions","clicks"):
+        out[k] = [int(v) for v in out[k]]
+    return [{k:values[i] for k, values in out.items()} for i in range(len(out["spend"]))]
+
+def sum_groups(rows: list[dict[str, Any]], codes: np.ndarray, groups: int) -> dict[str, np.ndarray]:
+    """Per-group ADDITIVE sums in one pass over rows; codes[i] is the group index of rows[i]."""
+    return {k:grouped_sum(codes, col, groups) for k, col in columns(rows, ADDITIVE).items()}
+
+def aggregate_groups(rows: list[dict[str, Any]], codes: np.ndarray, groups: int) -> list[dict[str, Any]]:
+    """aggregate() for every group at once; codes[i] is the group index of rows[i]."""
+    return derive_groups(sum_groups(rows, codes, groups))
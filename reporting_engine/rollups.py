@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+
+from metrics_engine import grouped_sum
+
+from .date_ranges import UNDATED, DateWindow, period_label
+from .metrics import ADDITIVE
+
+# Provider daily history pre-aggregated into rollup cubes: one cell per
+# source x campaign x period holding only additive metrics and the number of
+# daily rows behind it. The day cells of each account's full history are
+# persisted at sync time (see daily_rollups); week and month cubes are built
+# from them when the reporting snapshot is built, i.e. once per sync
+# watermark rather than per request. A date range is answered from the
+# coarsest cube whose whole periods fit inside it, plus day cells for the
+# partial periods at either edge.
+CUBE_SPLITS = {"platform", "campaign"}
+TIME_GRAINS = {
+    # requested time split -> cubes able to answer it, coarsest first
+    None: ("month", "day"),
+    "day": ("day",),
+    "week": ("week", "day"),
+    "month": ("month", "day"),
+    "quarter": ("month", "day"),
+    "year": ("month", "day"),
+}
+
+
+@dataclass
+class Rollup:
+    grain: str
+    source: np.ndarray
+    platform: np.ndarray
+    campaign: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    rows: np.ndarray
+    metrics: dict[str, np.ndarray]
+
+    def between(self, lo: int, hi: int) -> "Rollup":
+        """Cells whose period starts within [lo, hi]."""
+        return self.take(
+            slice(
+                int(np.searchsorted(self.start, lo, side="left")),
+                int(np.searchsorted(self.start, hi, side="right")),
+            )
+        )
+
+    def take(self, mask: Any) -> "Rollup":
+        return Rollup(
+            self.grain,
+            self.source[mask],
+            self.platform[mask],
+            self.campaign[mask],
+            self.start[mask],
+            self.end[mask],
+            self.rows[mask],
+            {name: values[mask] for name, values in self.metrics.items()},
+        )
+
+
+def _month_bounds(ordinals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    unique, inverse = np.unique(ordinals, return_inverse=True)
+    starts = np.empty(len(unique), dtype=np.int64)
+    ends = np.empty(len(unique), dtype=np.int64)
+    for index, ordinal in enumerate(unique.tolist()):
+        first = date.fromordinal(ordinal).replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        starts[index] = first.toordinal()
+        ends[index] = following.toordinal() - 1
+    return starts[inverse], ends[inverse]
+
+
+def _period_bounds(ordinals: np.ndarray, grain: str) -> tuple[np.ndarray, np.ndarray]:
+    if grain == "day":
+        return ordinals, ordinals
+    if grain == "week":
+        # date.fromordinal(1) is a Monday.
+        starts = ordinals - (ordinals - 1) % 7
+        return starts, starts + 6
+    return _month_bounds(ordinals)
+
+
+def _rollup(
+    grain: str,
+    source: np.ndarray,
+    platform: np.ndarray,
+    campaign: np.ndarray,
+    ordinals: np.ndarray,
+    rows: np.ndarray,
+    metrics: dict[str, np.ndarray],
+) -> Rollup:
+    start = _period_bounds(ordinals, grain)[0]
+    if not len(start):
+        empty = np.zeros(0, dtype=np.int64)
+        return Rollup(grain, empty, empty, empty, empty, empty, empty, {name: np.zeros(0) for name in metrics})
+
+    # One mixed-radix key per cell, period start most significant, so the
+    # unique cells come out ordered by date and a date range is a slice.
+    radix = [int(dimension.max()) + 1 for dimension in (platform, campaign, source)]
+    first = int(start.min())
+    combined = start - first
+    for size, dimension in zip(radix, (platform, campaign, source)):
+        combined = combined * size + dimension
+    cells, codes = np.unique(combined, return_inverse=True)
+    codes = codes.reshape(-1)
+    groups = len(cells)
+
+    parts = []
+    for size in reversed(radix):
+        cells, part = np.divmod(cells, size)
+        parts.append(part)
+    _source, _campaign, _platform = parts
+    cell_start = cells + first
+    return Rollup(
+        grain,
+        _source,
+        _platform,
+        _campaign,
+        cell_start,
+        _period_bounds(cell_start, grain)[1],
+        grouped_sum(codes, rows, groups).astype(np.int64),
+        {name: grouped_sum(codes, values, groups) for name, values in metrics.items()},
+    )
+
+
+def _cover(window: DateWindow, grain: str) -> tuple[int, int] | None:
+    """Ordinal span of the whole `grain` periods inside the window."""
+    if grain == "day":
+        return window.start.toordinal(), window.end.toordinal()
+    if grain == "week":
+        first = window.start + timedelta(days=(7 - window.start.weekday()) % 7)
+        last = window.end - timedelta(days=(window.end.weekday() + 1) % 7)
+    else:
+        first = (
+            window.start
+            if window.start.day == 1
+            else (window.start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        )
+        following = (window.end + timedelta(days=1))
+        last = (
+            window.end
+            if following.day == 1
+            else window.end.replace(day=1) - timedelta(days=1)
+        )
+    if first > last:
+        return None
+    return first.toordinal(), last.toordinal()
+
+
+class Rollups:
+    """Day, week and month cubes over the snapshot's provider daily rows."""
+
+    def __init__(
+        self,
+        sources: list[str],
+        platforms: list[str],
+        campaigns: list[str],
+        *,
+        source: np.ndarray,
+        platform: np.ndarray,
+        campaign: np.ndarray,
+        ordinals: np.ndarray,
+        metrics: dict[str, np.ndarray],
+        undated: set[str],
+    ):
+        self.sources = sources
+        self.platforms = platforms
+        self.campaigns = campaigns
+        self.undated = undated
+        rows = np.ones(len(ordinals), dtype=np.float64)
+        self.cubes = {
+            grain: _rollup(grain, source, platform, campaign, ordinals, rows, metrics)
+            for grain in ("day", "week", "month")
+        }
+        day = self.cubes["day"]
+        self.row_counts = {
+            name: int(day.rows[day.source == index].sum())
+            for index, name in enumerate(sources)
+        }
+
+    def covers(self, providers: list[str], splits: list[str]) -> bool:
+        """Whether a report over these providers and splits can skip the raw rows."""
+        time_splits = [split for split in splits if split not in CUBE_SPLITS]
+        return (
+            bool(providers)
+            and all(
+                self.row_counts.get(provider) and provider not in self.undated
+                for provider in providers
+            )
+            and len(time_splits) <= 1
+            and all(split in TIME_GRAINS for split in time_splits)
+        )
+
+    def select(
+        self,
+        providers: list[str],
+        window: DateWindow,
+        time_split: str | None,
+    ) -> Rollup:
+        """Cells covering exactly the window's days, coarsest cube first."""
+        wanted = np.array(
+            [index for index, name in enumerate(self.sources) if name in providers],
+            dtype=np.int64,
+        )
+        grains = TIME_GRAINS[time_split]
+        coarse = self.cubes[grains[0]]
+
+        if not window.start or not window.end:
+            pieces = [coarse]
+        else:
+            lo, hi = window.start.toordinal(), window.end.toordinal()
+            cover = _cover(window, grains[0])
+            if cover is None:
+                pieces = [self.cubes["day"].between(lo, hi)]
+            else:
+                # Whole coarse periods, plus the days before and after them.
+                pieces = [coarse.between(*cover)]
+                if grains[0] != "day":
+                    day = self.cubes["day"]
+                    pieces += [day.between(lo, cover[0] - 1), day.between(cover[1] + 1, hi)]
+
+        cells = _concat(pieces, grains[0])
+        if len(wanted) == len(self.sources):
+            return cells
+        return cells.take(np.isin(cells.source, wanted))
+
+
+def _concat(pieces: list[Rollup], grain: str) -> Rollup:
+    if len(pieces) == 1:
+        return pieces[0]
+    return Rollup(
+        grain,
+        np.concatenate([piece.source for piece in pieces]),
+        np.concatenate([piece.platform for piece in pieces]),
+        np.concatenate([piece.campaign for piece in pieces]),
+        np.concatenate([piece.start for piece in pieces]),
+        np.concatenate([piece.end for piece in pieces]),
+        np.concatenate([piece.rows for piece in pieces]),
+        {
+            name: np.concatenate([piece.metrics[name] for piece in pieces])
+            for name in ADDITIVE
+        },
+    )
+
+
+def group_cells(
+    rollups: Rollups,
+    cells: Rollup,
+    splits: list[str],
+) -> tuple[list[tuple[str, ...]], np.ndarray, dict[str, np.ndarray]]:
+    """Split labels, row counts and additive sums per split combination."""
+    labels: list[list[str]] = []
+    dimensions: list[np.ndarray] = []
+    for split in splits:
+        if split == "platform":
+            labels.append(rollups.platforms)
+            dimensions.append(cells.platform)
+        elif split == "campaign":
+            labels.append(rollups.campaigns)
+            dimensions.append(cells.campaign)
+        else:
+            periods, inverse = np.unique(cells.start, return_inverse=True)
+            names = [period_label(date.fromordinal(o), split) for o in periods.tolist()]
+            distinct = list(dict.fromkeys(names))
+            lookup = np.array([distinct.index(name) for name in names], dtype=np.int64)
+            labels.append(distinct)
+            dimensions.append(lookup[inverse.reshape(-1)])
+
+    if dimensions and len(cells.start):
+        # Dimension codes are dense, so one mixed-radix integer per combination.
+        combined = np.zeros(len(cells.start), dtype=np.int64)
+        for names, dimension in zip(labels, dimensions):
+            combined = combined * len(names) + dimension
+        combos, codes = np.unique(combined, return_inverse=True)
+        codes = codes.reshape(-1)
+        groups = len(combos)
+        keys = []
+        for combo in combos.tolist():
+            key = []
+            for names in reversed(labels):
+                combo, code = divmod(combo, len(names))
+                key.append(names[code])
+            keys.append(tuple(reversed(key)))
+    else:
+        codes = np.zeros(len(cells.start), dtype=np.int64)
+        groups = 1 if len(cells.start) and not dimensions else 0
+        keys = [()] * groups
+
+    sums = {name: grouped_sum(codes, cells.metrics[name], groups) for name in ADDITIVE}
+    return keys, grouped_sum(codes, cells.rows, groups).astype(np.int64), sums
+
+
+def _column(cells: dict[str, Any], key: str, dtype) -> np.ndarray:
+    values = cells.get(key)
+    return np.asarray(values if values is not None else [], dtype=dtype)
+
+
+def build_rollups(sources: dict[str, dict[str, Any]]) -> Rollups:
+    """
+    Cubes over each source's daily cells, given as columns: "platform" (the
+    source's platform label), "campaigns" (campaign labels), "campaign" (a
+    label index per cell), "ordinal" (a date ordinal per cell, UNDATED for
+    rows without a date) and one value list per ADDITIVE metric. Cells may be
+    raw daily rows or the persisted daily_rollups cells; both are one per
+    campaign per day.
+    """
+    names = list(sources)
+    platform_index: dict[str, int] = {}
+    campaign_index: dict[str, int] = {}
+    source_codes: list[np.ndarray] = []
+    platform_codes: list[np.ndarray] = []
+    campaign_codes: list[np.ndarray] = []
+    ordinals: list[np.ndarray] = []
+    metrics: dict[str, list[np.ndarray]] = {name: [] for name in ADDITIVE}
+    undated: set[str] = set()
+
+    for code, name in enumerate(names):
+        cells = sources[name]
+        ordinal = _column(cells, "ordinal", np.int64)
+        dated = ordinal != UNDATED
+        if not dated.all():
+            undated.add(name)
+        remap = np.asarray(
+            [campaign_index.setdefault(label, len(campaign_index)) for label in cells.get("campaigns") or []],
+            dtype=np.int64,
+        )
+        campaign = _column(cells, "campaign", np.int64)[dated]
+        count = len(campaign)
+        platform = platform_index.setdefault(str(cells.get("platform") or name), len(platform_index))
+
+        source_codes.append(np.full(count, code, dtype=np.int64))
+        platform_codes.append(np.full(count, platform, dtype=np.int64))
+        campaign_codes.append(remap[campaign] if count else campaign)
+        ordinals.append(ordinal[dated])
+        for metric in ADDITIVE:
+            metrics[metric].append(_column(cells, metric, np.float64)[dated])
+
+    def _joined(parts: list[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+    return Rollups(
+        names,
+        list(platform_index),
+        list(campaign_index),
+        source=_joined(source_codes, np.int64),
+        platform=_joined(platform_codes, np.int64),
+        campaign=_joined(campaign_codes, np.int64),
+        ordinals=_joined(ordinals, np.int64),
+        metrics={metric: _joined(values, np.float64) for metric, values in metrics.items()},
+        undated=undated,
+    )
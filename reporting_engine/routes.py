@@ -4,7 +4,7 @@ from fastapi.responses import StreamingResponse
 from auth_helpers import require_user
 from .engine import build_report
 from .export import build_workbook
-from .service import reporting_snapshot
+from .service import public_snapshot, reporting_snapshot
 router=APIRouter(prefix="/reports",tags=["Reports"])
 
 def _uid(auth:str|None)->str:
@@ -17,7 +17,7 @@ def _request(uid,report_type,providers,metrics,date_preset,start_date,end_date,c
     return build_report(reporting_snapshot(uid),report_type=report_type,providers=[x for x in providers.split(",") if x],metrics=[x for x in metrics.split(",") if x],date_preset=date_preset,start_date=start_date,end_date=end_date,comparison=comparison,splits=[x for x in splits.split(",") if x])
 
 @router.get("/status")
-def status(authorization:str|None=Header(default=None)): return reporting_snapshot(_uid(authorization))
+def status(authorization:str|None=Header(default=None)): return public_snapshot(reporting_snapshot(_uid(authorization)))
 
 @router.get("/preview")
 def preview(report_type:str=Query("campaign"),providers:str=Query("googleAds,metaAds"),metrics:str=Query("impressions,clicks,ctr,spend,conversions,cpa,roas"),date_preset:str=Query("last_30_days"),start_date:str|None=Query(None),end_date:str|None=Query(None),comparison:str=Query("none"),splits:str=Query(""),authorization:str|None=Header(default=None)):
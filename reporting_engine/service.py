@@ -1,23 +1,53 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Any
 
 from firebase_admin import firestore
 
 from integrations.google_ads.store import (
-    get_connection as get_google_connection,
+    CONNECTIONS as GOOGLE_CONNECTIONS,
+    DAILY_HISTORY as GOOGLE_DAILY_HISTORY,
     list_daily_campaign_performance as list_google_daily,
+    list_daily_rollups as list_google_rollups,
 )
 from integrations.meta_ads.store import (
-    get_connection as get_meta_connection,
+    CONNECTIONS as META_CONNECTIONS,
+    DAILY_HISTORY as META_DAILY_HISTORY,
     list_daily_campaign_performance as list_meta_daily,
+    list_daily_rollups as list_meta_rollups,
 )
 from performance_intelligence.store import (
+    ROOT_COLLECTION as LEARNING_COLLECTION,
     get_summary as get_learning_summary,
 )
 
+from .date_ranges import sort_by_ordinal
+from .engine import ORDINALS_KEY, build_rollups
 from .metrics import aggregate, derive
 
+# Report snapshots are cached per user and reused until a watermark moves:
+# each connection's status, selected account and lastSyncAt, each daily
+# history's lastSyncAt (written after its rows), and a library-performance
+# version bumped whenever a creative's manual performance changes. For
+# REPORTING_SNAPSHOT_FRESH_SECONDS after a check a cached snapshot is served
+# with no Firestore reads; after that one batched get_all re-reads the
+# watermarks and the snapshot is rebuilt only if they changed; when only the
+# library-performance version moved, the provider parts and their rollup
+# cubes are kept and just the library is re-read. Concurrent requests for the
+# same user share a single build.
+REPORTING_SNAPSHOT_CACHE_SIZE = int(os.getenv("REPORTING_SNAPSHOT_CACHE_SIZE", "64"))
+REPORTING_SNAPSHOT_FRESH_SECONDS = float(os.getenv("REPORTING_SNAPSHOT_FRESH_SECONDS", "30"))
+WATERMARK_COLLECTION = "reporting_watermarks"
+
+_snapshot_lock = threading.Lock()
+_snapshots: "OrderedDict[str, tuple[float, tuple[Any, ...], dict[str, Any]]]" = OrderedDict()
+_load_locks = [threading.Lock() for _ in range(64)]
+_snapshot_stats = {"hits": 0, "revalidated": 0, "libraryRebuilds": 0, "builds": 0}
+
 
 def _first_value(
     row: dict[str, Any],
@@ -149,10 +179,13 @@ def _provider(
         for row in connection.get("campaigns") or []
     ]
 
-    normalized_daily = [
-        _campaign(row, provider, label)
-        for row in (daily_rows or [])
-    ]
+    normalized_daily, daily_ordinals = sort_by_ordinal(
+        [
+            _campaign(row, provider, label)
+            for row in (daily_rows or [])
+        ]
+    )
+    rows, campaign_ordinals = sort_by_ordinal(rows)
 
     account_id = (
         connection.get("selectedCustomerId")
@@ -184,6 +217,10 @@ def _provider(
         "summary": aggregate(rows),
         "campaigns": rows,
         "dailyCampaignPerformance": normalized_daily,
+        ORDINALS_KEY: {
+            "campaigns": campaign_ordinals,
+            "dailyCampaignPerformance": daily_ordinals,
+        },
     }
 
 
@@ -280,6 +317,7 @@ def _library(uid: str) -> dict[str, Any]:
             )
 
     totals = aggregate(rows)
+    rows, ordinals = sort_by_ordinal(rows)
 
     return {
         "provider": "library_performance",
@@ -292,24 +330,102 @@ def _library(uid: str) -> dict[str, Any]:
         "totals": totals,
         "summary": totals,
         "creatives": rows,
+        ORDINALS_KEY: {"creatives": ordinals},
     }
 
 
-def reporting_snapshot(uid: str) -> dict[str, Any]:
-    learning = get_learning_summary(uid) or {}
-    google_connection = get_google_connection(uid) or {}
-    meta_connection = get_meta_connection(uid) or {}
+def _learning(learning: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "confidence": learning.get("confidence") or 0,
+        "creativeAssetCount": (
+            learning.get("creativeAssetCount") or 0
+        ),
+        "independentResultCount": (
+            learning.get("independentResultCount") or 0
+        ),
+        "qualifiedIndependentResultCount": (
+            learning.get("qualifiedCount") or 0
+        ),
+        "positiveIndependentResultCount": (
+            learning.get("positiveCount") or 0
+        ),
+        "updatedAt": learning.get("updatedAt"),
+    }
 
-    google_daily = list_google_daily(
-        uid,
-        account_id=google_connection.get("selectedCustomerId"),
-    )
-    meta_daily = list_meta_daily(
-        uid,
-        account_id=meta_connection.get("selectedAdAccountId"),
+
+def _read_watermarks(
+    db,
+    uid: str,
+) -> tuple[tuple[Any, ...], dict[str, dict[str, Any]]]:
+    refs = {
+        "google": db.collection(GOOGLE_CONNECTIONS).document(uid),
+        "meta": db.collection(META_CONNECTIONS).document(uid),
+        "googleDaily": db.collection(GOOGLE_DAILY_HISTORY).document(uid),
+        "metaDaily": db.collection(META_DAILY_HISTORY).document(uid),
+        "versions": db.collection(WATERMARK_COLLECTION).document(uid),
+        "learning": db.collection(LEARNING_COLLECTION).document(uid),
+    }
+    by_path = {
+        snap.reference.path: snap.to_dict() or {}
+        for snap in db.get_all(list(refs.values()))
+        if snap.exists
+    }
+    docs = {name: by_path.get(ref.path, {}) for name, ref in refs.items()}
+    docs["google"].pop("refreshTokenEncrypted", None)
+    docs["meta"].pop("accessTokenEncrypted", None)
+
+    watermark = (
+        docs["google"].get("status"),
+        docs["google"].get("selectedCustomerId"),
+        docs["google"].get("lastSyncAt"),
+        docs["googleDaily"].get("lastSyncAt"),
+        docs["meta"].get("status"),
+        docs["meta"].get("selectedAdAccountId"),
+        docs["meta"].get("lastSyncAt"),
+        docs["metaDaily"].get("lastSyncAt"),
+        docs["versions"].get("libraryPerformanceVersion") or 0,
     )
+    return watermark, docs
 
-    return {
+
+def _rollup_cells(
+    loader,
+    uid: str,
+    account_id: str | None,
+    label: str,
+) -> dict[str, Any] | None:
+    if not account_id:
+        return None
+    try:
+        cells = loader(uid, account_id=account_id)
+    except Exception as exc:
+        print(
+            "REPORTING ROLLUP LOAD ERROR:",
+            {"uid": uid, "accountId": account_id, "error": repr(exc)},
+            flush=True,
+        )
+        return None
+    return {**cells, "platform": label} if cells is not None else None
+
+
+def _build_snapshot(
+    uid: str,
+    google_connection: dict[str, Any],
+    meta_connection: dict[str, Any],
+    learning: dict[str, Any],
+) -> dict[str, Any]:
+    google_account = google_connection.get("selectedCustomerId")
+    meta_account = meta_connection.get("selectedAdAccountId")
+    google_daily = list_google_daily(uid, account_id=google_account)
+    meta_daily = list_meta_daily(uid, account_id=meta_account)
+    # Full-history cubes persisted at sync time; the daily rows above are
+    # capped, so they only stand in until an account's first rollup sync.
+    rollup_cells = {
+        "googleAds": _rollup_cells(list_google_rollups, uid, google_account, "Google Ads"),
+        "metaAds": _rollup_cells(list_meta_rollups, uid, meta_account, "Meta Ads"),
+    }
+
+    snapshot = {
         "googleAds": _provider(
             google_connection,
             "google_ads",
@@ -323,20 +439,130 @@ def reporting_snapshot(uid: str) -> dict[str, Any]:
             meta_daily,
         ),
         "libraryPerformance": _library(uid),
-        "learning": {
-            "confidence": learning.get("confidence") or 0,
-            "creativeAssetCount": (
-                learning.get("creativeAssetCount") or 0
-            ),
-            "independentResultCount": (
-                learning.get("independentResultCount") or 0
-            ),
-            "qualifiedIndependentResultCount": (
-                learning.get("qualifiedCount") or 0
-            ),
-            "positiveIndependentResultCount": (
-                learning.get("positiveCount") or 0
-            ),
-            "updatedAt": learning.get("updatedAt"),
-        },
+        "learning": _learning(learning),
+    }
+    snapshot["rollups"] = build_rollups(snapshot, rollup_cells)
+    return snapshot
+
+
+def _cached_snapshot(uid: str) -> tuple[Any, ...] | None:
+    with _snapshot_lock:
+        entry = _snapshots.get(uid)
+        if entry is None:
+            return None
+        _snapshots.move_to_end(uid)
+        return entry
+
+
+def reporting_snapshot(uid: str) -> dict[str, Any]:
+    """
+    The user's reporting snapshot. Treat it as read-only; it is shared
+    between requests until its watermarks change.
+    """
+    now = time.monotonic()
+    entry = _cached_snapshot(uid)
+    if entry is not None and entry[0] > now:
+        with _snapshot_lock:
+            _snapshot_stats["hits"] += 1
+        return entry[2]
+
+    with _load_locks[hash(uid) % len(_load_locks)]:
+        # Another request may have refreshed it while this one waited.
+        now = time.monotonic()
+        entry = _cached_snapshot(uid)
+        if entry is not None and entry[0] > now:
+            with _snapshot_lock:
+                _snapshot_stats["hits"] += 1
+            return entry[2]
+
+        db = firestore.client()
+        watermark, docs = _read_watermarks(db, uid)
+        learning = (
+            docs["learning"]
+            if docs["learning"].get("updatedAt")
+            else get_learning_summary(uid) or {}
+        )
+
+        if entry is not None and entry[1] == watermark:
+            snapshot = {**entry[2], "learning": _learning(learning)}
+            counter = "revalidated"
+        elif entry is not None and entry[1][:-1] == watermark[:-1]:
+            # Only libraryPerformanceVersion moved: the providers, and so
+            # their rollup cubes, are unchanged.
+            snapshot = {
+                **entry[2],
+                "libraryPerformance": _library(uid),
+                "learning": _learning(learning),
+            }
+            counter = "libraryRebuilds"
+        else:
+            snapshot = _build_snapshot(uid, docs["google"], docs["meta"], learning)
+            counter = "builds"
+
+        with _snapshot_lock:
+            _snapshot_stats[counter] += 1
+            _snapshots[uid] = (
+                time.monotonic() + REPORTING_SNAPSHOT_FRESH_SECONDS,
+                watermark,
+                snapshot,
+            )
+            _snapshots.move_to_end(uid)
+            while len(_snapshots) > REPORTING_SNAPSHOT_CACHE_SIZE:
+                _snapshots.popitem(last=False)
+        return snapshot
+
+
+def invalidate_reporting_snapshot(uid: str) -> None:
+    """Drop this process's cached snapshot, e.g. right after a sync."""
+    with _snapshot_lock:
+        _snapshots.pop(uid, None)
+
+
+def bump_library_performance_version(uid: str | None) -> None:
+    """Invalidate every process's snapshot after library performance changes. Never raises."""
+    if not uid:
+        return
+    # Expire rather than drop this process's snapshot, so the next request
+    # re-reads the watermarks and keeps the provider cubes.
+    with _snapshot_lock:
+        entry = _snapshots.get(uid)
+        if entry is not None:
+            _snapshots[uid] = (0.0, entry[1], entry[2])
+    try:
+        firestore.client().collection(WATERMARK_COLLECTION).document(uid).set(
+            {
+                "uid": uid,
+                "libraryPerformanceVersion": firestore.Increment(1),
+                "updatedAt": int(time.time()),
+            },
+            merge=True,
+        )
+    except Exception as exc:
+        print(
+            "REPORTING WATERMARK BUMP ERROR:",
+            {"uid": uid, "error": repr(exc)},
+            flush=True,
+        )
+
+
+def public_snapshot(snapshot: dict[str, Any]) -> dict[str, Any]:
+    """The snapshot as returned by /reports/status, without the rollup cubes or row ordinals."""
+    return {
+        key: (
+            {name: part for name, part in value.items() if name != ORDINALS_KEY}
+            if isinstance(value, dict)
+            else value
+        )
+        for key, value in snapshot.items()
+        if key != "rollups"
     }
+
+
+def reporting_snapshot_stats() -> dict[str, Any]:
+    with _snapshot_lock:
+        return {
+            "cached": len(_snapshots),
+            "capacity": REPORTING_SNAPSHOT_CACHE_SIZE,
+            "freshSeconds": REPORTING_SNAPSHOT_FRESH_SECONDS,
+            **_snapshot_stats,
+        }
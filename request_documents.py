@@ -0,0 +1,194 @@
+"""
+Request-scoped loader for the per-user documents that generation, caps and
+storage code all read: users/{uid}, usage/{uid} and
+users/{uid}/storage/summary.
+
+A route calls begin_request_documents() once; every helper that goes through
+load_user_doc / load_usage_doc / load_storage_summary_doc afterwards shares a
+single batched get_all and the memoized results for the rest of that request.
+Without an active loader the helpers fall back to a plain document read, so
+callers outside a request scope behave exactly as before.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DOCUMENT_KINDS = ("user", "usage", "storage")
+BULK_READ_CHUNK = 100
+
+_stats_lock = threading.Lock()
+_process_stats = {
+    "scopes": 0,
+    "documentReads": 0,
+    "batchedReads": 0,
+    "memoHits": 0,
+    "unscopedReads": 0,
+}
+
+
+def _document_ref(db, kind: str, uid: str):
+    if kind == "user":
+        return db.collection("users").document(uid)
+    if kind == "usage":
+        return db.collection("usage").document(uid)
+    if kind == "storage":
+        return (
+            db.collection("users")
+            .document(uid)
+            .collection("storage")
+            .document("summary")
+        )
+    raise ValueError(f"Unsupported request document: {kind}")
+
+
+def _bump(**counts: int) -> None:
+    with _stats_lock:
+        for key, amount in counts.items():
+            _process_stats[key] = _process_stats.get(key, 0) + amount
+
+
+class RequestDocuments:
+    """Memoized user/usage/storage documents for one request."""
+
+    def __init__(self, db, prefetch: Iterable[str] = DOCUMENT_KINDS):
+        self.db = db
+        self.prefetch = tuple(kind for kind in prefetch if kind in DOCUMENT_KINDS)
+        self._docs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"documentReads": 0, "batches": 0, "memoHits": 0}
+
+    def _load_batch(self, kind: str, uid: str) -> None:
+        kinds = [kind] + [
+            other
+            for other in self.prefetch
+            if other != kind and (other, uid) not in self._docs
+        ]
+        refs = [_document_ref(self.db, item, uid) for item in kinds]
+        by_path = {ref.path: item for item, ref in zip(kinds, refs)}
+
+        for item in kinds:
+            self._docs[(item, uid)] = {}
+
+        if len(refs) == 1:
+            snaps = [refs[0].get()]
+        else:
+            snaps = list(self.db.get_all(refs))
+
+        for snap in snaps:
+            item = by_path.get(snap.reference.path)
+            if item is not None and snap.exists:
+                self._docs[(item, uid)] = snap.to_dict() or {}
+
+        self.stats["documentReads"] += len(refs)
+        self.stats["batches"] += 1
+        _bump(documentReads=len(refs), batchedReads=1)
+
+    def get(self, kind: str, uid: str) -> Dict[str, Any]:
+        with self._lock:
+            key = (kind, uid)
+            if key in self._docs:
+                self.stats["memoHits"] += 1
+                _bump(memoHits=1)
+            else:
+                self._load_batch(kind, uid)
+            return self._docs[key]
+
+    def remember(self, kind: str, uid: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            current = self._docs.get((kind, uid))
+            if current is None:
+                return
+            current.update(data)
+
+    def forget(self, kind: str, uid: str) -> None:
+        with self._lock:
+            self._docs.pop((kind, uid), None)
+
+
+_current: ContextVar[Optional[RequestDocuments]] = ContextVar(
+    "adgen_request_documents",
+    default=None,
+)
+
+
+def begin_request_documents(db, prefetch: Iterable[str] = DOCUMENT_KINDS) -> RequestDocuments:
+    """
+    Start a request-scoped loader for the current context.
+
+    The loader lives until the request's context ends; asyncio.to_thread and
+    the FastAPI threadpool copy the context, so worker threads share it.
+    """
+    loader = RequestDocuments(db, prefetch)
+    _current.set(loader)
+    _bump(scopes=1)
+    return loader
+
+
+def current_request_documents() -> Optional[RequestDocuments]:
+    return _current.get()
+
+
+def _load(db, kind: str, uid: str) -> Dict[str, Any]:
+    loader = _current.get()
+    if loader is not None and loader.db is db:
+        return loader.get(kind, uid)
+
+    _bump(documentReads=1, unscopedReads=1)
+    return _document_ref(db, kind, uid).get().to_dict() or {}
+
+
+def load_user_doc(db, uid: str) -> Dict[str, Any]:
+    return _load(db, "user", uid)
+
+
+def load_usage_doc(db, uid: str) -> Dict[str, Any]:
+    return _load(db, "usage", uid)
+
+
+def load_storage_summary_doc(db, uid: str) -> Dict[str, Any]:
+    return _load(db, "storage", uid)
+
+
+def load_documents_many(db, kind: str, uids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read one document kind for many users in BULK_READ_CHUNK-sized get_all
+    batches. Missing documents map to {}; duplicate uids are read once.
+    """
+    ordered: List[str] = list(dict.fromkeys(uid for uid in uids if uid))
+    docs: Dict[str, Dict[str, Any]] = {uid: {} for uid in ordered}
+
+    for start in range(0, len(ordered), BULK_READ_CHUNK):
+        chunk = ordered[start:start + BULK_READ_CHUNK]
+        refs = [_document_ref(db, kind, uid) for uid in chunk]
+        by_path = {ref.path: uid for uid, ref in zip(chunk, refs)}
+
+        for snap in db.get_all(refs):
+            uid = by_path.get(snap.reference.path)
+            if uid is not None and snap.exists:
+                docs[uid] = snap.to_dict() or {}
+
+        _bump(documentReads=len(refs), batchedReads=1)
+
+    return docs
+
+
+def remember_request_document(kind: str, uid: str, data: Dict[str, Any]) -> None:
+    """Merge a just-written update into the memoized copy, if one is loaded."""
+    loader = _current.get()
+    if loader is not None:
+        loader.remember(kind, uid, data)
+
+
+def forget_request_document(kind: str, uid: str) -> None:
+    """Drop a memoized document after a write whose result is not known locally."""
+    loader = _current.get()
+    if loader is not None:
+        loader.forget(kind, uid)
+
+
+def request_document_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_process_stats)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+
+# Importing the app registers the generation job handlers. Set
+# JOB_WORKERS_IN_WEB=0 on the web service when this process runs separately.
+# The Runway poller elects a single leader, so running it here as well as in
+# the web process is safe.
+os.environ.setdefault("JOB_WORKERS_IN_WEB", "0")
+os.environ.setdefault("VIDEO_POLLER_IN_WEB", "0")
+
+import main  # noqa: E402,F401
+import http_pool  # noqa: E402
+from encoder_pool import shutdown_encoder_pool  # noqa: E402
+from firestore_async import shutdown_executor  # noqa: E402
+from job_queue import start_job_workers, stop_job_workers  # noqa: E402
+from progress_writer import flush_progress_writes  # noqa: E402
+from runway_poller import start_runway_poller, stop_runway_poller  # noqa: E402
+
+
+async def run() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    await http_pool.open_http_client()
+    await start_job_workers()
+    await start_runway_poller()
+    print("Job worker running. Press Ctrl+C to stop.")
+    try:
+        await stop.wait()
+    finally:
+        print("Stopping job worker...")
+        await stop_runway_poller()
+        await stop_job_workers()
+        flush_progress_writes()
+        await http_pool.close_http_client()
+        shutdown_encoder_pool()
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -3,6 +3,8 @@ import os
 from typing import Any, Dict, Optional
 import httpx
 
+import http_pool
+
 RUNWAY_API_BASE = (os.getenv("RUNWAY_API_BASE") or "https://api.dev.runwayml.com").rstrip("/")
 RUNWAY_API_KEY = (os.getenv("RUNWAY_API_KEY") or "").strip()
 RUNWAY_VERSION = (os.getenv("RUNWAY_VERSION") or "2024-11-06").strip()
@@ -35,8 +37,7 @@ def _headers() -> Dict[str, str]:
 async def _post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     url = f"{RUNWAY_API_BASE}{path}"
     try:
-        async with httpx.AsyncClient(timeout=90) as client:
-            r = await client.post(url, headers=_headers(), json=payload)
+        r = await http_pool.request("POST", url, headers=_headers(), json=payload, timeout=90)
     except httpx.TimeoutException as e:
         raise RunwayError(f"Runway timeout calling {path}: {e}") from e
     except httpx.RequestError as e:
@@ -53,8 +54,7 @@ async def _post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
 async def _get(path: str) -> Dict[str, Any]:
     url = f"{RUNWAY_API_BASE}{path}"
     try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            r = await client.get(url, headers=_headers())
+        r = await http_pool.request("GET", url, headers=_headers(), timeout=60)
     except httpx.TimeoutException as e:
         raise RunwayError(f"Runway timeout calling {path}: {e}") from e
     except httpx.RequestError as e:
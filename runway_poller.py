@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from google.cloud import firestore as gc_firestore
+
+from auth_helpers import get_db
+from firestore_async import run_blocking, stream_query
+from runway_client import get_task
+from video_jobs import (
+    VIDEO_FINALIZE_LEASE_SECONDS,
+    claim_video_finalization,
+    fail_video_job_from_provider,
+    finalize_video_job,
+    record_video_poll_error,
+    renew_video_finalization,
+)
+
+# One poller per deployment advances every running video job: it polls Runway
+# on an adaptive schedule, fails jobs the provider rejected, and starts
+# finalization under a per-job Firestore lease. Instances elect a leader
+# through system_locks/runway_poller so tasks are not polled once per replica.
+VIDEO_POLLER_IN_WEB = (os.getenv("VIDEO_POLLER_IN_WEB") or "1").strip().lower() in {"1", "true", "yes"}
+VIDEO_POLL_MIN_SECONDS = float(os.getenv("VIDEO_POLL_MIN_SECONDS", "3"))
+VIDEO_POLL_MAX_SECONDS = float(os.getenv("VIDEO_POLL_MAX_SECONDS", "20"))
+VIDEO_POLL_BACKOFF = float(os.getenv("VIDEO_POLL_BACKOFF", "1.5"))
+VIDEO_POLLER_DISCOVERY_SECONDS = float(os.getenv("VIDEO_POLLER_DISCOVERY_SECONDS", "10"))
+VIDEO_POLLER_RATE_PER_SECOND = float(os.getenv("VIDEO_POLLER_RATE_PER_SECOND", "5"))
+VIDEO_POLLER_MAX_CONCURRENCY = int(os.getenv("VIDEO_POLLER_MAX_CONCURRENCY", "8"))
+VIDEO_POLLER_LEADER_TTL_SECONDS = float(os.getenv("VIDEO_POLLER_LEADER_TTL_SECONDS", "45"))
+
+_LEADER_COLLECTION = "system_locks"
+_LEADER_DOCUMENT = "runway_poller"
+_ACTIVE_PROVIDER_STATES = {"PENDING", "RUNNING", "THROTTLED"}
+
+
+@dataclass
+class _TrackedJob:
+    job_id: str
+    uid: str
+    task_id: str
+    next_poll_at: float
+    interval: float = VIDEO_POLL_MIN_SECONDS
+    provider_status: Optional[str] = None
+    provider_progress: Optional[float] = None
+
+
+class _RateLimiter:
+    """Token bucket shared by every provider poll in this process."""
+
+    def __init__(self, rate: float):
+        self.rate = max(0.1, rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RunwayPoller:
+    def __init__(self, owner: Optional[str] = None):
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.db = None
+        self._tracked: Dict[str, _TrackedJob] = {}
+        self._in_flight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._finalizing: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._limiter: Optional[_RateLimiter] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._leader_until = 0.0
+        self._next_discovery = 0.0
+        self._stopping = False
+        self.stats = {
+            "polls": 0,
+            "pollErrors": 0,
+            "finalizationsStarted": 0,
+            "providerFailures": 0,
+        }
+
+    async def start(self) -> None:
+        self.db = get_db()
+        self._limiter = _RateLimiter(VIDEO_POLLER_RATE_PER_SECOND)
+        self._slots = asyncio.Semaphore(max(1, VIDEO_POLLER_MAX_CONCURRENCY))
+        self._loop_task = asyncio.create_task(self._run())
+        print(f"[RUNWAY POLLER] started ({self.owner})", flush=True)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        pending = list(self._tasks) + list(self._finalizing.values())
+        if self._loop_task is not None:
+            pending.append(self._loop_task)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._is_leader():
+            try:
+                await run_blocking(self._release_leadership)
+            except Exception:
+                pass
+
+    # ---------- leadership ----------
+    def _is_leader(self) -> bool:
+        return time.time() < self._leader_until
+
+    def _acquire_leadership(self) -> bool:
+        ref = self.db.collection(_LEADER_COLLECTION).document(_LEADER_DOCUMENT)
+        now = time.time()
+
+        @gc_firestore.transactional
+        def _tx(transaction: gc_firestore.Transaction) -> bool:
+            data = ref.get(transaction=transaction).to_dict() or {}
+            if data.get("owner") not in (None, self.owner) and float(data.get("expiresAt") or 0) > now:
+                return False
+            transaction.set(ref, {
+                "owner": self.owner,
+                "expiresAt": now + VIDEO_POLLER_LEADER_TTL_SECONDS,
+                "updatedAt": int(now),
+            })
+            return True
+
+        if _tx(self.db.transaction()):
+            self._leader_until = now + VIDEO_POLLER_LEADER_TTL_SECONDS
+            return True
+        self._leader_until = 0.0
+        return False
+
+    def _release_leadership(self) -> None:
+        ref = self.db.collection(_LEADER_COLLECTION).document(_LEADER_DOCUMENT)
+        data = ref.get().to_dict() or {}
+        if data.get("owner") == self.owner:
+            ref.update({"expiresAt": 0})
+
+    # ---------- main loop ----------
+    async def _run(self) -> None:
+        next_leader_check = 0.0
+        while not self._stopping:
+            try:
+                now = time.time()
+                if now >= next_leader_check:
+                    was_leader = self._is_leader()
+                    leader = await run_blocking(self._acquire_leadership)
+                    next_leader_check = now + VIDEO_POLLER_LEADER_TTL_SECONDS / 3
+                    if leader and not was_leader:
+                        self._next_discovery = 0.0
+                    if not leader:
+                        self._tracked.clear()
+
+                if not self._is_leader():
+                    await asyncio.sleep(1.0)
+                    continue
+
+                if now >= self._next_discovery:
+                    await self._discover()
+                    self._next_discovery = now + VIDEO_POLLER_DISCOVERY_SECONDS
+
+                for tracked in list(self._tracked.values()):
+                    if tracked.next_poll_at <= now and tracked.job_id not in self._in_flight:
+                        self._in_flight.add(tracked.job_id)
+                        self._spawn(self._poll(tracked))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print("RUNWAY POLLER LOOP ERROR:", repr(exc), flush=True)
+
+            await asyncio.sleep(0.5)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _discover(self) -> None:
+        snaps = await stream_query(
+            self.db.collection("video_jobs")
+            .where("status", "==", "running")
+            .limit(500)
+        )
+
+        now = time.time()
+        seen: Set[str] = set()
+        for snap in snaps:
+            job = snap.to_dict() or {}
+            task_id = job.get("runwayVideoTaskId")
+            if not task_id or snap.id in self._finalizing:
+                continue
+
+            if job.get("finalizationState") == "running":
+                expires_at = job.get("finalizationLeaseExpiresAt")
+                if expires_at is None:
+                    expires_at = int(job.get("progressUpdatedAt") or 0) + VIDEO_FINALIZE_LEASE_SECONDS
+                if float(expires_at) > now:
+                    continue
+
+            seen.add(snap.id)
+            if snap.id not in self._tracked:
+                self._tracked[snap.id] = _TrackedJob(
+                    job_id=snap.id,
+                    uid=job.get("uid") or "",
+                    task_id=task_id,
+                    next_poll_at=now,
+                )
+
+        for job_id in list(self._tracked):
+            if job_id not in seen and job_id not in self._in_flight:
+                self._tracked.pop(job_id, None)
+
+    def _reschedule(self, tracked: _TrackedJob, changed: bool) -> None:
+        if changed:
+            tracked.interval = VIDEO_POLL_MIN_SECONDS
+        else:
+            tracked.interval = min(VIDEO_POLL_MAX_SECONDS, tracked.interval * VIDEO_POLL_BACKOFF)
+        tracked.next_poll_at = time.time() + tracked.interval
+
+    async def _poll(self, tracked: _TrackedJob) -> None:
+        job_ref = self.db.collection("video_jobs").document(tracked.job_id)
+        try:
+            async with self._slots:
+                await self._limiter.acquire()
+                self.stats["polls"] += 1
+                try:
+                    task = await get_task(tracked.task_id)
+                except Exception as exc:
+                    self.stats["pollErrors"] += 1
+                    await run_blocking(record_video_poll_error, job_ref, exc)
+                    self._reschedule(tracked, changed=False)
+                    return
+
+            st = task.get("status")
+            if st == "SUCCEEDED":
+                self._tracked.pop(tracked.job_id, None)
+                claimed = await run_blocking(
+                    claim_video_finalization,
+                    self.db,
+                    job_ref,
+                    self.owner,
+                )
+                if claimed:
+                    self.stats["finalizationsStarted"] += 1
+                    self._finalizing[tracked.job_id] = asyncio.create_task(
+                        self._finalize(tracked, job_ref, task)
+                    )
+                return
+
+            if st in ("FAILED", "CANCELED"):
+                self._tracked.pop(tracked.job_id, None)
+                self.stats["providerFailures"] += 1
+                await run_blocking(
+                    fail_video_job_from_provider,
+                    self.db,
+                    job_ref,
+                    tracked.job_id,
+                    tracked.uid,
+                    task,
+                )
+                return
+
+            progress = task.get("progress")
+            changed = st != tracked.provider_status or progress != tracked.provider_progress
+            tracked.provider_status = st
+            tracked.provider_progress = progress
+            if st not in _ACTIVE_PROVIDER_STATES:
+                print("RUNWAY POLLER UNKNOWN STATUS:", tracked.job_id, st, flush=True)
+            self._reschedule(tracked, changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print("RUNWAY POLLER JOB ERROR:", tracked.job_id, repr(exc), flush=True)
+            self._reschedule(tracked, changed=False)
+        finally:
+            self._in_flight.discard(tracked.job_id)
+
+    async def _finalize(self, tracked: _TrackedJob, job_ref, task: Dict[str, Any]) -> None:
+        async def _renew() -> None:
+            while True:
+                await asyncio.sleep(VIDEO_FINALIZE_LEASE_SECONDS / 3)
+                try:
+                    await run_blocking(renew_video_finalization, job_ref, self.owner)
+                except Exception as exc:
+                    print("RUNWAY FINALIZE LEASE ERROR:", tracked.job_id, repr(exc), flush=True)
+
+        renewer = asyncio.create_task(_renew())
+        try:
+            await finalize_video_job(tracked.job_id, tracked.uid, task)
+        finally:
+            renewer.cancel()
+            self._finalizing.pop(tracked.job_id, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "leader": self._is_leader(),
+            "tracked": len(self._tracked),
+            "inFlight": len(self._in_flight),
+            "finalizing": len(self._finalizing),
+            **self.stats,
+        }
+
+
+_poller: Optional[RunwayPoller] = None
+
+
+async def start_runway_poller() -> RunwayPoller:
+    global _poller
+    if _poller is None:
+        _poller = RunwayPoller()
+        await _poller.start()
+    return _poller
+
+
+async def stop_runway_poller() -> None:
+    global _poller
+    poller = _poller
+    _poller = None
+    if poller is not None:
+        await poller.stop()
+
+
+def runway_poller_stats() -> Dict[str, Any]:
+    if _poller is None:
+        return {"running": False, "inWeb": VIDEO_POLLER_IN_WEB}
+    return {"running": True, "inWeb": VIDEO_POLLER_IN_WEB, **_poller.snapshot()}
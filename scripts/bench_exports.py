@@ -0,0 +1,183 @@
+"""
+Benchmark: streamed XLSX and CSV/ZIP exports vs. the in-memory builders they replaced.
+
+    python scripts/bench_exports.py --rows 1000000
+
+Each case runs in its own process so peak RSS is per case. The legacy_*
+functions are copies of the previous approach (a full Workbook with a width
+scan over every cell; every CSV held as a string before zipping), kept here
+only as the baseline. Large legacy XLSX runs need several GB of memory; use
+--legacy-rows to cap them.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADERS = [
+    "Source", "Account ID", "Campaign ID", "Campaign Name", "Line Item ID", "Creative ID",
+    "Headline", "Impressions", "Clicks", "CTR (%)", "Spend", "ROAS",
+]
+
+
+def make_rows(n, seed):
+    rng = random.Random(seed)
+    for index in range(n):
+        impressions = rng.randrange(0, 50000)
+        clicks = rng.randrange(0, impressions // 20 + 1)
+        yield [
+            rng.choice(("Google Ads", "Meta Ads", "Library / Manual")),
+            f"act_{rng.randrange(10):04d}",
+            f"c{rng.randrange(500)}",
+            f"Campaign {rng.randrange(500)} spring launch",
+            f"g{rng.randrange(2000)}",
+            f"k{index}",
+            "Save on your next order " * rng.randrange(1, 4),
+            impressions,
+            clicks,
+            round(clicks / impressions * 100, 4) if impressions else 0,
+            round(rng.uniform(0, 400), 4),
+            round(rng.uniform(0, 8), 4),
+        ]
+
+
+# ---------- previous implementations ----------
+def legacy_xlsx(rows, sink):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    rows = list(rows)
+    workbook = Workbook()
+    ws = workbook.active
+    ws.title = "Creatives"
+    ws.append(HEADERS)
+    for cell in ws[1]:
+        cell.fill = PatternFill("solid", fgColor="1F4E78")
+        cell.font = Font(color="FFFFFF", bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    ws.freeze_panes = "A2"
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(HEADERS))}{len(rows) + 1}"
+    for row in rows:
+        ws.append(row)
+    for index, header in enumerate(HEADERS, start=1):
+        max_length = len(str(header))
+        for cell in ws[get_column_letter(index)]:
+            max_length = max(max_length, min(len(str(cell.value or "")), 80))
+        ws.column_dimensions[get_column_letter(index)].width = min(max_length + 2, 48)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    sink.write(stream.getvalue())
+
+
+def legacy_csv_zip(rows, sink):
+    rows = list(rows)
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("report_metadata.json", json.dumps({"rows": len(rows)}))
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+        archive.writestr("creatives.csv", text.getvalue())
+    sink.write(stream.getvalue())
+
+
+# ---------- streamed ----------
+def streamed_xlsx(rows, sink):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+
+    from report_exports import workbook_chunks, write_table
+
+    workbook = Workbook(write_only=True)
+    write_table(
+        workbook.create_sheet("Creatives"),
+        HEADERS,
+        rows,
+        fill=PatternFill("solid", fgColor="1F4E78"),
+        font=Font(color="FFFFFF", bold=True),
+        alignment=Alignment(horizontal="center", vertical="center"),
+        show_grid_lines=False,
+    )
+    for chunk in workbook_chunks(workbook):
+        sink.write(chunk)
+
+
+def streamed_csv_zip(rows, sink):
+    from report_exports import csv_zip_chunks
+
+    for chunk in csv_zip_chunks([("creatives.csv", HEADERS, rows)], extra=[("report_metadata.json", "{}")]):
+        sink.write(chunk)
+
+
+CASES = {
+    "legacy xlsx": legacy_xlsx,
+    "streamed xlsx": streamed_xlsx,
+    "legacy csv zip": legacy_csv_zip,
+    "streamed csv zip": streamed_csv_zip,
+}
+
+
+class _CountingSink:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def run_case(name, rows, seed):
+    sink = _CountingSink()
+    started = time.perf_counter()
+    CASES[name](make_rows(rows, seed), sink)
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux.
+    print(json.dumps({"seconds": seconds, "peakMb": peak / 1024, "bytes": sink.size}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=None, help="row cap for the legacy cases (default: --rows)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--case", choices=sorted(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case, args.rows, args.seed)
+        return 0
+
+    print(f"{'case':<20}{'rows':>12}{'seconds':>10}{'peak RSS MB':>14}{'output MB':>12}")
+    for name in CASES:
+        rows = args.rows
+        if name.startswith("legacy") and args.legacy_rows is not None:
+            rows = min(rows, args.legacy_rows)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", name, "--rows", str(rows), "--seed", str(args.seed)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            print(f"{name:<20}{rows:>12,}  failed: {result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"{name:<20}{rows:>12,}{stats['seconds']:>10.1f}{stats['peakMb']:>14.0f}"
+            f"{stats['bytes'] / 1024 / 1024:>12.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+"""
+Microbenchmark: metrics_engine ports vs. the per-row implementations they replaced.
+
+    python scripts/bench_metrics.py --rows 100000
+
+The legacy_* functions are copies of the previous code, kept here only as the
+baseline; each pair is checked for matching output before it is timed.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign_intelligence.service import _aggregate as campaign_aggregate  # noqa: E402
+from creative_insights import _safe_num, compute_insights  # noqa: E402
+from performance_intelligence.reporting import (  # noqa: E402
+    METRIC_LABELS,
+    _aggregate as evidence_aggregate,
+    _performance_unit_key,
+    _to_float,
+    _to_int,
+)
+from reporting_engine.date_ranges import row_ordinal  # noqa: E402
+from reporting_engine.engine import _group, _split_value  # noqa: E402
+from reporting_engine.metrics import ADDITIVE, METRICS, derive, num  # noqa: E402
+
+
+# ---------- previous implementations ----------
+def legacy_aggregate(rows):
+    return derive({k: sum(num(r.get(k)) for r in rows) for k in ADDITIVE})
+
+
+def legacy_group(rows, splits):
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[tuple(_split_value(row, split) for split in splits)].append(row)
+    return [{"rowCount": len(group), **legacy_aggregate(group)} for group in grouped.values()]
+
+
+def legacy_campaign_aggregate(rows):
+    def _integer(value):
+        try:
+            return int(float(value if value not in (None, "") else 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _num(value):
+        try:
+            return float(value if value not in (None, "") else 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    impressions = sum(_integer(row.get("impressions")) for row in rows)
+    clicks = sum(_integer(row.get("clicks")) for row in rows)
+    spend = sum(_num(row.get("spend")) for row in rows)
+    conversions = sum(_num(row.get("conversions")) for row in rows)
+    conversion_value = sum(_num(row.get("conversionValue")) for row in rows)
+    return {
+        "impressions": impressions,
+        "clicks": clicks,
+        "spend": round(spend, 2),
+        "conversions": round(conversions, 2),
+        "conversionValue": round(conversion_value, 2),
+        "ctr": round((clicks / impressions) * 100, 4) if impressions else 0,
+        "cpc": round(spend / clicks, 4) if clicks else 0,
+        "cpa": round(spend / conversions, 4) if conversions else None,
+        "roas": round(conversion_value / spend, 4) if spend else None,
+    }
+
+
+def legacy_evidence_aggregate(rows, key_fields, metrics):
+    grouped = {}
+    seen_units = defaultdict(set)
+    for item in rows:
+        key = tuple(item.get(field) for field in key_fields)
+        if key not in grouped:
+            grouped[key] = {field: item.get(field) for field in key_fields}
+            grouped[key]["creative_count"] = 0
+            grouped[key]["independent_result_count"] = 0
+            for metric in metrics:
+                grouped[key][metric] = 0.0
+        target = grouped[key]
+        target["creative_count"] += 1
+        unit = _performance_unit_key(item)
+        if unit in seen_units[key]:
+            continue
+        seen_units[key].add(unit)
+        target["independent_result_count"] += 1
+        for metric in metrics:
+            if metric in {"ctr_percent", "cpc", "cpm", "cpa", "roas", "qualification_score", "attribution_confidence"}:
+                continue
+            target[metric] += _to_float(item.get(metric))
+
+    for key, target in grouped.items():
+        impressions = _to_float(target.get("impressions"))
+        clicks = _to_float(target.get("clicks"))
+        spend = _to_float(target.get("spend"))
+        conversions = _to_float(target.get("conversions"))
+        revenue = _to_float(target.get("revenue"))
+        matching_units = {}
+        for item in rows:
+            if all(item.get(field) == target.get(field) for field in key_fields):
+                matching_units.setdefault(_performance_unit_key(item), item)
+        if "ctr_percent" in metrics:
+            target["ctr_percent"] = (clicks / impressions * 100) if impressions else 0
+        if "cpc" in metrics:
+            target["cpc"] = spend / clicks if clicks else 0
+        if "cpm" in metrics:
+            target["cpm"] = spend / impressions * 1000 if impressions else 0
+        if "cpa" in metrics:
+            target["cpa"] = spend / conversions if conversions else 0
+        if "roas" in metrics:
+            target["roas"] = revenue / spend if spend else 0
+        for metric in {"qualification_score", "attribution_confidence"} & set(metrics):
+            vals = [_to_float(item.get(metric)) for item in matching_units.values()]
+            target[metric] = sum(vals) / len(vals) if vals else 0
+
+    return sorted(grouped.values(), key=lambda row: (_to_float(row.get("spend")), _to_int(row.get("impressions"))), reverse=True)
+
+
+def _perf(it, key):
+    return _safe_num((it.get("performance") or {}).get(key))
+
+
+def _legacy_avg(nums):
+    return round(sum(nums) / len(nums), 4) if nums else None
+
+
+def _legacy_weighted_roas(items):
+    total_spend = 0.0
+    total_revenue = 0.0
+    for it in items:
+        s, r = _perf(it, "spend"), _perf(it, "revenue")
+        if s is None or r is None or s <= 0:
+            continue
+        total_spend += s
+        total_revenue += r
+    return round(total_revenue / total_spend, 4) if total_spend > 0 else None
+
+
+def _legacy_summaries(groups, with_spend):
+    out = []
+    for g, arr in groups.items():
+        row = {"value": g, "count": len(arr)}
+        for metric in ("ctr", "cpa", "cpm"):
+            row[f"avg_{metric}"] = _legacy_avg([v for v in (_perf(x, metric) for x in arr) if v is not None])
+        if with_spend:
+            row["total_spend"] = round(sum(v for v in (_perf(x, "spend") for x in arr) if v is not None), 4)
+        row["weighted_roas"] = _legacy_weighted_roas(arr)
+        out.append(row)
+    return out
+
+
+def legacy_compute_insights(items, *, min_spend, limit):
+    items = [it for it in items if (_perf(it, "spend") or 0.0) >= min_spend]
+
+    def rank(key, desc):
+        sentinel = -1e18 if desc else 1e18
+        return sorted(items, key=lambda it: _perf(it, key) if _perf(it, key) is not None else sentinel, reverse=desc)[:5]
+
+    def best(group_of, with_spend=True):
+        groups = defaultdict(list)
+        for it in items:
+            g = group_of(it)
+            if g:
+                groups[g].append(it)
+        return _legacy_summaries(groups, with_spend)
+
+    def values(metric):
+        return [v for v in (_perf(x, metric) for x in items) if v is not None]
+
+    return {
+        "summary": {f"avg_{m}": _legacy_avg(values(m)) for m in ("roas", "ctr", "cpa", "cpm")},
+        "weighted_roas": _legacy_weighted_roas(items),
+        "top": [rank("roas", True), rank("ctr", True), rank("cpa", False), rank("cpm", False)],
+        "platform": best(lambda it: it["meta"].get("platform")),
+        "tone": best(lambda it: it["meta"].get("tone")),
+        "style": best(lambda it: it["meta"].get("stylePreset") if it["kind"] == "image" else None),
+        "ratio": best(lambda it: it.get("ratio"), with_spend=False),
+    }
+
+
+# ---------- data ----------
+def _maybe(rng, value, missing=0.1):
+    return None if rng.random() < missing else value
+
+
+def make_rows(n, rng):
+    campaigns = [f"c{i}" for i in range(10)]
+    return [
+        {
+            "source": rng.choice(("google_ads", "meta_ads")),
+            "source_account_id": rng.choice(("a1", "a2", "a3")),
+            "campaign_id": (campaign := rng.choice(campaigns)),
+            "campaign_name": f"Campaign {campaign}",
+            "ad_group_id": f"g{rng.randrange(5)}",
+            "creative_id": f"k{rng.randrange(n // 4 or 1)}",
+            "platform": rng.choice(("googleAds", "metaAds")),
+            "date": f"2026-01-{rng.randrange(1, 29):02d}",
+            "impressions": _maybe(rng, rng.randrange(0, 50000)),
+            "clicks": _maybe(rng, str(rng.randrange(0, 800))),
+            "spend": _maybe(rng, round(rng.uniform(0, 400), 2)),
+            "conversions": _maybe(rng, rng.randrange(0, 30)),
+            "conversionValue": _maybe(rng, round(rng.uniform(0, 2000), 2)),
+            "revenue": _maybe(rng, round(rng.uniform(0, 2000), 2)),
+            "qualification_score": _maybe(rng, rng.random()),
+            "attribution_confidence": _maybe(rng, rng.random()),
+        }
+        for _ in range(n)
+    ]
+
+
+def make_snapshots(n, rng):
+    return [
+        {
+            "id": str(i),
+            "kind": rng.choice(("image", "video")),
+            "ratio": _maybe(rng, rng.choice(("1:1", "9:16", "16:9"))),
+            "performance": {
+                key: _maybe(rng, round(rng.uniform(0, 50), 2), 0.2)
+                for key in ("ctr", "cpc", "cpa", "cpm", "spend", "revenue", "roas")
+            },
+            "meta": {
+                "platform": _maybe(rng, rng.choice(("meta", "tiktok", "google"))),
+                "tone": _maybe(rng, rng.choice(("bold", "calm", "playful"))),
+                "stylePreset": _maybe(rng, rng.choice(("photo", "3d", "flat"))),
+            },
+        }
+        for i in range(n)
+    ]
+
+
+# ---------- harness ----------
+def _close(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-4)
+    return a == b
+
+
+def _same_values(a, b):
+    return all(_close(a[k], b[k]) for k in a if k in b)
+
+
+def timed(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = make_rows(args.rows, rng)
+    snapshots = make_snapshots(args.rows, rng)
+    metrics = list(METRIC_LABELS)
+    keys = ["source", "source_account_id", "campaign_id", "campaign_name", "ad_group_id"]
+
+    cases = [
+        (
+            "reporting group by platform/day",
+            lambda: legacy_group(rows, ["platform", "day"]),
+            lambda: _group(rows, [row_ordinal(row) for row in rows], ["platform", "day"], list(METRICS), [])[0],
+            lambda old, new: sorted(row["rowCount"] for row in old) == sorted(row["rowCount"] for row in new),
+        ),
+        (
+            "campaign _aggregate",
+            lambda: legacy_campaign_aggregate(rows),
+            lambda: campaign_aggregate(rows),
+            _same_values,
+        ),
+        (
+            "evidence _aggregate",
+            lambda: legacy_evidence_aggregate(rows, keys, metrics),
+            lambda: evidence_aggregate(rows, keys, metrics),
+            lambda old, new: len(old) == len(new) and all(map(_same_values, old, new)),
+        ),
+        (
+            "creative compute_insights",
+            lambda: legacy_compute_insights(snapshots, min_spend=0, limit=args.rows),
+            lambda: compute_insights(snapshots, min_spend=0, limit=args.rows),
+            lambda old, new: old["weighted_roas"] == new["summary"]["weighted_roas"]
+            and [it["id"] for it in old["top"][0]] == [it["id"] for it in new["top"]["by_roas"]],
+        ),
+    ]
+
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    print(f"{'case':<30}{'legacy ms':>12}{'vectorized ms':>16}{'speedup':>10}  match")
+    for name, legacy, vectorized, check in cases:
+        old_seconds, old_result = timed(legacy, 1 if name == "evidence _aggregate" else args.repeat)
+        new_seconds, new_result = timed(vectorized, args.repeat)
+        print(
+            f"{name:<30}{old_seconds * 1000:>12.1f}{new_seconds * 1000:>16.1f}"
+            f"{old_seconds / new_seconds:>9.1f}x  {'yes' if check(old_result, new_result) else 'NO'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+Benchmark: build_report from the raw daily rows vs. from the rollup cubes.
+
+    python scripts/bench_reporting_rollups.py --campaigns 500 --days 730
+
+Builds a synthetic snapshot (one daily row per campaign per day, split across
+Google and Meta), times each preview with and without snapshot["rollups"],
+and checks both paths return the same rows, totals and comparison. The cubes
+are also built from the rows round-tripped through the persisted rollup
+documents (daily_rollups), and must answer identically.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_rollups import cells_from_rows, decode_columns, encode_month  # noqa: E402
+from reporting_engine.date_ranges import sort_by_ordinal  # noqa: E402
+from reporting_engine.engine import ORDINALS_KEY, build_report, build_rollups  # noqa: E402
+
+CASES = [
+    # (name, date_preset, start, end, comparison, splits)
+    ("last 30 days by platform", "last_30_days", None, None, "previous_period", ["platform"]),
+    ("last 90 days by campaign", "last_90_days", None, None, "previous_year", ["campaign"]),
+    ("maximum by month", "maximum", None, None, "none", ["month"]),
+    ("maximum by campaign/week", "maximum", None, None, "none", ["campaign", "week"]),
+    ("custom year by quarter", "custom", "offset:-400", "offset:-35", "previous_period", ["quarter", "platform"]),
+    ("this month by day", "this_month", None, None, "previous_month", ["day"]),
+]
+
+
+def make_snapshot(campaigns, days, rng):
+    today = date.today()
+    snapshot = {}
+    for key, provider, label in (("googleAds", "google_ads", "Google Ads"), ("metaAds", "meta_ads", "Meta Ads")):
+        rows = []
+        for index in range(campaigns // 2):
+            name = f"{label} campaign {index}"
+            for offset in range(days):
+                impressions = rng.randrange(0, 20000)
+                clicks = rng.randrange(0, impressions // 20 + 1)
+                rows.append(
+                    {
+                        "provider": provider,
+                        "providerLabel": label,
+                        "campaignId": f"{provider}-{index}",
+                        "campaignName": name,
+                        "date": (today - timedelta(days=offset)).isoformat(),
+                        "impressions": impressions,
+                        "clicks": clicks,
+                        "spend": round(rng.uniform(0, 300), 2),
+                        "conversions": rng.randrange(0, clicks // 10 + 1),
+                        "conversionValue": round(rng.uniform(0, 1500), 2),
+                    }
+                )
+        # Sorted and indexed by date ordinal, as reporting_engine.service stores them.
+        rows, ordinals = sort_by_ordinal(rows)
+        snapshot[key] = {
+            "accountName": label,
+            "dailyCampaignPerformance": rows,
+            "campaigns": [],
+            ORDINALS_KEY: {"dailyCampaignPerformance": ordinals, "campaigns": []},
+        }
+    return snapshot
+
+
+def stored_cells(snapshot):
+    """Each provider's rows as written to, then read back from, rollup documents."""
+    cells = {}
+    for key in ("googleAds", "metaAds"):
+        months = {}
+        for cell, value in cells_from_rows(snapshot[key]["dailyCampaignPerformance"]).items():
+            months.setdefault(date.fromordinal(cell[1]).strftime("%Y-%m"), {})[cell] = value
+        documents = [
+            payload
+            for month, month_cells in months.items()
+            for payload in encode_month("bench", key, month, month_cells).values()
+        ]
+        cells[key] = {**decode_columns(documents), "platform": snapshot[key]["accountName"]}
+    return cells
+
+
+def _date(value):
+    if value and value.startswith("offset:"):
+        return (date.today() + timedelta(days=int(value.split(":", 1)[1]))).isoformat()
+    return value
+
+
+def _close(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_close(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(_close, a, b))
+    return a == b
+
+
+def timed(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--campaigns", type=int, default=500)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    raw = make_snapshot(args.campaigns, args.days, random.Random(args.seed))
+    build_seconds, rollups = timed(lambda: build_rollups(raw), 1)
+    cubed = {**raw, "rollups": rollups}
+    cells = stored_cells(raw)
+    stored_seconds, stored_rollups = timed(lambda: build_rollups(raw, cells), 1)
+    stored = {**raw, "rollups": stored_rollups}
+    rows = sum(len(raw[key]["dailyCampaignPerformance"]) for key in ("googleAds", "metaAds"))
+
+    print(
+        f"{rows:,} daily rows; rollups built in {build_seconds * 1000:.0f} ms from rows, "
+        f"{stored_seconds * 1000:.0f} ms from stored cells; best of {args.repeat}"
+    )
+    print(f"{'case':<30}{'raw ms':>10}{'rollup ms':>12}{'speedup':>10}  match  stored")
+    for name, preset, start, end, comparison, splits in CASES:
+        def report(snapshot):
+            return build_report(
+                snapshot,
+                report_type="campaign",
+                providers=["googleAds", "metaAds"],
+                metrics=["impressions", "clicks", "spend", "ctr", "cpc", "roas"],
+                date_preset=preset,
+                start_date=_date(start),
+                end_date=_date(end),
+                comparison=comparison,
+                splits=splits,
+            )
+
+        old_seconds, old_result = timed(lambda: report(raw), args.repeat)
+        new_seconds, new_result = timed(lambda: report(cubed), args.repeat)
+        stored_result = report(stored)
+        print(
+            f"{name:<30}{old_seconds * 1000:>10.1f}{new_seconds * 1000:>12.1f}"
+            f"{old_seconds / new_seconds:>9.1f}x  {'yes' if _close(old_result, new_result) else 'NO':<5}"
+            f"  {'yes' if _close(old_result, stored_result) else 'NO'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 from google.cloud import firestore as gc_firestore
 
 from plan_config import get_limit
+from request_documents import (
+    load_documents_many,
+    load_storage_summary_doc,
+    remember_request_document,
+)
 
 SUMMARY_COLLECTION = "storage"
 SUMMARY_DOCUMENT = "summary"
@@ -26,10 +31,7 @@ def _safe_int(value: Any) -> int:
         return 0
 
 
-def get_storage_summary(db, uid: str, tier: Optional[str]) -> Dict[str, Any]:
-    snap = _summary_ref(db, uid).get()
-    data = snap.to_dict() or {}
-
+def _summary_from_doc(data: Dict[str, Any], tier: Optional[str]) -> Dict[str, Any]:
     used = _safe_int(data.get("usedBytes"))
     limit_bytes = get_limit(tier, "storage_bytes")
     remaining = max(0, limit_bytes - used)
@@ -49,6 +51,20 @@ def get_storage_summary(db, uid: str, tier: Optional[str]) -> Dict[str, Any]:
     }
 
 
+def get_storage_summary(db, uid: str, tier: Optional[str]) -> Dict[str, Any]:
+    return _summary_from_doc(load_storage_summary_doc(db, uid), tier)
+
+
+def get_storage_summaries_many(
+    db,
+    uids: Iterable[str],
+    tiers: Dict[str, Optional[str]],
+) -> Dict[str, Dict[str, Any]]:
+    """get_storage_summary for many users, read with batched get_all."""
+    docs = load_documents_many(db, "storage", uids)
+    return {uid: _summary_from_doc(data, tiers.get(uid)) for uid, data in docs.items()}
+
+
 def ensure_storage_available(db, uid: str, tier: Optional[str], incoming_bytes: int) -> Dict[str, Any]:
     incoming = _safe_int(incoming_bytes)
     summary = get_storage_summary(db, uid, tier)
@@ -95,7 +111,13 @@ def register_storage_asset(
         transaction.set(ref, update, merge=True)
         return update
 
-    return _tx(db.transaction())
+    update = _tx(db.transaction())
+    remember_request_document(
+        "storage",
+        uid,
+        {key: value for key, value in update.items() if key != "updatedAt"},
+    )
+    return update
 
 
 def release_storage_asset(
@@ -125,4 +147,10 @@ def release_storage_asset(
         transaction.set(ref, update, merge=True)
         return update
 
-    return _tx(db.transaction())
+    update = _tx(db.transaction())
+    remember_request_document(
+        "storage",
+        uid,
+        {key: value for key, value in update.items() if key != "updatedAt"},
+    )
+    return update
@@ -4,21 +4,12 @@ from typing import Optional, Dict, Any
 from urllib.parse import quote
 
 
-def upload_bytes_to_firebase_storage_with_metadata(
-    data: bytes,
-    uid: str,
-    content_type: str,
-    folder: str = "uploaded_creatives",
-    filename_hint: Optional[str] = None,
-) -> Dict[str, Any]:
-    """Upload bytes and return URL plus durable storage metadata."""
-    from firebase_admin import storage
+RESUMABLE_UPLOAD_CHUNK_BYTES = int(
+    os.getenv("RESUMABLE_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024))
+)
 
-    bucket_name = (os.getenv("FIREBASE_STORAGE_BUCKET") or "").strip()
-    if not bucket_name:
-        raise RuntimeError("FIREBASE_STORAGE_BUCKET is missing.")
 
-    ct = (content_type or "application/octet-stream").lower().strip()
+def _extension_for(ct: str, filename_hint: Optional[str]) -> str:
     ext = "bin"
     if ct == "image/png":
         ext = "png"
@@ -34,6 +25,18 @@ def upload_bytes_to_firebase_storage_with_metadata(
         ext = "mp3"
     elif filename_hint and "." in filename_hint:
         ext = filename_hint.split(".")[-1].lower()[:8]
+    return ext
+
+
+def _new_blob(uid: str, content_type: str, folder: str, filename_hint: Optional[str]):
+    from firebase_admin import storage
+
+    bucket_name = (os.getenv("FIREBASE_STORAGE_BUCKET") or "").strip()
+    if not bucket_name:
+        raise RuntimeError("FIREBASE_STORAGE_BUCKET is missing.")
+
+    ct = (content_type or "application/octet-stream").lower().strip()
+    ext = _extension_for(ct, filename_hint)
 
     bucket = storage.bucket(bucket_name)
     object_id = f"{folder}/{uid}/{uuid.uuid4().hex}.{ext}"
@@ -41,8 +44,10 @@ def upload_bytes_to_firebase_storage_with_metadata(
 
     blob = bucket.blob(object_id)
     blob.metadata = {"firebaseStorageDownloadTokens": token}
-    blob.upload_from_string(data, content_type=ct)
+    return blob, bucket_name, object_id, token, ct
+
 
+def _stored_metadata(bucket_name: str, object_id: str, token: str, ct: str, size: int) -> Dict[str, Any]:
     url = (
         f"https://firebasestorage.googleapis.com/v0/b/{bucket_name}/o/"
         f"{quote(object_id, safe='')}?alt=media&token={token}"
@@ -51,12 +56,42 @@ def upload_bytes_to_firebase_storage_with_metadata(
     return {
         "url": url,
         "storagePath": object_id,
-        "fileSizeBytes": len(data),
+        "fileSizeBytes": size,
         "contentType": ct,
         "bucket": bucket_name,
     }
 
 
+def upload_bytes_to_firebase_storage_with_metadata(
+    data: bytes,
+    uid: str,
+    content_type: str,
+    folder: str = "uploaded_creatives",
+    filename_hint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Upload bytes and return URL plus durable storage metadata."""
+    blob, bucket_name, object_id, token, ct = _new_blob(uid, content_type, folder, filename_hint)
+    blob.upload_from_string(data, content_type=ct)
+    return _stored_metadata(bucket_name, object_id, token, ct, len(data))
+
+
+def upload_file_to_firebase_storage_with_metadata(
+    path: str,
+    uid: str,
+    content_type: str,
+    folder: str = "uploaded_creatives",
+    filename_hint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Upload a local file with a chunked resumable upload, so large videos are
+    never held in memory and a dropped connection resumes mid-file.
+    """
+    blob, bucket_name, object_id, token, ct = _new_blob(uid, content_type, folder, filename_hint)
+    blob.chunk_size = RESUMABLE_UPLOAD_CHUNK_BYTES
+    blob.upload_from_filename(path, content_type=ct)
+    return _stored_metadata(bucket_name, object_id, token, ct, os.path.getsize(path))
+
+
 def upload_bytes_to_firebase_storage(
     data: bytes,
     uid: str,
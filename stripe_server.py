@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 import stripe
 
 from firebase_admin import firestore
+from admin_search import index_user
 from auth_helpers import get_db, get_bearer_token, verify_firebase_token
 from notification_utils import create_notification
 from customer_intelligence.event_service import track_event
@@ -414,6 +415,7 @@ def create_checkout_session(
             },
             merge=True,
         )
+        index_user(db, uid)
 
         session = stripe.checkout.Session.create(
             mode="subscription",
@@ -640,6 +642,7 @@ async def stripe_webhook(request: Request):
                 stripe_update["currentPeriodEnd"] = int(period_end)
 
             user_ref.set({"stripe": stripe_update}, merge=True)
+            index_user(db, uid)
 
             metadata = {
                 "stripeEventId": event_id,
@@ -749,6 +752,7 @@ async def stripe_webhook(request: Request):
                 },
                 merge=True,
             )
+            index_user(db, uid)
 
             amount_text = ""
             try:
@@ -813,6 +817,7 @@ async def stripe_webhook(request: Request):
                     },
                     merge=True,
                 )
+                index_user(db, uid)
 
                 track_event(
                     db,
@@ -982,6 +987,7 @@ def sync_subscription(
             stripe_update["currentPeriodEnd"] = int(resolved_period_end)
 
         user_ref.set({"stripe": stripe_update}, merge=True)
+        index_user(db, uid)
 
         return {
             "ok": True,
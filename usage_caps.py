@@ -1,11 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from google.cloud import firestore as gc_firestore
 
 from plan_config import get_limit, normalize_tier
+from request_documents import (
+    forget_request_document,
+    load_documents_many,
+    load_usage_doc,
+    load_user_doc,
+)
+
+# Firestore caps a WriteBatch at 500 operations.
+_CLEANUP_BATCH_LIMIT = 400
 
 
 def utc_month_key(dt: Optional[datetime] = None) -> str:
@@ -158,7 +167,7 @@ def check_and_increment_resource(
     if amount <= 0:
         raise ValueError("Usage increment must be greater than zero.")
 
-    user_doc = db.collection("users").document(uid).get().to_dict() or {}
+    user_doc = load_user_doc(db, uid)
     period = get_usage_period(user_doc)
     period_key = period["periodKey"]
     base_limit = get_limit(tier, resource)
@@ -255,7 +264,9 @@ def check_and_increment_resource(
             **period,
         }
 
-    return _tx(db.transaction())
+    result = _tx(db.transaction())
+    forget_request_document("usage", uid)
+    return result
 
 
 def rollback_resource(
@@ -303,26 +314,28 @@ def rollback_resource(
         transaction.set(ref, update, merge=True)
         return True
 
-    return _tx(db.transaction())
+    result = _tx(db.transaction())
+    forget_request_document("usage", uid)
+    return result
 
 
-def peek_resource(
-    db: gc_firestore.Client,
-    uid: str,
+def _peek_from_docs(
     tier: Optional[str],
     resource: str,
-    user_doc: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    if user_doc is None:
-        user_doc = db.collection("users").document(uid).get().to_dict() or {}
+    user_doc: Dict[str, Any],
+    data: Dict[str, Any],
+) -> tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Compute a peek result from already-loaded user and usage documents.
 
+    Returns the summary and, when expired bonus data was found, the merge
+    update that cleans it up (None otherwise).
+    """
     period = get_usage_period(user_doc)
     period_key = period["periodKey"]
     base_limit = get_limit(tier, resource)
 
     used_field, bonus_field, bonus_period_field = _resource_fields(resource)
-    ref = _usage_ref(db, uid)
-    data = ref.get().to_dict() or {}
     current_period = data.get("periodKey") or data.get("month")
 
     if resource == "images":
@@ -365,11 +378,9 @@ def peek_resource(
             if resource == "images":
                 cleanup["used"] = 0
 
-        ref.set(cleanup, merge=True)
-
     cap = base_limit + bonus
 
-    return {
+    summary = {
         "resource": resource,
         "used": used,
         "cap": cap,
@@ -377,6 +388,75 @@ def peek_resource(
         "bonus": bonus,
         **period,
     }
+    return summary, cleanup if stale_bonus_found else None
+
+
+def peek_resource(
+    db: gc_firestore.Client,
+    uid: str,
+    tier: Optional[str],
+    resource: str,
+    user_doc: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    if user_doc is None:
+        user_doc = load_user_doc(db, uid)
+
+    summary, cleanup = _peek_from_docs(tier, resource, user_doc, load_usage_doc(db, uid))
+
+    if cleanup is not None:
+        _usage_ref(db, uid).set(cleanup, merge=True)
+        forget_request_document("usage", uid)
+
+    return summary
+
+
+def peek_resources_many(
+    db: gc_firestore.Client,
+    uids: Iterable[str],
+    resources: Iterable[str],
+    user_docs: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Bulk peek_resource for listings: {uid: {resource: summary}}.
+
+    User and usage documents are read with batched get_all (user docs can be
+    passed in when the caller already has them), tiers come from each user
+    doc, and stale-bonus cleanups are written in WriteBatches rather than one
+    set() per user and resource.
+    """
+    uids = list(dict.fromkeys(uid for uid in uids if uid))
+    resources = tuple(resources)
+    if user_docs is None:
+        user_docs = load_documents_many(db, "user", uids)
+    usage_docs = load_documents_many(db, "usage", uids)
+
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    cleanups: Dict[str, Dict[str, Any]] = {}
+
+    for uid in uids:
+        user_doc = user_docs.get(uid) or {}
+        tier, _status = get_tier_and_status(user_doc)
+        data = usage_docs.get(uid) or {}
+        per_resource: Dict[str, Dict[str, Any]] = {}
+
+        for resource in resources:
+            summary, cleanup = _peek_from_docs(tier, resource, user_doc, data)
+            per_resource[resource] = summary
+            if cleanup is not None:
+                cleanups.setdefault(uid, {}).update(cleanup)
+
+        results[uid] = per_resource
+
+    pending = list(cleanups.items())
+    for start in range(0, len(pending), _CLEANUP_BATCH_LIMIT):
+        batch = db.batch()
+        for uid, cleanup in pending[start:start + _CLEANUP_BATCH_LIMIT]:
+            batch.set(_usage_ref(db, uid), cleanup, merge=True)
+        batch.commit()
+        for uid, _cleanup in pending[start:start + _CLEANUP_BATCH_LIMIT]:
+            forget_request_document("usage", uid)
+
+    return results
 
 
 # Existing image API compatibility wrappers.
@@ -7,11 +7,17 @@ import uuid
 import tempfile
 import subprocess
 from typing import Optional, Literal, Dict, Any, List
-import httpx
 from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel, Field
 
-from storage_utils import upload_bytes_to_firebase_storage, upload_bytes_to_firebase_storage_with_metadata, delete_firebase_storage_object
+import http_pool
+from encoder_pool import encoder_command, run_encode
+
+from storage_utils import (
+    delete_firebase_storage_object,
+    upload_bytes_to_firebase_storage,
+    upload_file_to_firebase_storage_with_metadata,
+)
 from storage_tracking import ensure_storage_available, register_storage_asset, release_storage_asset
 
 from runway_client import (
@@ -24,6 +30,13 @@ from runway_client import (
 )
 
 from auth_helpers import get_db, require_user
+from firestore_async import get_document, run_blocking, stream_query, update_document
+from progress_events import TERMINAL_STATUSES, bearer_from_query, open_progress_stream, publish_progress
+from progress_writer import write_progress
+from active_generation_locks import acquire_active_generation_lock, release_active_generation_lock
+from admin_search import remove_from_search_index, set_creative_job, update_creative_job
+from creative_insights import apply_creative_performance_change
+from reporting_engine.service import bump_library_performance_version
 from usage_caps import get_tier_and_status, utc_month_key
 from video_usage import (
     check_and_increment_video_usage,
@@ -31,7 +44,7 @@ from video_usage import (
 )
 from admin_guard import is_admin
 
-from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 from google.cloud import firestore as gc_firestore
 
 from entitlements import require_pro_or_business
@@ -46,10 +59,10 @@ from notification_utils import (
 )
 
 from video_safety import (
+    VIDEO_MAX_ACTIVE_JOBS_PER_USER,
     enforce_user_submission_window,
     moderate_video_request,
     require_active_account,
-    require_no_active_video_job,
     reserve_platform_cost,
     rollback_platform_cost,
     rollback_user_submission_window,
@@ -94,6 +107,7 @@ VIDEO_PROGRESS = {
     "submitting_to_runway": (32, "Submitting your video request."),
     "waiting_for_runway": (48, "Generating your video."),
     "processing_video": (68, "Processing the final video."),
+    "waiting_for_encoder": (68, "Waiting for an available video encoder."),
     "generating_voiceover": (78, "Generating your voiceover."),
     "mixing_audio": (86, "Adding voiceover to your video."),
     "uploading_video": (93, "Uploading your finished video."),
@@ -169,7 +183,9 @@ def set_video_progress(job_ref, stage: str, **extra) -> None:
     payload = progress_payload(stage)
     payload.update(extra)
     payload["progressUpdatedAt"] = int(time.time())
-    job_ref.update(payload)
+    terminal = stage in TERMINAL_STATUSES or payload.get("status") in TERMINAL_STATUSES
+    write_progress(job_ref, payload, terminal=terminal)
+    publish_progress(job_ref.parent.id, job_ref.id, payload)
 
 # -----------------------------
 # Video plan gating + caps
@@ -222,87 +238,49 @@ def _sha256(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 async def download_to_file(url: str, out_path: str) -> None:
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.get(url)
+    async with http_pool.stream("GET", url, timeout=120) as r:
         r.raise_for_status()
         with open(out_path, "wb") as f:
-            f.write(r.content)
-
-def mux_voiceover(video_path: str, audio_path: str, out_path: str) -> None:
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-i", audio_path,
-        "-map", "0:v:0",   # ✅ keep video from first input
-        "-map", "1:a:0",   # ✅ take audio from second input
-        "-c:v", "copy",
-        "-c:a", "aac",
-        out_path,
-    ]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if p.returncode != 0:
-        raise RuntimeError(f"ffmpeg mux failed: {p.stderr[-800:]}")
-
-def normalize_video_with_ffmpeg(in_path: str, out_path: str) -> None:
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", in_path,
-        "-c:v", "libx264",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        "-c:a", "aac",
-        out_path,
-    ]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if p.returncode != 0:
-        raise RuntimeError(f"ffmpeg normalize failed: {p.stderr[-800:]}")
-
-def probe_duration_seconds(path: str) -> float:
-    cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=nk=1:nw=1",
-        path,
-    ]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if p.returncode != 0:
-        raise RuntimeError(f"ffprobe failed: {p.stderr[-800:]}")
-    try:
-        return float((p.stdout or "").strip())
-    except Exception:
-        raise RuntimeError(f"ffprobe returned invalid duration: {p.stdout!r}")
-
-def enforce_exact_duration(in_path: str, out_path: str, target_seconds: int) -> None:
-    """
-    Runway sometimes returns shorter (ex: 4s when you request 6s).
-    This trims or pads (clone last frame) to ensure exact target length.
+            async for chunk in r.aiter_bytes(1024 * 1024):
+                f.write(chunk)
+
+def finalize_video_with_ffmpeg(
+    video_path: str,
+    out_path: str,
+    target_seconds: int,
+    audio_path: Optional[str] = None,
+) -> None:
     """
-    dur = probe_duration_seconds(in_path)
+    Normalize, enforce the exact duration and (optionally) mux the voiceover
+    in a single encode.
 
-    # If we're already very close, just copy through a faststart normalize
-    if abs(dur - target_seconds) <= 0.15:
-        normalize_video_with_ffmpeg(in_path, out_path)
-        return
-
-    pad = max(0.0, (target_seconds - dur) + 0.25)
+    Runway sometimes returns shorter clips (ex: 4s when you request 6s), so
+    the last frame is cloned for up to the full target length and the output
+    is cut at exactly target_seconds; longer clips are simply trimmed.
+    """
+    cmd = ["ffmpeg", "-y", "-i", video_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    else:
+        cmd += ["-map", "0:v:0", "-map", "0:a?"]
 
-    # Re-encode video to safely apply tpad and time trim
-    vf = f"tpad=stop_mode=clone:stop_duration={pad:.3f}"
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", in_path,
-        "-t", str(target_seconds),
-        "-vf", vf,
+    cmd += [
+        "-vf", f"tpad=stop_mode=clone:stop_duration={int(target_seconds)}",
+        "-t", str(int(target_seconds)),
         "-c:v", "libx264",
         "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
         "-c:a", "aac",
+        "-movflags", "+faststart",
         out_path,
     ]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    p = subprocess.run(
+        encoder_command(cmd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
     if p.returncode != 0:
-        raise RuntimeError(f"ffmpeg enforce duration failed: {p.stderr[-800:]}")
+        raise RuntimeError(f"ffmpeg finalize failed: {p.stderr[-800:]}")
 
 # -----------------------------
 # Voiceover script duration guard
@@ -1073,10 +1051,44 @@ def inject_winners_structured(
     )
 
 # ---------- Routes ----------
+async def _with_active_video_lock(start, req, authorization: str | None):
+    """
+    Hold one of the user's video slots for the new job. Any failure before the
+    job is accepted (validation, moderation, caps, provider submission)
+    releases it; once running, finalization or provider failure releases it.
+    """
+    uid, _email, _claims = await run_blocking(require_user, authorization)
+    db = get_db()
+    job_id = str(uuid.uuid4())
+
+    await run_blocking(
+        acquire_active_generation_lock,
+        db,
+        uid,
+        "video",
+        job_id,
+        limit=VIDEO_MAX_ACTIVE_JOBS_PER_USER,
+        detail="You already have a video generation in progress.",
+    )
+    try:
+        return await start(req, authorization, job_id)
+    except BaseException:
+        await run_blocking(release_active_generation_lock, db, uid, job_id)
+        raise
+
+
 @router.post("/video/start-image", response_model=StartVideoResponse,)
 async def start_image_video(
     req: StartImageVideoRequest,
     authorization: str | None = Header(default=None),
+):
+    return await _with_active_video_lock(_start_image_video, req, authorization)
+
+
+async def _start_image_video(
+    req: StartImageVideoRequest,
+    authorization: str | None,
+    job_id: str,
 ):
     uid, _email, claims = require_user(authorization)
     admin = is_admin(claims)
@@ -1105,7 +1117,6 @@ async def start_image_video(
     )
 
     require_active_account(user_doc)
-    require_no_active_video_job(db, uid)
 
     moderation_result = await moderate_video_request(
         db,
@@ -1194,14 +1205,12 @@ async def start_image_video(
             link="/video-ads",
         )
 
-    job_id = str(uuid.uuid4())
-
     job_ref = (
         db.collection("video_jobs")
         .document(job_id)
     )
 
-    job_ref.set({
+    set_creative_job(job_ref, {
         "uid": uid,
         "createdAt": int(time.time()),
         "status": "running",
@@ -1375,7 +1384,7 @@ async def start_image_video(
         )
         print("[Video Submission Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1412,7 +1421,7 @@ async def start_image_video(
         )
         print("[Video Submission Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1476,7 +1485,7 @@ async def start_image_video(
         )
         print("[Voiceover Start Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1507,7 +1516,7 @@ async def start_image_video(
         )
         print("[Post-Accept Video Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1523,6 +1532,14 @@ async def start_image_video(
 async def start_prompt_video(
     req: StartPromptVideoRequest,
     authorization: str | None = Header(default=None),
+):
+    return await _with_active_video_lock(_start_prompt_video, req, authorization)
+
+
+async def _start_prompt_video(
+    req: StartPromptVideoRequest,
+    authorization: str | None,
+    job_id: str,
 ):
     uid, _email, claims = require_user(authorization)
     admin = is_admin(claims)
@@ -1551,7 +1568,6 @@ async def start_prompt_video(
     )
 
     require_active_account(user_doc)
-    require_no_active_video_job(db, uid)
 
     moderation_result = await moderate_video_request(
         db,
@@ -1700,14 +1716,12 @@ async def start_prompt_video(
         f"{director_prompt}\n"
     )
 
-    job_id = str(uuid.uuid4())
-
     job_ref = (
         db.collection("video_jobs")
         .document(job_id)
     )
 
-    job_ref.set({
+    set_creative_job(job_ref, {
         "uid": uid,
         "createdAt": int(time.time()),
         "status": "running",
@@ -1842,7 +1856,7 @@ async def start_prompt_video(
         )
         print("[Video Submission Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1879,7 +1893,7 @@ async def start_prompt_video(
         )
         print("[Video Submission Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1943,7 +1957,7 @@ async def start_prompt_video(
         )
         print("[Voiceover Start Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1974,7 +1988,7 @@ async def start_prompt_video(
         )
         print("[Post-Accept Video Error]", repr(e), flush=True)
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_error,
             **progress_payload("failed"),
@@ -1987,42 +2001,37 @@ async def start_prompt_video(
 
 
 
-async def finalize_video_job(job_id: str, uid: str) -> None:
-    """Finalize a completed Runway task while status polling remains responsive."""
+async def finalize_video_job(
+    job_id: str,
+    uid: str,
+    task: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Finalize a completed Runway task. Callers hold the finalization lease."""
     db = get_db()
     job_ref = db.collection("video_jobs").document(job_id)
-    job = job_ref.get().to_dict() or {}
+    job = (await get_document(job_ref)).to_dict() or {}
 
     try:
-        runway_video_task_id = job.get("runwayVideoTaskId")
-        task = await get_task(runway_video_task_id)
+        if task is None:
+            task = await get_task(job.get("runwayVideoTaskId"))
         runway_video_url = extract_first_output_url(task)
         if not runway_video_url:
             raise RuntimeError("The video service completed the task but no output was available.")
 
         set_video_progress(job_ref, "processing_video", finalizationState="running")
+        finalize_started = time.perf_counter()
+        timings: Dict[str, Any] = {"pipeline": "single_pass"}
 
         with tempfile.TemporaryDirectory() as td:
+            target_seconds = int(job.get("duration") or 6)
             raw_video = os.path.join(td, "runway_raw.mp4")
-            await download_to_file(runway_video_url, raw_video)
-
-            normalized_video = os.path.join(td, "runway_norm.mp4")
-            await asyncio.to_thread(
-                normalize_video_with_ffmpeg,
-                raw_video,
-                normalized_video,
-            )
 
-            target_seconds = int(job.get("duration") or 6)
-            enforced_video = os.path.join(td, "runway_enforced.mp4")
-            await asyncio.to_thread(
-                enforce_exact_duration,
-                normalized_video,
-                enforced_video,
-                target_seconds,
-            )
-            final_path = enforced_video
+            async def _download_video() -> None:
+                started = time.perf_counter()
+                await download_to_file(runway_video_url, raw_video)
+                timings["downloadMs"] = int((time.perf_counter() - started) * 1000)
 
+            audio_path = None
             vo_cfg = job.get("voiceover") or {}
             if vo_cfg.get("enabled"):
                 set_video_progress(job_ref, "generating_voiceover")
@@ -2031,64 +2040,100 @@ async def finalize_video_job(job_id: str, uid: str) -> None:
                     raise RuntimeError("Voiceover enabled but voiceoverScript is empty.")
 
                 enforce_script_fits_duration(script, target_seconds, True)
-                tts_task_id = job.get("runwayTtsTaskId")
-                if not tts_task_id:
-                    tts_task_id = await create_text_to_speech(
-                        prompt_text=script,
-                        preset_voice=safe_voice(vo_cfg.get("presetVoice")),
-                    )
-                    job_ref.update({"runwayTtsTaskId": tts_task_id})
-
-                tts_task = None
-                for _ in range(120):
-                    tts_task = await get_task(tts_task_id)
-                    tts_status = tts_task.get("status")
-                    if tts_status == "SUCCEEDED":
-                        break
-                    if tts_status in ("FAILED", "CANCELED"):
-                        raise RuntimeError(
-                            tts_task.get("error")
-                            or tts_task.get("failureReason")
-                            or "Voiceover generation failed."
-                        )
-                    await asyncio.sleep(1)
-                else:
-                    raise RuntimeError("Voiceover generation timed out.")
-
-                tts_url = extract_first_output_url(tts_task or {})
-                if not tts_url:
-                    raise RuntimeError("TTS succeeded but output URL is missing.")
-
                 audio_path = os.path.join(td, "voice.mp3")
-                await download_to_file(tts_url, audio_path)
 
+                async def _prepare_voiceover() -> None:
+                    started = time.perf_counter()
+                    tts_task_id = job.get("runwayTtsTaskId")
+                    if not tts_task_id:
+                        tts_task_id = await create_text_to_speech(
+                            prompt_text=script,
+                            preset_voice=safe_voice(vo_cfg.get("presetVoice")),
+                        )
+                        await update_document(job_ref, {"runwayTtsTaskId": tts_task_id})
+
+                    tts_task = None
+                    for _ in range(120):
+                        tts_task = await get_task(tts_task_id)
+                        tts_status = tts_task.get("status")
+                        if tts_status == "SUCCEEDED":
+                            break
+                        if tts_status in ("FAILED", "CANCELED"):
+                            raise RuntimeError(
+                                tts_task.get("error")
+                                or tts_task.get("failureReason")
+                                or "Voiceover generation failed."
+                            )
+                        await asyncio.sleep(1)
+                    else:
+                        raise RuntimeError("Voiceover generation timed out.")
+
+                    tts_url = extract_first_output_url(tts_task or {})
+                    if not tts_url:
+                        raise RuntimeError("TTS succeeded but output URL is missing.")
+
+                    await download_to_file(tts_url, audio_path)
+                    timings["voiceoverMs"] = int((time.perf_counter() - started) * 1000)
+
+                # The voiceover does not depend on the video, so fetch both at once.
+                await asyncio.gather(_download_video(), _prepare_voiceover())
                 set_video_progress(job_ref, "mixing_audio")
-                muxed = os.path.join(td, "final_muxed.mp4")
-                await asyncio.to_thread(
-                    mux_voiceover,
-                    enforced_video,
-                    audio_path,
-                    muxed,
+            else:
+                await _download_video()
+
+            final_path = os.path.join(td, "final.mp4")
+            encode_stage = "mixing_audio" if audio_path else "processing_video"
+            encode_started: Dict[str, float] = {}
+
+            def _waiting_for_encoder(position: int) -> None:
+                set_video_progress(
+                    job_ref,
+                    "waiting_for_encoder",
+                    progressPercent=VIDEO_PROGRESS[encode_stage][0],
+                    encoderQueuePosition=position,
                 )
-                final_path = muxed
 
-            with open(final_path, "rb") as f:
-                data = f.read()
+            def _encoder_started() -> None:
+                encode_started["at"] = time.perf_counter()
+                set_video_progress(job_ref, encode_stage, encoderQueuePosition=None)
+
+            started = time.perf_counter()
+            await run_encode(
+                finalize_video_with_ffmpeg,
+                raw_video,
+                final_path,
+                target_seconds,
+                audio_path,
+                on_wait=_waiting_for_encoder,
+                on_start=_encoder_started,
+            )
+            finished = time.perf_counter()
+            encode_from = encode_started.get("at", started)
+            timings["encoderWaitMs"] = int((encode_from - started) * 1000)
+            timings["encodeMs"] = int((finished - encode_from) * 1000)
+            final_size = os.path.getsize(final_path)
 
             set_video_progress(job_ref, "uploading_video")
-            latest_job = job_ref.get().to_dict() or job
             tier, _status = get_tier_and_status(
-                db.collection("users").document(uid).get().to_dict() or {}
+                (await get_document(db.collection("users").document(uid))).to_dict() or {}
             )
-            ensure_storage_available(
+            await run_blocking(
+                ensure_storage_available,
                 db,
                 uid,
                 tier,
-                len(data),
+                final_size,
             )
-            stored = upload_bytes_to_firebase_storage_with_metadata(
-                data, uid, content_type="video/mp4", folder="video_ads", filename_hint="video.mp4"
+            started = time.perf_counter()
+            stored = await run_blocking(
+                upload_file_to_firebase_storage_with_metadata,
+                final_path,
+                uid,
+                content_type="video/mp4",
+                folder="video_ads",
+                filename_hint="video.mp4",
             )
+            timings["uploadMs"] = int((time.perf_counter() - started) * 1000)
             final_url = stored["url"]
 
             set_video_progress(job_ref, "saving_library")
@@ -2099,7 +2144,8 @@ async def finalize_video_job(job_id: str, uid: str) -> None:
                 asset_type="video",
             )
 
-            job_ref.update({
+            timings["totalMs"] = int((time.perf_counter() - finalize_started) * 1000)
+            update_creative_job(job_ref, {
                 "status": "succeeded",
                 "finalVideoUrl": final_url,
                 "error": None,
@@ -2109,7 +2155,9 @@ async def finalize_video_job(job_id: str, uid: str) -> None:
                 "storagePath": stored["storagePath"],
                 "fileSizeBytes": stored["fileSizeBytes"],
                 "contentType": stored.get("contentType") or "video/mp4",
+                "stageTimings": timings,
             })
+            release_active_generation_lock(db, uid, job_id)
 
             track_event(
                 db,
@@ -2157,13 +2205,14 @@ async def finalize_video_job(job_id: str, uid: str) -> None:
             reason="finalization_failure",
         )
 
-        job_ref.update({
+        update_creative_job(job_ref, {
             "status": "failed",
             "error": public_video_generation_error(exc, credits_refunded=bool(refund_succeeded)),
             "finalizationState": "failed",
             **progress_payload("failed"),
             "progressUpdatedAt": int(time.time()),
         })
+        release_active_generation_lock(db, uid, job_id)
 
         create_notification(
             db,
@@ -2189,153 +2238,221 @@ async def finalize_video_job(job_id: str, uid: str) -> None:
         )
 
 
+# -----------------------------
+# Provider task state (driven by runway_poller)
+# -----------------------------
+VIDEO_FINALIZE_LEASE_SECONDS = int(os.getenv("VIDEO_FINALIZE_LEASE_SECONDS", "600"))
+VIDEO_STATUS_CACHE_SECONDS = float(os.getenv("VIDEO_STATUS_CACHE_SECONDS", "2"))
+
+
+def claim_video_finalization(db, job_ref, owner: str) -> bool:
+    """
+    Take the finalization lease for a job whose Runway task succeeded.
+
+    Returns True for exactly one caller; a lease left by a dead process can be
+    reclaimed once it expires.
+    """
+    now = time.time()
+
+    @gc_firestore.transactional
+    def _tx(transaction: gc_firestore.Transaction) -> bool:
+        job = job_ref.get(transaction=transaction).to_dict() or {}
+        if job.get("status") != "running":
+            return False
+
+        state = job.get("finalizationState")
+        if state in {"complete", "failed"}:
+            return False
+        if state == "running":
+            expires_at = job.get("finalizationLeaseExpiresAt")
+            if expires_at is None:
+                expires_at = int(job.get("progressUpdatedAt") or 0) + VIDEO_FINALIZE_LEASE_SECONDS
+            if float(expires_at) > now:
+                return False
+
+        transaction.update(job_ref, {
+            "finalizationState": "running",
+            "finalizationOwner": owner,
+            "finalizationLeaseExpiresAt": now + VIDEO_FINALIZE_LEASE_SECONDS,
+            "finalizationAttempts": int(job.get("finalizationAttempts") or 0) + 1,
+            **progress_payload("processing_video"),
+            "progressUpdatedAt": int(now),
+        })
+        return True
+
+    claimed = _tx(db.transaction())
+    if claimed:
+        publish_progress(
+            job_ref.parent.id,
+            job_ref.id,
+            {**progress_payload("processing_video"), "finalizationState": "running"},
+        )
+    return claimed
+
+
+def renew_video_finalization(job_ref, owner: str) -> None:
+    job = job_ref.get().to_dict() or {}
+    if job.get("finalizationOwner") == owner and job.get("finalizationState") == "running":
+        job_ref.update({"finalizationLeaseExpiresAt": time.time() + VIDEO_FINALIZE_LEASE_SECONDS})
+
+
+def record_video_poll_error(job_ref, exc: Exception) -> None:
+    # A transient polling/network error does not mean the paid Runway task failed.
+    # Keep the job active so the user cannot start duplicate paid generations.
+    job_ref.update({
+        "statusPollErrors": gc_firestore.Increment(1),
+        "lastStatusPollError": str(exc)[:500],
+        "lastStatusPollErrorAt": int(time.time()),
+        "progressStage": "waiting_for_runway",
+        "progressPercent": VIDEO_PROGRESS["waiting_for_runway"][0],
+        "progressMessage": "The provider status check is temporarily unavailable. Your video is still processing.",
+        "progressUpdatedAt": int(time.time()),
+    })
+
+
+def fail_video_job_from_provider(db, job_ref, job_id: str, uid: str, task: Dict[str, Any]) -> None:
+    st = task.get("status")
+    refund_succeeded = refund_video_usage_once(
+        db,
+        job_ref,
+        uid,
+        reason="provider_generation_failure",
+    )
+
+    failure_code = task.get("failureCode") or task.get("failure_code")
+    provider_error = (
+        task.get("failure")
+        or task.get("error")
+        or task.get("failureReason")
+        or "The video task could not be completed."
+    )
+
+    public_error = public_video_generation_error(
+        RuntimeError(str(provider_error)),
+        credits_refunded=bool(refund_succeeded),
+    )
+
+    print("[Video Task Failure]", repr(provider_error), flush=True)
+
+    payload = {
+        "status": "failed",
+        "error": public_error,
+        "providerFailureCode": failure_code,
+        "providerFailureReason": str(provider_error)[:1000],
+        "providerTaskStatus": st,
+        **progress_payload("failed"),
+    }
+    update_creative_job(job_ref, payload)
+    publish_progress(job_ref.parent.id, job_ref.id, payload)
+    release_active_generation_lock(db, uid, job_id)
+
+    create_notification(
+        db,
+        uid,
+        event_key=f"video_failed_{job_id}",
+        title="Video generation failed",
+        body=(
+            "The video service could not complete your request. "
+            "Review the creative direction and try again."
+        ),
+        notification_type="generation_failed",
+        link="/video-ads",
+        metadata={
+            "jobId": job_id,
+            "error": str(provider_error)[:300],
+        },
+    )
+
+
+_status_cache: Dict[str, tuple] = {}
+
+
+async def _read_video_job(job_ref) -> Dict[str, Any]:
+    now = time.monotonic()
+    cached = _status_cache.get(job_ref.id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    job = (await get_document(job_ref)).to_dict() or {}
+    if len(_status_cache) > 4096:
+        _status_cache.clear()
+    _status_cache[job_ref.id] = (now + VIDEO_STATUS_CACHE_SECONDS, job)
+    return job
+
+
 @router.get("/video/status/{job_id}", response_model=VideoStatusResponse)
 async def video_status(job_id: str, authorization: str | None = Header(default=None)):
-    uid, _email, claims = require_user(authorization)
+    """Read-only: provider polling and finalization run in runway_poller."""
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
-    job_ref = db.collection("video_jobs").document(job_id)
-    job = job_ref.get().to_dict()
+    job = await _read_video_job(db.collection("video_jobs").document(job_id))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found.")
     if not admin and job.get("uid") != uid:
         raise HTTPException(status_code=403, detail="Forbidden.")
 
-    if job.get("status") == "succeeded" and job.get("finalVideoUrl"):
+    status = job.get("status") or "running"
+    if status == "succeeded" and job.get("finalVideoUrl"):
         return VideoStatusResponse(
             jobId=job_id, status="succeeded", finalVideoUrl=job["finalVideoUrl"],
             progressStage=job.get("progressStage") or "succeeded",
             progressMessage=job.get("progressMessage") or VIDEO_PROGRESS["succeeded"][1],
             progressPercent=job.get("progressPercent") or 100,
         )
-    if job.get("status") in ("failed", "canceled"):
+    if status in ("failed", "canceled"):
         return VideoStatusResponse(
-            jobId=job_id, status=job.get("status", "failed"), error=job.get("error"),
+            jobId=job_id, status=status, error=job.get("error"),
             progressStage=job.get("progressStage") or "failed",
             progressMessage=job.get("progressMessage") or VIDEO_PROGRESS["failed"][1],
             progressPercent=job.get("progressPercent") or 100,
         )
 
-    runway_video_task_id = job.get("runwayVideoTaskId")
-    if not runway_video_task_id:
-        return VideoStatusResponse(
-            jobId=job_id, status=job.get("status", "running"),
-            progressStage=job.get("progressStage") or "queued",
-            progressMessage=job.get("progressMessage") or VIDEO_PROGRESS["queued"][1],
-            progressPercent=job.get("progressPercent") or VIDEO_PROGRESS["queued"][0],
-        )
-
-    try:
-        task = await get_task(runway_video_task_id)
-
-    except (RunwayError, Exception) as exc:
-        # A transient polling/network error does not mean the paid Runway task failed.
-        # Keep the job active so the user cannot start duplicate paid generations.
-        error_message = str(exc)
-        poll_errors = int(job.get("statusPollErrors") or 0) + 1
-        job_ref.update({
-            "statusPollErrors": poll_errors,
-            "lastStatusPollError": error_message[:500],
-            "lastStatusPollErrorAt": int(time.time()),
-            "progressStage": "waiting_for_runway",
-            "progressPercent": VIDEO_PROGRESS["waiting_for_runway"][0],
-            "progressMessage": "The provider status check is temporarily unavailable. Your video is still processing.",
-            "progressUpdatedAt": int(time.time()),
-        })
-        return VideoStatusResponse(
-            jobId=job_id,
-            status="running",
-            error=None,
-            progressStage="waiting_for_runway",
-            progressMessage="The provider status check is temporarily unavailable. Your video is still processing.",
-            progressPercent=VIDEO_PROGRESS["waiting_for_runway"][0],
-        )
-
-    st = task.get("status")
-
-    if st == "SUCCEEDED":
-        latest = job_ref.get().to_dict() or job
-        finalization_state = latest.get("finalizationState")
-
-        if finalization_state not in {"running", "complete"}:
-            set_video_progress(job_ref, "processing_video", finalizationState="running")
-            asyncio.create_task(finalize_video_job(job_id, uid))
-            latest = job_ref.get().to_dict() or latest
-
-        return VideoStatusResponse(
-            jobId=job_id,
-            status="running",
-            progressStage=latest.get("progressStage") or "processing_video",
-            progressMessage=latest.get("progressMessage") or VIDEO_PROGRESS["processing_video"][1],
-            progressPercent=latest.get("progressPercent") or VIDEO_PROGRESS["processing_video"][0],
-        )
-
-    if st in ("FAILED", "CANCELED"):
-        refund_succeeded = refund_video_usage_once(
-            db,
-            job_ref,
-            uid,
-            reason="provider_generation_failure",
-        )
-
-        failure_code = task.get("failureCode") or task.get("failure_code")
-        provider_error = (
-            task.get("failure")
-            or task.get("error")
-            or task.get("failureReason")
-            or "The video task could not be completed."
-        )
-
-        public_error = public_video_generation_error(
-            RuntimeError(str(provider_error)),
-            credits_refunded=bool(refund_succeeded),
-        )
+    default_stage = "waiting_for_runway" if job.get("runwayVideoTaskId") else "queued"
+    return VideoStatusResponse(
+        jobId=job_id, status="running",
+        progressStage=job.get("progressStage") or default_stage,
+        progressMessage=job.get("progressMessage") or VIDEO_PROGRESS[default_stage][1],
+        progressPercent=job.get("progressPercent") or VIDEO_PROGRESS[default_stage][0],
+    )
 
-        print("[Video Task Failure]", repr(provider_error), flush=True)
 
-        job_ref.update({
-            "status": "failed",
-            "error": public_error,
-            "providerFailureCode": failure_code,
-            "providerFailureReason": str(provider_error)[:1000],
-            "providerTaskStatus": st,
-            **progress_payload("failed"),
-        })
+@router.get("/video/stream/{job_id}")
+async def video_stream(
+    job_id: str,
+    request: Request,
+    authorization: str | None = Header(default=None),
+    access_token: Optional[str] = Query(default=None),
+):
+    authorization = bearer_from_query(authorization, access_token)
+    uid, _email, claims = await run_blocking(require_user, authorization)
+    admin = is_admin(claims)
 
-        create_notification(
-            db,
-            uid,
-            event_key=f"video_failed_{job_id}",
-            title="Video generation failed",
-            body=(
-                "The video service could not complete your request. "
-                "Review the creative direction and try again."
-            ),
-            notification_type="generation_failed",
-            link="/video-ads",
-            metadata={
-                "jobId": job_id,
-                "error": str(provider_error)[:300],
-            },
-        )
+    def _authorize(job: Dict[str, Any]) -> None:
+        if not admin and job.get("uid") != uid:
+            raise HTTPException(status_code=403, detail="Forbidden.")
 
+    def _view(jid: str, job: Dict[str, Any]) -> Dict[str, Any]:
         return VideoStatusResponse(
-            jobId=job_id,
-            status="failed",
-            error=public_error,
-            **progress_payload("failed"),
-        )
-
-    refreshed = job_ref.get().to_dict() or job
-    return VideoStatusResponse(
-        jobId=job_id, status="running",
-        progressStage=refreshed.get("progressStage") or "waiting_for_runway",
-        progressMessage=refreshed.get("progressMessage") or VIDEO_PROGRESS["waiting_for_runway"][1],
-        progressPercent=refreshed.get("progressPercent") or VIDEO_PROGRESS["waiting_for_runway"][0],
+            jobId=jid,
+            status=job.get("status") or "running",
+            finalVideoUrl=job.get("finalVideoUrl"),
+            error=job.get("error"),
+            progressStage=job.get("progressStage") or "queued",
+            progressMessage=job.get("progressMessage") or VIDEO_PROGRESS["queued"][1],
+            progressPercent=job.get("progressPercent") or VIDEO_PROGRESS["queued"][0],
+        ).model_dump()
+
+    return await open_progress_stream(
+        get_db(),
+        "video_jobs",
+        job_id,
+        request,
+        authorize=_authorize,
+        view=_view,
     )
 
-
 @router.post("/video/tts/preview", response_model=TTSPreviewResponse)
 async def tts_preview(req: TTSPreviewRequest, authorization: str | None = Header(default=None)):
     uid, _email, claims = require_user(authorization)
@@ -2429,7 +2546,7 @@ async def list_video_jobs(
     limit: int = Query(24, ge=1, le=100),
     cursor: int | None = Query(None, description="createdAt cursor (unix seconds)"),
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
@@ -2445,7 +2562,7 @@ async def list_video_jobs(
 
     items = []
     last_created_at = None
-    for snap in q.stream():
+    for snap in await stream_query(q):
         data = snap.to_dict() or {}
         if not admin and data.get("uid") != uid:
             continue
@@ -2474,6 +2591,9 @@ def delete_video_job(job_id: str, authorization: str | None = Header(default=Non
             delete_firebase_storage_object(path)
         release_storage_asset(db, data.get("uid") or uid, size_bytes=int(data.get("fileSizeBytes") or 0), asset_type="video")
     ref.delete()
+    remove_from_search_index(db, "video", job_id)
+    apply_creative_performance_change(db, data.get("uid") or uid, "video", job_id, data, None)
+    bump_library_performance_version(data.get("uid") or uid)
     return {"ok": True, "jobId": job_id}
 
 @router.get("/video/jobs/{job_id}")
@@ -2481,12 +2601,12 @@ async def get_video_job(
     job_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid, _email, claims = require_user(authorization)
+    uid, _email, claims = await run_blocking(require_user, authorization)
     admin = is_admin(claims)
     db = get_db()
 
     ref = db.collection("video_jobs").document(job_id)
-    snap = ref.get()
+    snap = await get_document(ref)
     if not snap.exists:
         raise HTTPException(status_code=404, detail="Job not found.")
 
@@ -31,7 +31,6 @@ RUNWAY_DAILY_SPEND_LIMIT_USD = max(0.0, float(os.getenv("RUNWAY_DAILY_SPEND_LIMI
 RUNWAY_COST_PER_SECOND_USD = max(0.0, float(os.getenv("RUNWAY_COST_PER_SECOND_USD", "0.12")))
 RUNWAY_TTS_ESTIMATED_COST_USD = max(0.0, float(os.getenv("RUNWAY_TTS_ESTIMATED_COST_USD", "0.10")))
 
-ACTIVE_VIDEO_STATUSES = {"queued", "running", "pending", "processing", "throttled"}
 BLOCKING_CATEGORIES = {
     # Sexual content
     "sexual",
@@ -115,20 +114,6 @@ def require_active_account(user_doc: Dict[str, Any]) -> None:
         raise HTTPException(status_code=403, detail="This account has been suspended.")
 
 
-def require_no_active_video_job(db, uid: str) -> None:
-    active = 0
-    # Filter by UID only to avoid requiring a new composite Firestore index.
-    for snap in db.collection("video_jobs").where("uid", "==", uid).limit(25).stream():
-        data = snap.to_dict() or {}
-        if str(data.get("status") or "").lower() in ACTIVE_VIDEO_STATUSES:
-            active += 1
-            if active >= VIDEO_MAX_ACTIVE_JOBS_PER_USER:
-                raise HTTPException(
-                    status_code=429,
-                    detail="You already have a video generation in progress.",
-                )
-
-
 def enforce_user_submission_window(db, uid: str) -> None:
     """Atomic per-user cooldown and daily submission ceiling."""
     now = int(time.time())